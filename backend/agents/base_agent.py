@@ -1,30 +1,41 @@
+import asyncio
 from abc import ABC, abstractmethod
-from typing import List, Optional, Dict, Any
-import google.generativeai as genai
-from models import AgentRequest, AgentResponse, AgentType
+from typing import AsyncIterator, List, Optional, Dict, Any
+from models import AgentRequest, AgentResponse, AgentType, QueryFeatures
 from tools import BaseTool, ToolResult
 from config import settings
+from llm import get_llm_client, get_model_registry, estimate_tokens, PromptTemplate, PromptSection, AssembledPrompt
+from cache import ResponseCache, get_response_cache
+from .fast_answers import statistics_summary
+from .query_analyzer import get_query_analyzer
 import logging
-import asyncio
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# Joins the system prompt and the user's query into the prompt sent upstream
+_QUERY_SEPARATOR = "\n\nUser Query: "
+_QUERY_SEPARATOR_TOKENS = estimate_tokens(_QUERY_SEPARATOR)
+# Longer queries (pasted data, parsed as they are analysed) are analysed in a thread, off the event loop
+_ANALYZE_INLINE_MAX_CHARS = 100_000
+
 class BaseAgent(ABC):
     """Abstract base class for all AI agents"""
     
-    def __init__(self, agent_type: AgentType, description: str):
+    def __init__(self, agent_type: AgentType, description: str, prompt_budget: int = 2000):
         self.agent_type = agent_type
         self.description = description
+        self.prompt_budget = prompt_budget  # Max estimated input tokens per upstream call
         self.tools: Dict[str, BaseTool] = {}
         
-        # Configure Gemini API
-        if settings.gemini_api_key:
-            genai.configure(api_key=settings.gemini_api_key)
-            self.model = genai.GenerativeModel('gemini-2.0-flash')
-        else:
+        # Shared, concurrency-bounded client for all upstream model calls
+        self.llm_client = get_llm_client()
+        self.response_cache = get_response_cache() if settings.response_cache_enabled else None
+        
+        # Model handle borrowed from the process-wide registry
+        self.model = get_model_registry().get(settings.gemini_model, self._generation_config())
+        if self.model is None:
             logger.warning("Gemini API key not found. Agent will operate in mock mode.")
-            self.model = None
     
     def add_tool(self, tool: BaseTool) -> None:
         """Add a tool to this agent"""
@@ -47,6 +58,7 @@ class BaseAgent(ABC):
         """
         try:
             logger.info(f"{self.agent_type} agent processing query: {request.query[:100]}...")
+            request = await self._with_features(request)
             
             # Let specialized agents implement their own logic
             response = await self._process_specialized_query(request)
@@ -69,6 +81,65 @@ class BaseAgent(ABC):
                 metadata={"error": str(e)}
             )
     
+    async def process_query_stream(self, request: AgentRequest) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Process a query and stream the response as events
+        
+        Tool results are emitted first, then model text as it is generated,
+        then a final summary. Each event is a dict with an "event" name
+        ("tool", "token", "done" or "error") and a "data" payload.
+        
+        Args:
+            request: AgentRequest containing the query and context
+            
+        Yields:
+            Response events in order
+        """
+        try:
+            logger.info(f"{self.agent_type} agent streaming query: {request.query[:100]}...")
+            request = await self._with_features(request)
+            
+            context = await self._prepare_response(request)
+            for tool_event in context.get("tool_events", []):
+                yield {"event": "tool", "data": tool_event}
+            
+            chunks = []
+            if context.get("fast_answer") is not None:
+                chunks.append(context["fast_answer"])
+                yield {"event": "token", "data": {"text": context["fast_answer"]}}
+            else:
+                async for chunk in self._stream_gemini_api(
+                    context.get("query", request.query), context.get("system_prompt"), use_cache=not request.bypass_cache
+                ):
+                    chunks.append(chunk)
+                    yield {"event": "token", "data": {"text": chunk}}
+            
+            # Sections appended by the agent after generation go out as a last chunk
+            generated = "".join(chunks).strip()
+            response = self._complete_response(generated, context)
+            if response["text"].startswith(generated) and len(response["text"]) > len(generated):
+                yield {"event": "token", "data": {"text": response["text"][len(generated):]}}
+            
+            yield {
+                "event": "done",
+                "data": {
+                    "agent_type": self.agent_type,
+                    "tools_used": response.get("tools_used", []),
+                    "confidence": response.get("confidence"),
+                    "metadata": response.get("metadata", {})
+                }
+            }
+            
+        except Exception as e:
+            logger.error(f"Error in {self.agent_type} agent stream: {str(e)}")
+            yield {
+                "event": "error",
+                "data": {
+                    "agent_type": self.agent_type,
+                    "message": f"I apologize, but I encountered an error while processing your request: {str(e)}"
+                }
+            }
+    
     @abstractmethod
     async def _process_specialized_query(self, request: AgentRequest) -> Dict[str, Any]:
         """
@@ -82,13 +153,39 @@ class BaseAgent(ABC):
         """
         pass
     
-    async def _call_gemini_api(self, prompt: str, system_prompt: Optional[str] = None) -> str:
+    async def _prepare_response(self, request: AgentRequest) -> Dict[str, Any]:
+        """
+        Run tools and build the system prompt ahead of generation
+        
+        Args:
+            request: AgentRequest containing the query and context
+            
+        Returns:
+            Dict with system_prompt, tool_events and any state needed by _complete_response
+        """
+        raise NotImplementedError(f"{self.agent_type} agent does not support streaming")
+    
+    def _complete_response(self, ai_response: str, context: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Turn generated text into the final response dict
+        
+        Args:
+            ai_response: Text generated by the model
+            context: Dict returned by _prepare_response
+            
+        Returns:
+            Dict with response text, tools_used, confidence, and metadata
+        """
+        raise NotImplementedError(f"{self.agent_type} agent does not support streaming")
+    
+    async def _call_gemini_api(self, prompt: str, system_prompt: Optional[str] = None, use_cache: bool = True) -> str:
         """
         Call Gemini API with error handling and retries
         
         Args:
             prompt: User prompt
             system_prompt: Optional system prompt for context
+            use_cache: Serve and store the answer through the response cache
             
         Returns:
             Generated response text
@@ -96,27 +193,177 @@ class BaseAgent(ABC):
         if not self.model:
             return "I'm currently unable to process requests due to API configuration issues."
         
+        # Combine system prompt and user prompt if system prompt is provided
+        full_prompt = prompt
+        if system_prompt:
+            full_prompt = f"{system_prompt}{_QUERY_SEPARATOR}{prompt}"
+        
+        cache_key = self._get_cache_key(prompt, full_prompt, use_cache)
+        if cache_key:
+            cached = await self.response_cache.get(cache_key)
+            if cached is not None:
+                return cached
+        
         try:
-            # Combine system prompt and user prompt if system prompt is provided
-            full_prompt = prompt
-            if system_prompt:
-                full_prompt = f"{system_prompt}\n\nUser Query: {prompt}"
-            
             # Generate response with configured parameters
-            response = await asyncio.to_thread(
-                self.model.generate_content,
-                full_prompt,
-                generation_config=genai.types.GenerationConfig(
-                    max_output_tokens=settings.max_response_tokens,
-                    temperature=settings.temperature,
-                )
+            response_text = await self.llm_client.generate(
+                self.model,
+                full_prompt
             )
-            
-            return response.text.strip()
-            
         except Exception as e:
             logger.error(f"Gemini API error: {str(e)}")
             raise Exception(f"AI service error: {str(e)}")
+        
+        response_text = response_text.strip()
+        if cache_key:
+            await self.response_cache.set(cache_key, response_text)
+        
+        return response_text
+    
+    async def _stream_gemini_api(self, prompt: str, system_prompt: Optional[str] = None, use_cache: bool = True) -> AsyncIterator[str]:
+        """
+        Stream a Gemini response chunk by chunk
+        
+        Args:
+            prompt: User prompt
+            system_prompt: Optional system prompt for context
+            use_cache: Serve and store the answer through the response cache
+            
+        Yields:
+            Generated text chunks
+        """
+        if not self.model:
+            yield "I'm currently unable to process requests due to API configuration issues."
+            return
+        
+        full_prompt = prompt
+        if system_prompt:
+            full_prompt = f"{system_prompt}{_QUERY_SEPARATOR}{prompt}"
+        
+        cache_key = self._get_cache_key(prompt, full_prompt, use_cache)
+        if cache_key:
+            cached = await self.response_cache.get(cache_key)
+            if cached is not None:
+                yield cached
+                return
+        
+        chunks = []
+        try:
+            async for chunk in self.llm_client.stream(
+                self.model,
+                full_prompt
+            ):
+                chunks.append(chunk)
+                yield chunk
+                
+        except Exception as e:
+            logger.error(f"Gemini API stream error: {str(e)}")
+            raise Exception(f"AI service error: {str(e)}")
+        
+        if cache_key:
+            await self.response_cache.set(cache_key, "".join(chunks).strip())
+    
+    async def _generate_text(self, request: AgentRequest, context: Dict[str, Any]) -> str:
+        """Model answer for a prepared request, or the fast-path answer when _prepare_response made one"""
+        if context.get("fast_answer") is not None:
+            return context["fast_answer"]
+        return await self._call_gemini_api(
+            context["query"], context["system_prompt"], use_cache=not request.bypass_cache
+        )
+    
+    def _model_query(self, request: AgentRequest, statistics_result: Optional[Dict[str, Any]] = None) -> str:
+        """
+        The query as sent to the model: a pasted dataset, which may be megabytes,
+        is replaced by a placeholder and the statistics tool's summary of it
+        (without a summary the model is sent the data itself)
+        
+        Args:
+            request: AgentRequest containing the query
+            statistics_result: StatisticsTool result for the pasted data, if computed
+            
+        Returns:
+            Query text for the model
+        """
+        features = self._get_features(request)
+        if features.prompt_text is None or statistics_result is None:
+            return request.query
+        return f"{features.prompt_text}\n\n[pasted data: {statistics_summary(statistics_result)}]"
+    
+    def _use_fast_path(self, request: AgentRequest) -> bool:
+        """Whether deterministic answers may replace the model for this request"""
+        return settings.fast_path_enabled and request.allow_fast_path
+    
+    async def _with_features(self, request: AgentRequest) -> AgentRequest:
+        """The request with its query analysis attached, so the agents it passes through reuse it"""
+        if request.features is not None:
+            return request
+        if len(request.query) > _ANALYZE_INLINE_MAX_CHARS:
+            features = await asyncio.to_thread(get_query_analyzer().analyze, request.query)
+        else:
+            features = get_query_analyzer().analyze(request.query)
+        return request.model_copy(update={"features": features})
+    
+    def _get_features(self, request: AgentRequest) -> QueryFeatures:
+        """Query analysis passed along by the routing agent, or computed (and cached) here"""
+        return request.features or get_query_analyzer().analyze(request.query)
+    
+    def _assemble_system_prompt(self, template: PromptTemplate, sections: List[PromptSection],
+                                query: str) -> AssembledPrompt:
+        """
+        Build a system prompt that keeps the whole call within this agent's input budget
+        
+        Args:
+            template: Precompiled static part of the system prompt
+            sections: Context sections to fit in by priority
+            query: User query that will be sent along with the prompt
+            
+        Returns:
+            The assembled system prompt
+        """
+        budget = self.prompt_budget - estimate_tokens(query, limit=self.prompt_budget) - _QUERY_SEPARATOR_TOKENS
+        prompt = template.assemble(sections, budget)
+        if prompt.truncated:
+            logger.warning(
+                f"{self.agent_type} prompt over budget ({self.prompt_budget} tokens); "
+                f"left out lines: {prompt.truncated}"
+            )
+        return prompt
+    
+    def _token_usage(self, ai_response: str, context: Dict[str, Any]) -> Dict[str, Any]:
+        """Estimated prompt/response token counts of one request, for response metadata"""
+        prompt = context["prompt"]
+        if context.get("fast_answer") is not None:
+            # Nothing was sent upstream
+            return {"prompt_tokens": 0, "response_tokens": 0, "prompt_budget": self.prompt_budget, "truncated_sections": {}}
+        return {
+            "prompt_tokens": prompt.tokens + _QUERY_SEPARATOR_TOKENS + estimate_tokens(context["query"], limit=self.prompt_budget),
+            "response_tokens": estimate_tokens(ai_response),
+            "prompt_budget": self.prompt_budget,
+            "truncated_sections": prompt.truncated
+        }
+    
+    def _generation_config(self) -> Dict[str, Any]:
+        """Generation parameters this agent's model handle applies to every call"""
+        return {
+            "max_output_tokens": settings.max_response_tokens,
+            "temperature": settings.temperature,
+        }
+    
+    def _get_cache_key(self, prompt: str, full_prompt: str, use_cache: bool) -> Optional[str]:
+        """Build the response cache key for a call, or None when caching is off for it"""
+        if self.response_cache is None:
+            return None
+        if not use_cache:
+            self.response_cache.record_bypass()
+            return None
+        return ResponseCache.make_key(
+            agent=self.agent_type.value,
+            query=prompt,
+            full_prompt=full_prompt,
+            model=self.model.model_name,
+            temperature=settings.temperature,
+            max_tokens=settings.max_response_tokens
+        )
     
     async def _use_tool(self, tool_name: str, *args, **kwargs) -> ToolResult:
         """
@@ -0,0 +1,159 @@
+import re
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from utils import KeywordScorer
+from .learned_router import LearnedRouter, ROUTER_CLASSES
+from .query_analyzer import (
+    _ARITHMETIC, _MATH_ROUTING_PATTERNS, _PHYSICS_ROUTING_PATTERNS, MATH_TIE_CLUES, PHYSICS_TIE_CLUES
+)
+
+# Joins queries for scanning: no keyword or routing pattern can match across it
+# ("." stops at the newline, "\s" and "\b" at the NUL)
+_SEPARATOR = "\n\x00\n"
+
+# Route codes in the result arrays, shared with the learned router
+_ROUTES = ROUTER_CLASSES
+_TUTOR, _MATH, _PHYSICS = range(3)
+
+class BatchClassifier:
+    """
+    Classifies many queries at once with the same rules as TutorAgent._classify_query.
+
+    The queries are joined into one text and scanned once by the keyword
+    automaton and once per routing pattern; each match is mapped back to
+    its query by offset, giving query x keyword presence matrices. Domain
+    scores are then one product with the precomputed keyword-to-domain
+    weight matrix, and routes are decided for the whole batch with array
+    operations, so per-query Python work is limited to the scan itself.
+    Repeated queries are scanned once.
+
+    With a learned router, its confident predictions take precedence, as
+    in TutorAgent._classify_query.
+    """
+
+    def __init__(self, keyword_scorer: KeywordScorer, learned_router: Optional[LearnedRouter] = None,
+                 min_confidence: float = 1.0):
+        self.keyword_scorer = keyword_scorer
+        self.learned_router = learned_router
+        self.min_confidence = min_confidence
+        self.domains = ["math", "physics"]
+
+        # Keyword-to-domain weight matrix: (patterns, domains)
+        self.keyword_weights = np.array(
+            [[weights.get(domain, 0.0) for domain in self.domains] for weights in keyword_scorer.pattern_weights()],
+            dtype=np.float64
+        ).reshape(-1, len(self.domains))
+
+        # Routing patterns and their weights per domain: (patterns, domains)
+        self.routing_patterns = [pattern for pattern, _ in _MATH_ROUTING_PATTERNS + _PHYSICS_ROUTING_PATTERNS]
+        self.routing_weights = np.zeros((len(self.routing_patterns), len(self.domains)))
+        for i, (_, score) in enumerate(_MATH_ROUTING_PATTERNS):
+            self.routing_weights[i, 0] = score
+        for i, (_, score) in enumerate(_PHYSICS_ROUTING_PATTERNS, len(_MATH_ROUTING_PATTERNS)):
+            self.routing_weights[i, 1] = score
+
+        self._physics_clues = re.compile("|".join(re.escape(clue) for clue in PHYSICS_TIE_CLUES))
+        self._math_clues = re.compile("|".join(re.escape(clue) for clue in MATH_TIE_CLUES))
+
+    def score(self, queries: List[str]) -> Dict[str, np.ndarray]:
+        """
+        Score a batch of queries
+
+        Args:
+            queries: Query texts
+
+        Returns:
+            "keyword" and "pattern" score arrays of shape (queries, domains),
+            plus boolean arrays "physics_clue", "math_clue" and "expression"
+            used to break ties
+        """
+        count = len(queries)
+        lowered = [query.lower() for query in queries]
+
+        # Keyword presence: each keyword counts once per query, as in KeywordScorer.score
+        lowered_text, lowered_starts = _join(lowered)
+        hits = np.array(self.keyword_scorer.find_all(lowered_text), dtype=np.int64).reshape(-1, 2)
+        keyword_present = np.zeros((count, len(self.keyword_weights)), dtype=bool)
+        keyword_present[_owners(lowered_starts, hits[:, 1] - 1), hits[:, 0]] = True
+
+        # Routing patterns run case-sensitively on the original text
+        text, starts = _join(queries)
+        pattern_present = np.zeros((count, len(self.routing_patterns)), dtype=bool)
+        for column, pattern in enumerate(self.routing_patterns):
+            pattern_present[_owners(starts, _match_starts(pattern, text)), column] = True
+        expression = np.zeros(count, dtype=bool)
+        expression[_owners(starts, _match_starts(_ARITHMETIC, text))] = True
+
+        physics_clue = np.zeros(count, dtype=bool)
+        physics_clue[_owners(lowered_starts, _match_starts(self._physics_clues, lowered_text))] = True
+        math_clue = np.zeros(count, dtype=bool)
+        math_clue[_owners(lowered_starts, _match_starts(self._math_clues, lowered_text))] = True
+
+        return {
+            "keyword": keyword_present.astype(np.float64) @ self.keyword_weights,
+            "pattern": pattern_present.astype(np.float64) @ self.routing_weights,
+            "physics_clue": physics_clue,
+            "math_clue": math_clue,
+            "expression": expression,
+        }
+
+    def route(self, scores: Dict[str, np.ndarray]) -> np.ndarray:
+        """Route codes (indexes into the agent types) for scored queries"""
+        total = scores["keyword"] + scores["pattern"]
+        math, physics = total[:, 0], total[:, 1]
+
+        tie = (math == physics) & (math >= 2)
+        tie_route = np.where(scores["physics_clue"], _PHYSICS,
+                             np.where(scores["math_clue"] | scores["expression"], _MATH, _TUTOR))
+
+        routes = np.full(len(total), _TUTOR, dtype=np.int8)
+        routes[(math > physics) & (math >= 2)] = _MATH
+        routes[(physics > math) & (physics >= 2)] = _PHYSICS
+        routes[tie] = tie_route[tie]
+        return routes
+
+    def classify(self, queries: List[str]) -> List[Dict[str, Any]]:
+        """
+        Classify a batch of queries
+
+        Args:
+            queries: Query texts
+
+        Returns:
+            For each query, in order: the agent it routes to, its keyword math and
+            physics scores, and which router decided ("learned" or "keywords")
+        """
+        if not queries:
+            return []
+        # Bulk imports repeat queries; each distinct text is scanned once
+        positions = {query: i for i, query in enumerate(dict.fromkeys(queries))}
+        distinct = list(positions)
+        scores = self.score(distinct)
+        routes = self.route(scores)
+        total = scores["keyword"] + scores["pattern"]
+        learned = np.zeros(len(distinct), dtype=bool)
+        if self.learned_router is not None:
+            predicted, confidence = self.learned_router.predict_batch(distinct)
+            learned = confidence >= self.min_confidence
+            routes = np.where(learned, predicted, routes)
+        if len(positions) < len(queries):
+            inverse = np.fromiter((positions[query] for query in queries), dtype=np.int64, count=len(queries))
+            routes, total, learned = routes[inverse], total[inverse], learned[inverse]
+        return [
+            {"route": _ROUTES[route], "math_score": float(math), "physics_score": float(physics),
+             "router": "learned" if by_model else "keywords"}
+            for route, (math, physics), by_model in zip(routes.tolist(), total.tolist(), learned.tolist())
+        ]
+
+def _join(texts: List[str]) -> Tuple[str, np.ndarray]:
+    """One text holding all the given ones, and the offset each starts at"""
+    lengths = np.fromiter((len(text) + len(_SEPARATOR) for text in texts), dtype=np.int64, count=len(texts))
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    return _SEPARATOR.join(texts), starts
+
+def _owners(starts: np.ndarray, offsets) -> np.ndarray:
+    """Index of the text each offset in the joined text falls in"""
+    return np.searchsorted(starts, np.asarray(offsets, dtype=np.int64), side="right") - 1
+
+def _match_starts(pattern: re.Pattern, text: str) -> List[int]:
+    return [match.start() for match in pattern.finditer(text)]
@@ -0,0 +1,270 @@
+import re
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+# Token kinds
+_NUMBER, _NAME, _OP, _SUPERSCRIPT, _ROOT, _PI, _LPAREN, _RPAREN, _OTHER = range(9)
+
+_TOKEN = re.compile(r"""
+    (?P<space>\s+)
+  | (?P<number>(?:\d+(?:\.\d+)?|\.\d+)(?:[eE][+-]?\d+)?)
+  | (?P<name>[A-Za-z_]\w*)
+  | (?P<op>\*\*|[-+*/^×÷−·])
+  | (?P<superscript>[²³])
+  | (?P<root>√)
+  | (?P<pi>π)
+  | (?P<lparen>\()
+  | (?P<rparen>\))
+  | (?P<other>.)
+""", re.VERBOSE | re.DOTALL)
+_KINDS = {
+    "number": _NUMBER, "name": _NAME, "op": _OP, "superscript": _SUPERSCRIPT, "root": _ROOT,
+    "pi": _PI, "lparen": _LPAREN, "rparen": _RPAREN, "other": _OTHER,
+}
+
+# Functions the calculator evaluates, with the name it knows them by
+FUNCTIONS = {
+    "sin": "sin", "cos": "cos", "tan": "tan", "sqrt": "sqrt", "log": "log", "ln": "log",
+    "log10": "log10", "abs": "abs", "ceil": "ceil", "floor": "floor", "round": "round",
+}
+_ADDITIVE = {"+": "+", "-": "-", "−": "-"}
+_MULTIPLICATIVE = {"*": "*", "/": "/", "×": "×", "÷": "÷", "·": "*"}
+_POWER = {"^", "**"}
+_SUPERSCRIPTS = {"²": "^2", "³": "^3"}
+_MAX_DEPTH = 32  # Parenthesis nesting parsed before giving up
+
+class _Token(NamedTuple):
+    kind: int
+    text: str
+    start: int
+    end: int
+    spaced: bool  # Whitespace before the token
+
+class ExpressionSpan(NamedTuple):
+    start: int
+    end: int
+    expression: str  # Calculator-ready: "2(3+4)" -> "2*(3+4)", "√16" -> "sqrt(16)"
+
+def find_expressions(text: str) -> List[ExpressionSpan]:
+    """
+    Find the maximal, non-overlapping arithmetic expressions in text, in one pass
+
+    Understands + - * / ^ ** and their unicode forms (× ÷ − ·), functions
+    (sin, sqrt, ln, ...), π, √, ² and ³, and implicit multiplication written
+    without spaces ("2(3+4)", "3sqrt(2)", "2π"). "2 + 3 * 4" is one span, not
+    three; spans touching letters ("2x + 5", "x^2") are algebra, not arithmetic,
+    and are skipped. Plain numbers are not expressions.
+
+    Args:
+        text: Query text
+
+    Returns:
+        Spans in order of appearance
+    """
+    return _Scanner(text).scan()
+
+class _Scanner:
+    """Tokenizes once, then parses greedily left to right without revisiting tokens"""
+
+    def __init__(self, text: str):
+        self.tokens: List[_Token] = []
+        spaced = False
+        for match in _TOKEN.finditer(text):
+            if match.lastgroup == "space":
+                spaced = True
+                continue
+            self.tokens.append(_Token(_KINDS[match.lastgroup], match.group(), match.start(), match.end(), spaced))
+            spaced = False
+
+        # Matching parentheses, found up front so unbalanced ones are never parsed into
+        self.closing: Dict[int, int] = {}
+        open_positions = []
+        for i, token in enumerate(self.tokens):
+            if token.kind == _LPAREN:
+                open_positions.append(i)
+            elif token.kind == _RPAREN and open_positions:
+                self.closing[open_positions.pop()] = i
+
+        # Positions where a primary is known not to parse, so nested failures are not re-parsed
+        self.failed: Set[int] = set()
+        self.depth = 0
+        self.out: List[str] = []
+
+    def scan(self) -> List[ExpressionSpan]:
+        spans = []
+        i = 0
+        while i < len(self.tokens):
+            parsed = self._expression(i) if self._can_start(i) else None
+            if parsed is None:
+                i += 1
+                continue
+            end, has_operation = parsed
+            if has_operation and not self._touches_algebra(i, end):
+                spans.append(ExpressionSpan(self.tokens[i].start, self.tokens[end - 1].end, "".join(self.out)))
+            self.out.clear()
+            i = end
+        return spans
+
+    def _can_start(self, i: int) -> bool:
+        token = self.tokens[i]
+        return token.kind in (_NUMBER, _PI, _ROOT, _LPAREN, _NAME) or token.text in _ADDITIVE
+
+    def _touches_algebra(self, start: int, end: int) -> bool:
+        """
+        Whether the span is part of a larger expression with unknowns: next to an
+        operator it could not use ("x^2 - 5", "2 + 3 * x"), written against a
+        single-letter unknown ("5x", "x(2 + 3)"), or continuing a word with a
+        binary operator ("x + 2 * 3", but not "is -5 + 3")
+        """
+        first = self.tokens[start]
+        if start > 0:
+            before = self.tokens[start - 1]
+            if before.kind == _OP:
+                return True
+            if before.kind == _NAME and not first.spaced and len(before.text) == 1:
+                return True
+            if before.kind == _NAME and first.kind == _OP and self.tokens[start + 1].spaced:
+                return True
+        if end < len(self.tokens):
+            after = self.tokens[end]
+            if after.kind in (_OP, _SUPERSCRIPT):
+                return True
+            if after.kind == _NAME and not after.spaced and len(after.text) == 1:
+                return True
+        return False
+
+    # Each parser appends calculator text to self.out and returns (next index, whether
+    # an operation was seen), or removes what it appended and returns None
+
+    def _expression(self, i: int) -> Optional[Tuple[int, bool]]:
+        parsed = self._term(i)
+        if parsed is None:
+            return None
+        i, operation = parsed
+        while i < len(self.tokens) and self.tokens[i].text in _ADDITIVE:
+            mark = len(self.out)
+            self.out.append(f"{self._gap(i)}{_ADDITIVE[self.tokens[i].text]}{self._gap(i + 1)}")
+            right = self._term(i + 1)
+            if right is None:
+                del self.out[mark:]
+                break
+            i, operation = right[0], True
+        return i, operation
+
+    def _term(self, i: int) -> Optional[Tuple[int, bool]]:
+        parsed = self._unary(i)
+        if parsed is None:
+            return None
+        i, operation = parsed
+        while i < len(self.tokens):
+            token = self.tokens[i]
+            mark = len(self.out)
+            if token.text in _MULTIPLICATIVE:
+                self.out.append(f"{self._gap(i)}{_MULTIPLICATIVE[token.text]}{self._gap(i + 1)}")
+                right = self._unary(i + 1)
+            elif not token.spaced and self._implicit_factor(i):
+                # 2(3+4), 3sqrt(2), 2π, (1+2)(3+4)
+                self.out.append("*")
+                right = self._power(i)
+            else:
+                break
+            if right is None:
+                del self.out[mark:]
+                break
+            i, operation = right[0], True
+        return i, operation
+
+    def _implicit_factor(self, i: int) -> bool:
+        token = self.tokens[i]
+        return token.kind in (_LPAREN, _PI, _ROOT) or (token.kind == _NAME and self._is_call(i))
+
+    def _unary(self, i: int) -> Optional[Tuple[int, bool]]:
+        mark = len(self.out)
+        while i < len(self.tokens) and self.tokens[i].text in _ADDITIVE:
+            self.out.append(f"{_ADDITIVE[self.tokens[i].text]}{self._gap(i + 1)}")
+            i += 1
+        parsed = self._power(i)
+        if parsed is None:
+            del self.out[mark:]
+        return parsed
+
+    def _power(self, i: int) -> Optional[Tuple[int, bool]]:
+        parsed = self._postfix(i)
+        if parsed is None:
+            return None
+        i, operation = parsed
+        if i < len(self.tokens) and self.tokens[i].text in _POWER:
+            mark = len(self.out)
+            self.out.append(f"{self._gap(i)}{self.tokens[i].text}{self._gap(i + 1)}")
+            exponent = self._unary(i + 1)  # Right-associative: 2^3^2 = 2^(3^2)
+            if exponent is not None:
+                return exponent[0], True
+            del self.out[mark:]
+        return i, operation
+
+    def _postfix(self, i: int) -> Optional[Tuple[int, bool]]:
+        parsed = self._primary(i)
+        if parsed is None:
+            return None
+        i, operation = parsed
+        while i < len(self.tokens) and self.tokens[i].kind == _SUPERSCRIPT and not self.tokens[i].spaced:
+            self.out.append(_SUPERSCRIPTS[self.tokens[i].text])
+            i, operation = i + 1, True
+        return i, operation
+
+    def _primary(self, i: int) -> Optional[Tuple[int, bool]]:
+        if i >= len(self.tokens) or i in self.failed:
+            return None
+        mark = len(self.out)
+        parsed = self._parse_primary(i)
+        if parsed is None:
+            del self.out[mark:]
+            self.failed.add(i)
+        return parsed
+
+    def _parse_primary(self, i: int) -> Optional[Tuple[int, bool]]:
+        token = self.tokens[i]
+        if token.kind == _NUMBER:
+            self.out.append(token.text)
+            return i + 1, False
+        if token.kind == _PI or (token.kind == _NAME and token.text.lower() == "pi"):
+            self.out.append("pi")
+            return i + 1, False
+        if token.kind == _LPAREN:
+            return self._group(i)
+        if token.kind == _NAME and self._is_call(i):
+            self.out.append(FUNCTIONS[token.text.lower()])
+            group = self._group(i + 1)
+            return None if group is None else (group[0], True)
+        if token.kind == _ROOT and i + 1 < len(self.tokens) and not self.tokens[i + 1].spaced:
+            # √(9 + 16) -> sqrt(9 + 16); √16 -> sqrt(16)
+            bracketed = self.tokens[i + 1].kind == _LPAREN
+            self.out.append("sqrt" if bracketed else "sqrt(")
+            operand = self._postfix(i + 1)
+            if operand is None:
+                return None
+            if not bracketed:
+                self.out.append(")")
+            return operand[0], True
+        return None
+
+    def _group(self, i: int) -> Optional[Tuple[int, bool]]:
+        """A parenthesised expression starting at token i, which must fill the parentheses"""
+        close = self.closing.get(i)
+        if close is None or self.depth >= _MAX_DEPTH:
+            return None
+        self.out.append("(")
+        self.depth += 1
+        inner = self._expression(i + 1)
+        self.depth -= 1
+        if inner is None or inner[0] != close:
+            return None
+        self.out.append(")")
+        return close + 1, inner[1]
+
+    def _is_call(self, i: int) -> bool:
+        token = self.tokens[i]
+        return (token.text.lower() in FUNCTIONS and i + 1 < len(self.tokens)
+                and self.tokens[i + 1].kind == _LPAREN)
+
+    def _gap(self, i: int) -> str:
+        return " " if i < len(self.tokens) and self.tokens[i].spaced else ""
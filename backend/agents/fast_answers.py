@@ -0,0 +1,439 @@
+import ast
+import copy
+import math
+import operator
+from typing import Any, Dict, List, Optional
+
+# Operators and functions the step-by-step working knows how to reduce
+_BINARY_OPERATORS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.Pow: operator.pow,
+}
+_UNARY_OPERATORS = {ast.USub: operator.neg, ast.UAdd: operator.pos}
+_FUNCTIONS = {
+    "sqrt": math.sqrt, "sin": math.sin, "cos": math.cos, "tan": math.tan,
+    "log": math.log, "log10": math.log10, "abs": abs, "ceil": math.ceil,
+    "floor": math.floor, "round": round,
+}
+_MAX_STEPS = 12
+_MAX_EXPONENT = 1024
+
+def format_number(value: Any) -> str:
+    """Render a result without float noise (0.30000000000000004 -> 0.3, 4.0 -> 4)"""
+    if isinstance(value, float):
+        if value.is_integer() and abs(value) < 1e15:
+            return str(int(value))
+        return f"{value:.12g}"
+    return str(value)
+
+def arithmetic_steps(expression: str) -> List[str]:
+    """
+    Show how an expression reduces, innermost operations first
+
+    Each step evaluates every operation whose operands are already numbers,
+    so "2 + 3 * 4" gives ["2 + 3 * 4", "2 + 12", "14"]. Intermediate values
+    keep full precision and are rounded only for display, so "1/3*3" ends at
+    1 as the calculator does. Returns just the expression when it contains
+    anything the working cannot reduce.
+
+    Args:
+        expression: Expression as written by the user
+
+    Returns:
+        The expression followed by each intermediate form
+    """
+    cleaned = expression.replace('^', '**').replace('×', '*').replace('÷', '/')
+    try:
+        tree = ast.parse(cleaned.strip(), mode="eval")
+    except SyntaxError:
+        return [expression.strip()]
+
+    steps = [ast.unparse(tree)]
+    try:
+        while not isinstance(tree.body, ast.Constant) and len(steps) < _MAX_STEPS:
+            reduced = _reduce(tree.body)
+            if reduced is None:
+                break
+            tree.body = reduced
+            step = ast.unparse(_Rounded().visit(copy.deepcopy(tree)))
+            if step != steps[-1]:  # "-(9)" and "-9" read the same
+                steps.append(step)
+    except (ArithmeticError, ValueError, TypeError):
+        pass
+    return steps
+
+def _reduce(node: ast.AST) -> Optional[ast.AST]:
+    """Evaluate the operations whose operands are all numbers; None if nothing can be reduced"""
+    if isinstance(node, ast.BinOp) and type(node.op) in _BINARY_OPERATORS:
+        if isinstance(node.left, ast.Constant) and isinstance(node.right, ast.Constant):
+            if isinstance(node.op, ast.Pow) and abs(node.right.value) > _MAX_EXPONENT:
+                raise ValueError("Exponent too large to show the working")
+            return _constant(_BINARY_OPERATORS[type(node.op)](node.left.value, node.right.value))
+        left, right = _reduce(node.left), _reduce(node.right)
+        if left is None and right is None:
+            return None
+        return ast.BinOp(left=left or node.left, op=node.op, right=right or node.right)
+
+    if isinstance(node, ast.UnaryOp) and type(node.op) in _UNARY_OPERATORS:
+        if isinstance(node.operand, ast.Constant):
+            return _constant(_UNARY_OPERATORS[type(node.op)](node.operand.value))
+        operand = _reduce(node.operand)
+        return None if operand is None else ast.UnaryOp(op=node.op, operand=operand)
+
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id in _FUNCTIONS:
+        if all(isinstance(arg, ast.Constant) for arg in node.args):
+            return _constant(_FUNCTIONS[node.func.id](*(arg.value for arg in node.args)))
+        args = [_reduce(arg) for arg in node.args]
+        if all(arg is None for arg in args):
+            return None
+        return ast.Call(func=node.func, args=[new or old for new, old in zip(args, node.args)], keywords=[])
+
+    return None
+
+def _constant(value: Any) -> ast.Constant:
+    if isinstance(value, complex):
+        raise ValueError("Complex result")
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e15:
+        value = int(value)
+    return ast.Constant(value=value)
+
+class _Rounded(ast.NodeTransformer):
+    """Display copy of a step: floats without float noise"""
+
+    def visit_Constant(self, node: ast.Constant) -> ast.Constant:
+        if isinstance(node.value, float):
+            value = float(format_number(node.value))
+            return ast.Constant(value=int(value) if value.is_integer() and abs(value) < 1e15 else value)
+        return node
+
+def calculation_answer(calculation_results: Dict[str, Any]) -> str:
+    """
+    Templated step-by-step answer for a query that only asks for calculations
+
+    Args:
+        calculation_results: Expression -> calculator result
+
+    Returns:
+        Markdown answer text
+    """
+    # Sub-expressions (e.g. "3 * 4" inside "2 + 3 * 4") are covered by the working of the whole
+    expressions = [
+        expr for expr in calculation_results
+        if not any(expr != other and expr in other for other in calculation_results)
+    ]
+
+    sections = []
+    for expr in expressions:
+        result = format_number(calculation_results[expr])
+        steps = arithmetic_steps(expr)
+        lines = [f"**{expr.strip()} = {result}**"]
+        # Working that ends at a different number from the calculator would contradict the answer
+        if len(steps) > 2 and not (_is_number(steps[-1]) and steps[-1] != result):
+            lines.append("")
+            lines.append("Working (brackets and powers first, then × and ÷, then + and −):")
+            lines.extend(f"{i}. {'= ' if i > 1 else ''}{step}" for i, step in enumerate(steps, 1))
+        sections.append("\n".join(lines))
+    return "\n\n".join(sections)
+
+def _is_number(text: str) -> bool:
+    try:
+        float(text)
+    except ValueError:
+        return False
+    return True
+
+def constant_answer(constants: Dict[str, Dict[str, Any]]) -> str:
+    """
+    Templated answer for a query that only asks for physics constants
+
+    Args:
+        constants: Symbol -> constant data from PhysicsConstantsTool
+
+    Returns:
+        Markdown answer text
+    """
+    lines = []
+    for symbol, data in constants.items():
+        unit = "" if data["unit"] == "dimensionless" else f" {data['unit']}"
+        # CODATA standard uncertainty; exact (defined) values have none
+        uncertainty = f" (± {format_number(data['uncertainty'])})" if data.get("uncertainty") else ""
+        lines.append(f"- {data['description']} ({symbol}) = **{format_number(data['value'])}{unit}**{uncertainty}")
+    return "\n".join(lines)
+
+def equation_answer(solutions: Dict[str, Dict[str, Any]]) -> str:
+    """
+    Templated answer for a query that only asks for equations to be solved
+
+    Args:
+        solutions: Equations (a system joined with "; ") -> EquationSolverTool result
+
+    Returns:
+        Markdown answer text
+    """
+    sections = []
+    for result in solutions.values():
+        lines = [f"**{equation_summary(result)}**", "", "Working:"]
+        lines.extend(f"{i}. {step}" for i, step in enumerate(result["steps"], 1))
+        sections.append("\n".join(lines))
+    return "\n\n".join(sections)
+
+def equation_summary(result: Dict[str, Any]) -> str:
+    """One-line statement of an EquationSolverTool result, e.g. "x = 3 or x = 2" """
+    status = result["status"]
+    if status == "no_solution":
+        return "No solution"
+    if status == "infinite_solutions":
+        return "Infinitely many solutions"
+    if status == "no_real_solution":
+        roots = " or ".join(_assignments(root) for root in result["complex_roots"])
+        return f"No real solutions (complex roots: {roots})"
+
+    options = []
+    for exact, approximate in zip(result["solutions"], result["approximate"]):
+        text = _assignments(exact)
+        if any("/" in value or "√" in value for value in exact.values()):
+            text += f" (≈ {', '.join(format_number(value) for value in approximate.values())})"
+        options.append(text)
+    return " or ".join(options)
+
+def _assignments(values: Dict[str, str]) -> str:
+    return ", ".join(f"{var} = {value}" for var, value in values.items())
+
+def plot_summary(result: Dict[str, Any]) -> str:
+    """One-line statement of a PlotTool result's features, e.g. "for x from -5 to 5: roots at x = -2, 2; ..." """
+    features = result["features"]
+    variables = result["variables"]
+    ranges = [f"{variables[0]} from {format_number(result['x'][0])} to {format_number(result['x'][-1])}"]
+    if result["kind"] == "2d":
+        ranges.append(f"{variables[1]} from {format_number(result['y'][0])} to {format_number(result['y'][-1])}")
+    parts = []
+    if result["kind"] == "1d":
+        var = variables[0]
+        roots = features.get("roots")
+        parts.append(f"roots at {var} = {', '.join(format_number(root) for root in roots)}" if roots else "no roots")
+        for kind in ("minima", "maxima"):
+            points = features.get(kind) or []
+            if points:
+                label = "local minimum" if kind == "minima" else "local maximum"
+                parts.append(f"{label} at " + ", ".join(
+                    f"({format_number(point['x'])}, {format_number(point['y'])})" for point in points))
+        if features.get("poles"):
+            parts.append(f"undefined (vertical asymptote) at {var} = "
+                         + ", ".join(format_number(pole) for pole in features["poles"]))
+        if features.get("y_intercept") is not None:
+            parts.append(f"y-intercept {format_number(features['y_intercept'])}")
+    for name in ("min", "max"):
+        point = features.get(name)
+        if point:
+            value_name = "z" if result["kind"] == "2d" else "y"
+            where = ", ".join(f"{var} = {format_number(point[var])}" for var in variables)
+            parts.append(f"{'lowest' if name == 'min' else 'highest'} value {format_number(point[value_name])} at {where}")
+    return f"for {' and '.join(ranges)}: " + "; ".join(parts)
+
+# How each calculus method works, for the working of a computed answer
+_CALCULUS_METHODS = {
+    "complex step": "complex-step differentiation, f'(a) ≈ Im f(a + ih) / h with h = 10⁻²⁰, "
+                    "which has no subtraction and so is exact to rounding error",
+    "central differences with Richardson extrapolation": "central differences at shrinking step sizes, "
+                    "extrapolated to step size 0 (Richardson extrapolation)",
+    "adaptive Gauss-Kronrod quadrature (G7/K15)": "adaptive Gauss-Kronrod quadrature: 15-point rules on "
+                    "subintervals, halving those where the 7-point Gauss estimate disagrees",
+    "Richardson extrapolation of function values approaching the point": "evaluating the function ever closer "
+                    "to the point and extrapolating the values to the limit (Richardson extrapolation)",
+}
+_SUPERSCRIPT_DIGITS = str.maketrans("0123456789", "⁰¹²³⁴⁵⁶⁷⁸⁹")
+
+def calculus_summary(result: Dict[str, Any]) -> str:
+    """One-line statement of a CalculusTool result, e.g. "d/dx [x^3] at x = 2 = 12" """
+    var = result["variable"]
+    expression = result["expression"]
+    if result["operation"] == "derivative":
+        order = result["order"]
+        power = str(order).translate(_SUPERSCRIPT_DIGITS) if order > 1 else ""
+        return (f"d{power}/d{var}{power} [{expression}] at {var} = {_calculus_number(result['point'])}"
+                f" {_calculus_value(result)}")
+    if result["operation"] == "integral":
+        return (f"∫ from {_calculus_number(result['lower'])} to {_calculus_number(result['upper'])}"
+                f" of {expression} d{var} {_calculus_value(result)}")
+
+    side = {"left": "⁻", "right": "⁺"}.get(result["direction"], "")
+    text = f"lim {var}→{_calculus_number(result['point'])}{side} of {expression}"
+    if result["exists"]:
+        return f"{text} {_calculus_value(result)}"
+    if result["left"] is not None and result["right"] is not None:
+        return (f"{text} does not exist (from the left {_calculus_number(result['left'])}, "
+                f"from the right {_calculus_number(result['right'])})")
+    return f"{text} does not exist (the function keeps oscillating)"
+
+def calculus_answer(result: Dict[str, Any]) -> str:
+    """
+    Templated answer for a query that only asks for a derivative, integral or limit
+
+    Args:
+        result: CalculusTool result
+
+    Returns:
+        Markdown answer text
+    """
+    lines = [f"**{calculus_summary(result)}**", ""]
+    method = _CALCULUS_METHODS.get(result["method"], result["method"])
+    if result["operation"] == "limit" and not result["exists"]:
+        lines.append(f"Computed numerically by {method}: the two sides do not approach the same value.")
+    elif result["error"]:
+        lines.append(f"Computed numerically by {method}; estimated error {result['error']:.1e}.")
+    else:
+        lines.append(f"Computed numerically by {method}.")
+    return "\n".join(lines)
+
+def _calculus_value(result: Dict[str, Any]) -> str:
+    """ "= 12", "= 1/3 (≈ 0.333333333333)" or "≈ 1.57079632679" """
+    exact, value = result["exact"], result["value"]
+    if exact is not None and "/" in exact:
+        return f"= {exact} (≈ {format_number(value)})"
+    if exact is not None or isinstance(value, str):
+        return f"= {exact or _calculus_number(value)}"
+    return f"≈ {format_number(value)}"
+
+def _calculus_number(value: Any) -> str:
+    """Numbers as format_number, with infinities ("inf" in results) as ∞"""
+    if value in ("inf", "-inf") or (isinstance(value, float) and math.isinf(value)):
+        return "-∞" if str(value).startswith("-") else "∞"
+    if isinstance(value, float) and abs(value) > 0 and abs(value / math.pi - round(value / math.pi)) < 1e-12:
+        multiple = round(value / math.pi)
+        return {1: "π", -1: "-π"}.get(multiple, f"{multiple}π")
+    return format_number(value)
+
+def linear_algebra_summary(result: Dict[str, Any]) -> str:
+    """One-line statement of a LinearAlgebraTool result, e.g. "det [[1, 2], [3, 4]] = -2" """
+    operation = result["operation"]
+    operands = [_matrix_text(operand) for operand in result["operands"]]
+    value = _matrix_text(result["exact"] if result["exact"] is not None else result["value"])
+    relation = "=" if result["exact"] is not None else "≈"
+    if operation == "determinant":
+        return f"det {operands[0]} {relation} {value}"
+    if operation == "inverse":
+        return f"{operands[0]}⁻¹ {relation} {value}"
+    if operation == "rank":
+        return f"rank {operands[0]} = {value}"
+    if operation == "product":
+        return f"{' · '.join(operands)} {relation} {value}"
+    if operation == "cross":
+        return f"{operands[0]} × {operands[1]} {relation} {value}"
+    if operation == "solve":
+        text = f"{operands[0]} x = {operands[1]}: x {relation} {value}"
+        if result["status"] == "least_squares":
+            return f"{text} (least-squares solution; no x solves every equation, residual {format_number(result['residual'])})"
+        if result["status"] == "underdetermined":
+            return f"{text} (the solution of least norm; there are infinitely many)"
+        return text
+
+    pairs = []
+    for pair in result["eigenpairs"]:
+        exact = pair["exact"]
+        if exact is None:
+            value = f"λ ≈ {_matrix_text(pair['value'])}"
+        elif "√" in exact:
+            value = f"λ = {exact} ≈ {_matrix_text(pair['value'])}"
+        else:
+            value = f"λ = {exact}"
+        # Eigenvectors are exact (integers) where the eigenvalue is rational
+        rational = exact is not None and "√" not in exact and "i" not in exact
+        vectors = ", ".join(_matrix_text(vector, digits=6) for vector in pair["vectors"])
+        label = "eigenvectors" if len(pair["vectors"]) > 1 else "eigenvector"
+        repeated = {1: "", 2: "twice; "}.get(pair["multiplicity"], f"{pair['multiplicity']} times; ")
+        pairs.append(f"{value} ({repeated}{label} {'' if rational else '≈ '}{vectors})")
+    return f"eigenvalues of {operands[0]}: " + ", ".join(pairs)
+
+def linear_algebra_answer(result: Dict[str, Any]) -> str:
+    """
+    Templated answer for a query that only asks for a computation on matrices or vectors
+
+    Args:
+        result: LinearAlgebraTool result
+
+    Returns:
+        Markdown answer text
+    """
+    exactness = "exactly" if result["exact"] is not None else "numerically"
+    return f"**{linear_algebra_summary(result)}**\n\nComputed {exactness}, by {result['method']}."
+
+def _matrix_text(value: Any, digits: int = 12) -> str:
+    """Matrices and vectors as "[[1, 2], [3/2, 4]]", with numbers as format_number"""
+    if isinstance(value, list):
+        return "[" + ", ".join(_matrix_text(item, digits) for item in value) + "]"
+    if isinstance(value, float) and digits < 12:
+        return f"{value:.{digits}g}"
+    return format_number(value)
+
+def statistics_summary(result: Dict[str, Any]) -> str:
+    """One-line statement of a StatisticsTool result, e.g. "n = 8: mean = 5, median = 4.5, ..." """
+    count = result["count"]
+    if result["operation"] == "regression":
+        slope, intercept = result["slope"], result["intercept"]
+        sign = "-" if intercept < 0 else "+"
+        relation = "=" if _is_exact(slope) and _is_exact(intercept) else "≈"
+        text = (f"least-squares line through {count} points: "
+                f"y {relation} {_statistic(slope)}x {sign} {_statistic(abs(intercept))}")
+        if result["r"] is None:
+            return f"{text} (every y value is the same)"
+        return f"{text} (r {_equals(result['r'])}, r² {_equals(result['r_squared'])})"
+    if result["operation"] == "histogram":
+        edges = result["edges"]
+        return (f"histogram of {count} values in {result['bins']} bins of width {_statistic(edges[1] - edges[0])}"
+                f" from {_statistic(edges[0])} to {_statistic(edges[-1])}: counts {', '.join(map(str, result['counts']))}")
+
+    parts = [f"mean {_equals(result['mean'])}", f"median {_equals(result['median'])}"]
+    if result["modes"]:
+        parts.append(f"mode{'s' if len(result['modes']) > 1 else ''} {', '.join(map(_statistic, result['modes']))}")
+    if result["standard_deviation"] is not None:
+        parts.append(f"sample standard deviation ≈ {_statistic(result['standard_deviation'])}"
+                     f" (population ≈ {_statistic(result['population_standard_deviation'])})")
+    parts.append(f"range {_statistic(result['minimum'])} to {_statistic(result['maximum'])}")
+    parts.append(f"quartiles {', '.join(map(_statistic, result['quartiles']))}")
+    parts.extend(f"{_ordinal(percentile)} percentile {_equals(value)}"
+                 for percentile, value in result["percentiles"].items())
+    return f"n = {count}: " + ", ".join(parts)
+
+def statistics_answer(result: Dict[str, Any]) -> str:
+    """
+    Templated answer for a query that only asks for statistics of a pasted dataset
+
+    Args:
+        result: StatisticsTool result
+
+    Returns:
+        Markdown answer text
+    """
+    lines = [f"**{statistics_summary(result)}**", ""]
+    if result["operation"] == "histogram":
+        edges = result["edges"]
+        lines += ["| Bin | Count |", "|---|---|"]
+        lines += [f"| {_statistic(low)} to {_statistic(high)} | {count} |"
+                  for low, high, count in zip(edges, edges[1:], result["counts"])]
+        lines += ["", f"{result['bins']} equal-width bins, {result['method']}; each includes its lower edge, and the last its upper edge too."]
+    elif result["operation"] == "regression":
+        lines.append(f"Fitted by least squares to all {result['count']} points, in {result['method']}.")
+    else:
+        lines.append(f"Computed from all {result['count']} values in {result['method']}; "
+                     f"quartiles and percentiles by {result['quantile_method']}.")
+    return "\n".join(lines)
+
+def _statistic(value: float) -> str:
+    """Statistics to 6 significant figures, so values typed as 2.5 stay 2.5"""
+    return format_number(float(f"{value:.6g}"))
+
+def _is_exact(value: float) -> bool:
+    return float(f"{value:.6g}") == value
+
+def _equals(value: float) -> str:
+    """ "= 2.5", or "≈ 33333300" when 6 significant figures are not the whole value"""
+    return f"{'=' if _is_exact(value) else '≈'} {_statistic(value)}"
+
+def _ordinal(number: str) -> str:
+    """ "90" -> "90th", "1" -> "1st", "2.5" -> "2.5th" """
+    if not number.isdigit() or 10 <= int(number) % 100 <= 20:
+        return f"{number}th"
+    return number + {"1": "st", "2": "nd", "3": "rd"}.get(number[-1], "th")
@@ -0,0 +1,173 @@
+"""
+Learned query router: hashed-feature multinomial naive Bayes over the three agents.
+
+Trained offline from logged (query, agent) pairs by ``python -m agents.train_router``
+and enabled with LEARNED_ROUTER_PATH. The weights are a single float32 array,
+memory-mapped at startup and shared by every worker reading the file.
+"""
+import json
+import logging
+import math
+import re
+import zlib
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from models import AgentType
+
+logger = logging.getLogger(__name__)
+
+# Column order of the weight array
+ROUTER_CLASSES = [AgentType.TUTOR, AgentType.MATH, AgentType.PHYSICS]
+
+_FEATURE_TOKEN = re.compile(r"[a-z]+|\d+(?:\.\d+)?|[^\w\s]")
+_PREFIX_LENGTH = 5  # Words longer than this also count by prefix ("forces" -> "force")
+
+# Feature name -> hashed index, per feature-space size; cleared when it grows too large
+_FEATURE_INDEX: Dict[int, Dict[str, int]] = {}
+_FEATURE_INDEX_LIMIT = 200_000
+
+def route_features(text: str, n_features: int) -> List[int]:
+    """
+    Hashed feature indices for a query: words, numbers (as one token),
+    symbols, word prefixes and adjacent-token pairs, each counted once.
+    Index n_features (the prior row) is always included.
+    """
+    tokens = ["<num>" if token[0].isdigit() else token for token in _FEATURE_TOKEN.findall(text.lower())]
+    names = ["w:" + token for token in tokens]
+    names += ["p:" + token[:_PREFIX_LENGTH] for token in tokens if len(token) > _PREFIX_LENGTH]
+    names += ["b:" + first + " " + second for first, second in zip(tokens, tokens[1:])]
+
+    known = _FEATURE_INDEX.setdefault(n_features, {})
+    if len(known) > _FEATURE_INDEX_LIMIT:
+        known.clear()
+    indices = {n_features}
+    for name in names:
+        index = known.get(name)
+        if index is None:
+            index = known[name] = zlib.crc32(name.encode("utf-8")) % n_features
+        indices.add(index)
+    return sorted(indices)
+
+class LearnedRouter:
+    """
+    Predicts the agent for a query from a trained weight array.
+
+    The array has one row per hashed feature plus a final row of class
+    log-priors, and one column per agent in ROUTER_CLASSES. A prediction is
+    the sum of the rows for the query's features, so it costs a few
+    microseconds and no model call.
+    """
+
+    def __init__(self, weights: np.ndarray, source: Optional[str] = None):
+        if weights.ndim != 2 or weights.shape[1] != len(ROUTER_CLASSES) or weights.shape[0] < 2:
+            raise ValueError(f"Router weights must have shape (features + 1, {len(ROUTER_CLASSES)}), got {weights.shape}")
+        # A plain ndarray view of a memory map indexes much faster than np.memmap itself
+        self.weights = np.asarray(weights)
+        self.n_features = weights.shape[0] - 1
+        self.source = source
+
+    @classmethod
+    def load(cls, path: str) -> "LearnedRouter":
+        """Memory-map trained weights from a .npy file"""
+        return cls(np.load(path, mmap_mode="r"), source=path)
+
+    def predict(self, query: str) -> Tuple[AgentType, float]:
+        """
+        Route one query
+
+        Args:
+            query: Query text
+
+        Returns:
+            The most likely agent and its probability
+        """
+        rows = self.weights.take(route_features(query, self.n_features), axis=0)
+        scores = np.add.reduce(rows, axis=0, dtype=np.float64).tolist()
+        # Three classes: plain floats beat NumPy's per-call overhead
+        top = max(scores)
+        total = sum(math.exp(score - top) for score in scores)
+        best = scores.index(top)
+        return ROUTER_CLASSES[best], 1.0 / total
+
+    def predict_batch(self, queries: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Route many queries with one gather and one segmented sum
+
+        Returns:
+            Indexes into ROUTER_CLASSES and their probabilities, one per query
+        """
+        if not queries:
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+        features = [route_features(query, self.n_features) for query in queries]
+        lengths = np.fromiter((len(f) for f in features), dtype=np.int64, count=len(features))
+        offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+        flat = np.fromiter((i for f in features for i in f), dtype=np.int64, count=int(lengths.sum()))
+        # Every query has the prior row, so no segment is empty
+        scores = np.add.reduceat(self.weights[flat].astype(np.float64), offsets, axis=0)
+        probabilities = _softmax(scores)
+        best = probabilities.argmax(axis=1)
+        return best, probabilities[np.arange(len(queries)), best]
+
+    def get_info(self) -> Dict[str, object]:
+        return {
+            "source": self.source,
+            "features": self.n_features,
+            "classes": [agent.value for agent in ROUTER_CLASSES],
+        }
+
+def _softmax(scores: np.ndarray) -> np.ndarray:
+    shifted = np.exp(scores - scores.max(axis=-1, keepdims=True))
+    return shifted / shifted.sum(axis=-1, keepdims=True)
+
+def train_naive_bayes(examples: Iterable[Tuple[str, AgentType]], n_features: int, alpha: float = 1.0) -> np.ndarray:
+    """
+    Fit multinomial naive Bayes on (query, agent) pairs
+
+    Args:
+        examples: Training queries and the agent that should handle each
+        n_features: Size of the hashed feature space
+        alpha: Additive smoothing
+
+    Returns:
+        float32 weights of shape (n_features + 1, classes): log P(feature | agent)
+        rows, then a row of log P(agent)
+    """
+    counts = np.zeros((n_features, len(ROUTER_CLASSES)))
+    documents = np.zeros(len(ROUTER_CLASSES))
+    for query, agent in examples:
+        column = ROUTER_CLASSES.index(agent)
+        counts[route_features(query, n_features)[:-1], column] += 1
+        documents[column] += 1
+
+    log_likelihood = np.log(counts + alpha) - np.log(counts.sum(axis=0) + alpha * n_features)
+    log_prior = np.log((documents + 1) / (documents.sum() + len(ROUTER_CLASSES)))
+    return np.vstack([log_likelihood, log_prior]).astype(np.float32)
+
+def load_examples(path: str) -> List[Tuple[str, AgentType]]:
+    """Read logged (query, agent) pairs from a JSON Lines file, skipping unusable lines"""
+    examples = []
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+                query = record["query"]
+                agent = AgentType(record.get("agent") or record["agent_used"])
+            except (ValueError, KeyError, TypeError) as e:
+                logger.warning(f"Skipping line {line_number} of {path}: {e}")
+                continue
+            examples.append((query, agent))
+    return examples
+
+def load_learned_router(path: str) -> Optional[LearnedRouter]:
+    """Load the configured router, or None if none is configured or it cannot be read"""
+    if not path:
+        return None
+    try:
+        router = LearnedRouter.load(path)
+        logger.info(f"Loaded learned router from {path} ({router.n_features} features)")
+        return router
+    except (OSError, ValueError) as e:
+        logger.error(f"Could not load learned router from {path}: {e}; using keyword routing only")
+        return None
@@ -1,23 +1,50 @@
-import re
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 from .base_agent import BaseAgent
+from .query_analyzer import MATH_CONCEPTS, get_query_analyzer
+from .fast_answers import (calculation_answer, calculus_answer, calculus_summary, equation_answer,
+                           equation_summary, linear_algebra_answer, linear_algebra_summary, plot_summary,
+                           statistics_answer, statistics_summary)
 from models import AgentRequest, AgentType
-from tools import CalculatorTool
+from tools import CalculatorTool, CalculusTool, EquationSolverTool, LinearAlgebraTool, PlotTool, StatisticsTool
+from llm import PromptTemplate, PromptSection, AssembledPrompt
+from config import settings
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Static part of the math system prompt, measured once
+MATH_SYSTEM_PROMPT = PromptTemplate("""You are a specialized Math Tutor Agent. Your role is to:
+
+1. Solve mathematical problems step by step
+2. Explain mathematical concepts clearly
+3. Provide detailed working and reasoning
+4. Use calculation results when available
+5. Help students understand the underlying principles
+
+Guidelines:
+- Always show your working step by step
+- Explain the mathematical reasoning behind each step
+- Use simple language while maintaining mathematical accuracy
+- If calculations were performed, reference them appropriately
+- Include formulas and theorems when relevant""", max_line_chars=settings.prompt_max_line_chars)
+
 class MathAgent(BaseAgent):
    #AGENT FOR MATH PROBLEMS
     
     def __init__(self):
         super().__init__(
             agent_type=AgentType.MATH,
-            description="Specialized in solving mathematical problems, performing calculations, and explaining mathematical concepts"
+            description="Specialized in solving mathematical problems, performing calculations, and explaining mathematical concepts",
+            prompt_budget=settings.math_prompt_budget
         )
         
-        # Add calculator tool
+        # Add calculator, equation solver, calculus, linear algebra, statistics and plotting tools
         self.add_tool(CalculatorTool())
+        self.add_tool(EquationSolverTool())
+        self.add_tool(CalculusTool())
+        self.add_tool(LinearAlgebraTool())
+        self.add_tool(StatisticsTool())
+        self.add_tool(PlotTool())
         
         # Keywords that indicate calculator usage
         self.calculator_keywords = [
@@ -27,20 +54,25 @@ class MathAgent(BaseAgent):
         ]
         
         # Mathematical concepts keywords
-        self.math_concepts = [
-            "algebra", "geometry", "calculus", "trigonometry", "statistics",
-            "probability", "equation", "function", "derivative", "integral",
-            "matrix", "vector", "polynomial", "theorem", "proof", "formula"
-        ]
+        self.math_concepts = list(MATH_CONCEPTS)
     
     async def _process_specialized_query(self, request: AgentRequest) -> Dict[str, Any]:
         """Process mathematical queries with calculation support"""
-        query = request.query
+        context = await self._prepare_response(request)
+        
+        # Get AI response with calculation context
+        ai_response = await self._generate_text(request, context)
+        
+        return self._complete_response(ai_response, context)
+    
+    async def _prepare_response(self, request: AgentRequest) -> Dict[str, Any]:
+        """Run calculations and build the math system prompt"""
+        features = self._get_features(request)
         tools_used = []
-        confidence = 0.8  # Default confidence for math agent
+        tool_events = []
         
         # Check if we need to use calculator
-        calculations_needed = self._extract_calculations(query)
+        calculations_needed = features.math_calculations
         calculation_results = {}
         
         if calculations_needed:
@@ -55,126 +87,233 @@ class MathAgent(BaseAgent):
                 else:
                     logger.warning(f"Calculation failed for {calc}: {calc_result.error_message}")
                     calculation_results[calc] = f"Error: {calc_result.error_message}"
+                
+                tool_events.append({
+                    "tool": "calculator",
+                    "input": calc,
+                    "success": calc_result.success,
+                    "result": calculation_results[calc]
+                })
+        
+        # Solve equations exactly; each system is solved together
+        equation_results = {}
+        for system in features.equations:
+            key = "; ".join(system)
+            solve_result = await self._use_tool("equation_solver", system)
+            tools_used.append("equation_solver")
+            
+            if solve_result.success:
+                equation_results[key] = solve_result.result
+                logger.info(f"Solved {key}: {equation_summary(solve_result.result)}")
+            else:
+                logger.info(f"Equation solver declined {key}: {solve_result.error_message}")
+            
+            tool_events.append({
+                "tool": "equation_solver",
+                "input": key,
+                "success": solve_result.success,
+                "result": solve_result.result if solve_result.success else f"Error: {solve_result.error_message}"
+            })
+        
+        # Compute a derivative, integral or limit numerically, so the numbers given are verified
+        calculus_result = None
+        if features.calculus:
+            request_text = f"{features.calculus['operation']} of {features.calculus['expression']}"
+            calculus = await self._use_tool("calculus", **features.calculus)
+            tools_used.append("calculus")
+            if calculus.success:
+                calculus_result = calculus.result
+                logger.info(f"Computed {calculus_summary(calculus_result)}")
+            else:
+                logger.info(f"Calculus tool declined {request_text}: {calculus.error_message}")
+            
+            tool_events.append({
+                "tool": "calculus",
+                "input": request_text,
+                "success": calculus.success,
+                "result": calculus_summary(calculus_result) if calculus.success else f"Error: {calculus.error_message}"
+            })
+        
+        # Compute with the matrices written in the query, exactly where they are small
+        linear_algebra_result = None
+        if features.linear_algebra:
+            request_text = f"{features.linear_algebra['operation']} of {', '.join(features.linear_algebra['operands'])}"
+            matrices = await self._use_tool("linear_algebra", features.linear_algebra["operation"],
+                                            *features.linear_algebra["operands"])
+            tools_used.append("linear_algebra")
+            if matrices.success:
+                linear_algebra_result = matrices.result
+                logger.info(f"Computed {linear_algebra_summary(linear_algebra_result)}")
+            else:
+                logger.info(f"Linear algebra tool declined {request_text}: {matrices.error_message}")
+            
+            tool_events.append({
+                "tool": "linear_algebra",
+                "input": request_text,
+                "success": matrices.success,
+                "result": linear_algebra_summary(linear_algebra_result) if matrices.success else f"Error: {matrices.error_message}"
+            })
+        
+        # Summarise a pasted dataset, already parsed by the analyzer, in one pass over it
+        statistics_result = None
+        if features.statistics:
+            request_text = f"{features.statistics['operation']} of {len(features.statistics['data'])} values"
+            statistics = await self._use_tool("statistics", **features.statistics)
+            tools_used.append("statistics")
+            if statistics.success:
+                statistics_result = statistics.result
+                logger.info(f"Computed {statistics_summary(statistics_result)}")
+            else:
+                logger.info(f"Statistics tool declined {request_text}: {statistics.error_message}")
+            
+            tool_events.append({
+                "tool": "statistics",
+                "input": request_text,
+                "success": statistics.success,
+                "result": statistics_summary(statistics_result) if statistics.success else f"Error: {statistics.error_message}"
+            })
+        
+        # Tabulate a function the user asked to plot, so the answer describes the real graph
+        plot_result = None
+        if features.plot:
+            expression = features.plot["expression"]
+            plot = await self._use_tool("plot", expression, x_range=features.plot["x_range"])
+            tools_used.append("plot")
+            if plot.success:
+                plot_result = plot.result
+                logger.info(f"Plotted {expression}: {plot_summary(plot_result)}")
+            else:
+                logger.info(f"Plot tool declined {expression}: {plot.error_message}")
+            
+            tool_events.append({
+                "tool": "plot",
+                "input": expression,
+                "success": plot.success,
+                "result": plot_summary(plot_result) if plot.success else f"Error: {plot.error_message}"
+            })
         
         # Generate system prompt for math context
-        system_prompt = self._build_math_system_prompt(calculation_results)
+        query = self._model_query(request, statistics_result)
+        prompt = self._build_math_system_prompt(calculation_results, query, equation_results, plot_result,
+                                                calculus_result, linear_algebra_result, statistics_result)
         
-        # Get AI response with calculation context
-        ai_response = await self._call_gemini_api(query, system_prompt)
+        # Pure calculations or equations that all succeeded are answered without the model
+        fast_answer = None
+        if (self._use_fast_path(request)
+                and features.fast_path in ("calculation", "calculus", "equation", "linear_algebra", "statistics")
+                and not features.plot and all(event["success"] for event in tool_events)):
+            if features.fast_path == "equation":
+                fast_answer = equation_answer(equation_results)
+            elif features.fast_path == "calculus":
+                fast_answer = calculus_answer(calculus_result)
+            elif features.fast_path == "linear_algebra":
+                fast_answer = linear_algebra_answer(linear_algebra_result)
+            elif features.fast_path == "statistics":
+                fast_answer = statistics_answer(statistics_result)
+            else:
+                fast_answer = calculation_answer(calculation_results)
+        
+        return {
+            "query": query,
+            "features": features,
+            "prompt": prompt,
+            "system_prompt": prompt.text,
+            "fast_answer": fast_answer,
+            "tools_used": tools_used,
+            "tool_events": tool_events,
+            "calculation_results": calculation_results,
+            "equation_results": equation_results,
+            "plot_result": plot_result,
+            "calculus_result": calculus_result,
+            "linear_algebra_result": linear_algebra_result,
+            "statistics_result": statistics_result
+        }
+    
+    def _complete_response(self, ai_response: str, context: Dict[str, Any]) -> Dict[str, Any]:
+        """Attach calculation results and metadata to the generated answer"""
+        calculation_results = context["calculation_results"]
+        confidence = 0.8  # Default confidence for math agent
+        fast_path = context.get("fast_answer") is not None
+        if fast_path:
+            confidence = 1.0  # Computed, not generated
+        
+        token_usage = self._token_usage(ai_response, context)
         
         # If we performed calculations, include them in the response
-        if calculation_results:
+        if calculation_results and not fast_path:
             ai_response = self._enhance_response_with_calculations(ai_response, calculation_results)
         
         return {
             "text": ai_response,
-            "tools_used": list(set(tools_used)),  # Remove duplicates
+            "tools_used": list(set(context["tools_used"])),  # Remove duplicates
             "confidence": confidence,
             "metadata": {
                 "calculations_performed": len(calculation_results),
                 "calculation_results": calculation_results,
-                "math_concepts_detected": self._detect_math_concepts(query)
+                "equations_solved": {
+                    equations: equation_summary(result)
+                    for equations, result in context["equation_results"].items()
+                },
+                "calculus": context.get("calculus_result"),
+                "linear_algebra": context.get("linear_algebra_result"),
+                "statistics": context.get("statistics_result"),
+                "plot": context.get("plot_result"),
+                "math_concepts_detected": context["features"].concept_hits["math"],
+                "fast_path": fast_path,
+                "token_usage": token_usage
             }
         }
     
     def _extract_calculations(self, query: str) -> List[str]:
         """Extract mathematical expressions that need calculation"""
-        calculations = []
-        
-        # Pattern for mathematical expressions
-        # Matches expressions like: 2+3, 5*7, sqrt(16), sin(30), etc.
-        patterns = [
-            # Basic arithmetic: numbers with operators
-            r'\b\d+(?:\.\d+)?\s*[+\-*/^]\s*\d+(?:\.\d+)?(?:\s*[+\-*/^]\s*\d+(?:\.\d+)?)*',
-            
-            # Function calls: sin(30), sqrt(16), log(10), etc.
-            r'\b(?:sin|cos|tan|sqrt|log|log10|abs|ceil|floor|round)\s*\(\s*[0-9+\-*/^().\s]+\s*\)',
-            
-            # Expressions with parentheses
-            r'\([0-9+\-*/^().\s]+\)',
-            
-            # Power notation: 2^3, 5**2
-            r'\b\d+(?:\.\d+)?\s*[\^*]{1,2}\s*\d+(?:\.\d+)?',
-        ]
-        
-        for pattern in patterns:
-            matches = re.findall(pattern, query)
-            for match in matches:
-                # Clean up the match
-                cleaned = match.strip()
-                if cleaned and self._is_valid_calculation(cleaned):
-                    calculations.append(cleaned)
-        
-        # Also look for explicit calculation requests
-        calc_patterns = [
-            r'calculate\s+([0-9+\-*/^().\s]+)',
-            r'compute\s+([0-9+\-*/^().\s]+)',
-            r'evaluate\s+([0-9+\-*/^().\s]+)',
-            r'solve\s+([0-9+\-*/^().\s=]+)',
-        ]
-        
-        for pattern in calc_patterns:
-            matches = re.findall(pattern, query, re.IGNORECASE)
-            for match in matches:
-                cleaned = match.replace('=', '').strip()
-                if cleaned and self._is_valid_calculation(cleaned):
-                    calculations.append(cleaned)
-        
-        # Remove duplicates while preserving order
-        seen = set()
-        unique_calculations = []
-        for calc in calculations:
-            if calc not in seen:
-                seen.add(calc)
-                unique_calculations.append(calc)
-        
-        return unique_calculations
-    
-    def _is_valid_calculation(self, expression: str) -> bool:
-        """Check if an expression is a valid calculation"""
-        # Must contain at least one number and one operator or function
-        has_number = re.search(r'\d', expression)
-        has_operator = re.search(r'[+\-*/^]', expression)
-        has_function = re.search(r'\b(?:sin|cos|tan|sqrt|log|abs|ceil|floor|round)\b', expression)
-        
-        return has_number and (has_operator or has_function)
-    
-    def _detect_math_concepts(self, query: str) -> List[str]:
-        """Detect mathematical concepts mentioned in the query"""
-        detected = []
-        query_lower = query.lower()
-        
-        for concept in self.math_concepts:
-            if concept in query_lower:
-                detected.append(concept)
-        
-        return detected
+        return get_query_analyzer().analyze(query).math_calculations
     
-    def _build_math_system_prompt(self, calculation_results: Dict[str, Any]) -> str:
-        """Build system prompt for mathematical context"""
-        base_prompt = """You are a specialized Math Tutor Agent. Your role is to:
-
-1. Solve mathematical problems step by step
-2. Explain mathematical concepts clearly
-3. Provide detailed working and reasoning
-4. Use calculation results when available
-5. Help students understand the underlying principles
-
-Guidelines:
-- Always show your working step by step
-- Explain the mathematical reasoning behind each step
-- Use simple language while maintaining mathematical accuracy
-- If calculations were performed, reference them appropriately
-- Include formulas and theorems when relevant"""
-
-        if calculation_results:
-            calc_context = "\n\nCalculation Results Available:\n"
-            for expr, result in calculation_results.items():
-                calc_context += f"- {expr} = {result}\n"
-            calc_context += "\nUse these results in your explanation when appropriate."
-            base_prompt += calc_context
-        
-        return base_prompt
+    def _build_math_system_prompt(self, calculation_results: Dict[str, Any], query: str = "",
+                                  equation_results: Optional[Dict[str, Dict[str, Any]]] = None,
+                                  plot_result: Optional[Dict[str, Any]] = None,
+                                  calculus_result: Optional[Dict[str, Any]] = None,
+                                  linear_algebra_result: Optional[Dict[str, Any]] = None,
+                                  statistics_result: Optional[Dict[str, Any]] = None) -> AssembledPrompt:
+        """Build system prompt for mathematical context, within the agent's token budget"""
+        sections = [
+            PromptSection(
+                "calculations",
+                "Calculation Results Available:",
+                [f"- {expr} = {result}" for expr, result in calculation_results.items()],
+                footer="Use these results in your explanation when appropriate."
+            ),
+            PromptSection(
+                "equations",
+                "Verified Equation Solutions:",
+                [f"- {equations}: {equation_summary(result)}" for equations, result in (equation_results or {}).items()],
+                footer="These were solved exactly; explain the method and state these solutions."
+            ),
+            PromptSection(
+                "calculus",
+                "Verified Calculus Result:",
+                [f"- {calculus_summary(calculus_result)}"] if calculus_result else [],
+                footer="This was computed numerically; explain how to find it by hand and state this value."
+            ),
+            PromptSection(
+                "linear_algebra",
+                "Verified Matrix Result:",
+                [f"- {linear_algebra_summary(linear_algebra_result)}"] if linear_algebra_result else [],
+                footer="This was computed by the linear algebra tool; explain the method step by step and state this result."
+            ),
+            PromptSection(
+                "statistics",
+                "Dataset Statistics:",
+                [f"- {statistics_summary(statistics_result)}"] if statistics_result else [],
+                footer="These were computed from every value in the dataset; use them rather than working them out again."
+            ),
+            PromptSection(
+                "plot",
+                "Function Plot Data:",
+                [f"- {plot_result['expression']} {plot_summary(plot_result)}"] if plot_result else [],
+                footer="These features were computed from the function; describe the graph using them."
+            )
+        ]
+        return self._assemble_system_prompt(MATH_SYSTEM_PROMPT, sections, query)
     
     def _enhance_response_with_calculations(self, response: str, calculations: Dict[str, Any]) -> str:
         """Enhance the AI response with calculation results"""
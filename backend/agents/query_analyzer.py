@@ -0,0 +1,753 @@
+import math
+import os
+import re
+import string
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+from models import QueryFeatures
+from config import settings
+from utils import KeywordScorer
+from tools.linear_algebra_tool import LinearAlgebraError, parse_matrix
+from tools.plot_tool import PlotError, function_variables
+from tools.statistics_tool import StatisticsError, parse_dataset
+from .expression_scanner import ExpressionSpan, find_expressions
+
+_ROUTING_KEYWORDS_PATH = os.path.join(os.path.dirname(__file__), "data", "routing_keywords.json")
+
+# Mathematical concepts reported in math responses
+MATH_CONCEPTS = [
+    "algebra", "geometry", "calculus", "trigonometry", "statistics",
+    "probability", "equation", "function", "derivative", "integral",
+    "matrix", "vector", "polynomial", "theorem", "proof", "formula"
+]
+
+# Physics concepts reported in physics responses
+PHYSICS_CONCEPTS = [
+    # Mechanics
+    "force", "velocity", "acceleration", "momentum", "energy", "kinetic", "potential",
+    "friction", "gravity", "mass", "weight", "newton", "motion", "displacement",
+
+    # Thermodynamics
+    "temperature", "heat", "entropy", "enthalpy", "thermal", "gas", "pressure",
+    "volume", "ideal gas", "carnot", "thermodynamic",
+
+    # Electromagnetism
+    "electric", "magnetic", "current", "voltage", "resistance", "capacitance",
+    "inductance", "electromagnetic", "field", "charge", "coulomb", "ampere",
+    "ohm", "faraday", "maxwell",
+
+    # Waves and Optics
+    "wave", "frequency", "wavelength", "amplitude", "light", "optics", "reflection",
+    "refraction", "interference", "diffraction", "polarization",
+
+    # Modern Physics
+    "quantum", "relativity", "photon", "electron", "proton", "neutron", "atomic",
+    "nuclear", "radioactive", "planck", "einstein", "bohr"
+]
+
+# Constant symbols recognised when written as a separate word or after "="
+CONSTANT_SYMBOLS = [
+    "c", "h", "hbar", "e", "me", "mp", "mn", "G", "k", "NA", "R",
+    "eps0", "mu0", "ke", "g", "atm", "sigma", "pi", "euler"
+]
+
+# Constant descriptions -> symbol
+CONSTANT_DESCRIPTIONS = {
+    "speed of light": "c",
+    "planck constant": "h",
+    "elementary charge": "e",
+    "electron mass": "me",
+    "gravitational constant": "G",
+    "boltzmann constant": "k",
+    "avogadro": "NA",
+    "gas constant": "R"
+}
+
+# Formula keywords for common physics formulas; short abbreviations must stand alone
+FORMULA_KEYWORDS = {
+    "kinetic_energy": ["kinetic energy", "ke", "1/2 mv"],
+    "potential_energy": ["potential energy", "pe", "mgh"],
+    "force": ["newton's law", "f=ma", "force"],
+    "gravitational_force": ["gravity", "gravitational force", "newton's gravity"],
+    "coulomb_law": ["coulomb", "electrostatic", "electric force"],
+    "ohms_law": ["ohm", "v=ir", "resistance"],
+    "wave_equation": ["wave", "velocity", "frequency", "wavelength"],
+    "ideal_gas": ["ideal gas", "pv=nrt", "gas law"]
+}
+_WORD_ONLY_TERMS = {"ke", "pe", "mgh"}
+
+# Words that may surround a calculation or constant lookup without changing what is asked
+_FILLER_WORDS = {
+    "what", "whats", "what's", "is", "are", "the", "a", "an", "of", "value", "values", "please",
+    "calculate", "compute", "evaluate", "find", "work", "out", "solve", "result", "answer",
+    "equals", "equal", "to", "and", "tell", "me", "give", "s", "in", "vacuum", "constant", "can", "you"
+}
+_FILLER_PUNCTUATION = set("?.!,:;'\"=")
+_CACHED_QUERY_MAX_CHARS = 10_000  # Longer queries are analysed afresh each time rather than cached
+# Further words that may surround equations to solve ("solve the system ... for x")
+_EQUATION_WORDS = {
+    "for", "if", "where", "system", "equation", "equations", "simultaneous", "linear", "quadratic",
+    "unknown", "unknowns", "root", "roots", "solution", "solutions"
+}
+
+# Further words that may surround a derivative, integral or limit ("find the exact value of ...")
+_CALCULUS_WORDS = {
+    "for", "exact", "exactly", "approximate", "approximately", "numerically", "numerical", "definite",
+    "first", "derivative", "integral", "limit", "function", "its", "it", "x", "dx", "this", "following"
+}
+
+# Further words that may surround a matrix computation; single letters name matrices and vectors ("A x = b")
+_LINEAR_ALGEBRA_WORDS = {
+    "matrix", "matrices", "vector", "vectors", "by", "with", "for", "its", "where", "given", "following",
+    "eigenvalue", "eigenvector", "eigenvalues", "eigenvectors", "system", "ax", "solution", "exact", "exactly",
+} | set(string.ascii_lowercase)
+
+# Further words that may surround a dataset and the statistics asked of it ("the mean and standard deviation of ...")
+_STATISTICS_WORDS = {
+    "mean", "average", "median", "mode", "modes", "variance", "standard", "deviation", "sd", "std", "spread",
+    "range", "quartile", "quartiles", "interquartile", "iqr", "percentile", "percentiles", "minimum", "maximum",
+    "min", "max", "sum", "total", "count", "sample", "population", "histogram", "frequency", "distribution",
+    "table", "bins", "regression", "line", "best", "fit", "least", "squares", "correlation", "coefficient",
+    "data", "dataset", "set", "numbers", "scores", "measurements", "observations", "points", "list", "statistics",
+    "stats", "summary", "summarise", "summarize", "descriptive", "these", "following", "for", "with", "by", "from",
+    "this", "my", "its", "here", "given", "i", "have", "make", "draw", "show", "through", "using", "into", "x", "y", "r",
+}
+
+# Precompiled patterns
+_TOKEN = re.compile(r"\w+")
+_NUMBER = re.compile(r"\d+(?:\.\d+)?(?:[eE][+-]?\d+)?")
+_ARITHMETIC = re.compile(r'\b\d+(?:\.\d+)?\s*[+\-*/^]\s*\d+(?:\.\d+)?(?:\s*[+\-*/^]\s*\d+(?:\.\d+)?)*')
+_HAS_DIGIT = re.compile(r'\d')
+_HAS_OPERATOR = re.compile(r'[+\-*/^]')
+_HAS_LETTER = re.compile(r'[A-Za-z]')
+_EQUALS_RUN = re.compile(r'=+')
+
+# Equations to solve: pieces separated by commas, semicolons, newlines or "and",
+# read outwards from "=" while the tokens are numbers, single letters or operators
+_EQUATION_SEPARATOR = re.compile(r'[,;\n]|\band\b', re.IGNORECASE)
+_EQUATION_TOKEN = re.compile(r'\d+(?:\.\d+)?|[A-Za-z]+|\*\*|[-+*/^()=²³×÷−]|\S')
+_EQUATION_OPERATORS = set("-+*/^()=²³×÷−") | {"**"}
+_UNKNOWN = re.compile(r'(?<![A-Za-z])[A-Za-z](?![A-Za-z])')
+
+# Plot requests: "plot y = x^2 - 4 from -5 to 5", "graph of sin(x) on [0, 2pi]"
+_PLOT_REQUEST = re.compile(
+    r'\b(?:plot|graph|sketch|draw|tabulate)(?:\s+the)?(?:\s+(?:graph|function|curve))?(?:\s+of)?\s*:?\s+'
+    r'(?P<function>[^?;\n]+)', re.IGNORECASE)
+_PLOT_FUNCTION_END = re.compile(r'\s+(?:from|for|between|over|on|in|where|when|and|with)\b|,|\.(?!\d)')
+# Numbers, multiples of π or e and their fractions ("2pi", "pi/2", "3/4"); where a value
+# ends the phrase it must not be followed by more arithmetic ("at x = 2 + 1")
+_NUMBER_VALUE = r'-?(?:\d*\.?\d+(?:\s*\*?\s*(?:π|pi\b)|\*?e\b)?|π|pi\b|e\b)(?:\s*/\s*\d+(?:\.\d+)?)?'
+_NO_ARITHMETIC = r'(?!\s*[-+*/^(\d]|\w)'
+_RANGE_VALUE = r'(' + _NUMBER_VALUE + r')' + _NO_ARITHMETIC
+_PLOT_RANGES = [
+    re.compile(r'\b(?:from|between)\s+(?:[a-z]\s*=\s*)?' + _RANGE_VALUE + r'\s+(?:to|and)\s+(?:[a-z]\s*=\s*)?' + _RANGE_VALUE, re.IGNORECASE),
+    re.compile(r'[\[(]\s*' + _RANGE_VALUE + r'\s*,\s*' + _RANGE_VALUE + r'\s*[\])]', re.IGNORECASE),
+    re.compile(_RANGE_VALUE + r'\s*(?:<=|<|≤)\s*[a-z]\s*(?:<=|<|≤)\s*' + _RANGE_VALUE, re.IGNORECASE),
+]
+_SINGLE_LETTER = re.compile(r'^[A-Za-z]$')
+
+# Derivatives at a point, definite integrals and limits; the function runs up to a
+# keyword or, when it comes last, to the end of the clause
+_LIMIT_POINT = r'([-+]?(?:∞|infinity\b|inf\b)|' + _NUMBER_VALUE + r')'
+_BOUND = _LIMIT_POINT + _NO_ARITHMETIC
+_CLAUSE_END = r'(?=\s*(?:[?;,]|\.(?!\d)|\band\b|\bthen\b|$))'
+_AT_POINT = r'\s+(?:at|when|where|for)\s+(?:(?P<var>[a-z])\s*=\s*)?(?P<point>' + _NUMBER_VALUE + r')' + _NO_ARITHMETIC
+_APPROACHES = r'\s*(?:approaches|tends\s+to|goes\s+to|->|→)\s*'
+_SIDE = r'(?P<sign>⁺|⁻|\+|-)?(?=[\s,?)}]|$)(?:\s+from\s+(?:the\s+)?(?P<side>left|right|above|below))?'
+_DERIVATIVE_REQUESTS = [
+    re.compile(r'\b(?:(?P<nth>second|third|fourth|2nd|3rd|4th)\s+)?derivative\s+of\s+(?P<function>.+?)' + _AT_POINT, re.IGNORECASE),
+    re.compile(r'\bdifferentiate\s+(?P<function>.+?)(?:\s+and\s+evaluate(?:\s+it)?)?' + _AT_POINT, re.IGNORECASE),
+    re.compile(r'\bd(?P<nth>²|³|⁴|\^?[234])?\s*/\s*d[a-z](?:²|³|⁴|\^?[234])?\s*(?:of\s+)?(?P<function>.+?)' + _AT_POINT, re.IGNORECASE),
+    re.compile(r"\b(?P<name>[a-z])(?P<primes>'{1,4}|′{1,4}|″)\s*\(\s*(?P<point>" + _NUMBER_VALUE + r")\s*\)\s*,?\s*"
+               r"(?:where|if|when|for|given(?:\s+that)?)\s+(?P=name)\s*\(\s*(?P<var>[a-z])\s*\)\s*=\s*(?P<function>.+?)" + _CLAUSE_END,
+               re.IGNORECASE),
+]
+_INTEGRAL_REQUESTS = [
+    re.compile(r'\b(?:(?:definite\s+)?integral\s+of|integrate)\s+(?P<function>.+?)\s*(?:\bd(?P<var>[a-z])\s*)?'
+               r'\b(?:from|between)\s+(?:[a-z]\s*=\s*)?(?P<lower>' + _BOUND + r')\s+(?:to|and)\s+(?:[a-z]\s*=\s*)?(?P<upper>' + _BOUND + r')',
+               re.IGNORECASE),
+    re.compile(r'\b(?:definite\s+)?integral\s+from\s+(?P<lower>' + _BOUND + r')\s+to\s+(?P<upper>' + _BOUND + r')\s+of\s+'
+               r'(?P<function>.+?)(?:\s*\bd(?P<var>[a-z])\b|' + _CLAUSE_END + r')', re.IGNORECASE),
+    re.compile(r'∫\s*_?\s*\{?\s*(?P<lower>' + _LIMIT_POINT + r')\s*\}?\s*\^\s*\{?\s*(?P<upper>' + _LIMIT_POINT + r')\s*\}?\s*'
+               r'(?P<function>.+?)\s*\bd(?P<var>[a-z])\b', re.IGNORECASE),
+]
+_LIMIT_REQUESTS = [
+    re.compile(r'\b(?:limit|lim)\s+of\s+(?P<function>.+?)\s+as\s+(?P<var>[a-z])' + _APPROACHES + r'(?P<point>' + _LIMIT_POINT + r')' + _SIDE,
+               re.IGNORECASE),
+    re.compile(r'\b(?:limit|lim)\s+as\s+(?P<var>[a-z])' + _APPROACHES + r'(?P<point>' + _LIMIT_POINT + r')' + _SIDE
+               + r'\s*,?\s+of\s+(?P<function>.+?)' + _CLAUSE_END, re.IGNORECASE),
+    re.compile(r'\blim\s*_?\s*\{?\s*(?P<var>[a-z])\s*(?:->|→)\s*(?P<point>' + _LIMIT_POINT + r')' + _SIDE
+               + r'\s*\}?\s+(?P<function>.+?)' + _CLAUSE_END, re.IGNORECASE),
+]
+_ORDERS = {"second": 2, "third": 3, "fourth": 4, "2nd": 2, "3rd": 3, "4th": 4, "²": 2, "³": 3, "⁴": 4, '″': 2}
+
+# Inline matrices and vectors: "[[1, 2], [3, 4]]", "[1 2; 3 4]", "{{1, 2}, {3, 4}}", "[5, 6]"
+_MATRIX = re.compile(r'[\[{](?:\s*[\[{][^\[\]{}]*[\]}]\s*[,;]?)+\s*[\]}]|[\[{][^\[\]{}]*[\]}]')
+# What is asked of them; the operation named first wins, and its symbols sit against a matrix
+_MATRIX_OPERATIONS = [
+    ("determinant", re.compile(r'\bdet(?:erminant)?\b', re.IGNORECASE)),
+    ("inverse", re.compile(r'\binver(?:se|t)\b|(?<=[\]}])\s*(?:\^\s*\(?\s*[-−]\s*1\s*\)?|⁻¹)', re.IGNORECASE)),
+    ("rank", re.compile(r'\brank\b', re.IGNORECASE)),
+    ("eigen", re.compile(r'\beigen(?:values?|vectors?|pairs?|decomposition)?\b', re.IGNORECASE)),
+    ("cross", re.compile(r'\bcross\s+product\b', re.IGNORECASE)),
+    ("solve", re.compile(r'\bsolve\b|\bleast[\s-]+squares?\b|\bax\s*=\s*b\b|(?<=[\]}])\s*\*?\s*[a-z]\s*=(?=\s*[\[{])',
+                         re.IGNORECASE)),
+    ("product", re.compile(r'\b(?:dot\s+)?product\b|\bmultipl(?:y|ied)\b|\btimes\b|(?<=[\]}])\s*[*×·@]\s*(?=[\[{])',
+                           re.IGNORECASE)),
+]
+_BINARY_MATRIX_OPERATIONS = {"product", "cross", "solve"}
+
+# Pasted datasets: runs of numbers (with exponents, "1e3") separated by commas, semicolons, whitespace or "and"
+# ("2, 4, 4, 5 and 9", one per line), matched loosely and then read by the statistics tool's parser
+_DATASET = re.compile(r'(?<![\w.^*/])[-+]?\.?\d(?:[-+0-9., \t\r\n;]+|(?<=\d)[eE](?=[-+]?\d)|and\b)*(?<=\d)(?![\w(^*/])')
+# Paired data: "(1, 2), (2, 4.1), (3, 5.9)"
+_POINTS = re.compile(r'\([-+0-9., \t\r\n]+\)(?:[\s,;]*(?:and\s+)?\([-+0-9., \t\r\n]+\))+')
+_DATASET_PLACEHOLDER = "[pasted data]"  # What the model is sent in place of the data, with the tool's summary
+_MIN_DATASET = 3             # Values needed when statistics are asked for ("the median of 3, 9, 4")
+_AT_LEAST_MIN_DATASET = re.compile(r'(?:\D*\d+(?:\.\d*)?){%d}' % _MIN_DATASET)  # Cheap test before parsing
+_MIN_UNLABELLED_DATASET = 10  # Values needed to count as a pasted dataset without such words
+# Words saying statistics are wanted, and what is asked of the data
+_STATISTICS_REQUEST = re.compile(
+    r'\b(?:mean|average|median|modes?|variance|standard\s+deviation|deviation|spread|range|quartiles?|'
+    r'interquartile|iqr|percentiles?|quantiles?|histogram|frequenc(?:y|ies)|statistics?|stats|summar(?:y|i[sz]e)|'
+    r'data(?:\s*set)?|samples?|scores|measurements|observations|regression|correlat\w*|best[-\s]+fit|trend\s*line)\b',
+    re.IGNORECASE)
+_REGRESSION_REQUEST = re.compile(
+    r'\b(?:regression|correlat\w*|best[-\s]+fit|(?:line|curve)\s+of\s+fit|trend\s*line|least[-\s]+squares\s+line)\b',
+    re.IGNORECASE)
+_HISTOGRAM_REQUEST = re.compile(r'\b(?:histogram|frequency\s+(?:table|distribution)|bins)\b', re.IGNORECASE)
+_PERCENTILE = re.compile(r'\b(\d+(?:\.\d+)?)(?:st|nd|rd|th)?[\s-]*percentiles?\b', re.IGNORECASE)
+_BINS = re.compile(r'\b(\d+)\s+(?:equal[-\s]+width\s+)?(?:bins|classes|intervals|bars)\b', re.IGNORECASE)
+
+# Physics calculator candidates: F = ..., KE/PE = ..., arithmetic, function calls
+_PHYSICS_EXPRESSIONS = [
+    re.compile(r'F\s*=\s*[0-9+\-*/().\s]+', re.IGNORECASE),
+    re.compile(r'(?:KE|PE)\s*=\s*[0-9+\-*/().\s^]+', re.IGNORECASE),
+    re.compile(_ARITHMETIC.pattern, re.IGNORECASE),
+    re.compile(r'\b(?:sin|cos|tan|sqrt|log|abs)\s*\(\s*[0-9+\-*/^().\s]+\s*\)', re.IGNORECASE),
+]
+
+# Routing patterns: (pattern, score)
+_MATH_ROUTING_PATTERNS = [
+    (re.compile(r'\d+\s*[+\-*/^]\s*\d+'), 2),                # Mathematical expressions
+    (re.compile(r'f\(x\)|g\(x\)|h\(x\)'), 2),               # Function notation
+    (re.compile(r'[∫∑∆αβγθπ]'), 3),                        # Mathematical symbols and notation
+    (re.compile(r'=.*[x-z]|[x-z].*='), 2),                  # Equation patterns
+]
+_PHYSICS_ROUTING_PATTERNS = [
+    (re.compile(r'F\s*=\s*m.*a|E\s*=\s*m.*c|P\s*=\s*F/A', re.IGNORECASE), 3),            # Formulas
+    (re.compile(r'\d+\s*(m/s|kg|N|J|W|V|A|Ω|Hz)'), 2),                                    # Units
+    (re.compile(r'\b(9\.8|3\.0.*10\^8|6\.67.*10\^-11)\b'), 2),                           # Constants
+    (re.compile(r'object.*moving|ball.*thrown|car.*travels|spring.*compressed', re.IGNORECASE), 2),
+]
+
+# Context clues that settle a math/physics tie
+PHYSICS_TIE_CLUES = ["real world", "application", "experiment"]
+MATH_TIE_CLUES = ["abstract", "theoretical", "pure"]
+
+class QueryAnalyzer:
+    """
+    Computes QueryFeatures for a query in one go.
+
+    Every pattern and keyword table is compiled once, and results are cached
+    per query text, so a query routed from the tutor to a specialist agent
+    (or asked again) is analysed only once.
+    """
+
+    def __init__(self, routing_keywords_path: str = _ROUTING_KEYWORDS_PATH, cache_size: int = 1024):
+        self.keyword_scorer = KeywordScorer.from_file(routing_keywords_path)
+
+        # Concepts, constant descriptions and formula keywords share one automaton
+        terms: Dict[str, Dict[str, dict]] = {
+            "math": {concept: {"weight": 1, "match": "stem"} for concept in MATH_CONCEPTS},
+            "physics": {concept: {"weight": 1, "match": "stem"} for concept in PHYSICS_CONCEPTS},
+            "constants": {description: {"weight": 1, "match": "stem"} for description in CONSTANT_DESCRIPTIONS},
+            "formulas": {
+                keyword: {"weight": 1, "match": "word" if keyword in _WORD_ONLY_TERMS else "substring"}
+                for keywords in FORMULA_KEYWORDS.values() for keyword in keywords
+            },
+        }
+        self.term_scorer = KeywordScorer(terms)
+        self._formula_by_keyword = {
+            keyword: name for name, keywords in FORMULA_KEYWORDS.items() for keyword in keywords
+        }
+        self._cached_analyze = lru_cache(maxsize=cache_size)(self._analyze)
+
+    def analyze(self, query: str) -> QueryFeatures:
+        """Features of a query, cached unless the query is long enough to hold a pasted dataset"""
+        if len(query) > _CACHED_QUERY_MAX_CHARS:
+            # Keeping megabytes of text and its parsed array for a repeat that rarely comes costs more than it saves
+            return self._analyze(query)
+        return self._cached_analyze(query)
+
+    def _analyze(self, query: str) -> QueryFeatures:
+        # A pasted dataset is read once, here, and cut out of the text the rest of the analysis
+        # sees, so its numbers are not taken for calculations ("4 -2") or scanned by every pattern
+        statistics, dataset_spans = _scan_statistics(query)
+        text = _without(query, dataset_spans) if dataset_spans else query
+        normalized = text.lower()
+        keyword_scores, keyword_hits = self.keyword_scorer.scan(normalized)
+        terms = self.term_scorer.matches(normalized)
+        formulas = {self._formula_by_keyword[keyword] for keyword in terms["formulas"]}
+        calculus, calculus_span = _scan_calculus(text)
+        linear_algebra, matrix_spans, operation_spans = _scan_linear_algebra(text)
+        equations, equation_remainder = _scan_equations(text)
+        # Arithmetic inside an equation ("3 + 2" in "3 + 2x = 11") belongs to the equation,
+        # and the point or bounds of a calculus question ("at x = 2", "to 2*pi") to that question
+        calculus_text = text[calculus_span[0]:calculus_span[1]] if calculus_span else ""
+        equations = [system for system in equations if not any(equation in calculus_text for equation in system)]
+        calculation_spans = [
+            span for span in find_expressions(text)
+            if not any(text[span.start:span.end] in equation for system in equations for equation in system)
+            and not (calculus_span and calculus_span[0] <= span.start and span.end <= calculus_span[1])
+            and not any(start <= span.start and span.end <= end for start, end in matrix_spans)
+        ]
+        math_calculations = list(dict.fromkeys(span.expression for span in calculation_spans))
+
+        return QueryFeatures(
+            text=query,
+            normalized=normalized,
+            tokens=_TOKEN.findall(normalized),
+            numbers=[match.span() for match in _NUMBER.finditer(text)],
+            expression_spans=[match.span() for match in _ARITHMETIC.finditer(text)],
+            math_calculations=math_calculations,
+            physics_calculations=extract_physics_calculations(text),
+            keyword_scores=keyword_scores,
+            keyword_hits=keyword_hits,
+            pattern_scores={
+                "math": sum(score for pattern, score in _MATH_ROUTING_PATTERNS if pattern.search(text)),
+                "physics": sum(score for pattern, score in _PHYSICS_ROUTING_PATTERNS if pattern.search(text)),
+            },
+            concept_hits={
+                "math": [concept for concept in MATH_CONCEPTS if concept in terms["math"]],
+                "physics": [concept for concept in PHYSICS_CONCEPTS if concept in terms["physics"]],
+            },
+            constant_symbols=_find_constant_symbols(normalized, terms["constants"]),
+            # Keep the table's order so prompts and tool calls are stable
+            formula_names=[name for name in FORMULA_KEYWORDS if name in formulas],
+            equations=equations,
+            plot=extract_plot(text),
+            calculus=calculus,
+            linear_algebra=linear_algebra,
+            prompt_text=_replace(query, dataset_spans, _DATASET_PLACEHOLDER) if dataset_spans else None,
+            statistics=statistics,
+            fast_path=_fast_path_kind(text, normalized, calculation_spans, terms["constants"],
+                                      equations, equation_remainder, calculus_span,
+                                      matrix_spans + operation_spans if linear_algebra else None,
+                                      statistics is not None),
+        )
+
+def extract_math_calculations(query: str) -> List[str]:
+    """
+    Extract mathematical expressions that need calculation, in order and without duplicates
+
+    Expressions are read in one pass by the expression scanner, so "2 + 3 * 4"
+    is one calculation rather than overlapping pieces of it, and come back in
+    calculator form ("2(3+4)" -> "2*(3+4)", "√16" -> "sqrt(16)").
+    """
+    return list(dict.fromkeys(span.expression for span in find_expressions(query)))
+
+def extract_physics_calculations(query: str) -> List[str]:
+    """Extract numeric physics calculations, with variable names and equals signs removed"""
+    calculations = []
+    for pattern in _PHYSICS_EXPRESSIONS:
+        for match in pattern.findall(query):
+            cleaned = _EQUALS_RUN.sub('', _HAS_LETTER.sub('', match)).strip()
+            if cleaned and _is_valid_physics_calculation(cleaned):
+                calculations.append(cleaned)
+    return calculations
+
+def extract_equations(query: str) -> List[List[str]]:
+    """
+    Extract equations to solve, grouped into the systems to solve together
+
+    "x + y = 10 and x - y = 2" is one system; "2x = 4, 3y = 9" would be too,
+    while "2x = 4 and 3x = 9" gives two separate equations in x. Groups whose
+    unknowns outnumber their equations are dropped ("F = m * a").
+    """
+    return _scan_equations(query)[0]
+
+def extract_plot(query: str) -> Optional[Dict[str, Any]]:
+    """
+    Find a request to plot a function ("plot y = x^2 - 4 from -5 to 5")
+
+    Returns:
+        {"expression": function as written, "x_range": [min, max] or None},
+        or None when there is no plot request or what follows "plot" is not a
+        function of at most two single-letter variables ("graph a parabola")
+    """
+    match = _PLOT_REQUEST.search(query)
+    if match is None:
+        return None
+    text = match.group("function")
+    end = _PLOT_FUNCTION_END.search(text)
+    function = (text[:end.start()] if end else text).strip()
+    try:
+        variables = function_variables(function)
+    except PlotError:
+        return None
+    if not variables or not all(_SINGLE_LETTER.match(name) for name in variables):
+        return None
+
+    x_range = None
+    rest = text[end.start():] if end else ""
+    for pattern in _PLOT_RANGES:
+        bounds = pattern.search(rest)
+        if bounds:
+            low, high = (_range_value(value) for value in bounds.groups())
+            if low < high:
+                x_range = [low, high]
+            break
+    return {"expression": function, "x_range": x_range}
+
+def extract_calculus(query: str) -> Optional[Dict[str, Any]]:
+    """
+    Find a derivative at a point, definite integral or limit to compute
+
+    Returns:
+        The CalculusTool arguments: {"operation": "derivative", "expression",
+        "variable", "point", "order"}, {"operation": "integral", "expression",
+        "variable", "lower", "upper"} or {"operation": "limit", "expression",
+        "variable", "point", "direction"}; None if the query asks for none of
+        these or the function is not one of a single variable
+    """
+    return _scan_calculus(query)[0]
+
+def _scan_calculus(query: str) -> Tuple[Optional[Dict[str, Any]], Optional[Tuple[int, int]]]:
+    """The calculus question in the query, and where it is"""
+    for operation, patterns in (("derivative", _DERIVATIVE_REQUESTS), ("integral", _INTEGRAL_REQUESTS),
+                                ("limit", _LIMIT_REQUESTS)):
+        for pattern in patterns:
+            match = pattern.search(query)
+            if match is None:
+                continue
+            groups = match.groupdict()
+            variable = _calculus_variable(groups["function"], groups.get("var"))
+            if variable is None:
+                continue
+            request = {"operation": operation, "expression": groups["function"].strip(), "variable": variable}
+            if operation == "derivative":
+                order = _ORDERS.get((groups.get("nth") or "").lower().lstrip("^"))
+                if groups.get("primes"):
+                    order = _ORDERS.get(groups["primes"], len(groups["primes"]))
+                elif groups.get("nth") and order is None:
+                    order = int(groups["nth"].lstrip("^"))
+                request.update(point=_range_value(groups["point"]), order=order or 1)
+            elif operation == "integral":
+                request.update(lower=_range_value(groups["lower"]), upper=_range_value(groups["upper"]))
+            else:
+                point = _range_value(groups["point"])
+                side = groups.get("side") or groups.get("sign")
+                direction = None
+                if side and not math.isinf(point):
+                    direction = "right" if side.lower() in ("right", "above", "+", "⁺") else "left"
+                request.update(point=point, direction=direction)
+            return request, match.span()
+    return None, None
+
+def extract_linear_algebra(query: str) -> Optional[Dict[str, Any]]:
+    """
+    Find a computation on inline matrices or vectors ("the determinant of
+    [[1, 2], [3, 4]]", "solve [[2, 1], [1, 3]] x = [3, 5]")
+
+    Returns:
+        The LinearAlgebraTool arguments, {"operation": "determinant",
+        "inverse", "rank", "eigen", "product", "cross" or "solve", "operands":
+        the matrices as written}, or None if there is no matrix or no
+        operation asked of it
+    """
+    return _scan_linear_algebra(query)[0]
+
+def _scan_linear_algebra(query: str) -> Tuple[Optional[Dict[str, Any]], List[Tuple[int, int]], List[Tuple[int, int]]]:
+    """The matrix computation asked for, where the matrices are, and where the words asking for it are"""
+    matrices = []
+    for match in _MATRIX.finditer(query):
+        try:
+            parsed = parse_matrix(match.group())
+        except LinearAlgebraError:
+            continue  # An interval such as [0, 2pi], or a citation
+        if sum(len(row) if isinstance(row, list) else 1 for row in parsed) > 1:
+            matrices.append(match)
+    if not matrices:
+        return None, [], []
+
+    asked = [(match.start(), operation, pattern) for operation, pattern in _MATRIX_OPERATIONS
+             for match in [pattern.search(query)] if match]
+    if not asked:
+        return None, [], []
+    _, operation, pattern = min(asked, key=lambda item: item[0])
+    operands = [match.group() for match in matrices]
+    if operation in _BINARY_MATRIX_OPERATIONS:
+        if len(operands) < 2:
+            return None, [], []
+        operands = operands if operation == "product" else operands[:2]
+    else:
+        operands = operands[:1]
+    return ({"operation": operation, "operands": operands}, [match.span() for match in matrices],
+            [match.span() for match in pattern.finditer(query)])
+
+def extract_statistics(query: str) -> Optional[Dict[str, Any]]:
+    """
+    Find a dataset pasted into the query and what is asked of it ("the mean
+    and standard deviation of 3, 5, 8, 13", "a histogram of ...", "the line
+    of best fit through (1, 2), (2, 4), (3, 5)")
+
+    Returns:
+        The StatisticsTool arguments, {"operation": "describe", "histogram"
+        or "regression", "data": the values as an array, "y": the paired
+        values for a regression, and "percentiles" or "bins" if asked for},
+        or None if there is no dataset
+    """
+    return _scan_statistics(query)[0]
+
+def _scan_statistics(query: str) -> Tuple[Optional[Dict[str, Any]], List[Tuple[int, int]]]:
+    """The statistics asked for, and where the data is written"""
+    points = []
+    for match in _POINTS.finditer(query):
+        try:
+            values = parse_dataset(match.group())
+        except StatisticsError:
+            continue
+        if values.size == 2 * match.group().count("(") >= 2 * _MIN_DATASET:
+            points.append((match.span(), values))
+    runs = []
+    for match in _DATASET.finditer(_blank(query, [span for span, _ in points]) if points else query):
+        if not _AT_LEAST_MIN_DATASET.match(match.group()):
+            continue  # A lone number
+        try:
+            values = parse_dataset(match.group())
+        except StatisticsError:
+            continue  # Arithmetic ("3 + 4 + 5"), a date, ...
+        if values.size >= _MIN_DATASET:
+            runs.append((match.span(), values))
+    if not runs and not points:
+        return None, []
+
+    # Look for what is asked only in the words around the data, which may be megabytes long
+    words = _without(query, sorted(span for span, _ in points + runs))
+    if _STATISTICS_REQUEST.search(words):
+        # Any list, but not the rows of a matrix ("[[1, 2, 3], [4, 5, 6]]")
+        bracketed = [(_bracketed(query, *span), span, values) for span, values in runs]
+        datasets = [(brackets or span, values) for brackets, span, values in bracketed
+                    if not (brackets and _bracketed(query, *brackets, openers="[{,", closers="]},"))]
+    else:
+        # A long list on its own, not in brackets as a vector or matrix would be
+        datasets = [(span, values) for span, values in runs
+                    if values.size >= _MIN_UNLABELLED_DATASET and not _bracketed(query, *span)]
+        points = []
+
+    if _REGRESSION_REQUEST.search(words) and (points or len(datasets) >= 2):
+        if points:
+            span, values = points[0]
+            return {"operation": "regression", "data": values[0::2], "y": values[1::2]}, [span]
+        (x_span, x), (y_span, y) = datasets[:2]
+        if x.size == y.size:
+            return {"operation": "regression", "data": x, "y": y}, [x_span, y_span]
+    if not datasets:
+        return None, []
+    request: Dict[str, Any] = {"operation": "describe", "data": datasets[0][1]}
+    if _HISTOGRAM_REQUEST.search(words):
+        request["operation"] = "histogram"
+        bins = _BINS.search(words)
+        if bins:
+            request["bins"] = int(bins.group(1))
+    else:
+        percentiles = [float(match.group(1)) for match in _PERCENTILE.finditer(words)]
+        if percentiles:
+            request["percentiles"] = percentiles
+    return request, [span for span, _ in datasets]
+
+def _bracketed(text: str, start: int, end: int, openers: str = "[({", closers: str = "])}") -> Optional[Tuple[int, int]]:
+    """
+    The span widened to the brackets around it ("[1, 2, 3]"), or None if it
+    is not in brackets; with other openers and closers, e.g. whether a
+    bracketed row sits among others in a matrix
+    """
+    while start and text[start - 1].isspace():
+        start -= 1
+    while end < len(text) and text[end].isspace():
+        end += 1
+    if start and end < len(text) and text[start - 1] in openers and text[end] in closers:
+        return start - 1, end + 1
+    return None
+
+def _without(text: str, spans: List[Tuple[int, int]]) -> str:
+    """The text with the (sorted, non-overlapping) spans cut out, each leaving a space"""
+    pieces, position = [], 0
+    for start, end in spans:
+        pieces.append(text[position:start])
+        position = end
+    pieces.append(text[position:])
+    return " ".join(pieces)
+
+def _replace(text: str, spans: List[Tuple[int, int]], replacement: str) -> str:
+    """The text with each of the (sorted, non-overlapping) spans replaced"""
+    pieces, position = [], 0
+    for start, end in spans:
+        pieces += [text[position:start], replacement]
+        position = end
+    pieces.append(text[position:])
+    return "".join(pieces)
+
+def _blank(text: str, spans: List[Tuple[int, int]]) -> str:
+    """The text with the spans overwritten by spaces, so positions in it still hold"""
+    for start, end in spans:
+        text = text[:start] + " " * (end - start) + text[end:]
+    return text
+
+def _calculus_variable(function: str, named: Optional[str]) -> Optional[str]:
+    """The function's variable (the named one if given), or None if it is not a function of one variable"""
+    try:
+        variables = function_variables(function)
+    except PlotError:
+        return None
+    if len(variables) > 1 or (variables and not _SINGLE_LETTER.match(variables[0])):
+        return None
+    if named and variables and variables[0] != named:
+        return None
+    return named or (variables[0] if variables else "x")
+
+def _range_value(text: str) -> float:
+    text = text.replace(" ", "").replace("*", "").lower()
+    if text.lstrip("+-") in ("∞", "infinity", "inf"):
+        return -math.inf if text.startswith("-") else math.inf
+    numerator, _, denominator = text.partition("/")
+    for name, constant in (("π", math.pi), ("pi", math.pi), ("e", math.e)):
+        if numerator.endswith(name):
+            factor = numerator[:-len(name)]
+            value = (-1.0 if factor == "-" else float(factor or 1)) * constant
+            break
+    else:
+        value = float(numerator)
+    return value / float(denominator) if denominator else value
+
+def _scan_equations(query: str) -> Tuple[List[List[str]], str]:
+    """Equations grouped into systems, and the query text left once they are removed"""
+    found = []  # (equation, start, end)
+    offset = 0
+    for piece in _EQUATION_SEPARATOR.split(query):
+        start = query.index(piece, offset)
+        offset = start + len(piece)
+        if piece.count("=") != 1:
+            continue
+        span = _equation_around_equals(list(_EQUATION_TOKEN.finditer(piece)))
+        if span is None:
+            continue
+        equation = piece[span[0]:span[1]]
+        if _HAS_DIGIT.search(equation) and _UNKNOWN.search(equation):
+            found.append((equation, start + span[0], start + span[1]))
+
+    unknowns = [set(_UNKNOWN.findall(equation)) for equation, _, _ in found]
+    if len(found) > 1 and len(set().union(*unknowns)) == len(found):
+        kept = found
+        systems = [list(dict.fromkeys(equation for equation, _, _ in found))]
+    else:
+        kept = [item for item, names in zip(found, unknowns) if len(names) == 1]
+        systems = [[equation] for equation in dict.fromkeys(equation for equation, _, _ in kept)]
+
+    remainder = query
+    for _, start, end in sorted(kept, key=lambda item: item[1], reverse=True):
+        remainder = remainder[:start] + " " + remainder[end:]
+    return systems, _EQUATION_SEPARATOR.sub(" ", remainder)
+
+def _equation_around_equals(tokens: List[re.Match]) -> Optional[Tuple[int, int]]:
+    """Span of the longest run of number, single-letter and operator tokens around the "=" token"""
+    def is_math(token: str) -> bool:
+        return token[0].isdigit() or token in _EQUATION_OPERATORS or (token.isalpha() and len(token) == 1)
+
+    text = [token.group() for token in tokens]
+    first = last = text.index("=")
+    while first > 0 and is_math(text[first - 1]):
+        first -= 1
+    while last + 1 < len(text) and is_math(text[last + 1]):
+        last += 1
+    # Operators cannot end a side, nor (other than a sign) start one
+    while last > first and text[last] in ("+", "-", "*", "**", "/", "^", "(", "=", "×", "÷", "−"):
+        last -= 1
+    while first < last and text[first] in ("+", "*", "**", "/", "^", ")", "=", "×", "÷"):
+        first += 1
+    if text[first] == "=" or text[last] == "=":
+        return None
+    return tokens[first].start(), tokens[last].end()
+
+def _is_valid_physics_calculation(expression: str) -> bool:
+    # Must contain numbers and operators, no alphabetic characters
+    return (bool(_HAS_DIGIT.search(expression)) and bool(_HAS_OPERATOR.search(expression))
+            and not _HAS_LETTER.search(expression) and len(expression.strip()) > 2)
+
+def _fast_path_kind(query: str, normalized: str, calculations: List[ExpressionSpan], descriptions: List[str],
+                    equations: List[List[str]], equation_remainder: str,
+                    calculus_span: Optional[Tuple[int, int]] = None,
+                    linear_algebra_spans: Optional[List[Tuple[int, int]]] = None,
+                    statistics: bool = False) -> Optional[str]:
+    """
+    Whether the query asks for nothing but a derivative, integral or limit
+    ("calculus"), a matrix computation ("linear_algebra"), statistics of a
+    dataset ("statistics", whose data is already cut from the query), equations
+    to solve ("equation"), calculations ("calculation") or named constants
+    ("constant"), i.e. it is fully covered once those are removed along with
+    filler words and punctuation
+    """
+    if calculus_span:
+        remainder = query[:calculus_span[0]] + " " + query[calculus_span[1]:]
+        if not calculations and _only_filler(remainder.lower(), _CALCULUS_WORDS):
+            return "calculus"
+    if linear_algebra_spans and not calculations and not equations:
+        # The matrices and the words or symbols asking for the operation
+        remainder = query
+        for start, end in sorted(linear_algebra_spans, reverse=True):
+            remainder = remainder[:start] + " " + remainder[end:]
+        if _only_filler(remainder.lower(), _LINEAR_ALGEBRA_WORDS):
+            return "linear_algebra"
+    if statistics and not calculations and not equations:
+        # "the 90th percentile", "in 10 bins"
+        remainder = _BINS.sub(" ", _PERCENTILE.sub(" ", normalized))
+        if _only_filler(remainder, _STATISTICS_WORDS):
+            return "statistics"
+    if equations:
+        # "solve for x" names an unknown without asking anything more
+        unknowns = {name.lower() for system in equations for equation in system for name in _UNKNOWN.findall(equation)}
+        if _only_filler(equation_remainder.lower(), _EQUATION_WORDS | unknowns):
+            return "equation"
+    elif calculations:
+        # Cut out the spans themselves: the calculator form may not appear in the query
+        remainder = query
+        for span in reversed(calculations):
+            remainder = remainder[:span.start] + " " + remainder[span.end:]
+        if _only_filler(remainder.lower()):
+            return "calculation"
+    elif descriptions:
+        remainder = normalized
+        for description in descriptions:
+            remainder = remainder.replace(description, " ")
+        if _only_filler(remainder):
+            return "constant"
+    return None
+
+def _only_filler(text: str, extra_words: Optional[set] = None) -> bool:
+    if any(not char.isspace() and not char.isalnum() and char not in _FILLER_PUNCTUATION for char in text):
+        return False
+    return all(word in _FILLER_WORDS or (extra_words and word in extra_words)
+               for word in _TOKEN.findall(text.replace("'", " ")))
+
+def _find_constant_symbols(normalized: str, descriptions: List[str]) -> List[str]:
+    words = set(normalized.split())
+    symbols = [
+        symbol for symbol in CONSTANT_SYMBOLS
+        if symbol in words or f"={symbol}" in normalized
+    ]
+    for description in descriptions:
+        symbol = CONSTANT_DESCRIPTIONS[description]
+        if symbol not in symbols:
+            symbols.append(symbol)
+    return symbols
+
+# Global analyzer instance
+_query_analyzer = None
+
+def get_query_analyzer() -> QueryAnalyzer:
+    """Get or create the shared query analyzer"""
+    global _query_analyzer
+    if _query_analyzer is None:
+        _query_analyzer = QueryAnalyzer(settings.routing_keywords_path or _ROUTING_KEYWORDS_PATH)
+    return _query_analyzer
@@ -0,0 +1,64 @@
+"""
+Train the learned query router from logged (query, agent) pairs.
+
+Usage (from the backend directory):
+    python -m agents.train_router --data routes.jsonl --output router.npy
+
+The data has one JSON object per line with "query" and "agent" (or
+"agent_used", as in chat responses). A held-out slice is scored against
+keyword routing before the final model is trained on everything; then set
+LEARNED_ROUTER_PATH to the output file.
+"""
+import argparse
+import zlib
+import numpy as np
+from config import settings
+from .batch_classifier import BatchClassifier
+from .learned_router import ROUTER_CLASSES, LearnedRouter, load_examples, train_naive_bayes
+from .query_analyzer import get_query_analyzer
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Train the learned query router")
+    parser.add_argument("--data", required=True, help="JSON Lines file of {\"query\", \"agent\"} records")
+    parser.add_argument("--output", required=True, help="Where to write the .npy weights")
+    parser.add_argument("--bits", type=int, default=16, help="Hashed feature space size as a power of two")
+    parser.add_argument("--alpha", type=float, default=1.0, help="Additive smoothing")
+    parser.add_argument("--holdout", type=float, default=0.1, help="Fraction of queries held out for evaluation")
+    parser.add_argument("--min-confidence", type=float, default=None,
+                        help="Threshold to evaluate the fallback at (default: LEARNED_ROUTER_MIN_CONFIDENCE)")
+    args = parser.parse_args()
+
+    examples = load_examples(args.data)
+    if not examples:
+        parser.error(f"No usable examples in {args.data}")
+
+    # Hold out by query hash so repeats of a query land on the same side
+    held_out = [zlib.crc32(query.encode("utf-8")) % 1000 < args.holdout * 1000 for query, _ in examples]
+    train = [example for example, hold in zip(examples, held_out) if not hold]
+    test = [example for example, hold in zip(examples, held_out) if hold]
+    n_features = 1 << args.bits
+
+    if test:
+        router = LearnedRouter(train_naive_bayes(train, n_features, args.alpha))
+        min_confidence = settings.learned_router_min_confidence if args.min_confidence is None else args.min_confidence
+        queries = [query for query, _ in test]
+        expected = np.array([ROUTER_CLASSES.index(agent) for _, agent in test])
+        learned, confidence = router.predict_batch(queries)
+        keywords = BatchClassifier(get_query_analyzer().keyword_scorer).classify(queries)
+        keyword_routes = np.array([ROUTER_CLASSES.index(result["route"]) for result in keywords])
+        confident = confidence >= min_confidence
+        combined = np.where(confident, learned, keyword_routes)
+
+        print(f"Held out {len(test)} of {len(examples)} queries")
+        print(f"  keyword routing accuracy:           {np.mean(keyword_routes == expected):.3f}")
+        print(f"  learned routing accuracy:           {np.mean(learned == expected):.3f}")
+        print(f"  confident (>= {min_confidence:.2f}) coverage:      {np.mean(confident):.3f}")
+        print(f"  learned + keyword fallback accuracy: {np.mean(combined == expected):.3f}")
+
+    # The shipped model is trained on everything
+    weights = train_naive_bayes(examples, n_features, args.alpha)
+    np.save(args.output, weights)
+    print(f"Wrote {args.output}: {weights.shape[0] - 1} features x {weights.shape[1]} agents, {weights.nbytes // 1024} KiB")
+
+if __name__ == "__main__":
+    main()
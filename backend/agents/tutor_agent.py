@@ -1,63 +1,67 @@
-import re
-from typing import Dict, Any, Optional
+from typing import AsyncIterator, Dict, Any, List, Optional
 from .base_agent import BaseAgent
 from .math_agent import MathAgent
 from .physics_agent import PhysicsAgent
-from models import AgentRequest, AgentResponse, AgentType
+from models import AgentRequest, AgentResponse, AgentType, QueryFeatures
+from cache import get_near_duplicate_cache
+from llm import PromptTemplate
+from config import settings
+from .query_analyzer import get_query_analyzer, PHYSICS_TIE_CLUES, MATH_TIE_CLUES
+from .batch_classifier import BatchClassifier
+from .learned_router import load_learned_router
 import logging
 
 logger = logging.getLogger(__name__)
 
+# General tutoring system prompt, measured once
+TUTOR_SYSTEM_PROMPT = PromptTemplate("""You are an AI Tutor Agent specializing in educational support. Your role is to:
+
+1. Provide clear, helpful explanations on academic topics
+2. Guide students through learning concepts step by step
+3. Encourage critical thinking and problem-solving
+4. Adapt explanations to different learning levels
+5. Suggest additional resources when appropriate
+
+Guidelines:
+- Use encouraging, supportive language
+- Break complex topics into manageable parts
+- Provide examples to illustrate concepts
+- Ask clarifying questions when needed
+- Connect learning to real-world applications
+- If the question is specifically about math or physics calculations, suggest that the student ask more specifically about those topics for detailed assistance
+
+For questions that require detailed mathematical calculations or physics problem-solving, you can suggest that students specify they need "math help" or "physics help" for more specialized assistance.""")
+
 class TutorAgent(BaseAgent):
     """Main orchestrator agent that delegates queries to specialized agents"""
     
     def __init__(self):
         super().__init__(
             agent_type=AgentType.TUTOR,
-            description="Main tutoring agent that coordinates with specialized math and physics agents to provide comprehensive educational support"
+            description="Main tutoring agent that coordinates with specialized math and physics agents to provide comprehensive educational support",
+            prompt_budget=settings.tutor_prompt_budget
         )
         
         # Initialize specialized agents
         self.math_agent = MathAgent()
         self.physics_agent = PhysicsAgent()
         
-        # Classification keywords for routing
-        self.math_keywords = [
-            # Basic math
-            "calculate", "compute", "solve", "evaluate", "math", "mathematics",
-            "algebra", "geometry", "calculus", "trigonometry", "statistics",
-            "equation", "function", "derivative", "integral", "polynomial",
-            "+", "-", "*", "/", "×", "÷", "^", "**", "=", "equals",
-            "sqrt", "sin", "cos", "tan", "log", "ln", "abs", "round",
-            
-            # Mathematical concepts
-            "theorem", "proof", "formula", "matrix", "vector", "probability",
-            "graph", "plot", "linear", "quadratic", "exponential"
-        ]
+        # Answers reused for reworded repeats of earlier queries
+        self.near_duplicate_cache = get_near_duplicate_cache() if settings.similarity_cache_enabled else None
         
-        self.physics_keywords = [
-            # General physics
-            "physics", "force", "energy", "motion", "velocity", "acceleration",
-            "momentum", "gravity", "mass", "weight", "pressure", "volume",
-            
-            # Mechanics
-            "newton", "kinetic", "potential", "friction", "displacement",
-            
-            # Thermodynamics
-            "temperature", "heat", "thermal", "gas", "entropy", "enthalpy",
-            
-            # Electromagnetism
-            "electric", "magnetic", "current", "voltage", "resistance",
-            "charge", "field", "electromagnetic",
-            
-            # Waves and modern physics
-            "wave", "frequency", "wavelength", "light", "quantum", "relativity",
-            "photon", "electron", "proton", "neutron", "atomic", "nuclear",
-            
-            # Units and constants
-            "joule", "watt", "newton", "meter", "kilogram", "second", "ampere",
-            "coulomb", "volt", "ohm", "hertz"
-        ]
+        # Weighted routing keywords, compiled into one automaton by the shared query analyzer
+        self.query_analyzer = get_query_analyzer()
+        self.keyword_scorer = self.query_analyzer.keyword_scorer
+        self.math_keywords = self.keyword_scorer.keywords.get("math", [])
+        self.physics_keywords = self.keyword_scorer.keywords.get("physics", [])
+        
+        # Optional trained router; its confident predictions take precedence over keyword scoring
+        self.learned_router = load_learned_router(settings.learned_router_path)
+        
+        # Same routing rules applied to whole arrays of queries
+        self.batch_classifier = BatchClassifier(
+            self.keyword_scorer, self.learned_router, settings.learned_router_min_confidence
+        )
         
         # General educational keywords
         self.general_education_keywords = [
@@ -70,41 +74,114 @@ class TutorAgent(BaseAgent):
         """Route queries to appropriate specialized agents or handle general tutoring"""
         query = request.query
         
+        # Analysed once, by process_query; delegated agents reuse the features
+        features = self._get_features(request)
+        
         # Determine which agent should handle the query
-        agent_choice = self._classify_query(query)
+        agent_choice = self._route(request, features)
         
         logger.info(f"Tutor agent routing query to: {agent_choice}")
         
+        # Reuse the answer to a near-duplicate query routed to the same agent
+        # (fast-path answers are cheaper to recompute than to look up, and a pasted
+        # dataset is never worth normalising)
+        use_near_duplicates = (self.near_duplicate_cache is not None and not request.bypass_cache
+                               and not self._is_fast_path(request, features) and not features.statistics)
+        if use_near_duplicates:
+            match = self.near_duplicate_cache.lookup(query, agent_choice.value)
+            if match:
+                logger.info(f"Near-duplicate hit (similarity={match['similarity']}): {match['query'][:100]}")
+                response = dict(match["response"])
+                response["metadata"] = {
+                    **response["metadata"],
+                    "near_duplicate_of": match["query"],
+                    "similarity": match["similarity"]
+                }
+                return response
+        
         # Delegate to specialized agent or handle directly
         if agent_choice == AgentType.MATH:
-            response = await self.math_agent.process_query(request)
-            return self._wrap_delegated_response(response, "math")
+            delegated = await self.math_agent.process_query(request)
+            response = self._wrap_delegated_response(delegated, "math")
             
         elif agent_choice == AgentType.PHYSICS:
-            response = await self.physics_agent.process_query(request)
-            return self._wrap_delegated_response(response, "physics")
+            delegated = await self.physics_agent.process_query(request)
+            response = self._wrap_delegated_response(delegated, "physics")
             
         else:
             # Handle as general tutoring query
-            return await self._handle_general_tutoring(request)
+            response = await self._handle_general_tutoring(request)
+        
+        # Only remember real answers, not errors or mock-mode placeholders
+        original_metadata = response["metadata"].get("original_metadata") or {}
+        if use_near_duplicates and self.model is not None and "error" not in original_metadata:
+            self.near_duplicate_cache.store(query, agent_choice.value, response)
+        
+        return response
     
-    def _classify_query(self, query: str) -> AgentType:
-        """Classify query to determine which agent should handle it"""
-        query_lower = query.lower()
+    async def process_query_stream(self, request: AgentRequest) -> AsyncIterator[Dict[str, Any]]:
+        """Route a query and stream the chosen agent's events"""
+        request = await self._with_features(request)
+        features = request.features
+        agent_choice = self._route(request, features)
+        logger.info(f"Tutor agent routing streamed query to: {agent_choice}")
+        yield {"event": "route", "data": {"agent": agent_choice}}
+        
+        if agent_choice == AgentType.MATH:
+            delegate, agent_name = self.math_agent, "math"
+        elif agent_choice == AgentType.PHYSICS:
+            delegate, agent_name = self.physics_agent, "physics"
+        else:
+            async for event in super().process_query_stream(request):
+                yield event
+            return
         
-        # Count keyword matches for each domain
-        math_score = sum(1 for keyword in self.math_keywords if keyword in query_lower)
-        physics_score = sum(1 for keyword in self.physics_keywords if keyword in query_lower)
+        async for event in delegate.process_query_stream(request):
+            if event["event"] == "done":
+                # Report the final summary the same way as _wrap_delegated_response
+                data = event["data"]
+                event = {
+                    "event": "done",
+                    "data": {
+                        "agent_type": self.agent_type,
+                        "tools_used": data["tools_used"],
+                        "confidence": data["confidence"] or 0.8,
+                        "metadata": {
+                            "delegated_to": agent_name,
+                            "original_agent_type": data["agent_type"],
+                            "original_metadata": data["metadata"]
+                        }
+                    }
+                }
+            yield event
+    
+    def _route(self, request: AgentRequest, features: QueryFeatures) -> AgentType:
+        """Pick the agent for a request: the one with a fast path for it, else by classification"""
+        if self._is_fast_path(request, features):
+            return AgentType.PHYSICS if features.fast_path == "constant" else AgentType.MATH
+        if features.statistics:
+            # Only the math agent reads a pasted dataset with the statistics tool
+            return AgentType.MATH
+        return self._classify_query(request.query, features)
+    
+    def _is_fast_path(self, request: AgentRequest, features: QueryFeatures) -> bool:
+        return self._use_fast_path(request) and features.fast_path is not None
+    
+    def _classify_query(self, query: str, features: Optional[QueryFeatures] = None) -> AgentType:
+        """Classify query to determine which agent should handle it"""
+        if self.learned_router is not None:
+            agent_type, confidence = self.learned_router.predict(query)
+            if confidence >= settings.learned_router_min_confidence:
+                logger.info(f"Learned router: {agent_type} (confidence {confidence:.2f})")
+                return agent_type
+            logger.info(f"Learned router unsure ({agent_type}, {confidence:.2f}); using keyword scoring")
         
-        # Bonus scoring for explicit domain mentions
-        if "math" in query_lower or "mathematics" in query_lower:
-            math_score += 3
-        if "physics" in query_lower or "physical" in query_lower:
-            physics_score += 3
+        features = features or self.query_analyzer.analyze(query)
         
-        # Advanced pattern matching for specific problem types
-        math_score += self._detect_math_patterns(query)
-        physics_score += self._detect_physics_patterns(query)
+        # Weighted keyword matches for each domain, plus expression/formula patterns
+        # (explicit domain mentions like "math"/"physics" carry the bonus weight)
+        math_score = features.keyword_scores.get("math", 0.0) + features.pattern_scores["math"]
+        physics_score = features.keyword_scores.get("physics", 0.0) + features.pattern_scores["physics"]
         
         logger.info(f"Classification scores - Math: {math_score}, Physics: {physics_score}")
         
@@ -115,95 +192,58 @@ class TutorAgent(BaseAgent):
             return AgentType.PHYSICS
         elif math_score == physics_score and math_score >= 2:
             # Use additional context to break ties
-            return self._resolve_tie(query_lower)
+            return self._resolve_tie(features)
         else:
             # Default to tutor for general queries
             return AgentType.TUTOR
     
-    def _detect_math_patterns(self, query: str) -> int:
-        """Detect mathematical patterns in the query"""
-        score = 0
+    def classify_batch(self, queries: List[str]) -> List[Dict[str, Any]]:
+        """
+        Classify many queries at once, e.g. for analytics or pre-routing bulk imports
         
-        # Mathematical expressions
-        if re.search(r'\d+\s*[+\-*/^]\s*\d+', query):
-            score += 2
+        Routes match _classify_query for each query; the scoring is vectorised
+        over the whole batch instead of analysing queries one at a time.
         
-        # Function notation
-        if re.search(r'f\(x\)|g\(x\)|h\(x\)', query):
-            score += 2
+        Args:
+            queries: Query texts
             
-        # Mathematical symbols and notation
-        if re.search(r'[∫∑∆αβγθπ]', query):
-            score += 3
-            
-        # Equation patterns
-        if re.search(r'=.*[x-z]|[x-z].*=', query):
-            score += 2
-        
-        return score
+        Returns:
+            For each query, in order: "route" (AgentType), "math_score" and "physics_score"
+        """
+        return self.batch_classifier.classify(queries)
     
-    def _detect_physics_patterns(self, query: str) -> int:
-        """Detect physics patterns in the query"""
-        score = 0
-        
-        # Physics formulas (F=ma, E=mc^2, etc.)
-        if re.search(r'F\s*=\s*m.*a|E\s*=\s*m.*c|P\s*=\s*F/A', query, re.IGNORECASE):
-            score += 3
-            
-        # Units pattern
-        if re.search(r'\d+\s*(m/s|kg|N|J|W|V|A|Ω|Hz)', query):
-            score += 2
-            
-        # Physics constants
-        if re.search(r'\b(9\.8|3\.0.*10\^8|6\.67.*10\^-11)\b', query):
-            score += 2
-            
-        # Physics problem keywords
-        if re.search(r'object.*moving|ball.*thrown|car.*travels|spring.*compressed', query, re.IGNORECASE):
-            score += 2
-        
-        return score
-    
-    def _resolve_tie(self, query_lower: str) -> AgentType:
+    def _resolve_tie(self, features: QueryFeatures) -> AgentType:
         """Resolve ties between math and physics classification"""
+        query_lower = features.normalized
         # Look for context clues
-        if any(word in query_lower for word in ["real world", "application", "experiment"]):
+        if any(word in query_lower for word in PHYSICS_TIE_CLUES):
             return AgentType.PHYSICS
-        elif any(word in query_lower for word in ["abstract", "theoretical", "pure"]):
+        elif any(word in query_lower for word in MATH_TIE_CLUES):
             return AgentType.MATH
         else:
             # Default to math for mathematical expressions
-            if re.search(r'\d+\s*[+\-*/^]\s*\d+', query_lower):
+            if features.expression_spans:
                 return AgentType.MATH
             else:
                 return AgentType.TUTOR
     
     async def _handle_general_tutoring(self, request: AgentRequest) -> Dict[str, Any]:
         """Handle general tutoring queries that don't require specialized agents"""
-        query = request.query
+        context = await self._prepare_response(request)
         
-        # Build general tutoring system prompt
-        system_prompt = """You are an AI Tutor Agent specializing in educational support. Your role is to:
-
-1. Provide clear, helpful explanations on academic topics
-2. Guide students through learning concepts step by step
-3. Encourage critical thinking and problem-solving
-4. Adapt explanations to different learning levels
-5. Suggest additional resources when appropriate
-
-Guidelines:
-- Use encouraging, supportive language
-- Break complex topics into manageable parts
-- Provide examples to illustrate concepts
-- Ask clarifying questions when needed
-- Connect learning to real-world applications
-- If the question is specifically about math or physics calculations, suggest that the student ask more specifically about those topics for detailed assistance
-
-For questions that require detailed mathematical calculations or physics problem-solving, you can suggest that students specify they need "math help" or "physics help" for more specialized assistance."""
-
         # Generate response
-        ai_response = await self._call_gemini_api(query, system_prompt)
+        ai_response = await self._generate_text(request, context)
         
+        return self._complete_response(ai_response, context)
+    
+    async def _prepare_response(self, request: AgentRequest) -> Dict[str, Any]:
+        """Build the general tutoring system prompt"""
+        query = self._model_query(request)
+        prompt = self._assemble_system_prompt(TUTOR_SYSTEM_PROMPT, [], query)
+        return {"query": query, "prompt": prompt, "system_prompt": prompt.text, "tool_events": []}
+    
+    def _complete_response(self, ai_response: str, context: Dict[str, Any]) -> Dict[str, Any]:
+        """Wrap a general tutoring answer"""
         return {
             "text": ai_response,
             "tools_used": [],
@@ -211,7 +251,8 @@ For questions that require detailed mathematical calculations or physics problem
             "metadata": {
                 "handled_by": "general_tutor",
                 "query_classification": "general",
-                "suggestion": "For specific math or physics calculations, try asking with 'math:' or 'physics:' prefix"
+                "suggestion": "For specific math or physics calculations, try asking with 'math:' or 'physics:' prefix",
+                "token_usage": self._token_usage(ai_response, context)
             }
         }
     
@@ -241,6 +282,7 @@ For questions that require detailed mathematical calculations or physics problem
             },
             "routing_logic": {
                 "method": "keyword_scoring_with_pattern_detection",
+                "learned_router": self.learned_router.get_info() if self.learned_router else None,
                 "tie_resolution": "context_clues_and_expression_analysis",
                 "minimum_score": 2
             }
@@ -1,7 +1,22 @@
 from fastapi import APIRouter, HTTPException
-from models import ChatRequest, ChatResponse, HealthResponse, AgentType, AgentRequest
+from fastapi.responses import StreamingResponse
+from models import (
+    ChatRequest, ChatResponse, HealthResponse, AgentType, AgentRequest,
+    BatchClassifyRequest, BatchClassifyResponse, PlotRequest, PlotResponse,
+    AutocompleteResponse
+)
 from agents import TutorAgent
+from llm import get_llm_client, get_model_registry
+from cache import get_response_cache, get_near_duplicate_cache
+from tools.calculator_sandbox import get_calculator_sandbox
+from tools.plot_tool import PlotError, tabulate
+from tools.physics_constants_tool import get_physics_constants_tool
+from utils import SingleFlight
+from config import settings
+from collections import Counter
+import asyncio
 import uuid
+import json
 import logging
 
 # Configure logging
@@ -13,6 +28,9 @@ router = APIRouter()
 # Initialize the main tutor agent (singleton pattern)
 tutor_agent = None
 
+# Identical chat requests that arrive together share one agent run
+chat_flights = SingleFlight()
+
 def get_tutor_agent():
     """Get or create the tutor agent instance"""
     global tutor_agent
@@ -40,12 +58,16 @@ async def chat_endpoint(request: ChatRequest):
         # Create agent request
         agent_request = AgentRequest(
             query=request.message,
-            context={"conversation_id": conversation_id}
+            context={"conversation_id": conversation_id},
+            bypass_cache=request.bypass_cache,
+            allow_fast_path=request.allow_fast_path
         )
         
         # Process the query through the agent system
         logger.info(f"Processing query: {request.message[:100]}...")
-        agent_response = await agent.process_query(agent_request)
+        # Case is kept: "solve Ax = b" and "solve ax = b", or "G" and "g", are different questions
+        flight_key = (" ".join(request.message.split()), request.bypass_cache, request.allow_fast_path)
+        agent_response = await chat_flights.do(flight_key, lambda: agent.process_query(agent_request))
         
         # Return the response
         return ChatResponse(
@@ -70,6 +92,108 @@ async def chat_endpoint(request: ChatRequest):
             metadata={"error": str(e)}
         )
 
+def _format_sse(event: str, data: dict) -> str:
+    """Format a single Server-Sent Events message"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+@router.post("/chat/stream")
+async def chat_stream_endpoint(request: ChatRequest):
+    """
+    Streaming chat endpoint - same pipeline as /chat, delivered as Server-Sent Events
+
+    Emits "start", "route", "tool" (one per tool result), "token" (model text as it
+    is generated), and finally "done" or "error".
+    """
+    conversation_id = request.conversation_id or str(uuid.uuid4())
+    agent = get_tutor_agent()
+    
+    agent_request = AgentRequest(
+        query=request.message,
+        context={"conversation_id": conversation_id},
+        bypass_cache=request.bypass_cache,
+        allow_fast_path=request.allow_fast_path
+    )
+    
+    async def event_stream():
+        yield _format_sse("start", {"conversation_id": conversation_id})
+        try:
+            logger.info(f"Streaming query: {request.message[:100]}...")
+            async for event in agent.process_query_stream(agent_request):
+                data = event["data"]
+                if event["event"] == "done":
+                    # Same shape as the ChatResponse returned by /chat
+                    data = {
+                        "agent_used": data["agent_type"],
+                        "conversation_id": conversation_id,
+                        "metadata": {
+                            "tools_used": data["tools_used"],
+                            "confidence": data["confidence"],
+                            "agent_metadata": data["metadata"]
+                        }
+                    }
+                yield _format_sse(event["event"], data)
+        except Exception as e:
+            logger.error(f"Error in chat stream: {str(e)}")
+            yield _format_sse("error", {
+                "message": "I apologize, but I encountered an error while processing your request. Please try again."
+            })
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.post("/classify/batch", response_model=BatchClassifyResponse)
+async def classify_batch_endpoint(request: BatchClassifyRequest):
+    """
+    Classify many queries at once (no model calls), e.g. to pre-route bulk homework imports
+    """
+    if len(request.queries) > settings.classify_batch_max_queries:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {settings.classify_batch_max_queries} queries per batch"
+        )
+    
+    agent = get_tutor_agent()
+    # Scoring is CPU-bound; keep the event loop free for chat traffic
+    results = await asyncio.to_thread(agent.classify_batch, request.queries)
+    
+    return BatchClassifyResponse(
+        results=results,
+        route_counts=dict(Counter(result["route"].value for result in results))
+    )
+
+@router.post("/plot", response_model=PlotResponse)
+async def plot_endpoint(request: PlotRequest):
+    """
+    Sample a function of one or two variables for drawing, with its roots, extrema and intercepts (no model call)
+    """
+    y_range = None
+    if request.y_min is not None or request.y_max is not None:
+        y_range = (
+            request.y_min if request.y_min is not None else -10.0,
+            request.y_max if request.y_max is not None else 10.0
+        )
+    try:
+        # Vectorised, but a million-point grid still takes tens of milliseconds
+        result = await asyncio.to_thread(
+            tabulate, request.expression, (request.x_min, request.x_max), y_range,
+            request.points, request.samples, request.analyze
+        )
+    except PlotError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return PlotResponse(**result)
+
+@router.get("/constants/autocomplete", response_model=AutocompleteResponse)
+async def autocomplete_constants(q: str, limit: int = 10):
+    """
+    Physics constants and formulas completing a partly typed name, tolerating typos (no model call)
+    """
+    limit = max(1, min(limit, 50))
+    return AutocompleteResponse(query=q, suggestions=get_physics_constants_tool().autocomplete(q, limit))
+
 @router.get("/agents", response_model=dict)
 async def list_agents():
     """
@@ -100,6 +224,20 @@ async def list_agents():
             "error": str(e)
         }
 
+@router.get("/metrics", response_model=dict)
+async def metrics_endpoint():
+    """
+    Runtime performance metrics for the agent system
+    """
+    return {
+        "llm": get_llm_client().get_stats(),
+        "models": get_model_registry().get_stats(),
+        "response_cache": get_response_cache().get_stats(),
+        "near_duplicate_cache": get_near_duplicate_cache().get_stats(),
+        "chat_coalescing": chat_flights.get_stats(),
+        "calculator": get_calculator_sandbox().get_stats()
+    }
+
 @router.get("/health", response_model=HealthResponse)
 async def detailed_health_check():
     """
@@ -0,0 +1,10 @@
+from .response_cache import ResponseCache, get_response_cache
+from .similarity_cache import NearDuplicateCache, get_near_duplicate_cache, normalize_query
+
+__all__ = [
+    "ResponseCache",
+    "get_response_cache",
+    "NearDuplicateCache",
+    "get_near_duplicate_cache",
+    "normalize_query"
+] 
@@ -0,0 +1,215 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+class ResponseCache:
+    """
+    Two-tier cache for generated responses.
+
+    Tier 1 is an in-process LRU bounded by entry count. Tier 2 is an optional
+    SQLite file that survives restarts and can be shared by several workers.
+    Both tiers expire entries after ``ttl`` seconds; the disk tier also trims
+    its least recently used rows once it grows past ``disk_entries``.
+    """
+
+    _PRUNE_INTERVAL = 100  # Disk writes between eviction passes
+
+    def __init__(self, memory_entries: int, ttl: float, disk_path: Optional[str] = None, disk_entries: int = 100000):
+        self.memory_entries = max(1, memory_entries)
+        self.ttl = ttl
+        self.disk_entries = disk_entries
+
+        self._memory: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self._writes_since_prune = 0
+
+        # Metrics
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self.bypasses = 0
+
+        if disk_path:
+            self._open_disk(disk_path)
+
+    @staticmethod
+    def make_key(agent: str, query: str, full_prompt: str, model: str, temperature: float, max_tokens: int) -> str:
+        """
+        Build a cache key from everything that influences the generated text
+
+        Args:
+            agent: Agent type producing the response
+            query: Raw user query (normalized here)
+            full_prompt: Exact prompt sent to the model (hashed)
+            model: Model name
+            temperature: Sampling temperature
+            max_tokens: Output token limit
+
+        Returns:
+            Hex digest identifying the response
+        """
+        normalized_query = " ".join(query.lower().split())
+        prompt_hash = hashlib.sha256(full_prompt.encode("utf-8")).hexdigest()
+        material = json.dumps([agent, normalized_query, prompt_hash, model, temperature, max_tokens])
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    async def get(self, key: str) -> Optional[str]:
+        """Look up a response, promoting disk hits into memory"""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                expires_at, text = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    self.memory_hits += 1
+                    return text
+                del self._memory[key]
+
+        if self._db is not None:
+            text = await asyncio.to_thread(self._disk_get, key, now)
+            if text is not None:
+                self.disk_hits += 1
+                self._memory_set(key, text, now)
+                return text
+
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, text: str) -> None:
+        """Store a response in both tiers"""
+        now = time.time()
+        self.stores += 1
+        self._memory_set(key, text, now)
+        if self._db is not None:
+            await asyncio.to_thread(self._disk_set, key, text, now)
+
+    def record_bypass(self) -> None:
+        """Count a request that explicitly skipped the cache"""
+        self.bypasses += 1
+
+    def clear(self) -> None:
+        """Drop every cached response from both tiers"""
+        with self._lock:
+            self._memory.clear()
+        if self._db is not None:
+            try:
+                with self._db_lock:
+                    self._db.execute("DELETE FROM responses")
+            except sqlite3.Error as e:
+                logger.warning(f"Response cache disk clear failed: {str(e)}")
+
+    def _memory_set(self, key: str, text: str, now: float) -> None:
+        with self._lock:
+            self._memory[key] = (now + self.ttl, text)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+                self.evictions += 1
+
+    def _open_disk(self, path: str) -> None:
+        try:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, text TEXT NOT NULL, "
+                "expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)")
+            logger.info(f"Response cache disk tier at {path}")
+        except sqlite3.Error as e:
+            logger.warning(f"Response cache disk tier disabled: {str(e)}")
+            self._db = None
+
+    def _disk_get(self, key: str, now: float) -> Optional[str]:
+        # A locked, full or corrupt database is a miss, never a failed request
+        try:
+            with self._db_lock:
+                row = self._db.execute(
+                    "SELECT text, expires_at FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    return None
+                if row[1] <= now:
+                    self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    return None
+                self._db.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+                return row[0]
+        except sqlite3.Error as e:
+            logger.warning(f"Response cache disk read failed: {str(e)}")
+            return None
+
+    def _disk_set(self, key: str, text: str, now: float) -> None:
+        try:
+            with self._db_lock:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses (key, text, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                    (key, text, now + self.ttl, now)
+                )
+                self._writes_since_prune += 1
+                if self._writes_since_prune >= self._PRUNE_INTERVAL:
+                    self._writes_since_prune = 0
+                    self._disk_prune(now)
+        except sqlite3.Error as e:
+            logger.warning(f"Response cache disk write failed: {str(e)}")
+
+    def _disk_prune(self, now: float) -> None:
+        expired = self._db.execute("DELETE FROM responses WHERE expires_at <= ?", (now,)).rowcount
+        overflow = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0] - self.disk_entries
+        if overflow > 0:
+            self._db.execute(
+                "DELETE FROM responses WHERE key IN "
+                "(SELECT key FROM responses ORDER BY accessed_at ASC LIMIT ?)",
+                (overflow,)
+            )
+        self.evictions += max(0, expired) + max(0, overflow)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters and tier sizes"""
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_entries": len(self._memory),
+            "memory_capacity": self.memory_entries,
+            "disk_enabled": self._db is not None,
+            "ttl_seconds": self.ttl,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+            "stores": self.stores,
+            "evictions": self.evictions,
+            "bypasses": self.bypasses,
+        }
+
+# Process-wide cache (singleton pattern)
+_response_cache: Optional[ResponseCache] = None
+
+def get_response_cache() -> ResponseCache:
+    """Get or create the shared response cache"""
+    global _response_cache
+    if _response_cache is None:
+        _response_cache = ResponseCache(
+            memory_entries=settings.response_cache_memory_entries,
+            ttl=settings.response_cache_ttl,
+            disk_path=settings.response_cache_disk_path or None,
+            disk_entries=settings.response_cache_disk_entries
+        )
+    return _response_cache
@@ -0,0 +1,288 @@
+import hashlib
+import json
+import random
+import re
+import time
+from collections import OrderedDict
+from decimal import Decimal, InvalidOperation
+from typing import Any, Dict, List, Optional, Set, Tuple
+from config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Normalization tables
+_OPERATOR_ALIASES = {"×": "*", "·": "*", "÷": "/", "−": "-", "**": "^"}
+_CONTRACTIONS = {
+    "what's": "what is", "whats": "what is", "how's": "how is", "it's": "it is",
+    "that's": "that is", "where's": "where is", "who's": "who is", "isn't": "is not",
+    "can't": "cannot", "don't": "do not", "doesn't": "does not", "i'm": "i am"
+}
+_STOPWORDS = {
+    "a", "an", "the", "is", "are", "was", "were", "what", "please", "can", "could",
+    "you", "me", "i", "to", "of", "tell", "us", "my"
+}
+
+# Words that phrase a request without saying what it is about; any other word must match exactly
+_INSTRUCTION_WORDS = {
+    "find", "calculate", "compute", "solve", "evaluate", "determine", "work", "out", "show", "give",
+    "explain", "describe", "help", "how", "do", "does", "did", "why", "value", "answer", "and", "with",
+    "this", "that", "it", "be", "get", "need", "want", "know", "would", "should", "like", "just",
+    "again", "hi", "hello", "hey", "now", "so", "about", "some"
+}
+
+_CONTRACTION_PATTERN = re.compile(r"\b(" + "|".join(re.escape(c) for c in _CONTRACTIONS) + r")(?=\W|$)")
+_NUMBER_PATTERN = re.compile(r"\d{1,3}(?:,\d{3})+(?:\.\d+)?|\d+(?:\.\d+)?|\.\d+")
+_TOKEN_PATTERN = re.compile(r"[a-z]+|\d+(?:\.\d+)?|[+\-*/^=()]")
+
+# MinHash parameters
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_CANDIDATES = 64  # Candidates compared per lookup, keeps lookups O(1) in index size
+_QUERY_PREVIEW_CHARS = 200  # Of the matched query, kept for logs and metadata
+_ENTRY_OVERHEAD = 4096  # Bytes counted per entry on top of its response (signature, band keys, bookkeeping)
+
+def _canonical_number(text: str) -> str:
+    """Render a number the same way regardless of grouping or trailing zeros"""
+    try:
+        return format(Decimal(text.replace(",", "")).normalize(), "f")
+    except InvalidOperation:
+        return text
+
+def normalize_query(query: str) -> List[str]:
+    """
+    Normalize a query into comparable tokens
+
+    Lowercases, expands contractions, unifies operator symbols and number
+    formatting ("1,000.50" -> "1000.5"), drops punctuation and filler words.
+
+    Args:
+        query: Raw user query
+
+    Returns:
+        List of normalized tokens
+    """
+    text = query.lower().replace("’", "'")
+    for alias, canonical in _OPERATOR_ALIASES.items():
+        text = text.replace(alias, canonical)
+    text = _CONTRACTION_PATTERN.sub(lambda m: _CONTRACTIONS[m.group(1)], text)
+    text = _NUMBER_PATTERN.sub(lambda m: " " + _canonical_number(m.group(0)) + " ", text)
+    return [token for token in _TOKEN_PATTERN.findall(text) if token not in _STOPWORDS]
+
+class NearDuplicateCache:
+    """
+    Serves answers for queries that are near-duplicates of earlier ones.
+
+    The wording of a query is reduced to word shingles (unigrams and bigrams)
+    and summarized by a MinHash signature; banded locality-sensitive hashing
+    finds candidate matches without scanning the index. Numbers and operators
+    are kept out of the fuzzy part and must match exactly, so "what's 2+3?"
+    matches "What is 2 + 3" but never "What is 2 + 4"; so must the content
+    words (all but filler and instruction words like "find" or "explain"),
+    so "... when they freeze" never reuses the answer to "... when they melt".
+    Queries longer than ``max_query_chars`` are neither looked up nor stored.
+    The index holds at most ``max_entries`` answers and ``max_bytes`` of
+    them, evicting the least recently used.
+    """
+
+    def __init__(self, threshold: float = 0.8, max_entries: int = 50000, ttl: float = 86400.0,
+                 num_perm: int = 64, bands: int = 16, seed: int = 1,
+                 max_bytes: int = 64 * 1024 * 1024, max_query_chars: int = 2000):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.threshold = threshold
+        self.max_entries = max(1, max_entries)
+        self.max_bytes = max_bytes
+        self.max_query_chars = max_query_chars
+        self.ttl = ttl
+        self.bands = bands
+        self.rows = num_perm // bands
+
+        rng = random.Random(seed)
+        self._perms = [
+            (rng.randrange(1, _MERSENNE_PRIME), rng.randrange(0, _MERSENNE_PRIME))
+            for _ in range(num_perm)
+        ]
+
+        self._entries: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self._buckets: Dict[int, Set[int]] = {}
+        self._next_id = 0
+        self._bytes = 0
+
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self.candidates_checked = 0
+
+    def lookup(self, query: str, agent: str) -> Optional[Dict[str, Any]]:
+        """
+        Find a cached answer for a sufficiently similar query routed to the same agent
+
+        Args:
+            query: Raw user query
+            agent: Agent type the query was routed to
+
+        Returns:
+            Dict with the cached "response", matched "query" (its start, if long)
+            and "similarity", or None
+        """
+        if len(query) > self.max_query_chars:
+            self.misses += 1
+            return None
+        fingerprint, signature = self._fingerprint(query)
+        now = time.time()
+
+        best_id, best_similarity = None, 0.0
+        candidates: Set[int] = set()
+        for band_key in self._band_keys(agent, fingerprint, signature):
+            if len(candidates) >= _MAX_CANDIDATES:
+                break
+            for entry_id in self._buckets.get(band_key, ()):
+                if len(candidates) >= _MAX_CANDIDATES:
+                    break
+                if entry_id in candidates:
+                    continue
+                candidates.add(entry_id)
+                entry = self._entries[entry_id]
+                if entry["agent"] != agent or entry["fingerprint"] != fingerprint:
+                    continue  # Band hash collision
+                similarity = self._similarity(signature, entry["signature"])
+                if similarity > best_similarity:
+                    best_id, best_similarity = entry_id, similarity
+        self.candidates_checked += len(candidates)
+
+        if best_id is not None and best_similarity >= self.threshold:
+            entry = self._entries[best_id]
+            if entry["expires_at"] > now:
+                self._entries.move_to_end(best_id)
+                self.hits += 1
+                return {
+                    "response": entry["response"],
+                    "query": entry["query"],
+                    "similarity": round(best_similarity, 3)
+                }
+            self._remove(best_id)
+
+        self.misses += 1
+        return None
+
+    def store(self, query: str, agent: str, response: Dict[str, Any]) -> None:
+        """
+        Remember the answer given to a query
+
+        Args:
+            query: Raw user query
+            agent: Agent type that produced the answer
+            response: Response dict to serve for future near-duplicates
+        """
+        if len(query) > self.max_query_chars:
+            return
+        size = len(json.dumps(response, default=str)) + _ENTRY_OVERHEAD
+        if size > self.max_bytes:
+            return
+        fingerprint, signature = self._fingerprint(query)
+        band_keys = self._band_keys(agent, fingerprint, signature)
+
+        entry_id = self._next_id
+        self._next_id += 1
+        self._entries[entry_id] = {
+            "query": query[:_QUERY_PREVIEW_CHARS],
+            "size": size,
+            "agent": agent,
+            "fingerprint": fingerprint,
+            "signature": signature,
+            "band_keys": band_keys,
+            "response": response,
+            "expires_at": time.time() + self.ttl
+        }
+        for band_key in band_keys:
+            self._buckets.setdefault(band_key, set()).add(entry_id)
+        self._bytes += size
+        self.stores += 1
+
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            oldest_id = next(iter(self._entries))
+            self._remove(oldest_id)
+            self.evictions += 1
+
+    def _remove(self, entry_id: int) -> None:
+        entry = self._entries.pop(entry_id)
+        self._bytes -= entry["size"]
+        for band_key in entry["band_keys"]:
+            bucket = self._buckets.get(band_key)
+            if bucket is not None:
+                bucket.discard(entry_id)
+                if not bucket:
+                    del self._buckets[band_key]
+
+    def _fingerprint(self, query: str) -> Tuple[Tuple[Tuple[str, ...], Tuple[str, ...]], Tuple[int, ...]]:
+        """
+        Split a query into its exact part (numbers, operators and content
+        words) and a MinHash signature of its wording
+        """
+        tokens = normalize_query(query)
+        words = [t for t in tokens if t.isalpha()]
+        numeric = tuple(t for t in tokens if not t.isalpha())
+        content = tuple(sorted({word for word in words if word not in _INSTRUCTION_WORDS}))
+
+        shingles = set(words)
+        shingles.update(f"{a} {b}" for a, b in zip(words, words[1:]))
+        if not shingles:
+            shingles = {"<expression>"}
+
+        hashed = [
+            int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "big")
+            for s in shingles
+        ]
+        signature = tuple(
+            min((a * h + b) % _MERSENNE_PRIME for h in hashed)
+            for a, b in self._perms
+        )
+        return (numeric, content), signature
+
+    def _band_keys(self, agent: str, fingerprint: Tuple[Tuple[str, ...], Tuple[str, ...]], signature: Tuple[int, ...]) -> List[int]:
+        """Hash each signature band together with the exact part of the query"""
+        return [
+            hash((agent, fingerprint, band, signature[band * self.rows:(band + 1) * self.rows]))
+            for band in range(self.bands)
+        ]
+
+    @staticmethod
+    def _similarity(a: Tuple[int, ...], b: Tuple[int, ...]) -> float:
+        """Estimated Jaccard similarity of the underlying shingle sets"""
+        return sum(1 for x, y in zip(a, b) if x == y) / len(a)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters and index size"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "capacity": self.max_entries,
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "buckets": len(self._buckets),
+            "threshold": self.threshold,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "stores": self.stores,
+            "evictions": self.evictions,
+            "avg_candidates_checked": round(self.candidates_checked / lookups, 2) if lookups else 0.0,
+        }
+
+# Process-wide cache (singleton pattern)
+_near_duplicate_cache: Optional[NearDuplicateCache] = None
+
+def get_near_duplicate_cache() -> NearDuplicateCache:
+    """Get or create the shared near-duplicate cache"""
+    global _near_duplicate_cache
+    if _near_duplicate_cache is None:
+        _near_duplicate_cache = NearDuplicateCache(
+            threshold=settings.similarity_threshold,
+            max_entries=settings.similarity_cache_entries,
+            ttl=settings.similarity_cache_ttl,
+            max_bytes=settings.similarity_cache_max_bytes,
+            max_query_chars=settings.similarity_max_query_chars
+        )
+    return _near_duplicate_cache
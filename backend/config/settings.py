@@ -1,4 +1,5 @@
 import os
+from typing import Optional
 from dotenv import load_dotenv
 from pydantic_settings import BaseSettings
 
@@ -14,6 +15,81 @@ class Settings(BaseSettings):
     max_response_tokens: int = 1000
     temperature: float = 0.7
     
+    # LLM client configuration
+    llm_backend: str = "gemini"        # "gemini", "stub" (in-process fake) or "stub_http" (python -m llm.stub_server)
+    gemini_model: str = "gemini-2.0-flash"
+    llm_max_concurrency: int = 16      # Upstream calls allowed in flight at once
+    llm_call_timeout: float = 30.0     # Seconds before a single model call is abandoned
+    llm_async_native: bool = True      # Use the async gRPC client instead of the call executor
+    
+    # Upstream admission control
+    llm_requests_per_minute: float = 0     # Request quota to pace against (0 = unlimited)
+    llm_tokens_per_minute: float = 0       # Token quota to pace against (0 = unlimited)
+    llm_adaptive_concurrency: bool = True  # Shrink the concurrency cap on 429s/latency growth, grow on success
+    llm_min_concurrency: int = 1
+    llm_queue_timeout: float = 15.0        # Seconds a call may wait for admission before being rejected
+    
+    # Query routing
+    fast_path_enabled: bool = True         # Answer pure calculations/constant lookups without calling the model
+    routing_keywords_path: str = ""        # JSON of weighted keywords per domain (empty = bundled agents/data file)
+    classify_batch_max_queries: int = 50000  # Largest batch accepted by /api/classify/batch
+    learned_router_path: str = ""          # .npy weights from `python -m agents.train_router` (empty = keywords only)
+    learned_router_min_confidence: float = 0.8  # Below this the keyword scorer decides
+    
+    # Calculator
+    calculator_cache_size: int = 2048      # Compiled expressions kept in the LRU
+    calculator_isolation: bool = True      # Evaluate expensive expressions in worker processes
+    calculator_workers: int = 2
+    calculator_timeout: float = 2.0        # Seconds an isolated evaluation may take
+    calculator_memory_mb: int = 512        # Address-space cap per worker process
+    calculator_max_result_digits: int = 4000  # Larger exact integer results are refused
+    calculator_inline_max_cost: int = 200  # Expressions estimated cheaper than this run on the event loop
+    calculator_inline_max_chars: int = 1000
+    plot_max_points: int = 1_000_000       # Most function evaluations per plot (per curve or grid)
+    statistics_max_values: int = 10_000_000  # Largest dataset the statistics tool will read (8 bytes per value)
+    physics_data_path: str = ""            # From `python -m tools.build_physics_data` (empty = bundled tools/data file)
+    
+    # Prompt size (estimated input tokens per call, system prompt + query)
+    math_prompt_budget: int = 1500
+    physics_prompt_budget: int = 2000
+    tutor_prompt_budget: int = 1500
+    prompt_max_line_chars: int = 300       # Longer context lines (e.g. huge results) are clipped
+    
+    # Retries and hedging
+    llm_max_attempts: int = 3              # Attempts per request, including the first
+    llm_retry_base_delay: float = 0.5      # Backoff before the first retry (doubles each time, fully jittered)
+    llm_retry_max_delay: float = 8.0
+    llm_request_deadline: float = 60.0     # Overall seconds per request across queueing, attempts and backoff
+    llm_hedging_enabled: bool = False      # Send a duplicate call when the first is slower than the observed p95
+    llm_hedge_budget: float = 0.1          # Maximum fraction of requests that may be hedged
+    llm_hedge_min_samples: int = 20        # Calls observed before the p95 is trusted for hedging
+    
+    # Stub model (llm_backend = "stub" / "stub_http")
+    stub_latency_ms: float = 800.0         # Median time to first token
+    stub_latency_sigma: float = 0.5        # Log-normal spread of the latency
+    stub_tokens_per_second: float = 80.0
+    stub_response_tokens: int = 250
+    stub_error_rate: float = 0.0           # Fraction of calls failing with 503
+    stub_rate_limit_rate: float = 0.0      # Fraction of calls failing with 429
+    stub_retry_after: float = 1.0
+    stub_seed: Optional[int] = None
+    stub_server_url: str = "http://127.0.0.1:8765"
+    
+    # Response cache configuration
+    response_cache_enabled: bool = True
+    response_cache_ttl: float = 86400.0                          # Seconds a cached answer stays valid
+    response_cache_memory_entries: int = 1024                    # In-process LRU size
+    response_cache_disk_path: str = ".cache/responses.sqlite3"   # Empty string disables the disk tier
+    response_cache_disk_entries: int = 100000
+    
+    # Near-duplicate query cache configuration
+    similarity_cache_enabled: bool = True
+    similarity_threshold: float = 0.8        # Estimated Jaccard similarity needed to reuse an answer
+    similarity_cache_entries: int = 50000
+    similarity_cache_ttl: float = 86400.0
+    similarity_cache_max_bytes: int = 64 * 1024 * 1024  # Also bounds the cache by the size of its answers
+    similarity_max_query_chars: int = 2000   # Longer queries (pasted data) skip the near-duplicate cache
+    
     class Config:
         env_file = ".env"
 
@@ -0,0 +1,28 @@
+from .client import LLMClient, get_llm_client
+from .errors import LLMError, LLMTimeoutError, LLMRateLimitError, AdmissionTimeoutError
+from .admission import AdmissionController, AdaptiveConcurrencyLimiter, TokenBucket
+from .retry import RetryPolicy, is_retryable
+from .tokens import estimate_tokens
+from .prompts import PromptTemplate, PromptSection, AssembledPrompt
+from .registry import ModelHandle, ModelRegistry, get_model_registry
+
+__all__ = [
+    "LLMClient",
+    "LLMError",
+    "LLMTimeoutError",
+    "LLMRateLimitError",
+    "AdmissionTimeoutError",
+    "AdmissionController",
+    "AdaptiveConcurrencyLimiter",
+    "TokenBucket",
+    "RetryPolicy",
+    "is_retryable",
+    "estimate_tokens",
+    "PromptTemplate",
+    "PromptSection",
+    "AssembledPrompt",
+    "ModelHandle",
+    "ModelRegistry",
+    "get_llm_client",
+    "get_model_registry"
+] 
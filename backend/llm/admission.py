@@ -0,0 +1,275 @@
+import asyncio
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+from .errors import AdmissionTimeoutError
+import logging
+
+logger = logging.getLogger(__name__)
+
+class TokenBucket:
+    """
+    Reservation-style token bucket refilled continuously at a per-minute rate.
+
+    Callers reserve what they need up front and are told how long to wait;
+    the level may go negative, which makes later callers wait their turn
+    instead of racing for the next refill. Ten seconds' worth of budget can be
+    spent as a burst.
+    """
+
+    def __init__(self, rate_per_minute: float):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = max(1.0, self.rate * 10)
+        self.level = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until ``amount`` could be taken, without reserving it"""
+        self._refill()
+        return max(0.0, (amount - self.level) / self.rate)
+
+    def reserve(self, amount: float) -> None:
+        """Take ``amount`` now, going into debt if necessary"""
+        self._refill()
+        self.level -= amount
+
+    def charge(self, amount: float) -> None:
+        """Account for usage discovered after the fact (e.g. output tokens)"""
+        self.reserve(amount)
+
+    def refund(self, amount: float) -> None:
+        """Give back a reservation for a call that was never sent"""
+        self._refill()
+        self.level = min(self.capacity, self.level + amount)
+
+class AdaptiveConcurrencyLimiter:
+    """
+    AIMD concurrency cap for upstream calls.
+
+    The limit grows by roughly one slot per limit's worth of successful calls
+    and is cut multiplicatively on rate limiting or when calls slow down well
+    beyond the best recently observed pace. Pace is seconds per output token,
+    with short answers (and a stream's wait for its first chunk) timed as if
+    ``short_answer_tokens`` long, so neither long answers nor fixed overhead
+    read as queueing. Cuts happen at most once per round trip, so one burst of 429s counts as a single congestion signal.
+    Waiters are admitted in FIFO order as slots free up.
+    """
+
+    def __init__(self, max_limit: int, min_limit: int = 1, adaptive: bool = True,
+                 backoff: float = 0.5, latency_tolerance: float = 2.0, short_answer_tokens: int = 32):
+        self.max_limit = max(1, max_limit)
+        self.min_limit = max(1, min(min_limit, self.max_limit))
+        self.adaptive = adaptive
+        self.backoff = backoff
+        self.latency_tolerance = latency_tolerance
+        self.short_answer_tokens = max(1, short_answer_tokens)
+
+        self.limit = float(self.max_limit)
+        self.in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._baseline_pace: Optional[float] = None
+        self._last_cut = 0.0
+
+    @property
+    def waiting(self) -> int:
+        return sum(1 for waiter in self._waiters if not waiter.done())
+
+    async def acquire(self, deadline: float) -> None:
+        """
+        Take a slot, waiting in line until ``deadline`` (time.monotonic())
+
+        Raises:
+            AdmissionTimeoutError: If no slot frees up in time
+        """
+        if self.in_flight < int(self.limit) and not self._waiters:
+            self.in_flight += 1
+            return
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, max(0.0, deadline - time.monotonic()))
+        except asyncio.TimeoutError:
+            raise AdmissionTimeoutError("Timed out waiting for an upstream slot")
+        except asyncio.CancelledError:
+            # Granted just before the caller went away; hand the slot back
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+
+    def release(self) -> None:
+        """Return a slot and admit the next waiters that fit under the limit"""
+        self.in_flight -= 1
+        self._wake()
+
+    def _wake(self) -> None:
+        while self._waiters and self.in_flight < int(self.limit):
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    def on_success(self, latency: float, output_tokens: int = 0) -> None:
+        """
+        Grow the limit, unless the call's pace shows the upstream is queueing
+
+        Args:
+            latency: Seconds the call took (for a stream, to its first chunk)
+            output_tokens: Tokens generated in that time (0 for a stream's first chunk)
+        """
+        if not self.adaptive:
+            return
+        pace = latency / max(output_tokens, self.short_answer_tokens)
+        if self._baseline_pace is None or pace < self._baseline_pace:
+            self._baseline_pace = pace
+        else:
+            # Let the baseline drift up slowly so it tracks genuine changes
+            self._baseline_pace += (pace - self._baseline_pace) * 0.01
+
+        if pace > self._baseline_pace * self.latency_tolerance:
+            self._cut(0.9)
+        else:
+            self.limit = min(float(self.max_limit), self.limit + 1.0 / self.limit)
+            self._wake()
+
+    def on_overload(self) -> None:
+        """Cut the limit after a rate-limit response or timeout"""
+        if self.adaptive:
+            self._cut(self.backoff)
+
+    def _cut(self, factor: float) -> None:
+        now = time.monotonic()
+        # About one round trip of a short answer
+        round_trip = self._baseline_pace * self.short_answer_tokens if self._baseline_pace else 1.0
+        if now - self._last_cut < round_trip:
+            return
+        self._last_cut = now
+        self.limit = max(float(self.min_limit), self.limit * factor)
+
+class AdmissionController:
+    """
+    Decides when a call may go upstream.
+
+    A caller waits, in order, for any Retry-After pause requested by the
+    upstream, for the request-rate and token-rate buckets, and for a slot
+    under the adaptive concurrency limit. If that cannot happen within
+    ``queue_timeout`` seconds the call is rejected instead of piling up.
+    """
+
+    def __init__(self, limiter: AdaptiveConcurrencyLimiter, queue_timeout: float,
+                 requests_per_minute: float = 0, tokens_per_minute: float = 0):
+        self.limiter = limiter
+        self.queue_timeout = queue_timeout
+        self.request_bucket = TokenBucket(requests_per_minute) if requests_per_minute > 0 else None
+        self.token_bucket = TokenBucket(tokens_per_minute) if tokens_per_minute > 0 else None
+        self._paused_until = 0.0
+
+        # Metrics
+        self.admitted = 0
+        self.rejected = 0
+        self.rate_limited = 0
+        self.timeouts = 0
+        self.throttle_wait = 0.0
+
+    async def admit(self, estimated_tokens: int, deadline: Optional[float] = None) -> None:
+        """
+        Wait until a call may be sent upstream
+
+        Args:
+            estimated_tokens: Expected prompt tokens of the call (output is charged afterwards)
+            deadline: Absolute time.monotonic() deadline (defaults to now + queue_timeout)
+
+        Raises:
+            AdmissionTimeoutError: If the call cannot be admitted before the deadline
+        """
+        now = time.monotonic()
+        deadline = min(deadline or float("inf"), now + self.queue_timeout)
+
+        try:
+            # Upstream asked us to back off
+            pause = self._paused_until - now
+            if pause > 0:
+                if now + pause > deadline:
+                    raise AdmissionTimeoutError(f"Upstream asked to retry in {pause:.1f}s")
+                self.throttle_wait += pause
+                await asyncio.sleep(pause)
+
+            # Rate budgets
+            buckets = [(self.request_bucket, 1), (self.token_bucket, estimated_tokens)]
+            buckets = [(bucket, amount) for bucket, amount in buckets if bucket is not None]
+            wait = max((bucket.wait_time(amount) for bucket, amount in buckets), default=0.0)
+            if time.monotonic() + wait > deadline:
+                raise AdmissionTimeoutError(f"Rate budget exhausted for the next {wait:.1f}s")
+            for bucket, amount in buckets:
+                bucket.reserve(amount)
+            try:
+                if wait > 0:
+                    self.throttle_wait += wait
+                    await asyncio.sleep(wait)
+
+                # Concurrency slot
+                await self.limiter.acquire(deadline)
+            except (AdmissionTimeoutError, asyncio.CancelledError):
+                # The call is never sent, so it must not use up the rate budgets
+                for bucket, amount in buckets:
+                    bucket.refund(amount)
+                raise
+        except AdmissionTimeoutError:
+            self.rejected += 1
+            raise
+
+        self.admitted += 1
+
+    def release(self) -> None:
+        """Give back the concurrency slot taken by admit()"""
+        self.limiter.release()
+
+    def record_success(self, latency: float, output_tokens: int = 0, streamed: bool = False) -> None:
+        """
+        Feed a successful call's latency and output size back into the limits
+
+        Args:
+            latency: Seconds to the whole answer, or to the first chunk of a stream
+            output_tokens: Tokens generated
+            streamed: Whether latency is a stream's time to its first chunk
+        """
+        self.limiter.on_success(latency, 0 if streamed else output_tokens)
+        if self.token_bucket is not None and output_tokens:
+            self.token_bucket.charge(output_tokens)
+
+    def record_overload(self, retry_after: Optional[float] = None, timed_out: bool = False) -> None:
+        """Back off after a 429 or timeout, honouring Retry-After when given"""
+        if timed_out:
+            self.timeouts += 1
+        else:
+            self.rate_limited += 1
+        self.limiter.on_overload()
+        if retry_after:
+            self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+            logger.warning(f"Upstream rate limited; pausing new calls for {retry_after:.1f}s")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get admission counters and current limits"""
+        return {
+            "concurrency_limit": round(self.limiter.limit, 2),
+            "max_concurrency": self.limiter.max_limit,
+            "adaptive": self.limiter.adaptive,
+            "in_flight": self.limiter.in_flight,
+            "waiting": self.limiter.waiting,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "rate_limited": self.rate_limited,
+            "timeouts": self.timeouts,
+            "throttle_wait_s": round(self.throttle_wait, 3),
+            "paused_for_s": round(max(0.0, self._paused_until - time.monotonic()), 3),
+            "request_budget": round(self.request_bucket.level, 1) if self.request_bucket else None,
+            "token_budget": round(self.token_bucket.level, 1) if self.token_bucket else None,
+        }
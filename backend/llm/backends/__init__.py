@@ -0,0 +1,40 @@
+from typing import Optional
+from config import settings
+from .base import LLMBackend, GeneratedText
+from .stub import StubBackend, StubConfig, StubServiceError
+import logging
+
+logger = logging.getLogger(__name__)
+
+def create_backend(model_name: Optional[str] = None) -> Optional[LLMBackend]:
+    """
+    Build the model backend selected by settings.llm_backend
+
+    Args:
+        model_name: Gemini model to use (defaults to settings.gemini_model; ignored by the stubs)
+
+    Returns:
+        The backend, or None when Gemini is selected without an API key (mock mode)
+    """
+    backend = settings.llm_backend.lower()
+    if backend == "stub":
+        return StubBackend(StubConfig.from_settings())
+    if backend == "stub_http":
+        from .http_stub import HTTPStubBackend
+        return HTTPStubBackend(settings.stub_server_url, max_connections=settings.llm_max_concurrency)
+    if backend != "gemini":
+        raise ValueError(f"Unknown LLM backend: {settings.llm_backend}. Use 'gemini', 'stub' or 'stub_http'")
+
+    if not settings.gemini_api_key:
+        return None
+    from .gemini import GeminiBackend
+    return GeminiBackend(model_name or settings.gemini_model, settings.gemini_api_key)
+
+__all__ = [
+    "LLMBackend",
+    "GeneratedText",
+    "StubBackend",
+    "StubConfig",
+    "StubServiceError",
+    "create_backend"
+] 
@@ -0,0 +1,56 @@
+from abc import ABC, abstractmethod
+from typing import Any, AsyncIterator, Dict, Iterator, Optional
+
+class GeneratedText:
+    """Minimal response object: the generated (or streamed chunk of) text"""
+
+    def __init__(self, text: str):
+        self.text = text
+
+class LLMBackend(ABC):
+    """
+    Abstract base class for model backends.
+
+    Backends expose the same call surface as ``genai.GenerativeModel`` so the
+    LLMClient can drive any of them: a blocking ``generate_content`` (used with
+    the call executor) and an awaitable ``generate_content_async``. Without
+    ``stream`` both return an object with ``.text``; with ``stream=True`` they
+    return an iterable (async iterable for the async variant) of such objects.
+    """
+
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+
+    @abstractmethod
+    def generate_content(self, prompt: str, *, generation_config: Optional[Dict[str, Any]] = None,
+                         stream: bool = False) -> Any:
+        """Generate content, blocking the calling thread"""
+        pass
+
+    @abstractmethod
+    async def generate_content_async(self, prompt: str, *, generation_config: Optional[Dict[str, Any]] = None,
+                                     stream: bool = False) -> Any:
+        """Generate content without blocking the event loop"""
+        pass
+
+    def get_info(self) -> Dict[str, Any]:
+        """Get backend information"""
+        return {
+            "backend": type(self).__name__,
+            "model": self.model_name
+        }
+
+class AsyncChunkStream:
+    """Wraps an async generator of strings as an async iterable of GeneratedText chunks"""
+
+    def __init__(self, chunks: AsyncIterator[str]):
+        self._chunks = chunks
+
+    async def __aiter__(self):
+        async for text in self._chunks:
+            yield GeneratedText(text)
+
+def chunk_stream(chunks: Iterator[str]) -> Iterator[GeneratedText]:
+    """Blocking counterpart of AsyncChunkStream"""
+    for text in chunks:
+        yield GeneratedText(text)
@@ -0,0 +1,25 @@
+from typing import Any, Dict, Optional
+import google.generativeai as genai
+from .base import LLMBackend
+
+# genai.configure sets process-global state; only redo it if the key changes
+_configured_key: Optional[str] = None
+
+class GeminiBackend(LLMBackend):
+    """Google Gemini through the google-generativeai SDK"""
+
+    def __init__(self, model_name: str, api_key: str):
+        global _configured_key
+        super().__init__(model_name)
+        if _configured_key != api_key:
+            genai.configure(api_key=api_key)
+            _configured_key = api_key
+        self.model = genai.GenerativeModel(model_name)
+
+    def generate_content(self, prompt: str, *, generation_config: Optional[Dict[str, Any]] = None,
+                         stream: bool = False) -> Any:
+        return self.model.generate_content(prompt, generation_config=generation_config, stream=stream)
+
+    async def generate_content_async(self, prompt: str, *, generation_config: Optional[Dict[str, Any]] = None,
+                                     stream: bool = False) -> Any:
+        return await self.model.generate_content_async(prompt, generation_config=generation_config, stream=stream)
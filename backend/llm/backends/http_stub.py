@@ -0,0 +1,120 @@
+import json
+from typing import Any, AsyncIterator, Dict, Iterator, Optional
+import httpx
+from .base import AsyncChunkStream, GeneratedText, LLMBackend, chunk_stream
+from .stub import StubServiceError, _config_value
+
+class HTTPStubBackend(LLMBackend):
+    """
+    Client for the stub model served by ``python -m llm.stub_server``.
+
+    Exercises the real network path (connection pooling, HTTP framing,
+    streamed bodies) against a local, configurable fake upstream. Connections
+    are pooled and kept alive by one shared httpx client per mode.
+    """
+
+    def __init__(self, base_url: str, model_name: str = "stub-http", max_connections: int = 100):
+        super().__init__(model_name)
+        self.base_url = base_url.rstrip("/")
+        self._limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        self._client: Optional[httpx.Client] = None
+        self._async_client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.Client:
+        if self._client is None:
+            self._client = httpx.Client(base_url=self.base_url, limits=self._limits, timeout=None)
+        return self._client
+
+    @property
+    def async_client(self) -> httpx.AsyncClient:
+        if self._async_client is None:
+            self._async_client = httpx.AsyncClient(base_url=self.base_url, limits=self._limits, timeout=None)
+        return self._async_client
+
+    def generate_content(self, prompt: str, *, generation_config: Optional[Dict[str, Any]] = None,
+                         stream: bool = False) -> Any:
+        payload = _payload(prompt, generation_config, stream)
+        if not stream:
+            response = self.client.post("/v1/generate", json=payload)
+            _raise_for_status(response)
+            return GeneratedText(response.json()["text"])
+
+        response = self.client.send(self.client.build_request("POST", "/v1/generate", json=payload), stream=True)
+        if response.status_code != 200:
+            response.read()
+            response.close()
+            _raise_for_status(response)
+        return chunk_stream(_iter_chunks(response))
+
+    async def generate_content_async(self, prompt: str, *, generation_config: Optional[Dict[str, Any]] = None,
+                                     stream: bool = False) -> Any:
+        payload = _payload(prompt, generation_config, stream)
+        if not stream:
+            response = await self.async_client.post("/v1/generate", json=payload)
+            _raise_for_status(response)
+            return GeneratedText(response.json()["text"])
+
+        request = self.async_client.build_request("POST", "/v1/generate", json=payload)
+        response = await self.async_client.send(request, stream=True)
+        if response.status_code != 200:
+            await response.aread()
+            await response.aclose()
+            _raise_for_status(response)
+        return AsyncChunkStream(_aiter_chunks(response))
+
+    def get_info(self) -> Dict[str, Any]:
+        return {
+            **super().get_info(),
+            "url": self.base_url,
+            "max_connections": self._limits.max_connections,
+            "async_pool": _pool_usage(self._async_client),
+            "sync_pool": _pool_usage(self._client)
+        }
+
+def _pool_usage(client: Any) -> Optional[Dict[str, int]]:
+    """Open/idle connections of an httpx client's pool (None if the client was never used)"""
+    pool = getattr(getattr(client, "_transport", None), "_pool", None)
+    if pool is None:
+        return None
+    connections = list(pool.connections)
+    idle = sum(1 for connection in connections if connection.is_idle())
+    return {"open": len(connections), "active": len(connections) - idle, "idle": idle}
+
+def _payload(prompt: str, generation_config: Any, stream: bool) -> Dict[str, Any]:
+    return {
+        "prompt": prompt,
+        "max_output_tokens": _config_value(generation_config, "max_output_tokens"),
+        "stream": stream
+    }
+
+def _raise_for_status(response: httpx.Response) -> None:
+    """Turn stub server errors into the same exceptions the in-process stub raises"""
+    if response.status_code == 200:
+        return
+    retry_after = response.headers.get("Retry-After")
+    try:
+        message = response.json().get("error", response.text)
+    except ValueError:
+        message = response.text
+    raise StubServiceError(
+        response.status_code,
+        f"{response.status_code} {message}",
+        retry_after=float(retry_after) if retry_after else None
+    )
+
+def _iter_chunks(response: httpx.Response) -> Iterator[str]:
+    try:
+        for line in response.iter_lines():
+            if line:
+                yield json.loads(line)["text"]
+    finally:
+        response.close()
+
+async def _aiter_chunks(response: httpx.Response) -> AsyncIterator[str]:
+    try:
+        async for line in response.aiter_lines():
+            if line:
+                yield json.loads(line)["text"]
+    finally:
+        await response.aclose()
@@ -0,0 +1,154 @@
+import asyncio
+import hashlib
+import math
+import random
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+from pydantic import BaseModel
+from config import settings
+from .base import AsyncChunkStream, GeneratedText, LLMBackend, chunk_stream
+
+# Words the stub strings together; deterministic per prompt
+_VOCABULARY = (
+    "the", "answer", "is", "found", "by", "first", "writing", "down", "what", "we", "know",
+    "then", "applying", "formula", "step", "result", "so", "value", "equals", "because",
+    "energy", "force", "mass", "velocity", "equation", "solve", "for", "x", "and", "check",
+    "units", "this", "gives", "us", "final", "note", "that", "each", "term", "simplifies"
+)
+_WORDS_PER_CHUNK = 8
+
+class StubServiceError(Exception):
+    """Simulated upstream failure carrying an HTTP-style status code"""
+
+    def __init__(self, code: int, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.code = code
+        self.retry_after = retry_after
+
+class StubConfig(BaseModel):
+    """Behaviour of the stub model"""
+    latency_ms: float = 800.0        # Median time to first token
+    latency_sigma: float = 0.5       # Log-normal spread of that latency (0 = fixed)
+    tokens_per_second: float = 80.0  # Generation speed after the first token (0 = instant)
+    response_tokens: int = 250       # Mean response length in tokens
+    error_rate: float = 0.0          # Fraction of calls failing with 503
+    rate_limit_rate: float = 0.0     # Fraction of calls failing with 429
+    retry_after: float = 1.0         # Retry-After seconds attached to simulated 429s
+    seed: Optional[int] = None       # Seed for latency/error sampling
+
+    @classmethod
+    def from_settings(cls) -> "StubConfig":
+        return cls(
+            latency_ms=settings.stub_latency_ms,
+            latency_sigma=settings.stub_latency_sigma,
+            tokens_per_second=settings.stub_tokens_per_second,
+            response_tokens=settings.stub_response_tokens,
+            error_rate=settings.stub_error_rate,
+            rate_limit_rate=settings.stub_rate_limit_rate,
+            retry_after=settings.stub_retry_after,
+            seed=settings.stub_seed
+        )
+
+class _StubPlan:
+    """Everything decided up front for one simulated call"""
+
+    def __init__(self, delay: float, chunks: List[str], chunk_delay: float, error: Optional[StubServiceError]):
+        self.delay = delay
+        self.chunks = chunks
+        self.chunk_delay = chunk_delay
+        self.error = error
+
+class StubBackend(LLMBackend):
+    """
+    Local stand-in for an LLM, for load tests and benchmarks without network.
+
+    Latency to first token is log-normal around ``latency_ms``; text then
+    arrives at ``tokens_per_second``. A configurable share of calls fails with
+    a 503 or a 429 carrying Retry-After. The response text is a deterministic
+    function of the prompt, so caches behave as they would with a real model.
+    """
+
+    def __init__(self, config: Optional[StubConfig] = None, model_name: str = "stub"):
+        super().__init__(model_name)
+        self.config = config or StubConfig()
+        self._rng = random.Random(self.config.seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+
+    def _plan(self, prompt: str, generation_config: Any) -> _StubPlan:
+        config = self.config
+        with self._lock:
+            self.calls += 1
+            delay = config.latency_ms / 1000 * math.exp(self._rng.gauss(0, config.latency_sigma))
+            roll = self._rng.random()
+
+        error = None
+        if roll < config.rate_limit_rate:
+            error = StubServiceError(429, "429 Resource has been exhausted (stub)", retry_after=config.retry_after)
+        elif roll < config.rate_limit_rate + config.error_rate:
+            error = StubServiceError(503, "503 Service unavailable (stub)")
+
+        # Response size and wording depend only on the prompt
+        prompt_rng = random.Random(hashlib.sha256(prompt.encode("utf-8")).digest())
+        n_tokens = prompt_rng.randint(max(1, config.response_tokens // 2), max(1, config.response_tokens * 3 // 2))
+        max_tokens = _config_value(generation_config, "max_output_tokens")
+        if max_tokens:
+            n_tokens = min(n_tokens, max_tokens)
+        words = [prompt_rng.choice(_VOCABULARY) for _ in range(n_tokens)]
+        chunks = [
+            " ".join(words[i:i + _WORDS_PER_CHUNK]) + " "
+            for i in range(0, len(words), _WORDS_PER_CHUNK)
+        ]
+
+        chunk_delay = _WORDS_PER_CHUNK / config.tokens_per_second if config.tokens_per_second > 0 else 0.0
+        return _StubPlan(delay, chunks, chunk_delay, error)
+
+    def generate_content(self, prompt: str, *, generation_config: Optional[Dict[str, Any]] = None,
+                         stream: bool = False) -> Any:
+        plan = self._plan(prompt, generation_config)
+        time.sleep(plan.delay)
+        if plan.error:
+            raise plan.error
+        if stream:
+            return chunk_stream(self._sync_chunks(plan))
+        time.sleep(plan.chunk_delay * len(plan.chunks))
+        return GeneratedText("".join(plan.chunks).strip())
+
+    async def generate_content_async(self, prompt: str, *, generation_config: Optional[Dict[str, Any]] = None,
+                                     stream: bool = False) -> Any:
+        plan = self._plan(prompt, generation_config)
+        await asyncio.sleep(plan.delay)
+        if plan.error:
+            raise plan.error
+        if stream:
+            return AsyncChunkStream(self._async_chunks(plan))
+        await asyncio.sleep(plan.chunk_delay * len(plan.chunks))
+        return GeneratedText("".join(plan.chunks).strip())
+
+    def _sync_chunks(self, plan: _StubPlan) -> Iterator[str]:
+        for i, chunk in enumerate(plan.chunks):
+            if i:
+                time.sleep(plan.chunk_delay)
+            yield chunk
+
+    async def _async_chunks(self, plan: _StubPlan) -> AsyncIterator[str]:
+        for i, chunk in enumerate(plan.chunks):
+            if i:
+                await asyncio.sleep(plan.chunk_delay)
+            yield chunk
+
+    def get_info(self) -> Dict[str, Any]:
+        return {
+            **super().get_info(),
+            "calls": self.calls,
+            "config": self.config.model_dump()
+        }
+
+def _config_value(generation_config: Any, name: str) -> Any:
+    """Read a field from a generation config given as dict or object"""
+    if generation_config is None:
+        return None
+    if isinstance(generation_config, dict):
+        return generation_config.get(name)
+    return getattr(generation_config, name, None)
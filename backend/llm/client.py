@@ -0,0 +1,440 @@
+import asyncio
+import functools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import aclosing
+from typing import Any, AsyncIterator, Dict, Optional
+from config import settings
+from utils.metrics import LatencyTracker
+from .admission import AdaptiveConcurrencyLimiter, AdmissionController
+from .errors import LLMRateLimitError, LLMTimeoutError
+from .retry import RetryPolicy
+from .tokens import estimate_tokens
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Prompt tokens counted for the rate budget; a longer prompt is past any model's context window, so the rest is not counted
+_PROMPT_TOKEN_LIMIT = 1_000_000
+
+class LLMClient:
+    """
+    Process-wide gateway for upstream model calls.
+
+    Every call is first admitted by an AdmissionController (rate budgets and
+    an adaptive concurrency cap of at most ``llm_max_concurrency``); callers
+    beyond that wait in an explicit queue whose depth and wait time are
+    measured. Calls then go either through the model's async gRPC client (one
+    multiplexed, kept-alive channel per process) or through a dedicated thread
+    pool of the same size, so model traffic never competes with other
+    ``asyncio.to_thread`` users for the default executor.
+
+    Failed calls are retried according to a RetryPolicy within one overall
+    deadline. With hedging enabled, a call that has not answered by the
+    observed p95 latency gets a second identical call, the first answer wins
+    and the other is cancelled; ``hedge_budget`` caps the share of calls that
+    may be hedged so tail-cutting cannot blow the quota.
+    """
+
+    def __init__(self, max_concurrency: int, call_timeout: float, async_native: bool = True,
+                 admission: Optional[AdmissionController] = None,
+                 retry_policy: Optional[RetryPolicy] = None,
+                 hedging: bool = False, hedge_budget: float = 0.1, hedge_min_samples: int = 20):
+        self.max_concurrency = max(1, max_concurrency)
+        self.call_timeout = call_timeout
+        self.async_native = async_native
+        self.admission = admission or AdmissionController(
+            AdaptiveConcurrencyLimiter(self.max_concurrency, adaptive=False),
+            queue_timeout=float("inf")
+        )
+        self.retry_policy = retry_policy or RetryPolicy(max_attempts=1, deadline=float("inf"))
+        self.hedging = hedging
+        self.hedge_budget = hedge_budget
+        self.hedge_min_samples = hedge_min_samples
+
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+        # Metrics
+        self.requests = 0
+        self.calls = 0
+        self.retries = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.failures = 0
+        self.rate_limited = 0
+        self.timeouts = 0
+        self.streams = 0
+        self.prompt_tokens = 0    # Estimated input tokens sent upstream, retries and hedges included
+        self.response_tokens = 0  # Estimated output tokens received
+        self.wait_times = LatencyTracker()
+        self.call_latency = LatencyTracker()  # Whole calls, not streams, which last as long as their reader
+        self.first_chunk_latency = LatencyTracker()
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        """Dedicated executor for blocking model calls, created on first use"""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_concurrency,
+                thread_name_prefix="llm-call"
+            )
+        return self._executor
+
+    async def generate(self, model: Any, prompt: str, timeout: Optional[float] = None, **kwargs) -> str:
+        """
+        Generate content with admission control, retries and optional hedging
+
+        Args:
+            model: Model handle exposing generate_content / generate_content_async
+            prompt: Full prompt text
+            timeout: Seconds to wait for each upstream call (defaults to llm_call_timeout)
+            **kwargs: Extra arguments forwarded to the model (e.g. generation_config)
+
+        Returns:
+            Generated response text
+        """
+        self.requests += 1
+        deadline = time.monotonic() + self.retry_policy.deadline
+        attempt = 0
+        while True:
+            attempt += 1
+            call_timeout = min(timeout or self.call_timeout, max(0.0, deadline - time.monotonic()))
+            try:
+                if self.hedging:
+                    return await self._hedged_call(model, prompt, call_timeout, deadline, **kwargs)
+                return await self._call(model, prompt, call_timeout, deadline, **kwargs)
+            except Exception as e:
+                delay = self.retry_policy.next_delay(attempt, e, deadline)
+                if delay is None:
+                    raise
+                self.retries += 1
+                logger.warning(f"Model call attempt {attempt} failed ({str(e)}); retrying in {delay:.2f}s")
+                await asyncio.sleep(delay)
+
+    async def _hedged_call(self, model: Any, prompt: str, timeout: float, deadline: float, **kwargs) -> str:
+        """Run a call, adding a second identical one if the first is slower than the p95"""
+        pending = {asyncio.ensure_future(self._call(model, prompt, timeout, deadline, **kwargs))}
+        hedge = None
+        try:
+            hedge_delay = self._hedge_delay()
+            if hedge_delay is not None:
+                done, pending = await asyncio.wait(pending, timeout=hedge_delay)
+                if not done and self.hedges < self.hedge_budget * self.requests:
+                    self.hedges += 1
+                    hedge = asyncio.ensure_future(self._call(model, prompt, timeout, deadline, **kwargs))
+                    pending.add(hedge)
+                else:
+                    pending |= done
+
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if hedge is not None and task is hedge:
+                            self.hedge_wins += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def _hedge_delay(self) -> Optional[float]:
+        """Observed p95 latency, once enough calls have been seen to trust it"""
+        if self.call_latency.count < self.hedge_min_samples:
+            return None
+        return self.call_latency.percentile(95)
+
+    async def _call(self, model: Any, prompt: str, timeout: float, deadline: float, **kwargs) -> str:
+        """Single upstream call: admission, bounded wait, metrics"""
+        await self._acquire_slot(prompt, deadline)
+
+        self.calls += 1
+        started_at = time.perf_counter()
+        release_slot = True
+        cancelled = False
+        try:
+            if self.async_native:
+                response = await asyncio.wait_for(
+                    model.generate_content_async(prompt, **kwargs), timeout
+                )
+            else:
+                future = asyncio.wrap_future(
+                    self.executor.submit(functools.partial(model.generate_content, prompt, **kwargs))
+                )
+                try:
+                    response = await asyncio.wait_for(asyncio.shield(future), timeout)
+                except (asyncio.TimeoutError, asyncio.CancelledError):
+                    # The worker thread cannot be interrupted; keep its slot taken
+                    # until it actually finishes so the bound stays truthful.
+                    release_slot = False
+                    future.add_done_callback(lambda _: self._release_slot())
+                    raise
+            text = response.text
+            output_tokens = estimate_tokens(text)
+            self.response_tokens += output_tokens
+            self.admission.record_success(time.perf_counter() - started_at, output_tokens)
+            return text
+
+        except asyncio.CancelledError:
+            # Lost a hedge race or the caller went away; not an upstream signal
+            cancelled = True
+            raise
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            self.admission.record_overload(timed_out=True)
+            logger.warning(f"Model call timed out after {timeout:.1f}s")
+            raise LLMTimeoutError(f"Model call timed out after {timeout:.1f}s")
+        except Exception as e:
+            raise self._handle_failure(e)
+        finally:
+            if not cancelled:
+                self.call_latency.record(time.perf_counter() - started_at)
+            if release_slot:
+                self._release_slot()
+
+    async def stream(self, model: Any, prompt: str, timeout: Optional[float] = None, **kwargs) -> AsyncIterator[str]:
+        """
+        Stream generated text chunks as they arrive
+
+        The concurrency slot is held for the lifetime of the stream. The timeout
+        applies to the wait for each chunk, so a long answer is fine as long as
+        the model keeps producing tokens. Failures are retried only while no
+        chunk has been delivered yet; streams are never hedged.
+
+        Args:
+            model: Model handle exposing generate_content / generate_content_async
+            prompt: Full prompt text
+            timeout: Seconds to wait for each chunk (defaults to llm_call_timeout)
+            **kwargs: Extra arguments forwarded to the model (e.g. generation_config)
+
+        Yields:
+            Text chunks in generation order
+        """
+        self.requests += 1
+        deadline = time.monotonic() + self.retry_policy.deadline
+        attempt = 0
+        while True:
+            attempt += 1
+            delivered = False
+            try:
+                async with aclosing(self._stream_call(model, prompt, timeout or self.call_timeout, deadline, **kwargs)) as chunks:
+                    async for chunk in chunks:
+                        delivered = True
+                        yield chunk
+                return
+            except Exception as e:
+                delay = None if delivered else self.retry_policy.next_delay(attempt, e, deadline)
+                if delay is None:
+                    raise
+                self.retries += 1
+                logger.warning(f"Model stream attempt {attempt} failed ({str(e)}); retrying in {delay:.2f}s")
+                await asyncio.sleep(delay)
+
+    async def _stream_call(self, model: Any, prompt: str, timeout: float, deadline: float, **kwargs) -> AsyncIterator[str]:
+        """Single upstream streaming call"""
+        await self._acquire_slot(prompt, deadline)
+
+        self.calls += 1
+        self.streams += 1
+        started_at = time.perf_counter()
+        first_chunk_latency: Optional[float] = None
+        release_slot = True
+        output_tokens = 0
+        try:
+            if self.async_native:
+                response = await asyncio.wait_for(
+                    model.generate_content_async(prompt, stream=True, **kwargs), timeout
+                )
+                chunks = response.__aiter__()
+                try:
+                    while True:
+                        try:
+                            chunk = await asyncio.wait_for(chunks.__anext__(), timeout)
+                        except StopAsyncIteration:
+                            break
+                        if first_chunk_latency is None:
+                            first_chunk_latency = time.perf_counter() - started_at
+                            self.first_chunk_latency.record(first_chunk_latency)
+                        if chunk.text:
+                            output_tokens += estimate_tokens(chunk.text)
+                            yield chunk.text
+                finally:
+                    # Consumers that stop reading early leave the upstream stream open otherwise
+                    close = getattr(chunks, "aclose", None)
+                    if close is not None:
+                        await close()
+            else:
+                loop = asyncio.get_running_loop()
+                queue: asyncio.Queue = asyncio.Queue()
+                stop = threading.Event()
+                done = object()
+
+                def produce() -> None:
+                    try:
+                        for chunk in model.generate_content(prompt, stream=True, **kwargs):
+                            if stop.is_set():
+                                break
+                            loop.call_soon_threadsafe(queue.put_nowait, chunk.text)
+                        loop.call_soon_threadsafe(queue.put_nowait, done)
+                    except Exception as e:
+                        loop.call_soon_threadsafe(queue.put_nowait, e)
+
+                future = asyncio.wrap_future(self.executor.submit(produce))
+                try:
+                    while True:
+                        item = await asyncio.wait_for(queue.get(), timeout)
+                        if item is done:
+                            break
+                        if isinstance(item, Exception):
+                            raise item
+                        if first_chunk_latency is None:
+                            first_chunk_latency = time.perf_counter() - started_at
+                            self.first_chunk_latency.record(first_chunk_latency)
+                        if item:
+                            output_tokens += estimate_tokens(item)
+                            yield item
+                finally:
+                    # Covers timeouts and consumers that stop reading early
+                    if not future.done():
+                        stop.set()
+                        release_slot = False
+                        future.add_done_callback(lambda _: self._release_slot())
+            self.response_tokens += output_tokens
+            # The whole stream's duration depends on the answer's length and how fast it is read
+            if first_chunk_latency is None:
+                first_chunk_latency = time.perf_counter() - started_at
+            self.admission.record_success(first_chunk_latency, output_tokens, streamed=True)
+
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            self.admission.record_overload(timed_out=True)
+            logger.warning(f"Model stream stalled for more than {timeout:.1f}s")
+            raise LLMTimeoutError(f"Model stream stalled for more than {timeout:.1f}s")
+        except Exception as e:
+            raise self._handle_failure(e)
+        finally:
+            if release_slot:
+                self._release_slot()
+
+    async def _acquire_slot(self, prompt: str, deadline: Optional[float] = None) -> None:
+        enqueued_at = time.perf_counter()
+        prompt_tokens = estimate_tokens(prompt, limit=_PROMPT_TOKEN_LIMIT)
+        try:
+            await self.admission.admit(prompt_tokens, deadline)
+            self.prompt_tokens += prompt_tokens
+        finally:
+            self.wait_times.record(time.perf_counter() - enqueued_at)
+
+    def _release_slot(self) -> None:
+        self.admission.release()
+
+    def _handle_failure(self, error: Exception) -> Exception:
+        """Count a failed call and translate upstream quota errors"""
+        if isinstance(error, LLMRateLimitError):
+            return error
+        if not _is_rate_limited(error):
+            self.failures += 1
+            return error
+
+        self.rate_limited += 1
+        retry_after = _retry_after(error)
+        self.admission.record_overload(retry_after)
+        return LLMRateLimitError(f"Upstream rate limit exceeded: {str(error)}", retry_after=retry_after)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get queueing and latency metrics for the upstream call path"""
+        return {
+            "mode": "async_native" if self.async_native else "executor",
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.admission.limiter.in_flight,
+            "utilisation": round(self.admission.limiter.in_flight / self.max_concurrency, 3),
+            "queue_depth": self.admission.limiter.waiting,
+            "requests": self.requests,
+            "calls": self.calls,
+            "retries": self.retries,
+            "retry_rate": round(self.retries / self.requests, 4) if self.requests else 0.0,
+            "hedging": self.hedging,
+            "hedges": self.hedges,
+            "hedge_rate": round(self.hedges / self.requests, 4) if self.requests else 0.0,
+            "hedge_wins": self.hedge_wins,
+            "failures": self.failures,
+            "rate_limited": self.rate_limited,
+            "timeouts": self.timeouts,
+            "streams": self.streams,
+            "prompt_tokens": self.prompt_tokens,
+            "response_tokens": self.response_tokens,
+            "queue_wait": self.wait_times.snapshot(),
+            "call_latency": self.call_latency.snapshot(),
+            "first_chunk_latency": self.first_chunk_latency.snapshot(),
+            "admission": self.admission.get_stats(),
+        }
+
+    def shutdown(self) -> None:
+        """Release the dedicated executor"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+def _is_rate_limited(error: Exception) -> bool:
+    """Whether an upstream error means HTTP 429 / RESOURCE_EXHAUSTED"""
+    code = getattr(error, "code", None)
+    return code == 429 or type(error).__name__ in ("ResourceExhausted", "TooManyRequests")
+
+def _retry_after(error: Exception) -> Optional[float]:
+    """Extract a Retry-After delay (seconds) from an upstream error, if present"""
+    if getattr(error, "retry_after", None):
+        return float(error.retry_after)
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if headers and headers.get("Retry-After"):
+        try:
+            return float(headers["Retry-After"])
+        except ValueError:
+            pass
+    # gRPC errors carry a google.rpc.RetryInfo detail instead of a header
+    for detail in getattr(error, "details", None) or []:
+        delay = getattr(detail, "retry_delay", None)
+        if delay is not None:
+            return delay.seconds + delay.nanos / 1e9
+    return None
+
+# Process-wide client (singleton pattern)
+_llm_client: Optional[LLMClient] = None
+
+def get_llm_client() -> LLMClient:
+    """Get or create the shared LLM client"""
+    global _llm_client
+    if _llm_client is None:
+        admission = AdmissionController(
+            AdaptiveConcurrencyLimiter(
+                max_limit=settings.llm_max_concurrency,
+                min_limit=settings.llm_min_concurrency,
+                adaptive=settings.llm_adaptive_concurrency
+            ),
+            queue_timeout=settings.llm_queue_timeout,
+            requests_per_minute=settings.llm_requests_per_minute,
+            tokens_per_minute=settings.llm_tokens_per_minute
+        )
+        _llm_client = LLMClient(
+            max_concurrency=settings.llm_max_concurrency,
+            call_timeout=settings.llm_call_timeout,
+            async_native=settings.llm_async_native,
+            admission=admission,
+            retry_policy=RetryPolicy(
+                max_attempts=settings.llm_max_attempts,
+                base_delay=settings.llm_retry_base_delay,
+                max_delay=settings.llm_retry_max_delay,
+                deadline=settings.llm_request_deadline
+            ),
+            hedging=settings.llm_hedging_enabled,
+            hedge_budget=settings.llm_hedge_budget,
+            hedge_min_samples=settings.llm_hedge_min_samples
+        )
+        logger.info(
+            f"LLM client initialized (mode={'async_native' if settings.llm_async_native else 'executor'}, "
+            f"max_concurrency={settings.llm_max_concurrency})"
+        )
+    return _llm_client
@@ -0,0 +1,17 @@
+from typing import Optional
+
+class LLMError(Exception):
+    """Raised when an upstream model call fails"""
+
+class LLMTimeoutError(LLMError):
+    """Raised when an upstream model call exceeds its timeout"""
+
+class LLMRateLimitError(LLMError):
+    """Raised when the upstream rejects a call for exceeding quota (HTTP 429)"""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class AdmissionTimeoutError(LLMError):
+    """Raised when a call cannot be admitted upstream before its deadline"""
@@ -0,0 +1,101 @@
+from typing import Dict, List, Optional
+from .tokens import estimate_tokens
+
+class PromptSection:
+    """
+    A block of context lines appended to a system prompt.
+
+    Sections are filled in priority order (lower numbers first); within a
+    section lines are kept in the order given and dropped from the end when
+    the budget runs out.
+    """
+
+    def __init__(self, name: str, heading: str, lines: List[str], priority: int = 0,
+                 footer: Optional[str] = None):
+        self.name = name
+        self.heading = heading
+        self.lines = lines
+        self.priority = priority
+        self.footer = footer
+
+class AssembledPrompt:
+    """A system prompt built within a token budget"""
+
+    def __init__(self, text: str, tokens: int, budget: int, truncated: Dict[str, int]):
+        self.text = text
+        self.tokens = tokens
+        self.budget = budget
+        self.truncated = truncated  # Section name -> lines left out
+
+class PromptTemplate:
+    """
+    Static part of a system prompt, measured once when the agent module loads.
+
+    ``assemble`` adds dynamic context sections (tool results, constants,
+    formulas) to it without letting the total exceed a token budget. The
+    static text is always kept; context lines are added by priority until
+    the budget is spent, with a marker noting how many were left out.
+    """
+
+    def __init__(self, text: str, max_line_chars: int = 300):
+        self.text = text
+        self.tokens = estimate_tokens(text)
+        self.max_line_chars = max_line_chars
+
+    def assemble(self, sections: List[PromptSection], budget: int) -> AssembledPrompt:
+        """
+        Build the system prompt from the static text and context sections
+
+        Args:
+            sections: Context sections; empty ones are skipped
+            budget: Maximum tokens for the whole system prompt
+
+        Returns:
+            The assembled prompt with its token count and what was truncated
+        """
+        used = self.tokens
+        blocks: Dict[str, str] = {}
+        truncated: Dict[str, int] = {}
+
+        for section in sorted(sections, key=lambda s: s.priority):
+            if not section.lines:
+                continue
+            lines = [self._clip(line) for line in section.lines]
+            heading = f"\n\n{section.heading}\n"
+            footer = f"\n{section.footer}" if section.footer else ""
+            fixed = estimate_tokens(heading) + estimate_tokens(footer)
+
+            kept: List[str] = []
+            cost = fixed
+            for i, line in enumerate(lines):
+                line_tokens = estimate_tokens(line)
+                # Leave room for the "omitted" marker unless this is the last line
+                marker = 0 if i == len(lines) - 1 else estimate_tokens(_omitted(len(lines) - i - 1))
+                if used + cost + line_tokens + marker > budget:
+                    break
+                kept.append(line)
+                cost += line_tokens
+
+            if not kept:
+                truncated[section.name] = len(lines)
+                continue
+            if len(kept) < len(lines):
+                dropped = len(lines) - len(kept)
+                truncated[section.name] = dropped
+                kept.append(_omitted(dropped))
+                cost += estimate_tokens(kept[-1])
+
+            blocks[section.name] = heading + "\n".join(kept) + "\n" + footer
+            used += cost
+
+        # Sections appear in their original order regardless of priority
+        text = self.text + "".join(blocks[s.name] for s in sections if s.name in blocks)
+        return AssembledPrompt(text, used, budget, truncated)
+
+    def _clip(self, line: str) -> str:
+        if len(line) <= self.max_line_chars:
+            return line
+        return line[:self.max_line_chars] + "…"
+
+def _omitted(count: int) -> str:
+    return f"- ... ({count} more omitted)"
@@ -0,0 +1,156 @@
+import threading
+from typing import Any, AsyncIterable, AsyncIterator, Callable, Dict, Hashable, Iterable, Iterator, Optional, Tuple
+from config import settings
+from .backends import LLMBackend, create_backend
+import logging
+
+logger = logging.getLogger(__name__)
+
+class ModelHandle:
+    """
+    A shared backend bound to one generation config.
+
+    This is what agents hold as ``self.model``: it exposes the backend call
+    surface, fills in its generation config, and counts usage. Handles with
+    different configs for the same model share one backend, and with it the
+    SDK client and its connections.
+    """
+
+    def __init__(self, backend: LLMBackend, generation_config: Dict[str, Any]):
+        self.backend = backend
+        self.model_name = backend.model_name
+        self.generation_config = dict(generation_config)
+
+        # Metrics
+        self.borrowers = 0
+        self.calls = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    def _config(self, generation_config: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        return {**self.generation_config, **(generation_config or {})}
+
+    def _start(self) -> None:
+        self.calls += 1
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def generate_content(self, prompt: str, *, generation_config: Optional[Dict[str, Any]] = None,
+                         stream: bool = False) -> Any:
+        self._start()
+        try:
+            response = self.backend.generate_content(prompt, generation_config=self._config(generation_config), stream=stream)
+        except BaseException:
+            self.in_flight -= 1
+            raise
+        if stream:
+            # A stream is in flight until it is exhausted or closed, not when it is returned
+            return self._counted(response)
+        self.in_flight -= 1
+        return response
+
+    async def generate_content_async(self, prompt: str, *, generation_config: Optional[Dict[str, Any]] = None,
+                                     stream: bool = False) -> Any:
+        self._start()
+        try:
+            response = await self.backend.generate_content_async(
+                prompt, generation_config=self._config(generation_config), stream=stream
+            )
+        except BaseException:
+            self.in_flight -= 1
+            raise
+        if stream:
+            return self._counted_async(response)
+        self.in_flight -= 1
+        return response
+
+    def _counted(self, chunks: Iterable[Any]) -> Iterator[Any]:
+        try:
+            yield from chunks
+        finally:
+            self.in_flight -= 1
+
+    async def _counted_async(self, chunks: AsyncIterable[Any]) -> AsyncIterator[Any]:
+        try:
+            async for chunk in chunks:
+                yield chunk
+        finally:
+            self.in_flight -= 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "model": self.model_name,
+            "generation_config": self.generation_config,
+            "borrowers": self.borrowers,
+            "calls": self.calls,
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight,
+        }
+
+class ModelRegistry:
+    """
+    Process-wide owner of model handles, keyed by (model name, generation config).
+
+    The first agent that asks for a model creates its backend; every later
+    agent, and every request, borrows the same handle. Backends are created
+    once per model name, so SDK setup and connection pools happen once per
+    process instead of once per agent.
+    """
+
+    def __init__(self, backend_factory: Callable[[str], Optional[LLMBackend]] = create_backend):
+        self.backend_factory = backend_factory
+        self._backends: Dict[str, LLMBackend] = {}
+        self._handles: Dict[Tuple[str, Hashable], ModelHandle] = {}
+        self._lock = threading.Lock()
+
+    def get(self, model_name: Optional[str] = None,
+            generation_config: Optional[Dict[str, Any]] = None) -> Optional[ModelHandle]:
+        """
+        Borrow the shared handle for a model and generation config
+
+        Args:
+            model_name: Model to use (defaults to settings.gemini_model)
+            generation_config: Default generation parameters for calls made through the handle
+
+        Returns:
+            The shared handle, or None when no backend is available (mock mode)
+        """
+        model_name = model_name or settings.gemini_model
+        generation_config = generation_config or {}
+        key = (model_name, tuple(sorted(generation_config.items())))
+
+        with self._lock:
+            handle = self._handles.get(key)
+            if handle is None:
+                backend = self._backends.get(model_name)
+                if backend is None:
+                    backend = self.backend_factory(model_name)
+                    if backend is None:
+                        return None
+                    self._backends[model_name] = backend
+                    logger.info(f"Model backend created: {backend.get_info()}")
+                handle = ModelHandle(backend, generation_config)
+                self._handles[key] = handle
+            handle.borrowers += 1
+            return handle
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get backend pool state and per-handle usage"""
+        handles = list(self._handles.values())
+        return {
+            "backends": [backend.get_info() for backend in self._backends.values()],
+            "handles": [handle.get_stats() for handle in handles],
+            "borrowers": sum(handle.borrowers for handle in handles),
+            "calls": sum(handle.calls for handle in handles),
+            "in_flight": sum(handle.in_flight for handle in handles),
+        }
+
+# Global registry instance
+_model_registry: Optional[ModelRegistry] = None
+
+def get_model_registry() -> ModelRegistry:
+    """Get or create the shared model registry"""
+    global _model_registry
+    if _model_registry is None:
+        _model_registry = ModelRegistry()
+    return _model_registry
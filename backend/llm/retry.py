@@ -0,0 +1,69 @@
+import random
+import time
+from typing import Optional
+from .errors import AdmissionTimeoutError, LLMRateLimitError, LLMTimeoutError
+
+# Upstream failures that are worth another attempt
+_TRANSIENT_CODES = {500, 502, 503, 504}
+_TRANSIENT_ERRORS = {
+    "ServiceUnavailable", "InternalServerError", "DeadlineExceeded", "GatewayTimeout",
+    "BadGateway", "Aborted", "ConnectionError", "ConnectError", "ReadTimeout"
+}
+
+def is_retryable(error: Exception) -> bool:
+    """
+    Whether a failed call may succeed if tried again
+
+    Args:
+        error: Exception raised by the call
+
+    Returns:
+        True for timeouts, rate limiting and transient upstream errors
+    """
+    if isinstance(error, AdmissionTimeoutError):
+        return False  # Already waited as long as the deadline allows
+    if isinstance(error, (LLMTimeoutError, LLMRateLimitError)):
+        return True
+    return getattr(error, "code", None) in _TRANSIENT_CODES or type(error).__name__ in _TRANSIENT_ERRORS
+
+class RetryPolicy:
+    """
+    Exponential backoff with full jitter, bounded by attempts and a deadline.
+
+    The n-th retry sleeps a random time in [0, min(max_delay, base_delay * 2^(n-1))],
+    or longer if the upstream asked for it via Retry-After. A retry is only
+    scheduled if it can start before the request's overall deadline.
+    """
+
+    def __init__(self, max_attempts: int = 3, base_delay: float = 0.5, max_delay: float = 8.0,
+                 deadline: float = 60.0):
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+
+    def backoff(self, attempt: int) -> float:
+        """Jittered delay before retry number ``attempt`` (1-based)"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+    def next_delay(self, attempt: int, error: Exception, deadline: float) -> Optional[float]:
+        """
+        Decide whether to retry after a failed attempt
+
+        Args:
+            attempt: Number of attempts made so far
+            error: Exception raised by the last attempt
+            deadline: Absolute time.monotonic() deadline of the request
+
+        Returns:
+            Seconds to wait before the next attempt, or None to give up
+        """
+        if attempt >= self.max_attempts or not is_retryable(error):
+            return None
+        delay = self.backoff(attempt)
+        retry_after = getattr(error, "retry_after", None)
+        if retry_after:
+            delay = max(delay, retry_after)
+        if time.monotonic() + delay >= deadline:
+            return None
+        return delay
@@ -0,0 +1,87 @@
+"""
+Local stub LLM server for load testing and benchmarking without network access.
+
+Usage (from the backend directory):
+    python -m llm.stub_server --port 8765 --latency-ms 800 --tokens-per-second 80
+
+Then run the API with LLM_BACKEND=stub_http (and STUB_SERVER_URL if the port differs).
+"""
+import argparse
+import json
+from typing import Optional
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel
+import uvicorn
+from .backends.stub import StubBackend, StubConfig, StubServiceError
+
+class GenerateRequest(BaseModel):
+    prompt: str
+    max_output_tokens: Optional[int] = None
+    stream: bool = False
+
+def create_app(backend: StubBackend) -> FastAPI:
+    """Build the stub server around a StubBackend"""
+    app = FastAPI(title="Stub LLM server")
+
+    @app.post("/v1/generate")
+    async def generate(request: GenerateRequest):
+        generation_config = {"max_output_tokens": request.max_output_tokens}
+        try:
+            response = await backend.generate_content_async(
+                request.prompt, generation_config=generation_config, stream=request.stream
+            )
+        except StubServiceError as e:
+            headers = {"Retry-After": str(e.retry_after)} if e.retry_after else None
+            return JSONResponse(status_code=e.code, content={"error": str(e)}, headers=headers)
+
+        if not request.stream:
+            return {"text": response.text}
+
+        async def lines():
+            async for chunk in response:
+                yield json.dumps({"text": chunk.text}) + "\n"
+
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    @app.get("/v1/config")
+    async def get_config():
+        return backend.get_info()
+
+    @app.put("/v1/config")
+    async def update_config(config: StubConfig):
+        """Change latency/error behaviour while a load test is running"""
+        backend.config = config
+        return backend.get_info()
+
+    return app
+
+def main() -> None:
+    defaults = StubConfig.from_settings()
+    parser = argparse.ArgumentParser(description="Run the stub LLM server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=defaults.latency_ms)
+    parser.add_argument("--latency-sigma", type=float, default=defaults.latency_sigma)
+    parser.add_argument("--tokens-per-second", type=float, default=defaults.tokens_per_second)
+    parser.add_argument("--response-tokens", type=int, default=defaults.response_tokens)
+    parser.add_argument("--error-rate", type=float, default=defaults.error_rate)
+    parser.add_argument("--rate-limit-rate", type=float, default=defaults.rate_limit_rate)
+    parser.add_argument("--retry-after", type=float, default=defaults.retry_after)
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    args = parser.parse_args()
+
+    config = StubConfig(
+        latency_ms=args.latency_ms,
+        latency_sigma=args.latency_sigma,
+        tokens_per_second=args.tokens_per_second,
+        response_tokens=args.response_tokens,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        retry_after=args.retry_after,
+        seed=args.seed
+    )
+    uvicorn.run(create_app(StubBackend(config)), host=args.host, port=args.port)
+
+if __name__ == "__main__":
+    main()
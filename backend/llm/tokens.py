@@ -0,0 +1,29 @@
+import re
+from typing import Optional
+
+# Roughly one token per short word, number or symbol, and ~4 characters for long words
+_TOKEN_PIECES = re.compile(r"\w+|[^\w\s]")
+
+def estimate_tokens(text: str, limit: Optional[int] = None) -> int:
+    """
+    Estimate the token count of a text without calling the model
+
+    Args:
+        text: Text to measure
+        limit: Stop counting once the estimate passes this, so a huge text
+               (e.g. a pasted dataset) is not measured in full just to learn
+               that it is over a budget
+
+    Returns:
+        Approximate token count, or a count just over limit
+    """
+    if not text:
+        return 0
+    if limit is None:
+        return sum(1 + len(piece) // 6 for piece in _TOKEN_PIECES.findall(text))
+    total = 0
+    for piece in _TOKEN_PIECES.finditer(text):
+        total += 1 + (piece.end() - piece.start()) // 6
+        if total > limit:
+            break
+    return total
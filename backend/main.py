@@ -3,6 +3,8 @@ from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
 from api.routes import router
 from utils import setup_logging
+from llm import get_llm_client
+from tools.calculator_sandbox import get_calculator_sandbox
 import logging
 import os
 
@@ -55,12 +57,15 @@ async def startup_event():
     logger.info("🚀 AI Tutor Multi-Agent System starting up...")
     logger.info("✅ Agents: TutorAgent, MathAgent, PhysicsAgent")
     logger.info("✅ Tools: CalculatorTool, PhysicsConstantsTool")
-    logger.info("✅ API endpoints: /api/chat, /api/agents, /api/health")
+    get_calculator_sandbox().warm()
+    logger.info("✅ API endpoints: /api/chat, /api/chat/stream, /api/agents, /api/health, /api/metrics")
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Application shutdown event"""
     logger.info("🛑 AI Tutor Multi-Agent System shutting down...")
+    get_llm_client().shutdown()
+    get_calculator_sandbox().shutdown()
 
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000) 
\ No newline at end of file
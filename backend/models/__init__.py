@@ -4,6 +4,13 @@ from .schemas import (
     ChatResponse,
     AgentRequest,
     AgentResponse,
+    QueryFeatures,
+    BatchClassifyRequest,
+    QueryClassification,
+    BatchClassifyResponse,
+    PlotRequest,
+    PlotResponse,
+    AutocompleteResponse,
     HealthResponse
 )
 
@@ -13,5 +20,12 @@ __all__ = [
     "ChatResponse",
     "AgentRequest",
     "AgentResponse",
+    "QueryFeatures",
+    "BatchClassifyRequest",
+    "QueryClassification",
+    "BatchClassifyResponse",
+    "PlotRequest",
+    "PlotResponse",
+    "AutocompleteResponse",
     "HealthResponse"
 ] 
\ No newline at end of file
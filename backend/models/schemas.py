@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Tuple
 from enum import Enum
 
 class AgentType(str, Enum):
@@ -10,6 +10,8 @@ class AgentType(str, Enum):
 class ChatRequest(BaseModel):
     message: str
     conversation_id: Optional[str] = None
+    bypass_cache: bool = False
+    allow_fast_path: bool = True  # False always asks the model, even for plain calculations
 
 class ChatResponse(BaseModel):
     response: str
@@ -17,9 +19,35 @@ class ChatResponse(BaseModel):
     conversation_id: str
     metadata: Optional[Dict[str, Any]] = None
 
+class QueryFeatures(BaseModel):
+    """Analysis of a query computed once per request and shared by every agent that handles it"""
+    text: str
+    normalized: str                                       # Lowercased text, less any pasted dataset
+    tokens: List[str]                                     # Words and numbers, lowercased
+    numbers: List[Tuple[int, int]]                        # (start, end) spans of numeric literals
+    expression_spans: List[Tuple[int, int]]               # (start, end) spans of arithmetic expressions
+    math_calculations: List[str]                          # Expressions for the math agent's calculator
+    physics_calculations: List[str]                       # Expressions for the physics agent's calculator
+    keyword_scores: Dict[str, float]                      # Routing keyword score per domain
+    keyword_hits: Dict[str, List[str]]                    # Routing keywords found per domain
+    pattern_scores: Dict[str, float]                      # Routing score from expression/formula patterns
+    concept_hits: Dict[str, List[str]]                    # Concepts mentioned, per domain
+    constant_symbols: List[str]                           # Physics constants referenced
+    formula_names: List[str]                              # Physics formulas referenced
+    equations: List[List[str]] = []                       # Equations to solve, grouped into systems
+    plot: Optional[Dict[str, Any]] = None                 # {"expression", "x_range"} for "plot"/"graph" requests
+    calculus: Optional[Dict[str, Any]] = None             # CalculusTool arguments for a derivative/integral/limit question
+    linear_algebra: Optional[Dict[str, Any]] = None       # LinearAlgebraTool arguments for a computation on inline matrices
+    statistics: Optional[Dict[str, Any]] = None           # StatisticsTool arguments (the data already parsed) for a pasted dataset
+    prompt_text: Optional[str] = None                     # The query with any pasted dataset cut out, to send the model instead
+    fast_path: Optional[str] = None                       # "calculation"/"calculus"/"constant"/"equation"/"linear_algebra"/"statistics" if answerable without the model
+
 class AgentRequest(BaseModel):
     query: str
     context: Optional[Dict[str, Any]] = None
+    bypass_cache: bool = False
+    allow_fast_path: bool = True
+    features: Optional[QueryFeatures] = None  # Filled in by the routing agent for delegates
 
 class AgentResponse(BaseModel):
     response: str
@@ -28,6 +56,43 @@ class AgentResponse(BaseModel):
     confidence: Optional[float] = None
     metadata: Optional[Dict[str, Any]] = None
 
+class BatchClassifyRequest(BaseModel):
+    queries: List[str]
+
+class QueryClassification(BaseModel):
+    route: AgentType
+    math_score: float
+    physics_score: float
+    router: str = "keywords"                  # "learned" when the learned router was confident
+
+class BatchClassifyResponse(BaseModel):
+    results: List[QueryClassification]        # One per query, in request order
+    route_counts: Dict[str, int]              # Queries per agent
+
+class PlotRequest(BaseModel):
+    expression: str                           # e.g. "x^2 - 4", "y = 2sin(x)", "x^2 + y^2"
+    x_min: float = -10.0
+    x_max: float = 10.0
+    y_min: Optional[float] = None             # Range of the second variable, for functions of two variables
+    y_max: Optional[float] = None
+    points: Optional[int] = None              # Evaluated per axis to find the features
+    samples: Optional[int] = None             # Returned per axis for drawing
+    analyze: bool = True                      # Find roots, extrema, poles and intercepts
+
+class PlotResponse(BaseModel):
+    kind: str                                 # "1d" or "2d"
+    expression: str
+    variables: List[str]
+    x: List[Optional[float]]
+    y: List[Optional[float]]                  # Values (1-D) or the second axis (2-D); None where undefined
+    z: Optional[List[List[Optional[float]]]] = None  # Values by row of y (2-D)
+    points: int
+    features: Dict[str, Any]
+
+class AutocompleteResponse(BaseModel):
+    query: str
+    suggestions: List[Dict[str, Any]]         # Constants and formulas, best first, each with its "kind" and "key"
+
 class HealthResponse(BaseModel):
     status: str
     service: str
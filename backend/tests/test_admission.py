@@ -0,0 +1,29 @@
+from llm.admission import AdaptiveConcurrencyLimiter
+
+def make_limiter(limit: float = 8.0) -> AdaptiveConcurrencyLimiter:
+    limiter = AdaptiveConcurrencyLimiter(16)
+    limiter.limit = limit
+    return limiter
+
+def test_long_answers_are_not_taken_for_congestion():
+    limiter = make_limiter()
+    # 0.4s of overhead and 10ms per token, answers of every length, and streams' first chunks
+    for tokens in [5, 40, 400, 1200] * 25:
+        limiter.on_success(0.4 + 0.01 * tokens, tokens)
+        limiter.on_success(0.45)
+    assert limiter.limit == 16
+
+def test_a_slower_pace_cuts_the_limit():
+    limiter = make_limiter()
+    for _ in range(10):
+        limiter.on_success(0.8, 40)
+    grown = limiter.limit
+    limiter.on_success(4.0, 40)
+    assert limiter.limit == grown * 0.9
+
+def test_overload_backs_off_once_per_round_trip():
+    limiter = make_limiter()
+    limiter.on_success(0.5)
+    limiter.on_overload()
+    limiter.on_overload()
+    assert limiter.limit == (8 + 1 / 8) * 0.5
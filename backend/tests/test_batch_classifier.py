@@ -0,0 +1,61 @@
+import pytest
+
+from agents import TutorAgent
+from models import AgentType
+
+QUERIES = [
+    "What is 2 + 3 * 4?",
+    "Solve 2x + 5 = 15",
+    "Find the derivative of x^2 sin(x)",
+    "Integrate x^2 from 0 to 3",
+    "What is Newton's second law?",
+    "Calculate the kinetic energy of a 2 kg ball moving at 3 m/s",
+    "What is the speed of light?",
+    "A 5 kg block is pushed with a force of 20 N; what is its acceleration?",
+    "How do I study for exams?",
+    "Explain photosynthesis",
+    "What is the probability of rolling two sixes?",
+    "Find the determinant of [[1, 2], [3, 4]]",
+    "Calculate the momentum of a 3 kg ball at 4 m/s and the energy in joules",
+    "What is the well-known formula for the area of a circle?",
+    "MATH AND PHYSICS: velocity = distance / time, solve for time",
+    "Hello!",
+    "",
+    "x^2 - 5x + 6 = 0",
+    "What's the gravitational force between two 1 kg masses 1 m apart?",
+    "What is the standard deviation of 2, 4, 4, 4, 5, 5, 7, 9?",
+]
+
+@pytest.fixture(scope="module")
+def tutor():
+    return TutorAgent()
+
+def test_batch_routes_match_single_query_routes(tutor):
+    results = tutor.classify_batch(QUERIES)
+    assert len(results) == len(QUERIES)
+    for query, result in zip(QUERIES, results):
+        assert result["route"] == tutor._classify_query(query), query
+
+def test_batch_scores_match_single_query_scores(tutor):
+    analyzer = tutor.query_analyzer
+    for query, result in zip(QUERIES, tutor.classify_batch(QUERIES)):
+        features = analyzer.analyze(query)
+        math = features.keyword_scores.get("math", 0.0) + features.pattern_scores["math"]
+        physics = features.keyword_scores.get("physics", 0.0) + features.pattern_scores["physics"]
+        assert result["math_score"] == pytest.approx(math), query
+        assert result["physics_score"] == pytest.approx(physics), query
+
+def test_matches_cannot_span_queries(tutor):
+    # "forc" + "e" would read as "force" if the queries were simply concatenated
+    alone = tutor.classify_batch(["forc"])[0]
+    assert tutor.classify_batch(["forc", "e of gravity"])[0] == alone
+
+def test_repeated_queries_keep_their_positions(tutor):
+    queries = ["What is 2 + 3?", "Explain photosynthesis", "What is 2 + 3?"]
+    results = tutor.classify_batch(queries)
+    assert results[0] == results[2]
+    assert results[0]["route"] == tutor._classify_query(queries[0])
+    assert results[1]["route"] == AgentType.TUTOR
+
+def test_empty_batch(tutor):
+    assert tutor.classify_batch([]) == []
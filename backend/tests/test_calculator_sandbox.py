@@ -0,0 +1,62 @@
+import asyncio
+
+import pytest
+
+from tools.calculator_sandbox import CalculationTimeoutError, CalculatorSandbox, check_result_size
+
+def evaluate(sandbox, expression, bindings=None):
+    return asyncio.run(sandbox.evaluate(expression, bindings))
+
+@pytest.fixture
+def sandbox():
+    sandbox = CalculatorSandbox(workers=1, timeout=10.0, max_result_digits=50)
+    yield sandbox
+    sandbox.shutdown()
+
+def test_cheap_expressions_run_inline(sandbox):
+    assert evaluate(sandbox, "2 + 3 * x", {"x": 4}) == 14
+    assert sandbox.inline_evaluations == 1
+    assert sandbox.isolated_evaluations == 0
+
+def test_expensive_expressions_run_in_a_worker(sandbox):
+    assert evaluate(sandbox, "3 ** 100 % 1000") == 3 ** 100 % 1000
+    assert sandbox.isolated_evaluations == 1
+
+def test_long_expressions_run_in_a_worker():
+    sandbox = CalculatorSandbox(workers=1, timeout=10.0, inline_max_chars=10)
+    try:
+        assert evaluate(sandbox, " + ".join(["1"] * 20)) == 20
+        assert sandbox.isolated_evaluations == 1
+    finally:
+        sandbox.shutdown()
+
+def test_result_digits_are_limited_on_both_paths(sandbox):
+    with pytest.raises(ValueError, match="more than 50 digits"):
+        evaluate(sandbox, "10 ** 60")
+    with pytest.raises(ValueError, match="more than 50 digits"):
+        evaluate(sandbox, "7 ** 100")
+
+def test_errors_from_a_worker_reach_the_caller(sandbox):
+    with pytest.raises(OverflowError):
+        evaluate(sandbox, "1.5 ** 10000")
+
+def test_timeout_restarts_the_pool():
+    sandbox = CalculatorSandbox(workers=1, timeout=0.001)
+    try:
+        with pytest.raises(CalculationTimeoutError):
+            evaluate(sandbox, "3 ** 100 % 1000")
+        assert sandbox.timeouts == 1
+        assert sandbox.restarts == 1
+    finally:
+        sandbox.shutdown()
+
+def test_without_isolation_everything_runs_inline():
+    sandbox = CalculatorSandbox(isolated=False)
+    assert evaluate(sandbox, "3 ** 100 % 1000") == 3 ** 100 % 1000
+    assert sandbox.isolated_evaluations == 0
+
+def test_check_result_size():
+    assert check_result_size(10 ** 9, 10) == 10 ** 9
+    assert check_result_size(1e300, 10) == 1e300
+    with pytest.raises(ValueError):
+        check_result_size(10 ** 20, 10)
@@ -0,0 +1,78 @@
+import asyncio
+import math
+
+import pytest
+
+from tools.calculus_tool import CalculusError, CalculusTool, derivative, integrate, limit
+
+@pytest.mark.parametrize("expression, point, order, exact", [
+    ("x^3", 2, 1, "12"),
+    ("sin(x)", 0, 1, "1"),
+    ("x^3", 2, 2, "12"),
+    ("abs(x)", 1, 1, "1"),
+])
+def test_derivative(expression, point, order, exact):
+    result = derivative(expression, point, order=order)
+    assert result["exact"] == exact
+    assert result["value"] == pytest.approx(float(exact))
+
+def test_derivative_of_a_transcendental_function():
+    result = derivative("exp(x) * cos(x)", 1.0)
+    assert result["value"] == pytest.approx(math.exp(1) * (math.cos(1) - math.sin(1)), rel=1e-12)
+
+@pytest.mark.parametrize("expression, point, order, message", [
+    ("abs(x)", 0, 1, "not differentiable"),
+    ("log(x)", 0, 1, "not defined"),
+    ("x^2", 1, 5, "order 1 to 4"),
+])
+def test_derivative_failures(expression, point, order, message):
+    with pytest.raises(CalculusError, match=message):
+        derivative(expression, point, order=order)
+
+@pytest.mark.parametrize("expression, lower, upper, expected", [
+    ("x^2", 0, 3, 9.0),
+    ("x^2", 3, 0, -9.0),
+    ("1/x^2", 1, math.inf, 1.0),
+    ("exp(-x^2)", -math.inf, math.inf, math.sqrt(math.pi)),
+    ("sin(x)", 0, math.pi, 2.0),
+])
+def test_integral(expression, lower, upper, expected):
+    result = integrate(expression, lower, upper)
+    assert result["value"] == pytest.approx(expected, rel=1e-9)
+    assert result["error"] <= 1e-6
+
+@pytest.mark.parametrize("lower, upper", [(-1, 1), (1, math.inf)])
+def test_divergent_integrals_are_refused(lower, upper):
+    with pytest.raises(CalculusError, match="does not converge"):
+        integrate("1/x", lower, upper)
+
+def test_two_sided_limit():
+    result = limit("sin(x)/x", 0)
+    assert result["exists"] and result["exact"] == "1"
+
+def test_limit_at_infinity():
+    assert limit("(1 + 1/x)^x", math.inf)["value"] == pytest.approx(math.e, rel=1e-9)
+
+def test_infinite_limit():
+    assert limit("1/x^2", 0)["value"] == "inf"
+
+def test_one_sided_limits_that_disagree():
+    result = limit("1/x", 0)
+    assert not result["exists"]
+    assert (result["left"], result["right"]) == ("-inf", "inf")
+
+def test_limit_where_only_one_side_is_defined():
+    result = limit("sqrt(x)", 0)
+    assert result["direction"] == "right" and result["value"] == 0.0
+
+def test_oscillating_limit_does_not_exist():
+    assert not limit("sin(1/x)", 0)["exists"]
+
+def test_tool_reports_errors_without_raising():
+    tool = CalculusTool()
+    ok = asyncio.run(tool.execute("integral", "x^2", lower=0, upper=3))
+    assert ok.success and ok.result["exact"] == "9"
+    failed = asyncio.run(tool.execute("integral", "1/x", lower=-1, upper=1))
+    assert not failed.success and "does not converge" in failed.error_message
+    unknown = asyncio.run(tool.execute("series", "x"))
+    assert not unknown.success
@@ -0,0 +1,78 @@
+import asyncio
+
+import pytest
+
+from tools.equation_solver_tool import EquationError, EquationSolverTool, parse_equation
+
+def solve(equations):
+    result = asyncio.run(EquationSolverTool().execute(equations))
+    assert result.success, result.error_message
+    return result.result
+
+def test_linear_exact_fraction():
+    result = solve("0.5x = 1.25")
+    assert result["kind"] == "linear"
+    assert result["solutions"] == [{"x": "5/2"}]
+    assert result["approximate"] == [{"x": 2.5}]
+
+def test_linear_steps_end_with_the_answer():
+    result = solve("2x + 5 = 15")
+    assert result["solutions"] == [{"x": "5"}]
+    assert result["steps"][-1].endswith("x = 5")
+
+@pytest.mark.parametrize("equation, roots", [
+    ("x^2 - 5x + 6 = 0", [{"x": "3"}, {"x": "2"}]),
+    ("x^2 - 4x + 4 = 0", [{"x": "2"}]),
+    ("x² = 2", [{"x": "√2"}, {"x": "−√2"}]),
+])
+def test_quadratic(equation, roots):
+    result = solve(equation)
+    assert result["kind"] == "quadratic"
+    assert result["status"] == "solved"
+    assert result["solutions"] == roots
+
+def test_quadratic_without_real_roots():
+    result = solve("x^2 + 1 = 0")
+    assert result["status"] == "no_real_solution"
+    assert result["solutions"] == []
+    assert result["complex_roots"] == [{"x": "i"}, {"x": "−i"}]
+
+def test_system():
+    result = solve(["x+y+z=6", "2x-y+z=3", "x+2y-z=2"])
+    assert result["kind"] == "system"
+    assert result["solutions"] == [{"x": "1", "y": "2", "z": "3"}]
+
+def test_system_from_one_string():
+    assert solve("2x + 5 = 15; x - y = 1")["solutions"] == [{"x": "5", "y": "4"}]
+
+@pytest.mark.parametrize("equations, status", [
+    (["2x + y = 5", "4x + 2y = 10"], "infinite_solutions"),
+    (["x + y = 1", "x + y = 2"], "no_solution"),
+    ("x = x + 1", "no_solution"),
+    ("2x + 3 = 2(x + 1) + 1", "infinite_solutions"),
+    ("x = x; y = y", "infinite_solutions"),
+])
+def test_degenerate_equations(equations, status):
+    result = solve(equations)
+    assert result["status"] == status
+    assert result["solutions"] == []
+
+def test_cancelled_unknowns_are_still_reported():
+    assert solve("x = x + 1")["variables"] == ["x"]
+
+@pytest.mark.parametrize("equations, message", [
+    ("x^3 = 8", "Only linear and quadratic"),
+    ("x*y = 3", "Only systems of linear equations"),
+    ("x + y = 2", "2 unknowns need at least 2 equations"),
+    ("1/x = 2", "denominator"),
+    ("2 = 3", "has no unknowns"),
+    ("2x + 5", "not an equation"),
+])
+def test_unsupported_equations_fail_cleanly(equations, message):
+    result = asyncio.run(EquationSolverTool().execute(equations))
+    assert not result.success
+    assert message in result.error_message
+
+def test_parse_equation_rejects_missing_side():
+    with pytest.raises(EquationError):
+        parse_equation("x + 1 =")
@@ -0,0 +1,86 @@
+import math
+
+import numpy as np
+import pytest
+
+from tools.expression_engine import ExpressionEngine, UnsafeExpressionError, compile_expression
+from tools.plot_tool import ARRAY_FUNCTIONS
+
+@pytest.fixture
+def engine():
+    return ExpressionEngine(cache_size=8)
+
+@pytest.mark.parametrize("expression, expected", [
+    ("2 + 3 * 4", 14),
+    ("(2 + 3) * 4", 20),
+    ("2 ** 10", 1024),
+    ("-3 ** 2", -9),
+    ("7 // 2 + 7 % 2", 4),
+    ("sqrt(16) + abs(-2)", 6.0),
+    ("max(1, 5, 3) - min(4, 2)", 3),
+    ("round(2.567, 2)", 2.57),
+    ("sin(pi / 2)", 1.0),
+    ("log(e)", 1.0),
+    ("2 ** 100", 2 ** 100),
+])
+def test_evaluates_like_python(engine, expression, expected):
+    assert engine.evaluate(expression) == pytest.approx(expected)
+
+def test_variables(engine):
+    compiled = engine.compile("2 * x + y")
+    assert compiled.variables == frozenset({"x", "y"})
+    assert compiled.evaluate({"x": 3, "y": 1}) == 7
+    assert compiled.evaluate({"x": 0.5, "y": 0}) == 1.0
+
+def test_missing_variable(engine):
+    with pytest.raises(ValueError, match="No value given for x"):
+        engine.evaluate("x + 1")
+
+@pytest.mark.parametrize("expression", [
+    "__import__('os').system('true')",
+    "(1).__class__",
+    "[1, 2][0]",
+    "lambda: 1",
+    "open('/etc/passwd')",
+    "_secret + 1",
+    "sin",
+    "'text'",
+    "x if 1 else 2",
+])
+def test_rejects_anything_outside_the_whitelist(engine, expression):
+    with pytest.raises(UnsafeExpressionError):
+        engine.compile(expression)
+
+def test_rejects_text_that_is_not_an_expression(engine):
+    with pytest.raises(SyntaxError):
+        engine.compile("2 +")
+
+def test_refuses_huge_exact_powers(engine):
+    with pytest.raises(ValueError, match="too large"):
+        engine.evaluate("9 ** 9 ** 9")
+
+@pytest.mark.parametrize("expression", ["1e308 * 10", "1e308 * 10 - 1e308 * 10"])
+def test_non_finite_results_overflow(engine, expression):
+    with pytest.raises(OverflowError):
+        engine.evaluate(expression)
+
+def test_non_numeric_results_are_refused():
+    compiled = compile_expression("f(1)", functions={"f": lambda x: "text", "pow": pow})
+    with pytest.raises(ValueError, match="not a number"):
+        compiled.evaluate()
+
+def test_cost_charges_big_and_variable_exponents():
+    cheap = compile_expression("2 ** 10 + 3 * 4")
+    assert compile_expression("2 ** 100000").cost > cheap.cost
+    assert compile_expression("2 ** x").cost > cheap.cost
+
+def test_compiled_forms_are_cached(engine):
+    engine.evaluate("1 + 1")
+    engine.evaluate("1 + 1")
+    stats = engine.get_cache_stats()
+    assert stats["hits"] == 1 and stats["misses"] == 1 and stats["max_size"] == 8
+
+def test_vectorized_evaluation_with_array_functions():
+    compiled = compile_expression("sin(x) + x ** 2", functions=ARRAY_FUNCTIONS)
+    values = compiled.evaluate_vectorized({"x": np.array([0.0, math.pi / 2])})
+    assert values.tolist() == pytest.approx([0.0, 1.0 + (math.pi / 2) ** 2])
@@ -0,0 +1,69 @@
+import re
+
+import pytest
+
+from utils.keyword_scorer import KeywordScorer
+
+KEYWORDS = {
+    "math": {
+        "sin": {"weight": 2.0, "match": "word"},
+        "integral": 1.5,
+        "-": {"weight": 0.5, "match": "operator"},
+        "^": {"weight": 1.0, "match": "substring"},
+    },
+    "physics": {
+        "force": 2.0,
+        "energy": 1.0,
+        "integral": 0.5,
+    },
+}
+
+@pytest.fixture
+def scorer():
+    return KeywordScorer(KEYWORDS)
+
+def test_word_mode_needs_whole_words(scorer):
+    assert scorer.matches("sin(x) + 1")["math"] == ["sin"]
+    assert "sin" not in scorer.matches("using a ruler")["math"]
+
+def test_stem_mode_matches_word_starts(scorer):
+    assert scorer.matches("the forces on a block")["physics"] == ["force"]
+    assert scorer.matches("the workforce")["physics"] == []
+
+def test_operator_mode_skips_hyphenated_words(scorer):
+    assert "-" in scorer.matches("2-3")["math"]
+    assert "-" in scorer.matches("x - y")["math"]
+    assert "-" not in scorer.matches("a well-known result")["math"]
+
+def test_substring_mode_matches_anywhere(scorer):
+    assert "^" in scorer.matches("x^2")["math"]
+
+def test_each_keyword_counts_once_for_every_domain(scorer):
+    scores = scorer.score("Integral of the integral, with energy and energy")
+    assert scores == {"math": 1.5, "physics": 1.5}
+
+def test_case_is_ignored(scorer):
+    assert scorer.score("FORCE") == scorer.score("force")
+
+def test_scan_agrees_with_score_and_matches(scorer):
+    text = "Find the integral of sin(x)^2 - the force"
+    scores, found = scorer.scan(text)
+    assert scores == scorer.score(text)
+    assert found == scorer.matches(text)
+
+def test_matches_naive_regex_scoring():
+    # The automaton must give the same scores as checking each keyword on its own
+    words = ["work", "workforce", "force", "for", "or", "forces", "ce"]
+    scorer = KeywordScorer({"a": {word: float(i + 1) for i, word in enumerate(words)}})
+    text = "the workforce forces for work, or ce"
+    expected = sum(float(i + 1) for i, word in enumerate(words) if re.search(r"(?<!\w)" + word, text))
+    assert scorer.score(text)["a"] == expected
+
+def test_find_all_reports_repeats_with_end_offsets(scorer):
+    text = "force | force"
+    ends = [end for pattern_id, end in scorer.find_all(text)]
+    assert ends == [5, 13]
+
+def test_unknown_match_mode_is_rejected():
+    with pytest.raises(ValueError):
+        KeywordScorer({"math": {"sin": {"weight": 1.0, "match": "fuzzy"}}})
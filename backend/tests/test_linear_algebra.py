@@ -0,0 +1,90 @@
+import asyncio
+from fractions import Fraction
+
+import numpy as np
+import pytest
+
+from tools.linear_algebra_tool import (LinearAlgebraError, LinearAlgebraTool, cross, determinant, eigen, inverse,
+                                       parse_matrix, product, rank, solve)
+
+@pytest.mark.parametrize("text, expected", [
+    ("[[1, 2], [3, 4]]", [[1, 2], [3, 4]]),
+    ("[1 2; 3 4]", [[1, 2], [3, 4]]),
+    ("[5, 6]", [5, 6]),
+    ("[[1/2, 0.25]]", [[Fraction(1, 2), Fraction(1, 4)]]),
+    ([[1, 2], [3, 4]], [[1, 2], [3, 4]]),
+])
+def test_parse_matrix(text, expected):
+    assert parse_matrix(text) == expected
+
+@pytest.mark.parametrize("text, message", [
+    ("[[1, 2], [3]]", "same number of entries"),
+    ("[x, 1]", "not a number"),
+    ("1 2", "not a matrix or vector"),
+    ("[]", "Empty matrix"),
+])
+def test_parse_matrix_failures(text, message):
+    with pytest.raises(LinearAlgebraError, match=message):
+        parse_matrix(text)
+
+def test_determinant_is_exact():
+    result = determinant(parse_matrix("[[1, 2], [3, 4]]"))
+    assert (result["value"], result["exact"]) == (-2, "-2")
+
+def test_large_matrices_fall_back_to_floating_point():
+    matrix = (2 * np.eye(11)).tolist()
+    result = determinant(parse_matrix(matrix))
+    assert result["exact"] is None
+    assert result["value"] == pytest.approx(2 ** 11)
+
+def test_inverse():
+    result = inverse(parse_matrix("[[1, 2], [3, 4]]"))
+    assert result["exact"] == [["-2", "1"], ["3/2", "-1/2"]]
+    assert result["determinant"] == -2
+
+def test_singular_matrix_has_no_inverse():
+    with pytest.raises(LinearAlgebraError, match="singular"):
+        inverse(parse_matrix("[[1, 2], [2, 4]]"))
+
+def test_rank():
+    assert rank(parse_matrix("[[1, 2], [2, 4]]"))["value"] == 1
+
+@pytest.mark.parametrize("matrix, expected", [
+    ("[[2, 0], [0, 3]]", ["3", "2"]),
+    ("[[0, -1], [1, 0]]", ["i", "−i"]),
+    ("[[1, 1], [1, 0]]", ["1/2 + √5/2", "1/2 − √5/2"]),
+])
+def test_eigenvalues_of_2x2_matrices_are_exact(matrix, expected):
+    assert eigen(parse_matrix(matrix))["exact"] == expected
+
+def test_repeated_eigenvalue_has_a_full_eigenspace():
+    pairs = eigen(parse_matrix("[[2, 0, 0], [0, 2, 0], [0, 0, 5]]"))["eigenpairs"]
+    assert [(pair["exact"], pair["multiplicity"]) for pair in pairs] == [("5", 1), ("2", 2)]
+    assert pairs[1]["vectors"] == [["1", "0", "0"], ["0", "1", "0"]]
+
+def test_product_follows_numpy_rules_for_vectors():
+    assert product(parse_matrix("[[1, 2], [3, 4]]"), parse_matrix("[5, 6]"))["exact"] == ["17", "39"]
+    assert product(parse_matrix("[1, 2, 3]"), parse_matrix("[4, 5, 6]"))["exact"] == "32"
+
+def test_product_of_mismatched_shapes():
+    with pytest.raises(LinearAlgebraError, match="Cannot multiply a 1×3 matrix by a 1×2 matrix"):
+        product(parse_matrix("[[1, 2, 3]]"), parse_matrix("[[1, 2]]"))
+
+def test_cross_product():
+    assert cross(parse_matrix("[1, 0, 0]"), parse_matrix("[0, 1, 0]"))["exact"] == ["0", "0", "1"]
+
+@pytest.mark.parametrize("matrix, rhs, status, exact", [
+    ("[[2, 1], [1, 3]]", "[3, 5]", "solved", ["4/5", "7/5"]),
+    ("[[1], [1]]", "[1, 2]", "least_squares", ["3/2"]),
+    ("[[1, 1]]", "[2]", "underdetermined", ["1", "1"]),
+])
+def test_solve(matrix, rhs, status, exact):
+    result = solve(parse_matrix(matrix), parse_matrix(rhs))
+    assert (result["status"], result["exact"]) == (status, exact)
+
+def test_tool_reports_errors_without_raising():
+    tool = LinearAlgebraTool()
+    ok = asyncio.run(tool.execute("determinant", "[[1, 2], [3, 4]]"))
+    assert ok.success and ok.metadata["exact"]
+    assert asyncio.run(tool.execute("inverse", "[[1, 2], [3, 4]]", "[1]")).error_message == "inverse takes 1 operand, not 2"
+    assert not asyncio.run(tool.execute("trace", "[[1]]")).success
@@ -0,0 +1,97 @@
+import pytest
+
+from tools.build_physics_data import build_tables, readable_unit
+from tools.physics_data import PhysicsData, write_physics_data
+
+TABLES = {
+    "constants": {
+        "entries": {
+            "g": {"value": 9.80665, "uncertainty": 0.0, "unit": "m/s²", "description": "Standard gravity"},
+            "G": {"value": 6.6743e-11, "uncertainty": 1.5e-15, "unit": "m³/(kg⋅s²)",
+                  "description": "Newtonian constant of gravitation"},
+            "c": {"value": 299792458.0, "uncertainty": 0.0, "unit": "m/s", "description": "Speed of light in vacuum"},
+        },
+        "strings": ["unit", "description"],
+        "numbers": ["value", "uncertainty"],
+    },
+    "formulas": {
+        "entries": {
+            "kinetic energy": {"formula": "KE = ½mv²", "variables": {"m": "mass", "v": "velocity"},
+                               "description": "Energy of motion"},
+        },
+        "strings": ["formula", "variables", "description"],
+        "numbers": [],
+        "json": ["variables"],
+    },
+}
+
+@pytest.fixture
+def data(tmp_path):
+    path = tmp_path / "physics_data.bin"
+    size = write_physics_data(str(path), TABLES, source="test")
+    assert size == path.stat().st_size
+    return PhysicsData(str(path))
+
+def test_round_trip(data):
+    assert data.source == "test"
+    for name, table in TABLES.items():
+        assert list(data.tables[name]) == list(table["entries"])
+        assert dict(data.tables[name]) == table["entries"]
+
+def test_table_is_a_mapping(data):
+    constants = data.tables["constants"]
+    assert len(constants) == 3
+    assert "G" in constants and "x" not in constants and 1 not in constants
+    assert constants["c"]["value"] == 299792458.0
+    with pytest.raises(KeyError):
+        constants["C"]
+
+def test_json_fields_are_decoded(data):
+    assert data.tables["formulas"]["kinetic energy"]["variables"] == {"m": "mass", "v": "velocity"}
+
+def test_find(data):
+    constants = data.tables["constants"]
+    assert constants.find("g") == "g"
+    assert constants.find("C") is None
+    assert constants.find("C", ignore_case=True) == "c"
+    # Both "g" and "G" match; the one compiled first wins
+    assert constants.find("G", ignore_case=True) == "g"
+
+def test_other_files_are_refused(tmp_path):
+    path = tmp_path / "other.bin"
+    path.write_bytes(b"not physics data")
+    with pytest.raises(ValueError, match="not a compiled physics data file"):
+        PhysicsData(str(path))
+
+@pytest.mark.parametrize("unit, expected", [
+    ("m^3 kg^-1 s^-2", "m³/(kg⋅s²)"),
+    ("m s^-1", "m/s"),
+    ("J K^-1", "J/K"),
+    ("ohm", "Ω"),
+    ("s^-1", "1/s"),
+    ("", "dimensionless"),
+])
+def test_readable_unit(unit, expected):
+    assert readable_unit(unit) == expected
+
+def test_build_tables_puts_symbols_first():
+    codata = {
+        "electron mass": {"value": 9.1093837139e-31, "uncertainty": 2.8e-40, "unit": "kg"},
+        "speed of light in vacuum": {"value": 299792458.0, "uncertainty": 0.0, "unit": "m/s"},
+    }
+    library = {
+        "constants": [
+            {"symbol": "c", "codata": "speed of light in vacuum"},
+            {"symbol": "g", "value": 9.80665, "uncertainty": 0.0, "unit": "m/s²", "description": "Standard gravity"},
+        ],
+        "formulas": {},
+    }
+    constants = build_tables(codata, library)["constants"]["entries"]
+    assert list(constants) == ["c", "g", "electron mass"]
+    assert constants["c"]["description"] == "Speed of light in vacuum"
+    assert constants["electron mass"]["description"] == "Electron mass"
+
+def test_build_tables_rejects_unknown_codata_names():
+    library = {"constants": [{"symbol": "x", "codata": "missing"}], "formulas": {}}
+    with pytest.raises(ValueError, match="not in the CODATA table"):
+        build_tables({}, library)
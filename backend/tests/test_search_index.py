@@ -0,0 +1,68 @@
+import pytest
+
+from utils.search_index import SearchIndex, edit_distance, tokenize
+
+DOCUMENTS = {
+    "c": {"symbol": "c", "description": "speed of light in vacuum"},
+    "h": {"symbol": "h", "description": "Planck constant"},
+    "hbar": {"symbol": "hbar", "description": "reduced Planck constant"},
+    "molar Planck constant": {"symbol": "", "description": "molar Planck constant"},
+    "e": {"symbol": "e", "description": "elementary charge"},
+    "m_e": {"symbol": "m_e", "description": "electron mass"},
+}
+WEIGHTS = {"symbol": 4.0, "description": 2.0}
+
+@pytest.fixture
+def index():
+    return SearchIndex(DOCUMENTS, WEIGHTS)
+
+def keys(hits):
+    return [hit.key for hit in hits]
+
+def test_shorter_documents_rank_first(index):
+    assert keys(index.search("planck constant")) == ["h", "molar Planck constant", "hbar"]
+
+def test_documents_matching_more_words_rank_first(index):
+    hits = index.search("electron charge")
+    assert {hit.key for hit in hits} == {"m_e", "e"}
+    assert all(hit.matched == 1 for hit in hits)
+    assert index.search("electron mass")[0].matched == 2
+
+def test_boosts_raise_a_document(index):
+    boosted = SearchIndex(DOCUMENTS, WEIGHTS, boosts={"hbar": 3.0})
+    assert keys(boosted.search("planck constant"))[0] == "hbar"
+
+def test_prefixes_match(index):
+    assert keys(index.search("elec")) == ["m_e"]
+
+def test_typos_match_only_when_fuzzy(index):
+    assert keys(index.search("plank"))[0] == "h"
+    assert index.search("plank", fuzzy=False) == []
+
+def test_unindexed_fields_are_ignored():
+    index = SearchIndex(DOCUMENTS, {"symbol": 1.0})
+    assert index.search("planck") == []
+
+def test_complete_needs_every_word(index):
+    assert keys(index.complete("planck c")) == ["h", "molar Planck constant", "hbar"]
+    assert index.complete("planck x") == []
+    assert index.complete("") == []
+
+def test_complete_after_a_space_matches_the_whole_last_word(index):
+    assert index.complete("electron ") == index.search("electron")
+
+def test_suggest(index):
+    assert index.suggest("electon") == ["m_e"]
+
+def test_tokenize():
+    assert tokenize("Planck's m_e λ m³") == ["planck", "s", "m", "e", "λ", "m³"]
+
+@pytest.mark.parametrize("a, b, limit, expected", [
+    ("plank", "planck", 2, 1),
+    ("form", "from", 1, 1),
+    ("abc", "abc", 0, 0),
+    ("abc", "xyz", 1, None),
+    ("a", "abcd", 2, None),
+])
+def test_edit_distance(a, b, limit, expected):
+    assert edit_distance(a, b, limit) == expected
@@ -0,0 +1,87 @@
+import cache.similarity_cache as similarity_cache
+from cache.similarity_cache import NearDuplicateCache, normalize_query
+
+RESPONSE = {"text": "2x", "metadata": {}}
+
+def test_normalize_query_unifies_wording_and_numbers():
+    assert normalize_query("What's 1,000.50 × 2?") == normalize_query("what is 1000.5 * 2")
+
+def test_rephrased_query_hits():
+    cache = NearDuplicateCache()
+    cache.store("What's the derivative of x^2?", "math", RESPONSE)
+    match = cache.lookup("what is the derivative of x^2", "math")
+    assert match is not None
+    assert match["response"] == RESPONSE
+    assert match["similarity"] >= cache.threshold
+
+def test_numbers_must_match():
+    cache = NearDuplicateCache()
+    cache.store("What is 2 + 3", "math", RESPONSE)
+    assert cache.lookup("what's 2+3?", "math") is not None
+    assert cache.lookup("What is 2 + 4", "math") is None
+
+def test_content_words_must_match():
+    cache = NearDuplicateCache()
+    query = ("Why do most substances become denser as solids but water does not, "
+             "and why does ice not sink in their own liquid form when they melt")
+    cache.store(query, "tutor", RESPONSE)
+    assert cache.lookup(query.replace("melt", "freeze"), "tutor") is None
+    assert cache.lookup("what is the integral of x^2", "tutor") is None
+
+def test_agent_must_match():
+    cache = NearDuplicateCache()
+    cache.store("What is the derivative of x^2", "math", RESPONSE)
+    assert cache.lookup("What is the derivative of x^2", "tutor") is None
+
+def test_long_queries_are_skipped():
+    cache = NearDuplicateCache(max_query_chars=100)
+    query = "mean of " + " ".join(["1.5"] * 100)
+    cache.store(query, "math", RESPONSE)
+    assert cache.get_stats()["entries"] == 0
+    assert cache.lookup(query, "math") is None
+
+def test_stored_query_is_bounded():
+    cache = NearDuplicateCache()
+    query = "explain " + "very " * 100 + "long question"
+    cache.store(query, "tutor", RESPONSE)
+    match = cache.lookup(query, "tutor")
+    assert match is not None and len(match["query"]) < len(query)
+
+def test_evicts_by_entries_and_bytes():
+    by_count = NearDuplicateCache(max_entries=3)
+    by_bytes = NearDuplicateCache(max_bytes=20000)
+    for i in range(10):
+        by_count.store(f"explain topic number {i}", "tutor", RESPONSE)
+        by_bytes.store(f"explain topic number {i}", "tutor", {"text": "y" * 3000, "metadata": {}})
+    assert by_count.get_stats()["entries"] == 3
+    stats = by_bytes.get_stats()
+    assert stats["bytes"] <= stats["max_bytes"]
+    assert stats["evictions"] > 0
+    # The most recent answers are the ones kept
+    assert by_count.lookup("explain topic number 9", "tutor") is not None
+    assert by_count.lookup("explain topic number 0", "tutor") is None
+
+def test_expired_entries_miss():
+    cache = NearDuplicateCache(ttl=-1)
+    cache.store("What is the derivative of x^2", "math", RESPONSE)
+    assert cache.lookup("What is the derivative of x^2", "math") is None
+    assert cache.get_stats()["entries"] == 0
+
+class CountingDict(dict):
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.reads = 0
+
+    def get(self, *args):
+        self.reads += 1
+        return super().get(*args)
+
+def test_lookup_stops_at_the_candidate_cap(monkeypatch):
+    monkeypatch.setattr(similarity_cache, "_MAX_CANDIDATES", 1)
+    cache = NearDuplicateCache()
+    for verb in ("find", "compute", "calculate"):
+        cache.store(f"{verb} the derivative of x^2", "math", RESPONSE)
+    cache._buckets = CountingDict(cache._buckets)
+    cache.lookup("find the derivative of x^2", "math")
+    assert cache.candidates_checked == 1
+    assert cache._buckets.reads == 1
@@ -0,0 +1,106 @@
+import asyncio
+import statistics
+
+import numpy as np
+import pytest
+
+from agents import TutorAgent
+from agents.fast_answers import statistics_summary
+from agents.query_analyzer import get_query_analyzer
+from models import AgentRequest, AgentType
+from tools.statistics_tool import (RunningStatistics, StatisticsError, StatisticsTool, describe, histogram,
+                                   parse_dataset, regression)
+
+@pytest.mark.parametrize("data, expected", [
+    ("1, 2, 3\n4 5", [1, 2, 3, 4, 5]),
+    ([1, 2.5], [1, 2.5]),
+    ("1e3, -2.5E-1", [1000, -0.25]),
+])
+def test_parse_dataset(data, expected):
+    assert parse_dataset(data).tolist() == expected
+
+@pytest.mark.parametrize("data, message", [
+    ("a b", "numbers separated by commas"),
+    ("4, 8, 15, 16, 23 - 42", "numbers separated by commas"),
+    ([[1, 2]], "flat list"),
+    ("", "empty"),
+    ([float("nan")], "finite"),
+    ("1 inf", "finite"),
+])
+def test_parse_dataset_failures(data, message):
+    with pytest.raises(StatisticsError, match=message):
+        parse_dataset(data)
+
+def test_describe_matches_the_statistics_module():
+    values = [2, 4, 4, 4, 5, 5, 7, 9]
+    result = describe(parse_dataset(values), percentiles=[90])
+    assert result["mean"] == statistics.mean(values)
+    assert result["median"] == statistics.median(values)
+    assert result["modes"] == [4.0]
+    assert result["variance"] == pytest.approx(statistics.variance(values))
+    assert result["population_standard_deviation"] == pytest.approx(statistics.pstdev(values))
+    assert result["quartiles"] == [4.0, 4.5, 5.5]
+    assert result["percentiles"] == {"90": pytest.approx(np.percentile(values, 90))}
+
+def test_running_statistics_scale_huge_values():
+    running = RunningStatistics().update([1e300, 3e300])
+    assert (running.mean, running.total) == (2e300, 4e300)
+
+def test_merge_matches_one_pass():
+    left, right = np.arange(10.0), np.linspace(1e6, 2e6, 7)
+    merged = RunningStatistics().update(left).merge(RunningStatistics().update(right))
+    whole = np.concatenate([left, right])
+    assert merged.count == whole.size
+    assert merged.mean == pytest.approx(whole.mean(), rel=1e-12)
+    assert merged.variance == pytest.approx(whole.var(ddof=1), rel=1e-12)
+
+def test_statistics_beyond_the_float_range_are_refused():
+    result = asyncio.run(StatisticsTool().execute("describe", "1e308 1e308"))
+    assert not result.success
+    assert result.error_message == "The sum of the dataset is too large to represent"
+
+def test_histogram_uses_sturges_rule():
+    result = histogram(parse_dataset("1 2 2 3 3 3 4 4 4 4"))
+    assert result["bins"] == 5
+    assert result["counts"] == [1, 2, 0, 3, 4]
+    assert histogram(parse_dataset("1 2 3"), bins=2)["counts"] == [1, 2]
+
+def test_regression_matches_numpy():
+    x, y = parse_dataset("1 2 3 4"), parse_dataset("2 4 7 8")
+    result = regression(x, y)
+    slope, intercept = np.polyfit(x, y, 1)
+    assert result["slope"] == pytest.approx(slope)
+    assert result["intercept"] == pytest.approx(intercept)
+    assert result["r"] == pytest.approx(np.corrcoef(x, y)[0, 1])
+
+def test_regression_needs_paired_values():
+    tool = StatisticsTool()
+    assert asyncio.run(tool.execute("regression", "1 2 3")).error_message.startswith("Regression needs a y value")
+    assert not asyncio.run(tool.execute("regression", "1 2 3", "1 2")).success
+    assert not asyncio.run(tool.execute("median", "1 2 3")).success
+
+def test_datasets_with_exponents_are_recognised():
+    features = get_query_analyzer().analyze("mean of 1e3, 2e3, 5")
+    assert features.statistics["data"].tolist() == [1000, 2000, 5]
+    assert features.prompt_text == "mean of [pasted data]"
+
+def test_summary_marks_rounded_statistics():
+    summary = statistics_summary(describe(parse_dataset("1 2 2")))
+    assert "mean ≈ 1.66667" in summary
+    assert "median = 2" in summary
+
+@pytest.mark.parametrize("query", [
+    "Find the mean of 3, 5, 8, 13, 21",
+    "Explain what the standard deviation tells us about these test scores: 55, 67, 72, 81, 90, 94",
+])
+def test_datasets_are_routed_to_the_statistics_tool(query):
+    tutor = TutorAgent()
+    request = AgentRequest(query=query, allow_fast_path=False)
+    assert tutor._route(request, tutor._get_features(request)) == AgentType.MATH
+
+def test_model_sees_the_data_unless_it_was_summarised():
+    tutor = TutorAgent()
+    request = AgentRequest(query="mean of 3, 5, 8, 13, 21")
+    assert tutor._model_query(request) == request.query
+    summary = describe(parse_dataset("3, 5, 8, 13, 21"))
+    assert tutor._model_query(request, summary) == f"mean of [pasted data]\n\n[pasted data: {statistics_summary(summary)}]"
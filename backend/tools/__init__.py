@@ -2,11 +2,21 @@
 
 from .base_tool import BaseTool, ToolResult
 from .calculator_tool import CalculatorTool
+from .equation_solver_tool import EquationSolverTool
 from .physics_constants_tool import PhysicsConstantsTool
+from .plot_tool import PlotTool
+from .calculus_tool import CalculusTool
+from .linear_algebra_tool import LinearAlgebraTool
+from .statistics_tool import StatisticsTool
 
 __all__ = [
     "BaseTool",
     "ToolResult", 
     "CalculatorTool",
-    "PhysicsConstantsTool"
+    "EquationSolverTool",
+    "PhysicsConstantsTool",
+    "PlotTool",
+    "CalculusTool",
+    "LinearAlgebraTool",
+    "StatisticsTool"
 ] 
\ No newline at end of file
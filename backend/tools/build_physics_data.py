@@ -0,0 +1,122 @@
+"""
+Compile the physics constants and formula library into the binary data file.
+
+Usage (from the backend directory):
+    python -m tools.build_physics_data [--output tools/data/physics_data.bin]
+
+Reads the CODATA 2022 recommended values (tools/data/codata_2022.txt, NIST's
+fixed-width ASCII table) and tools/data/physics_library.json, which gives the
+short symbols of the common constants ("c", "hbar"), a few constants CODATA
+does not list, and the formulas. Every CODATA constant without a symbol is
+keyed by its CODATA name. Rerun after editing either source; the output
+replaces the old file atomically, so running servers are not disturbed.
+"""
+import argparse
+import json
+import os
+import re
+from typing import Any, Dict, List
+from .physics_data import PHYSICS_DATA_DIR, PHYSICS_DATA_PATH, write_physics_data
+
+CODATA_PATH = os.path.join(PHYSICS_DATA_DIR, "codata_2022.txt")
+LIBRARY_PATH = os.path.join(PHYSICS_DATA_DIR, "physics_library.json")
+
+# Column ranges of NIST's fixed-width table
+_NAME, _VALUE, _UNCERTAINTY = slice(0, 60), slice(60, 85), slice(85, 110)
+_UNIT_START = 110
+
+_POWER = re.compile(r"\^(-?\d+)")
+_SUPERSCRIPTS = str.maketrans("0123456789-", "⁰¹²³⁴⁵⁶⁷⁸⁹⁻")
+_UNIT_NAMES = {"ohm": "Ω"}
+
+def parse_codata(path: str) -> Dict[str, Dict[str, Any]]:
+    """CODATA name -> value, standard uncertainty (0 if exact) and unit, in table order"""
+    constants = {}
+    with open(path, encoding="utf-8") as file:
+        for line in file:
+            if not line.strip():
+                continue
+            uncertainty = line[_UNCERTAINTY].strip()
+            constants[line[_NAME].strip()] = {
+                "value": _number(line[_VALUE]),
+                "uncertainty": 0.0 if uncertainty == "(exact)" else _number(uncertainty),
+                "unit": readable_unit(line[_UNIT_START:].strip())
+            }
+    return constants
+
+def readable_unit(unit: str) -> str:
+    """CODATA unit notation in the tool's style: "m^3 kg^-1 s^-2" -> "m³/(kg⋅s²)" """
+    if not unit:
+        return "dimensionless"
+    if "/" in unit or "(" in unit:
+        return _POWER.sub(lambda match: match.group(1).translate(_SUPERSCRIPTS), unit)
+    numerator: List[str] = []
+    denominator: List[str] = []
+    for factor in unit.split():
+        base, _, power = factor.partition("^")
+        base = _UNIT_NAMES.get(base, base)
+        exponent = int(power or 1)
+        magnitude = "" if abs(exponent) == 1 else str(abs(exponent)).translate(_SUPERSCRIPTS)
+        (numerator if exponent > 0 else denominator).append(base + magnitude)
+    text = "⋅".join(numerator) or "1"
+    if len(denominator) == 1:
+        text += "/" + denominator[0]
+    elif denominator:
+        text += "/(" + "⋅".join(denominator) + ")"
+    return text
+
+def build_tables(codata: Dict[str, Dict[str, Any]], library: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """The constants and formulas tables to compile"""
+    constants: Dict[str, Dict[str, Any]] = {}
+    symbolised = set()
+    # Constants with symbols come first, in the library's order
+    for item in library["constants"]:
+        name = item.get("codata")
+        if name is not None:
+            if name not in codata:
+                raise ValueError(f"'{name}' (for {item['symbol']}) is not in the CODATA table")
+            symbolised.add(name)
+            entry = dict(codata[name], description=item.get("description", _sentence(name)))
+        else:
+            entry = {field: item[field] for field in ("value", "uncertainty", "unit", "description")}
+        constants[item["symbol"]] = entry
+    for name, data in codata.items():
+        if name not in symbolised:
+            constants[name] = dict(data, description=_sentence(name))
+    return {
+        "constants": {
+            "entries": constants,
+            "strings": ["unit", "description"],
+            "numbers": ["value", "uncertainty"]
+        },
+        "formulas": {
+            "entries": library["formulas"],
+            "strings": ["formula", "variables", "description"],
+            "numbers": [],
+            "json": ["variables"]
+        }
+    }
+
+def _number(text: str) -> float:
+    # "1.054 571 817... e-34": digit groups are spaced and "..." marks a truncated exact value
+    return float(text.replace(" ", "").replace("...", ""))
+
+def _sentence(name: str) -> str:
+    return name[:1].upper() + name[1:]
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compile the physics constants and formulas data file")
+    parser.add_argument("--codata", default=CODATA_PATH, help="NIST ASCII table of CODATA values")
+    parser.add_argument("--library", default=LIBRARY_PATH, help="JSON of constant symbols, extra constants and formulas")
+    parser.add_argument("--output", default=PHYSICS_DATA_PATH, help="Where to write the compiled file")
+    args = parser.parse_args()
+
+    with open(args.library, encoding="utf-8") as file:
+        library = json.load(file)
+    tables = build_tables(parse_codata(args.codata), library)
+    size = write_physics_data(args.output, tables, source="CODATA 2022")
+    print(f"Wrote {args.output}: {len(tables['constants']['entries'])} constants, "
+          f"{len(tables['formulas']['entries'])} formulas, {size // 1024} KiB")
+
+if __name__ == "__main__":
+    main()
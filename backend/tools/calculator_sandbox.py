@@ -0,0 +1,181 @@
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Optional
+from config import settings
+from .expression_engine import Number, get_expression_engine
+
+logger = logging.getLogger(__name__)
+
+_BITS_PER_DIGIT = 3.3219280948873626  # log2(10)
+
+class CalculationTimeoutError(TimeoutError):
+    """An isolated calculation that did not finish within the time limit"""
+
+class CalculatorSandbox:
+    """
+    Evaluates calculator expressions without letting one of them stall the event loop.
+
+    Cheap expressions (by the compiled cost estimate, which charges heavily
+    for big or variable exponents) are evaluated in-process, as before.
+    Anything else goes to a warm pool of worker processes, each with an
+    address-space cap, under a wall-clock timeout; a worker that runs over is
+    killed by restarting the pool. Exact integer results are limited in size
+    on both paths.
+    """
+
+    def __init__(self, workers: int = 2, timeout: float = 2.0, memory_mb: int = 512,
+                 max_result_digits: int = 4000, inline_max_cost: int = 200,
+                 inline_max_chars: int = 1000, isolated: bool = True):
+        self.workers = max(1, workers)
+        self.timeout = timeout
+        self.memory_mb = memory_mb
+        self.max_result_digits = max_result_digits
+        self.inline_max_cost = inline_max_cost
+        self.inline_max_chars = inline_max_chars
+        self.isolated = isolated
+        self.engine = get_expression_engine()
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+        # Metrics
+        self.inline_evaluations = 0
+        self.isolated_evaluations = 0
+        self.timeouts = 0
+        self.restarts = 0
+
+    @property
+    def pool(self) -> ProcessPoolExecutor:
+        """Worker pool, created on first use"""
+        if self._pool is None:
+            # Spawned workers start clean instead of inheriting the server's memory and threads
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(self.memory_mb,)
+            )
+        return self._pool
+
+    def warm(self) -> None:
+        """Start the worker processes ahead of the first expensive calculation"""
+        if self.isolated:
+            for _ in range(self.workers):
+                self.pool.submit(_ping)
+
+    async def evaluate(self, expression: str, bindings: Optional[Dict[str, Number]] = None) -> Number:
+        """
+        Evaluate an expression in-process if it is cheap, otherwise in a worker
+
+        Args:
+            expression: Cleaned calculator expression
+            bindings: Values for its variables
+
+        Returns:
+            The numeric result
+
+        Raises:
+            CalculationTimeoutError: The worker ran over the time limit
+            SyntaxError, ValueError, ArithmeticError: As for ExpressionEngine.evaluate
+        """
+        if not self.isolated or len(expression) <= self.inline_max_chars:
+            compiled = self.engine.compile(expression)
+            if not self.isolated or compiled.cost <= self.inline_max_cost:
+                self.inline_evaluations += 1
+                return check_result_size(compiled.evaluate(bindings), self.max_result_digits)
+        return await self._evaluate_isolated(expression, bindings)
+
+    async def _evaluate_isolated(self, expression: str, bindings: Optional[Dict[str, Number]]) -> Number:
+        self.isolated_evaluations += 1
+        loop = asyncio.get_running_loop()
+        for attempt in range(2):
+            pool = self.pool
+            try:
+                future = loop.run_in_executor(pool, _evaluate_in_worker, expression, bindings, self.max_result_digits)
+                return await asyncio.wait_for(future, self.timeout)
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                logger.warning(f"Calculation timed out after {self.timeout:g}s: {expression[:100]}")
+                self._restart(pool)
+                raise CalculationTimeoutError(f"Calculation took longer than {self.timeout:g}s")
+            except BrokenProcessPool:
+                # Another calculation's timeout killed the pool under this one; try once more
+                self._restart(pool)
+                if attempt:
+                    raise ValueError("Calculation worker failed")
+        raise AssertionError("unreachable")
+
+    def _restart(self, pool: ProcessPoolExecutor) -> None:
+        """Kill the workers of a pool (if it is still the current one) and warm a new one"""
+        if pool is not self._pool:
+            return
+        self._pool = None
+        self.restarts += 1
+        _terminate(pool)
+        self.warm()
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            _terminate(self._pool)
+            self._pool = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "isolated": self.isolated,
+            "workers": self.workers,
+            "inline_evaluations": self.inline_evaluations,
+            "isolated_evaluations": self.isolated_evaluations,
+            "timeouts": self.timeouts,
+            "restarts": self.restarts,
+            "compiled_cache": self.engine.get_cache_stats(),
+        }
+
+def check_result_size(result: Number, max_digits: int) -> Number:
+    """Refuse exact integers with more than max_digits digits"""
+    if isinstance(result, int) and result.bit_length() > max_digits * _BITS_PER_DIGIT:
+        raise ValueError(f"Result has more than {max_digits} digits")
+    return result
+
+def _terminate(pool: ProcessPoolExecutor) -> None:
+    # The executor can only wait for running tasks, so stop its processes directly
+    for process in list((pool._processes or {}).values()):
+        process.terminate()
+    pool.shutdown(wait=False, cancel_futures=True)
+
+# Worker process functions
+
+def _init_worker(memory_mb: int) -> None:
+    try:
+        import resource
+        limit = memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    except (ImportError, ValueError, OSError):
+        pass  # No address-space limits on this platform; the timeout still applies
+
+def _ping() -> None:
+    pass
+
+def _evaluate_in_worker(expression: str, bindings: Optional[Dict[str, Number]], max_digits: int) -> Number:
+    try:
+        return check_result_size(get_expression_engine().evaluate(expression, bindings), max_digits)
+    except MemoryError:
+        raise ValueError("Calculation needs more memory than allowed")
+
+# Global sandbox instance
+_calculator_sandbox = None
+
+def get_calculator_sandbox() -> CalculatorSandbox:
+    """Get or create the shared calculator sandbox"""
+    global _calculator_sandbox
+    if _calculator_sandbox is None:
+        _calculator_sandbox = CalculatorSandbox(
+            workers=settings.calculator_workers,
+            timeout=settings.calculator_timeout,
+            memory_mb=settings.calculator_memory_mb,
+            max_result_digits=settings.calculator_max_result_digits,
+            inline_max_cost=settings.calculator_inline_max_cost,
+            inline_max_chars=settings.calculator_inline_max_chars,
+            isolated=settings.calculator_isolation
+        )
+    return _calculator_sandbox
@@ -1,8 +1,8 @@
 import re
-import math
-import operator
-from typing import Union
+from typing import Dict, Optional, Union
 from .base_tool import BaseTool, ToolResult
+from .calculator_sandbox import CalculationTimeoutError, get_calculator_sandbox
+from .expression_engine import UnsafeExpressionError
 
 class CalculatorTool(BaseTool):
    #Calculator tool
@@ -13,35 +13,16 @@ class CalculatorTool(BaseTool):
             description="Performs safe mathematical calculations including basic arithmetic, trigonometry, and common math functions"
         )
         
-        # Safe operations mapping
-        self.safe_operators = {
-            '+': operator.add,
-            '-': operator.sub,
-            '*': operator.mul,
-            '/': operator.truediv,
-            '**': operator.pow,
-            '^': operator.pow,
-            'pow': pow,
-            'sqrt': math.sqrt,
-            'sin': math.sin,
-            'cos': math.cos,
-            'tan': math.tan,
-            'log': math.log,
-            'log10': math.log10,
-            'abs': abs,
-            'ceil': math.ceil,
-            'floor': math.floor,
-            'round': round,
-            'pi': math.pi,
-            'e': math.e
-        }
+        # Cheap expressions run in-process from the shared compiled cache, expensive ones in workers
+        self.sandbox = get_calculator_sandbox()
     
-    async def execute(self, expression: str) -> ToolResult:
+    async def execute(self, expression: str, variables: Optional[Dict[str, Union[int, float]]] = None) -> ToolResult:
         """
         Safely evaluate a mathematical expression
         
         Args:
             expression: Mathematical expression as string
+            variables: Values for any variables in the expression (e.g. {"x": 2})
             
         Returns:
             ToolResult with calculation result
@@ -50,15 +31,8 @@ class CalculatorTool(BaseTool):
             # Clean and validate the expression
             cleaned_expr = self._clean_expression(expression)
             
-            if not self._is_safe_expression(cleaned_expr):
-                return ToolResult(
-                    success=False,
-                    result=None,
-                    error_message="Expression contains unsafe operations"
-                )
-            
-            # Evaluate the expression
-            result = self._safe_eval(cleaned_expr)
+            # Compile once (or reuse the cached compiled form) and evaluate
+            result = await self.sandbox.evaluate(cleaned_expr, variables)
             
             return ToolResult(
                 success=True,
@@ -70,13 +44,25 @@ class CalculatorTool(BaseTool):
                 }
             )
             
+        except UnsafeExpressionError:
+            return ToolResult(
+                success=False,
+                result=None,
+                error_message="Expression contains unsafe operations"
+            )
+        except CalculationTimeoutError as e:
+            return ToolResult(
+                success=False,
+                result=None,
+                error_message=str(e)
+            )
         except ZeroDivisionError:
             return ToolResult(
                 success=False,
                 result=None,
                 error_message="Division by zero"
             )
-        except ValueError as e:
+        except (ValueError, OverflowError) as e:
             return ToolResult(
                 success=False,
                 result=None,
@@ -100,44 +86,3 @@ class CalculatorTool(BaseTool):
         cleaned = cleaned.replace('÷', '/')   # Division symbol
         
         return cleaned
-    
-    def _is_safe_expression(self, expression: str) -> bool:
-        """Check if expression contains only safe operations"""
-        # Allow only numbers, operators, parentheses, and safe function names
-        safe_pattern = r'^[0-9+\-*/().\s^a-z_]*$'
-        if not re.match(safe_pattern, expression, re.IGNORECASE):
-            return False
-        
-        # Check for dangerous keywords
-        dangerous_keywords = ['import', 'exec', 'eval', '__', 'open', 'file']
-        for keyword in dangerous_keywords:
-            if keyword in expression.lower():
-                return False
-        
-        return True
-    
-    def _safe_eval(self, expression: str) -> Union[int, float]:
-        """Safely evaluate mathematical expression using eval with restricted globals"""
-        # Create safe namespace with only math functions
-        safe_dict = {
-            "__builtins__": {},
-            "abs": abs,
-            "round": round,
-            "pow": pow,
-            "max": max,
-            "min": min,
-        }
-        
-        # Add math functions
-        for name in ['sin', 'cos', 'tan', 'sqrt', 'log', 'log10', 'ceil', 'floor', 'pi', 'e']:
-            if hasattr(math, name):
-                safe_dict[name] = getattr(math, name)
-        
-        # Evaluate with restricted namespace
-        result = eval(expression, safe_dict, {})
-        
-        # Ensure result is a number
-        if not isinstance(result, (int, float)):
-            raise ValueError("Result is not a number")
-        
-        return result 
\ No newline at end of file
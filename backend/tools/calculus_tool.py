@@ -0,0 +1,520 @@
+import asyncio
+import math
+import re
+from fractions import Fraction
+from functools import lru_cache
+from typing import Any, Callable, Dict, Optional, Tuple
+import numpy as np
+from .base_tool import BaseTool, ToolResult
+from .expression_engine import CompiledExpression, UnsafeExpressionError, compile_expression
+from .plot_tool import ARRAY_FUNCTIONS, PlotError, normalize_function
+
+Function = Callable[[np.ndarray], np.ndarray]
+
+# 15-point Gauss-Kronrod rule on [-1, 1] (QUADPACK qk15); the 7-point Gauss rule
+# it extends reuses every other node, so one evaluation gives both estimates
+_KRONROD_POSITIVE = [
+    0.991455371120812639206854697526329, 0.949107912342758524526189684047851,
+    0.864864423359769072789712788640926, 0.741531185599394439863864773280788,
+    0.586087235467691130294144845693013, 0.405845151377397166906606412076961,
+    0.207784955007898467600689403773245,
+]
+_KRONROD_POSITIVE_WEIGHTS = [
+    0.022935322010529224963732008058970, 0.063092092629978553290700663189204,
+    0.104790010322250183839876322541518, 0.140653259715525918745189590510238,
+    0.169004726639267902826583426598550, 0.190350578064785409913256402421014,
+    0.204432940075298892414161999234649,
+]
+_KRONROD_CENTER_WEIGHT = 0.209482141084727828012999174891714
+_GAUSS_POSITIVE_WEIGHTS = [0.129484966168869693270611432679082, 0.279705391489276667901467771423780,
+                           0.381830050505118944950369775488975]
+_GAUSS_CENTER_WEIGHT = 0.417959183673469387755102040816327
+
+_NODES = np.array([-x for x in _KRONROD_POSITIVE] + [0.0] + _KRONROD_POSITIVE[::-1])
+_KRONROD_WEIGHTS = np.array(_KRONROD_POSITIVE_WEIGHTS + [_KRONROD_CENTER_WEIGHT] + _KRONROD_POSITIVE_WEIGHTS[::-1])
+_GAUSS_WEIGHTS = np.zeros(15)
+_GAUSS_WEIGHTS[[1, 3, 5]] = _GAUSS_POSITIVE_WEIGHTS
+_GAUSS_WEIGHTS[[13, 11, 9]] = _GAUSS_POSITIVE_WEIGHTS
+_GAUSS_WEIGHTS[7] = _GAUSS_CENTER_WEIGHT
+
+# Central difference stencils (offsets in steps, weights) for each derivative order
+_STENCILS = {
+    1: (np.array([-1.0, 1.0]), np.array([-0.5, 0.5])),
+    2: (np.array([-1.0, 0.0, 1.0]), np.array([1.0, -2.0, 1.0])),
+    3: (np.array([-2.0, -1.0, 1.0, 2.0]), np.array([-0.5, 1.0, -1.0, 0.5])),
+    4: (np.array([-2.0, -1.0, 0.0, 1.0, 2.0]), np.array([1.0, -4.0, 6.0, -4.0, 1.0])),
+}
+# Functions without a complex derivative, which rule out the complex step
+_NON_ANALYTIC = re.compile(r"\b(?:abs|round|ceil|floor|max|min)\(")
+
+_INTEGRAL_TOLERANCE = 1e-10   # Relative
+_ABSOLUTE_TOLERANCE = 1e-13
+_INITIAL_INTERVALS = 8
+_MAX_INTERVALS = 20_000       # Intervals evaluated before giving up on convergence
+_ACCEPTED_ERROR = 1e-6        # Relative error still reported as an answer
+_COMPLEX_STEP = 1e-20
+_RIDDERS_STEPS = 10
+_RIDDERS_SHRINK = 1.4
+_LIMIT_STEPS = 11             # Steps halving from 0.5 for the extrapolated limit
+_LIMIT_TINY_STEPS = 15        # Steps 10^-1 ... 10^-15 for slow or infinite limits
+_MAX_DENOMINATOR = 1000       # Largest denominator recognised as an exact fraction
+
+class CalculusError(ValueError):
+    """A derivative, integral or limit that cannot be computed as asked"""
+
+class CalculusTool(BaseTool):
+   #Numerical calculus tool
+
+    def __init__(self):
+        super().__init__(
+            name="calculus",
+            description="Computes derivatives at a point, definite integrals and limits numerically, with error estimates"
+        )
+
+    async def execute(self, operation: str, expression: str, **options) -> ToolResult:
+        """
+        Compute a derivative, definite integral or limit
+
+        Args:
+            operation: "derivative", "integral" or "limit"
+            expression: Function of one variable, e.g. "x^2 sin(x)" or "f(x) = e^x / x"
+            **options: Arguments of derivative (point, order), integrate (lower,
+                       upper) or limit (point, direction), and variable
+
+        Returns:
+            ToolResult whose result is the dict described by that function
+        """
+        if operation not in _OPERATIONS:
+            return ToolResult(success=False, result=None, error_message=f"Unknown calculus operation '{operation}'")
+        try:
+            # Evaluations are vectorised but can still take milliseconds; keep them off the event loop
+            result = await asyncio.to_thread(_OPERATIONS[operation], expression, **options)
+            return ToolResult(
+                success=True,
+                result=result,
+                metadata={"operation": operation, "method": result["method"]}
+            )
+        except CalculusError as e:
+            return ToolResult(success=False, result=None, error_message=str(e))
+        except Exception as e:
+            return ToolResult(success=False, result=None, error_message=f"Calculus error: {str(e)}")
+
+def derivative(expression: str, point: float, variable: Optional[str] = None, order: int = 1) -> Dict[str, Any]:
+    """
+    Derivative of a function at a point
+
+    First derivatives of analytic functions use the complex step, exact to
+    rounding; otherwise (and for orders 2-4) central differences at shrinking
+    steps are extrapolated to step 0 (Ridders' method), all evaluated at once.
+
+    Returns:
+        "operation", "expression", "variable", "point", "order", "value",
+        "error" (estimate), "exact" (a fraction such as "3/4", or None) and "method"
+    """
+    compiled, variable = _function(expression, variable)
+    f = _real(compiled, variable)
+    x0 = _finite(point, "point")
+    order = int(order)
+    if order not in _STENCILS:
+        raise CalculusError("Only derivatives of order 1 to 4 can be computed")
+    if not np.isfinite(f(np.array([x0]))[0]):
+        raise CalculusError(f"{expression.strip()} is not defined at {variable} = {_show(x0)}")
+
+    value, error = _ridders(f, x0, order)
+    method = "central differences with Richardson extrapolation"
+    if order == 1:
+        _check_one_sided(f, x0, value, variable)
+        if not _NON_ANALYTIC.search(compiled.source):
+            # Exact to rounding, but only where the function is analytic; the
+            # difference estimate guards against branch points such as sqrt at 0
+            step = _evaluate(compiled, variable, np.array([x0 + _COMPLEX_STEP * 1j]))[0]
+            complex_value = step.imag / _COMPLEX_STEP
+            if np.isfinite(complex_value) and abs(complex_value - value) <= max(100 * error, 1e-6 * abs(value)):
+                value, error, method = float(complex_value), 4e-16 * max(abs(float(complex_value)), 1e-300), "complex step"
+    if not error <= _ACCEPTED_ERROR * max(1.0, abs(value)):
+        raise CalculusError(f"The derivative of {expression.strip()} at {variable} = {_show(x0)} does not settle; "
+                            f"the function may not be differentiable there")
+    value, exact = _settle(value, error)
+    return {
+        "operation": "derivative",
+        "expression": expression.strip(),
+        "variable": variable,
+        "point": x0,
+        "order": order,
+        "value": value,
+        "error": error,
+        "exact": exact,
+        "method": method,
+    }
+
+def integrate(expression: str, lower: float, upper: float, variable: Optional[str] = None,
+              tolerance: float = _INTEGRAL_TOLERANCE) -> Dict[str, Any]:
+    """
+    Definite integral by adaptive Gauss-Kronrod quadrature
+
+    Each round evaluates the 15-point rule on every unfinished interval in one
+    vectorised call and bisects the intervals whose error (Kronrod vs Gauss)
+    is above their share of the tolerance. Infinite bounds are mapped to a
+    finite interval first.
+
+    Returns:
+        "operation", "expression", "variable", "lower", "upper", "value",
+        "error" (estimate), "exact", "intervals" (evaluated) and "method"
+    """
+    compiled, variable = _function(expression, variable)
+    f = _real(compiled, variable)
+    a, b = _bound(lower, "lower"), _bound(upper, "upper")
+    sign = 1.0
+    if a > b:
+        a, b, sign = b, a, -1.0
+    if a == b:
+        value, error, intervals = 0.0, 0.0, 0
+    else:
+        g, (ta, tb) = _finite_interval(f, a, b)
+        value, error, intervals = _adaptive_quadrature(g, ta, tb, tolerance)
+        if not (np.isfinite(value) and np.isfinite(error)):
+            raise CalculusError(f"{expression.strip()} is undefined or infinite somewhere between "
+                                f"{_show(a)} and {_show(b)}, so the integral does not exist")
+        if error > _ACCEPTED_ERROR * max(1.0, abs(value)):
+            raise CalculusError(f"The integral of {expression.strip()} from {_show(a)} to {_show(b)} "
+                                f"does not converge (it may diverge)")
+    value, exact = _settle(sign * value, error)
+    return {
+        "operation": "integral",
+        "expression": expression.strip(),
+        "variable": variable,
+        "lower": _json_number(float(lower)),
+        "upper": _json_number(float(upper)),
+        "value": value,
+        "error": error,
+        "exact": exact,
+        "intervals": intervals,
+        "method": "adaptive Gauss-Kronrod quadrature (G7/K15)",
+    }
+
+def limit(expression: str, point: float, variable: Optional[str] = None,
+          direction: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Limit of a function at a point (or ±infinity), from one side or both
+
+    Each side is evaluated at steps halving towards the point and the values
+    extrapolated to step 0; limits approached slowly, infinite limits and
+    oscillation are told apart from values at steps down to 1e-15.
+
+    Args:
+        direction: "left", "right" or None for two-sided
+
+    Returns:
+        "operation", "expression", "variable", "point", "direction", "exists",
+        "value" (a number, "inf" or "-inf", or None), "left" and "right"
+        (one-sided values, same form), "error", "exact" and "method"
+    """
+    compiled, variable = _function(expression, variable)
+    f = _real(compiled, variable)
+    a = float(point)
+    if math.isnan(a):
+        raise CalculusError("The limit point must be a number or infinity")
+    if direction not in (None, "left", "right"):
+        raise CalculusError("The direction of a limit must be 'left' or 'right'")
+    if math.isinf(a):
+        # x -> ±inf is t -> 0 with x = ±1/t
+        sides = {"left" if a > 0 else "right": lambda h: f(math.copysign(1.0, a) / h)}
+        direction = None
+    else:
+        scale = max(1.0, abs(a))
+        sides = {
+            side: (lambda h, sign=sign: f(a + sign * scale * h))
+            for side, sign in (("left", -1.0), ("right", 1.0)) if direction in (None, side)
+        }
+    found = {side: _one_sided_limit(g) for side, g in sides.items()}
+
+    defined = {side: outcome for side, outcome in found.items() if outcome[0] != "undefined"}
+    if not defined:
+        raise CalculusError(f"{expression.strip()} is not defined near {variable} = {_show(a)}")
+    if len(found) == 2 and len(defined) == 1:
+        direction = next(iter(defined))  # sqrt(x) at 0: only one side exists
+    outcomes = list(defined.values())
+    value, error, exists = None, 0.0, all(kind in ("value", "infinite") for kind, _, _ in outcomes)
+    if exists and len(outcomes) == 2:
+        (left_kind, left, left_error), (right_kind, right, right_error) = outcomes
+        tolerance = 10 * max(left_error, right_error, 1e-9 * max(1.0, abs(left)))
+        exists = left_kind == right_kind and (left == right or (left_kind == "value" and abs(left - right) <= tolerance))
+    if exists:
+        value = outcomes[0][1] if len(outcomes) == 1 else (outcomes[0][1] + outcomes[1][1]) / 2
+        error = max(outcome[2] for outcome in outcomes)
+    exact = None
+    if value is not None and np.isfinite(value):
+        value, exact = _settle(value, error)
+    one_sided = {side: _json_number(_settle(outcome[1], outcome[2])[0]) if outcome[0] in ("value", "infinite") else None
+                 for side, outcome in found.items()}
+    return {
+        "operation": "limit",
+        "expression": expression.strip(),
+        "variable": variable,
+        "point": _json_number(a),
+        "direction": direction,
+        "exists": exists,
+        "value": _json_number(value) if value is not None else None,
+        "left": one_sided.get("left"),
+        "right": one_sided.get("right"),
+        "error": error,
+        "exact": exact,
+        "method": "Richardson extrapolation of function values approaching the point",
+    }
+
+_OPERATIONS: Dict[str, Callable[..., Dict[str, Any]]] = {
+    "derivative": derivative,
+    "integral": integrate,
+    "limit": limit,
+}
+
+@lru_cache(maxsize=256)
+def _compile(expression: str) -> CompiledExpression:
+    try:
+        return compile_expression(normalize_function(expression), ARRAY_FUNCTIONS)
+    except SyntaxError:
+        raise CalculusError(f"'{expression.strip()}' is not a valid function")
+    except (PlotError, UnsafeExpressionError) as e:
+        raise CalculusError(str(e))
+
+def _function(expression: str, variable: Optional[str]) -> Tuple[CompiledExpression, str]:
+    """The compiled function and its variable (x for a constant function)"""
+    compiled = _compile(expression)
+    names = sorted(compiled.variables)
+    if variable is None:
+        if len(names) > 1:
+            raise CalculusError(f"{expression.strip()} has several variables ({', '.join(names)}); say which one to use")
+        variable = names[0] if names else "x"
+    elif any(name != variable for name in names):
+        others = [name for name in names if name != variable]
+        raise CalculusError(f"{expression.strip()} depends on {', '.join(others)} as well as {variable}")
+    return compiled, variable
+
+def _evaluate(compiled: CompiledExpression, variable: str, x: np.ndarray) -> np.ndarray:
+    with np.errstate(all="ignore"):
+        try:
+            values = compiled.evaluate_vectorized({variable: x})
+            return np.broadcast_to(np.asarray(values, dtype=np.result_type(x, np.float64)), x.shape)
+        except (ValueError, TypeError, ArithmeticError) as e:
+            raise CalculusError(f"Cannot evaluate '{compiled.source}': {e}")
+
+def _real(compiled: CompiledExpression, variable: str) -> Function:
+    return lambda x: _evaluate(compiled, variable, np.asarray(x, dtype=np.float64))
+
+def _finite(value: float, name: str) -> float:
+    value = float(value)
+    if not np.isfinite(value):
+        raise CalculusError(f"The {name} must be a finite number")
+    return value
+
+def _bound(value: float, name: str) -> float:
+    value = float(value)
+    if math.isnan(value):
+        raise CalculusError(f"The {name} bound must be a number or infinity")
+    return value
+
+# Derivatives
+
+def _ridders(f: Function, x0: float, order: int) -> Tuple[float, float]:
+    """
+    Extrapolated central difference and its error estimate; the first step is
+    made smaller until the estimate settles, for functions that change on a
+    finer scale than the point (1/x near 0)
+    """
+    best, error = math.nan, math.inf
+    step = 0.1 * max(1.0, abs(x0))
+    defined = False
+    for _ in range(6):
+        estimate, estimate_error = _ridders_from(f, x0, order, step)
+        step /= 10
+        if estimate_error is None:
+            continue  # A pole or the edge of the domain is within reach of the steps
+        defined = True
+        if estimate_error < error:
+            best, error = estimate, estimate_error
+        if error <= 1e-10 * max(1.0, abs(best)):
+            break
+    if not defined:
+        raise CalculusError(f"The function is not defined on both sides of {_show(x0)}")
+    return best, error
+
+def _ridders_from(f: Function, x0: float, order: int, step: float) -> Tuple[float, Optional[float]]:
+    offsets, weights = _STENCILS[order]
+    steps = step / _RIDDERS_SHRINK ** np.arange(_RIDDERS_STEPS)
+    values = f(x0 + steps[:, None] * offsets)
+    if not np.isfinite(values).all():
+        return math.nan, None
+    estimates = (values @ weights) / steps ** order
+
+    best, error, best_step = estimates[0], math.inf, steps[0]
+    previous = [estimates[0]]
+    shrink = _RIDDERS_SHRINK ** 2
+    for i in range(1, _RIDDERS_STEPS):
+        row = [estimates[i]]
+        factor = shrink
+        for j in range(1, i + 1):
+            row.append((row[j - 1] * factor - previous[j - 1]) / (factor - 1))
+            factor *= shrink
+            estimate_error = max(abs(row[j] - row[j - 1]), abs(row[j] - previous[j - 1]))
+            if estimate_error <= error:
+                best, error, best_step = row[j], estimate_error, steps[i]
+        if abs(row[i] - previous[i - 1]) >= 2 * error:
+            break  # Higher orders are only amplifying rounding error
+        previous = row
+    # Estimates can agree exactly by rounding alone; the error is never below rounding
+    noise = 10 * np.finfo(float).eps * np.max(np.abs(values)) / best_step ** order
+    return float(best), float(max(error, noise))
+
+def _check_one_sided(f: Function, x0: float, value: float, variable: str) -> None:
+    """
+    Refuse corners such as abs(x) at 0, where the central difference averages
+    two different one-sided slopes: there the gap between forward and backward
+    differences does not shrink with the step
+    """
+    scale = max(1.0, abs(x0))
+    steps = np.array([1e-5, 1e-6]) * scale
+    y0 = f(np.array([x0]))[0]
+    forward = (f(x0 + steps) - y0) / steps
+    backward = (y0 - f(x0 - steps)) / steps
+    gaps = np.abs(forward - backward)
+    noise = 1e3 * np.finfo(float).eps * max(abs(y0), 1e-300) / steps[1]
+    if gaps[1] > 0.5 * gaps[0] and gaps[1] > max(1e-6 * max(1.0, abs(value)), noise):
+        raise CalculusError(f"The function is not differentiable at {variable} = {_show(x0)} "
+                            f"(slope {_show(backward[1])} from the left, {_show(forward[1])} from the right)")
+
+# Integrals
+
+def _finite_interval(f: Function, a: float, b: float) -> Tuple[Function, Tuple[float, float]]:
+    """The integrand and bounds after mapping infinite bounds onto a finite interval"""
+    if np.isfinite(a) and np.isfinite(b):
+        return f, (a, b)
+
+    def weighted(values: np.ndarray, jacobian: np.ndarray) -> np.ndarray:
+        # f vanishing far out times a huge Jacobian is 0, not NaN
+        with np.errstate(all="ignore"):
+            return np.where(values == 0, 0.0, values * jacobian)
+
+    if np.isfinite(a):
+        return (lambda t: weighted(f(a + t / (1 - t)), 1 / (1 - t) ** 2)), (0.0, 1.0)
+    if np.isfinite(b):
+        return (lambda t: weighted(f(b - (1 - t) / t), 1 / t ** 2)), (0.0, 1.0)
+    return (lambda t: weighted(f(t / (1 - t ** 2)), (1 + t ** 2) / (1 - t ** 2) ** 2)), (-1.0, 1.0)
+
+def _adaptive_quadrature(g: Function, a: float, b: float, tolerance: float) -> Tuple[float, float, int]:
+    """Integral, error estimate and number of intervals evaluated"""
+    edges = np.linspace(a, b, _INITIAL_INTERVALS + 1)
+    lows, highs = edges[:-1], edges[1:]
+    done_value, done_error, evaluated = 0.0, 0.0, 0
+    min_width = 1e-14 * (b - a)
+    while len(lows):
+        centers, halves = (lows + highs) / 2, (highs - lows) / 2
+        values = g(centers[:, None] + halves[:, None] * _NODES)
+        evaluated += len(lows)
+        kronrod = halves * (values @ _KRONROD_WEIGHTS)
+        errors = np.abs(kronrod - halves * (values @ _GAUSS_WEIGHTS))
+        errors[~np.isfinite(kronrod)] = math.inf
+
+        # Each interval may use its share (by width) of the tolerance on the current estimate
+        estimate = done_value + float(np.sum(kronrod[np.isfinite(kronrod)]))
+        allowed = max(tolerance * abs(estimate), _ABSOLUTE_TOLERANCE) * (highs - lows) / (b - a)
+        finished = (errors <= allowed) | (halves < min_width) | (evaluated + 2 * len(lows) > _MAX_INTERVALS)
+        done_value += float(np.sum(kronrod[finished]))
+        done_error += float(np.sum(errors[finished]))
+        lows, highs, centers = lows[~finished], highs[~finished], centers[~finished]
+        lows, highs = np.concatenate([lows, centers]), np.concatenate([centers, highs])
+    return done_value, done_error, evaluated
+
+# Limits
+
+def _one_sided_limit(g: Callable[[np.ndarray], np.ndarray]) -> Tuple[str, Optional[float], float]:
+    """
+    Limit of g(h) as h -> 0+: ("value", limit, error), ("infinite", ±inf, 0),
+    ("undefined", None, 0) when g is undefined near 0, or ("none", None, 0)
+    when it has no limit (oscillates)
+    """
+    steps = 0.5 ** np.arange(1, _LIMIT_STEPS + 1)
+    tiny = 10.0 ** -np.arange(1, _LIMIT_TINY_STEPS + 1)
+    values = g(np.concatenate([steps, tiny]))
+    values, tiny_values = values[:_LIMIT_STEPS], values[_LIMIT_STEPS:]
+    if np.isnan(tiny_values[-3:]).all():
+        return "undefined", None, 0.0
+
+    # Extrapolate the finite run of values nearest the point
+    finite = np.isfinite(values)
+    run = values if finite.all() else values[len(values) - int(np.argmin(finite[::-1])):]
+    if len(run) >= 3:
+        best, error = _richardson(run)
+        # The extrapolation must also fit the trend of the closest values, or a
+        # coincidence among the far ones (x log x at 1/2 and 1/4) passes for convergence
+        trend = abs(run[-1] - run[-2])
+        if error <= 1e-7 * max(1.0, abs(best)) and abs(best - run[-1]) <= 10 * trend + error:
+            return "value", best, error
+
+    # Slow convergence (x log x at 0): successive values settling down
+    tail = tiny_values[-6:]
+    if np.isfinite(tail).all():
+        differences = np.abs(np.diff(tail))
+        if np.all(differences[1:] <= differences[:-1] + 1e-300) and differences[-1] <= 1e-6 * max(1.0, abs(tail[-1])):
+            return "value", float(tail[-1]), float(differences[-1])
+
+    # Infinite: growing without bound in one direction, or overflowing
+    tail = tiny_values[-8:]
+    signs = np.sign(tail[np.isfinite(tail) | np.isinf(tail)])
+    if np.isinf(tail[-1]) and np.all(signs[-3:] == np.sign(tail[-1])):
+        return "infinite", float(tail[-1]), 0.0
+    if np.isfinite(tail).all():
+        steps_taken = np.diff(tail)
+        if (np.all(np.sign(steps_taken) == np.sign(steps_taken[-1])) and steps_taken[-1] != 0
+                and np.all(np.abs(steps_taken[1:]) >= 0.5 * np.abs(steps_taken[:-1]))):
+            return "infinite", math.copysign(math.inf, steps_taken[-1]), 0.0
+    return "none", None, 0.0
+
+def _richardson(values: np.ndarray) -> Tuple[float, float]:
+    """Extrapolate values at steps halving each time to step 0, with an error estimate"""
+    best, error = float(values[-1]), math.inf
+    previous = [values[0]]
+    for i in range(1, len(values)):
+        row = [values[i]]
+        factor = 2.0
+        for j in range(1, i + 1):
+            row.append(row[j - 1] + (row[j - 1] - previous[j - 1]) / (factor - 1))
+            factor *= 2.0
+            estimate_error = max(abs(row[j] - row[j - 1]), abs(row[j] - previous[j - 1]))
+            if estimate_error <= error:
+                best, error = row[j], estimate_error
+        if abs(row[i] - previous[i - 1]) >= 2 * error:
+            break
+        previous = row
+    return float(best), float(error)
+
+# Results
+
+def _settle(value: float, error: float) -> Tuple[float, Optional[str]]:
+    """
+    Round a value to the digits its error estimate supports, and recognise
+    a simple fraction it agrees with ("1/3"); None when there is none
+    """
+    if not np.isfinite(value):
+        return float(value), None
+    tolerance = max(error, 4e-16 * abs(value))
+    if abs(value) <= tolerance:
+        return 0.0, "0"
+    digits = int(min(15, max(1, math.floor(-math.log10(tolerance / abs(value))))))
+    rounded = float(f"{value:.{digits}g}")
+    if tolerance > _ACCEPTED_ERROR * max(1.0, abs(value)):
+        return rounded, None
+    fraction = Fraction(value).limit_denominator(_MAX_DENOMINATOR)
+    if abs(float(fraction) - value) <= max(10 * tolerance, 1e-9 * max(1.0, abs(value))):
+        return float(fraction), str(fraction)
+    return rounded, None
+
+def _json_number(value: float) -> Any:
+    """Infinities as "inf"/"-inf", which JSON cannot hold as numbers"""
+    if math.isinf(value):
+        return "inf" if value > 0 else "-inf"
+    return value
+
+def _show(value: float) -> str:
+    if math.isinf(value):
+        return "∞" if value > 0 else "-∞"
+    return f"{value:.12g}"
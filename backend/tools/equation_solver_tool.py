@@ -0,0 +1,433 @@
+import math
+import re
+from fractions import Fraction
+from typing import Dict, List, Optional, Tuple, Union
+from .base_tool import BaseTool, ToolResult
+
+# A monomial is a sorted tuple of (variable, exponent); () is the constant term
+Monomial = Tuple[Tuple[str, int], ...]
+Polynomial = Dict[Monomial, Fraction]
+
+_TOKEN = re.compile(r"\s*(?:(\d+(?:\.\d+)?|\.\d+)|([A-Za-z]+)|(\*\*|[-+*/^()=²³]))")
+_SUPERSCRIPTS = {"²": 2, "³": 3}
+_MAX_EXPONENT = 8
+_MAX_DEGREE = 2
+_MAX_EQUATIONS = 6
+
+class EquationError(ValueError):
+    """An equation that cannot be parsed or is outside what the solver handles"""
+
+class EquationSolverTool(BaseTool):
+   #Exact equation solver
+
+    def __init__(self):
+        super().__init__(
+            name="equation_solver",
+            description="Solves linear and quadratic equations in one variable and systems of linear equations exactly, with working"
+        )
+
+    async def execute(self, equations: Union[str, List[str]]) -> ToolResult:
+        """
+        Solve one equation or a system of equations
+
+        Args:
+            equations: Equation such as "2x + 5 = 15", or a list of equations
+                       (a string may separate them with ";")
+
+        Returns:
+            ToolResult whose result holds the kind of problem, the variables,
+            the exact solutions as strings, decimal approximations and the steps
+        """
+        if isinstance(equations, str):
+            equations = [part for part in equations.split(";") if part.strip()]
+        try:
+            if not equations:
+                raise EquationError("No equation given")
+            if len(equations) > _MAX_EQUATIONS:
+                raise EquationError(f"At most {_MAX_EQUATIONS} equations can be solved together")
+            polynomials = [parse_equation(equation) for equation in equations]
+            result = solve(polynomials, [equation.strip() for equation in equations])
+            return ToolResult(
+                success=True,
+                result=result,
+                metadata={"equations": list(equations), "kind": result["kind"]}
+            )
+        except ZeroDivisionError:
+            return ToolResult(success=False, result=None, error_message="Division by zero")
+        except EquationError as e:
+            return ToolResult(success=False, result=None, error_message=str(e))
+        except Exception as e:
+            return ToolResult(success=False, result=None, error_message=f"Solver error: {str(e)}")
+
+def parse_equation(equation: str) -> Polynomial:
+    """
+    Parse "lhs = rhs" into the polynomial lhs - rhs with exact coefficients
+
+    Args:
+        equation: Equation in one or more single-letter variables
+
+    Returns:
+        Monomial -> coefficient, without zero terms (only a constant when the
+        unknowns cancel, as in "x = x + 1")
+    """
+    lhs, rhs = _sides(equation)
+    if not any(monomial for side in (lhs, rhs) for monomial in side):
+        raise EquationError(f"'{equation.strip()}' has no unknowns")
+    return _subtract(lhs, rhs)
+
+def _sides(equation: str) -> Tuple[Polynomial, Polynomial]:
+    sides = equation.replace("×", "*").replace("÷", "/").replace("−", "-").split("=")
+    if len(sides) != 2 or not sides[0].strip() or not sides[1].strip():
+        raise EquationError(f"'{equation.strip()}' is not an equation of the form lhs = rhs")
+    return _Parser(sides[0]).parse(), _Parser(sides[1]).parse()
+
+def solve(polynomials: List[Polynomial], equations: List[str]) -> Dict[str, object]:
+    """Solve parsed equations, choosing the method from their shape"""
+    variables = sorted({var for polynomial in polynomials for monomial in polynomial for var, _ in monomial})
+    if not variables:
+        return _solve_cancelled(polynomials, equations)
+    degree = max(_degree(monomial) for polynomial in polynomials for monomial in polynomial)
+    if degree > _MAX_DEGREE:
+        raise EquationError("Only linear and quadratic equations can be solved exactly")
+
+    if len(polynomials) == 1 and len(variables) == 1:
+        if degree == 1:
+            return _solve_linear(polynomials[0], variables[0], equations[0])
+        return _solve_quadratic(polynomials[0], variables[0], equations[0])
+    if degree > 1:
+        raise EquationError("Only systems of linear equations can be solved")
+    if len(polynomials) < len(variables):
+        raise EquationError(f"{len(variables)} unknowns need at least {len(variables)} equations")
+    return _solve_system(polynomials, variables, equations)
+
+def _solve_cancelled(polynomials: List[Polynomial], equations: List[str]) -> Dict[str, object]:
+    """Equations whose unknowns all cancel: each is now always or never true"""
+    kind = "linear" if len(equations) == 1 else "system"
+    steps = [equations[0]] if kind == "linear" else [f"({i}) {equation}" for i, equation in enumerate(equations, 1)]
+    written: List[str] = []
+    for i, (polynomial, equation) in enumerate(zip(polynomials, equations), 1):
+        names = sorted({var for side in _sides(equation) for monomial in side for var, _ in monomial})
+        written += [name for name in names if name not in written]
+        cancel = f"the {', '.join(names)} terms cancel, leaving 0 = {format_fraction(-polynomial.get((), Fraction(0)))}"
+        steps.append(cancel[:1].upper() + cancel[1:] if kind == "linear" else f"In ({i}), {cancel}")
+    variables = sorted(written)
+    if any(polynomials):
+        steps.append("That is never true, so there is no solution")
+        return _result(kind, variables, [], steps, status="no_solution")
+    steps.append(f"That is always true, so every value of {', '.join(variables)} is a solution")
+    return _result(kind, variables, [], steps, status="infinite_solutions")
+
+def _solve_linear(polynomial: Polynomial, var: str, equation: str) -> Dict[str, object]:
+    a = polynomial.get(((var, 1),), Fraction(0))
+    b = polynomial.get((), Fraction(0))
+    steps = [equation]
+    collected = f"{format_polynomial({((var, 1),): a})} = {format_fraction(-b)}"
+    if collected.replace(" ", "") != equation.replace(" ", ""):
+        steps.append(f"Collect {var} terms on the left and numbers on the right: {collected}")
+    value = -b / a
+    if a != 1:
+        steps.append(f"Divide both sides by {format_fraction(a)}: {var} = {format_fraction(value)}")
+    return _result("linear", [var], [{var: value}], steps)
+
+def _solve_quadratic(polynomial: Polynomial, var: str, equation: str) -> Dict[str, object]:
+    a = polynomial.get(((var, 2),), Fraction(0))
+    b = polynomial.get(((var, 1),), Fraction(0))
+    c = polynomial.get((), Fraction(0))
+    standard = f"{format_polynomial(polynomial)} = 0"
+    steps = [equation] if standard.replace(" ", "") == equation.replace(" ", "") else [
+        equation, f"Rearrange to standard form: {standard}"]
+    steps.append(f"a = {format_fraction(a)}, b = {format_fraction(b)}, c = {format_fraction(c)}")
+    discriminant = b * b - 4 * a * c
+    steps.append(f"Discriminant b² − 4ac = {format_fraction(discriminant)}")
+
+    vertex = -b / (2 * a)
+    root = _rational_sqrt(abs(discriminant))
+    if discriminant == 0:
+        steps.append(f"One repeated root: {var} = −b / 2a = {format_fraction(vertex)}")
+        return _result("quadratic", [var], [{var: vertex}], steps)
+    if root is not None and discriminant > 0:
+        first, second = vertex + root / (2 * a), vertex - root / (2 * a)
+        steps.append(f"{var} = ({format_fraction(-b)} ± {format_fraction(root)}) / {format_fraction(2 * a)}")
+        steps.append(f"{var} = {format_fraction(first)} or {var} = {format_fraction(second)}")
+        return _result("quadratic", [var], [{var: first}, {var: second}], steps)
+
+    # Irrational or complex roots: exact surd form plus decimals
+    coefficient, radicand = _simplify_surd(abs(discriminant))
+    scale = coefficient / abs(2 * a)
+    surd = _format_surd(scale, radicand, imaginary=discriminant < 0)
+    center = format_fraction(vertex) + " " if vertex else ""
+    exact = [f"{center}+ {surd}" if center else surd, f"{center}− {surd}" if center else f"−{surd}"]
+    steps.append(f"{var} = {center}± {surd}" if center else f"{var} = ±{surd}")
+    if discriminant < 0:
+        steps.append("The discriminant is negative, so there are no real solutions")
+        result = _result("quadratic", [var], [], steps, status="no_real_solution")
+        result["complex_roots"] = [{var: value} for value in exact]
+        return result
+
+    spread = float(scale) * math.sqrt(radicand)
+    approximate = [{var: float(vertex) + spread}, {var: float(vertex) - spread}]
+    return _result("quadratic", [var], approximate, steps, exact=[{var: value} for value in exact])
+
+def _solve_system(polynomials: List[Polynomial], variables: List[str], equations: List[str]) -> Dict[str, object]:
+    """Gauss-Jordan elimination on the augmented matrix, exact throughout"""
+    rows = [[polynomial.get(((var, 1),), Fraction(0)) for var in variables] + [-polynomial.get((), Fraction(0))]
+            for polynomial in polynomials]
+    steps = [f"({i}) {equation}" for i, equation in enumerate(equations, 1)]
+    labels = [str(i) for i in range(1, len(rows) + 1)]
+
+    pivot_row = 0
+    pivots = []
+    for col, var in enumerate(variables):
+        pivot = next((r for r in range(pivot_row, len(rows)) if rows[r][col] != 0), None)
+        if pivot is None:
+            continue
+        rows[pivot_row], rows[pivot] = rows[pivot], rows[pivot_row]
+        labels[pivot_row], labels[pivot] = labels[pivot], labels[pivot_row]
+        for r in range(len(rows)):
+            factor = rows[r][col] / rows[pivot_row][col]
+            if r == pivot_row or factor == 0:
+                continue
+            rows[r] = [x - factor * y for x, y in zip(rows[r], rows[pivot_row])]
+            steps.append(f"Eliminate {var} from ({labels[r]}) using ({labels[pivot_row]}): "
+                         f"{_format_row(rows[r], variables)}")
+        pivots.append(col)
+        pivot_row += 1
+
+    if any(all(x == 0 for x in row[:-1]) and row[-1] != 0 for row in rows):
+        steps.append("The equations contradict each other, so there is no solution")
+        return _result("system", variables, [], steps, status="no_solution")
+    if len(pivots) < len(variables):
+        steps.append("The equations are not independent, so there are infinitely many solutions")
+        return _result("system", variables, [], steps, status="infinite_solutions")
+
+    solution = {}
+    for r, col in enumerate(pivots):
+        solution[variables[col]] = rows[r][-1] / rows[r][col]
+    steps.append(", ".join(f"{var} = {format_fraction(solution[var])}" for var in variables))
+    return _result("system", variables, [solution], steps)
+
+def _result(kind: str, variables: List[str], solutions: List[Dict[str, Union[Fraction, float]]],
+            steps: List[str], status: Optional[str] = None,
+            exact: Optional[List[Dict[str, str]]] = None) -> Dict[str, object]:
+    """Solutions are exact Fractions, or decimals when ``exact`` gives their surd form"""
+    if exact is None:
+        exact = [{var: format_fraction(value) for var, value in solution.items()} for solution in solutions]
+    return {
+        "kind": kind,
+        "status": status or ("solved" if solutions else "no_solution"),
+        "variables": variables,
+        "solutions": exact,
+        "approximate": [{var: float(value) for var, value in solution.items()} for solution in solutions],
+        "steps": steps,
+    }
+
+def format_fraction(value: Fraction) -> str:
+    """Render an exact value as "5", "-3/4" etc."""
+    if value.denominator == 1:
+        return str(value.numerator)
+    return f"{value.numerator}/{value.denominator}"
+
+def format_polynomial(polynomial: Polynomial) -> str:
+    """Render a polynomial highest degree first, e.g. "x² - 5x + 6" """
+    terms = sorted((m for m in polynomial if polynomial[m] != 0), key=lambda m: (-_degree(m), m))
+    if not terms:
+        return "0"
+    parts = []
+    for monomial in terms:
+        coefficient = polynomial[monomial]
+        body = "".join(var + _exponent(exp) for var, exp in monomial)
+        magnitude = abs(coefficient)
+        if not body:
+            text = format_fraction(magnitude)
+        elif magnitude == 1:
+            text = body
+        elif magnitude.denominator == 1:
+            text = f"{magnitude.numerator}{body}"
+        else:
+            text = f"({format_fraction(magnitude)}){body}"
+        if not parts:
+            parts.append(f"-{text}" if coefficient < 0 else text)
+        else:
+            parts.append(f"{'-' if coefficient < 0 else '+'} {text}")
+    return " ".join(parts)
+
+def _format_row(row: List[Fraction], variables: List[str]) -> str:
+    polynomial = {((var, 1),): coefficient for var, coefficient in zip(variables, row[:-1])}
+    return f"{format_polynomial(polynomial)} = {format_fraction(row[-1])}"
+
+def _format_surd(scale: Fraction, radicand: int, imaginary: bool = False) -> str:
+    """Render scale·√radicand as e.g. "√2", "3√17/4", "i/2" """
+    unit = "i" if imaginary else ""
+    if radicand != 1:
+        unit = f"√{radicand}" + ("·i" if imaginary else "")
+    numerator = "" if scale.numerator == 1 and unit else str(scale.numerator)
+    denominator = "" if scale.denominator == 1 else f"/{scale.denominator}"
+    return f"{numerator}{unit}{denominator}"
+
+def _exponent(exp: int) -> str:
+    return {1: "", 2: "²", 3: "³"}.get(exp, f"^{exp}")
+
+def _degree(monomial: Monomial) -> int:
+    return sum(exp for _, exp in monomial)
+
+def _rational_sqrt(value: Fraction) -> Optional[Fraction]:
+    numerator, denominator = math.isqrt(value.numerator), math.isqrt(value.denominator)
+    if numerator * numerator == value.numerator and denominator * denominator == value.denominator:
+        return Fraction(numerator, denominator)
+    return None
+
+def _simplify_surd(value: Fraction) -> Tuple[Fraction, int]:
+    """Write √value as coefficient·√radicand with an integer radicand free of square factors"""
+    # √(p/q) = √(pq) / q
+    radicand = value.numerator * value.denominator
+    coefficient = Fraction(1, value.denominator)
+    factor = 2
+    while factor * factor <= radicand and factor <= 10_000:
+        while radicand % (factor * factor) == 0:
+            radicand //= factor * factor
+            coefficient *= factor
+        factor += 1
+    return coefficient, radicand
+
+def _add(left: Polynomial, right: Polynomial) -> Polynomial:
+    result = dict(left)
+    for monomial, coefficient in right.items():
+        result[monomial] = result.get(monomial, Fraction(0)) + coefficient
+    return {m: c for m, c in result.items() if c != 0}
+
+def _subtract(left: Polynomial, right: Polynomial) -> Polynomial:
+    return _add(left, {m: -c for m, c in right.items()})
+
+def _multiply(left: Polynomial, right: Polynomial) -> Polynomial:
+    result: Polynomial = {}
+    for m1, c1 in left.items():
+        for m2, c2 in right.items():
+            powers: Dict[str, int] = dict(m1)
+            for var, exp in m2:
+                powers[var] = powers.get(var, 0) + exp
+            monomial = tuple(sorted(powers.items()))
+            result[monomial] = result.get(monomial, Fraction(0)) + c1 * c2
+    return {m: c for m, c in result.items() if c != 0}
+
+def _constant_value(polynomial: Polynomial) -> Optional[Fraction]:
+    if any(polynomial.keys() - {()}):
+        return None
+    return polynomial.get((), Fraction(0))
+
+class _Parser:
+    """Recursive-descent parser from an expression to a Polynomial"""
+
+    def __init__(self, text: str):
+        self.tokens = self._tokenize(text)
+        self.pos = 0
+
+    def _tokenize(self, text: str) -> List[Tuple[str, str]]:
+        tokens = []
+        text = text.rstrip()
+        pos = 0
+        while pos < len(text):
+            match = _TOKEN.match(text, pos)
+            if not match:
+                raise EquationError(f"Unexpected character '{text[pos:].strip()[0]}'")
+            number, name, symbol = match.groups()
+            if number:
+                tokens.append(("number", number))
+            elif name:
+                # Unknowns are single letters; words such as "sin" are not supported
+                if len(name) > 1:
+                    raise EquationError(f"Unknown name '{name}'; use single-letter unknowns")
+                tokens.append(("var", name))
+            else:
+                tokens.append(("op", "^" if symbol == "**" else symbol))
+            pos = match.end()
+        return tokens
+
+    def _peek(self) -> Optional[Tuple[str, str]]:
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def _take(self) -> Tuple[str, str]:
+        token = self.tokens[self.pos]
+        self.pos += 1
+        return token
+
+    def parse(self) -> Polynomial:
+        if not self.tokens:
+            raise EquationError("Empty side of equation")
+        result = self._expression()
+        if self._peek() is not None:
+            raise EquationError(f"Unexpected '{self._peek()[1]}'")
+        return result
+
+    def _expression(self) -> Polynomial:
+        result = self._term()
+        while self._peek() in (("op", "+"), ("op", "-")):
+            op = self._take()[1]
+            term = self._term()
+            result = _add(result, term) if op == "+" else _subtract(result, term)
+        return result
+
+    def _term(self) -> Polynomial:
+        result = self._unary()
+        while True:
+            token = self._peek()
+            if token in (("op", "*"), ("op", "/")):
+                self._take()
+                factor = self._unary()
+                if token[1] == "*":
+                    result = _multiply(result, factor)
+                else:
+                    divisor = _constant_value(factor)
+                    if divisor is None:
+                        raise EquationError("Unknowns in a denominator are not supported")
+                    result = {m: c / divisor for m, c in result.items()}
+            elif token is not None and (token[0] == "var" or token == ("op", "(")):
+                # Implicit multiplication: 2x, 3(x + 1), (x + 1)(x - 1)
+                result = _multiply(result, self._power())
+            else:
+                return result
+
+    def _unary(self) -> Polynomial:
+        token = self._peek()
+        if token in (("op", "+"), ("op", "-")):
+            self._take()
+            operand = self._unary()
+            return operand if token[1] == "+" else {m: -c for m, c in operand.items()}
+        return self._power()
+
+    def _power(self) -> Polynomial:
+        base = self._atom()
+        token = self._peek()
+        if token is not None and token[1] in _SUPERSCRIPTS:
+            self._take()
+            return self._raise(base, _SUPERSCRIPTS[token[1]])
+        if token == ("op", "^"):
+            self._take()
+            exponent = _constant_value(self._unary())
+            if exponent is None or exponent.denominator != 1 or not 0 <= exponent <= _MAX_EXPONENT:
+                raise EquationError(f"Exponents must be whole numbers from 0 to {_MAX_EXPONENT}")
+            return self._raise(base, int(exponent))
+        return base
+
+    def _raise(self, base: Polynomial, exponent: int) -> Polynomial:
+        result: Polynomial = {(): Fraction(1)}
+        for _ in range(exponent):
+            result = _multiply(result, base)
+        return result
+
+    def _atom(self) -> Polynomial:
+        token = self._peek()
+        if token is None:
+            raise EquationError("Incomplete expression")
+        kind, value = self._take()
+        if kind == "number":
+            number = Fraction(value)
+            return {(): number} if number != 0 else {}
+        if kind == "var":
+            return {((value, 1),): Fraction(1)}
+        if value == "(":
+            inner = self._expression()
+            if self._peek() != ("op", ")"):
+                raise EquationError("Unbalanced parentheses")
+            self._take()
+            return inner
+        raise EquationError(f"Unexpected '{value}'")
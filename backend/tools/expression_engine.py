@@ -0,0 +1,267 @@
+import ast
+import math
+import operator
+from functools import lru_cache
+from typing import Any, Callable, Dict, FrozenSet, Optional, Union
+from config import settings
+
+Number = Union[int, float]
+Evaluator = Callable[[Dict[str, Number]], Number]
+
+# Functions and constants an expression may use
+FUNCTIONS: Dict[str, Callable[..., Number]] = {
+    "abs": abs,
+    "round": round,
+    "pow": pow,
+    "max": max,
+    "min": min,
+    "sin": math.sin,
+    "cos": math.cos,
+    "tan": math.tan,
+    "sqrt": math.sqrt,
+    "log": math.log,
+    "log10": math.log10,
+    "ceil": math.ceil,
+    "floor": math.floor,
+}
+CONSTANTS: Dict[str, float] = {"pi": math.pi, "e": math.e}
+
+_BINARY_OPERATORS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+    ast.Pow: None,  # _power, which bounds the size of integer results
+}
+_UNARY_OPERATORS = {
+    ast.UAdd: operator.pos,
+    ast.USub: operator.neg,
+}
+_MAX_POWER_BITS = 100_000  # Largest exact integer a power may produce (about 30,000 digits)
+_CHEAP_EXPONENT = 64       # Constant exponents up to this size count as cheap
+_HEAVY_COST = 1000         # Cost of a power whose exponent is large or only known at evaluation
+
+class UnsafeExpressionError(ValueError):
+    """An expression using syntax or names outside the calculator's whitelist"""
+
+class CompiledExpression:
+    """
+    An expression parsed and compiled once, to be evaluated any number of times.
+
+    Compilation turns the whitelisted syntax tree into nested closures, with
+    constant subexpressions folded, so evaluation is a handful of Python calls
+    and never goes through eval.
+    """
+
+    def __init__(self, source: str, evaluator: Evaluator, variables: FrozenSet[str], cost: int = 0):
+        self.source = source
+        self.variables = variables  # Names that must be bound when evaluating
+        self.cost = cost            # Rough evaluation cost: one per operation, far more for big powers
+        self._evaluator = evaluator
+
+    def evaluate(self, bindings: Optional[Dict[str, Number]] = None) -> Number:
+        """
+        Evaluate with the given variable values
+
+        Args:
+            bindings: Value for each variable in the expression
+
+        Returns:
+            The numeric result
+
+        Raises:
+            OverflowError: The result is an infinite or undefined float
+                           ("1e308 * 10")
+        """
+        bindings = bindings or {}
+        missing = self.variables.difference(bindings)
+        if missing:
+            raise ValueError(f"No value given for {', '.join(sorted(missing))}")
+        result = self._evaluator(bindings)
+        if isinstance(result, bool) or not isinstance(result, (int, float)):
+            raise ValueError("Result is not a number")
+        if isinstance(result, float) and not math.isfinite(result):
+            raise OverflowError("Result is too large to represent" if math.isinf(result) else "Result is undefined")
+        return result
+
+    def evaluate_vectorized(self, bindings: Dict[str, Any]) -> Any:
+        """
+        Evaluate with arrays bound to the variables, for an expression compiled
+        with array functions (e.g. NumPy ufuncs); the result is not checked
+        """
+        missing = self.variables.difference(bindings)
+        if missing:
+            raise ValueError(f"No value given for {', '.join(sorted(missing))}")
+        return self._evaluator(bindings)
+
+    def __repr__(self) -> str:
+        return f"CompiledExpression({self.source!r}, variables={sorted(self.variables)})"
+
+class ExpressionEngine:
+    """
+    Compiles calculator expressions, keeping the most recently used compiled
+    forms in an LRU keyed by expression text, so a repeated or parametric
+    calculation is parsed once.
+    """
+
+    def __init__(self, cache_size: int = 2048):
+        self.compile = lru_cache(maxsize=cache_size)(self._compile)
+
+    def evaluate(self, expression: str, bindings: Optional[Dict[str, Number]] = None) -> Number:
+        """Compile (or reuse) an expression and evaluate it"""
+        return self.compile(expression).evaluate(bindings)
+
+    def get_cache_stats(self) -> Dict[str, int]:
+        info = self.compile.cache_info()
+        return {"hits": info.hits, "misses": info.misses, "size": info.currsize, "max_size": info.maxsize}
+
+    def _compile(self, expression: str) -> CompiledExpression:
+        """
+        Compile an expression such as "2 * sin(x) + 1"
+
+        Raises:
+            SyntaxError: The text is not an expression
+            UnsafeExpressionError: It uses anything but numbers, arithmetic,
+                whitelisted functions, constants and variable names
+        """
+        return compile_expression(expression)
+
+def compile_expression(expression: str, functions: Optional[Dict[str, Callable[..., Any]]] = None) -> CompiledExpression:
+    """
+    Compile an expression without caching
+
+    Args:
+        expression: Expression text
+        functions: Implementations of the whitelisted function names to call
+                   instead of FUNCTIONS (same names), e.g. array versions;
+                   its "pow" also implements **
+    """
+    tree = ast.parse(expression.strip(), mode="eval")
+    compiler = _Compiler(functions)
+    evaluator = compiler.compile(tree.body)
+    cost = compiler.cost + compiler.heavy * _HEAVY_COST
+    return CompiledExpression(expression, evaluator, frozenset(compiler.variables), cost)
+
+class _Compiler:
+    """Turns a syntax tree into a closure, rejecting anything not whitelisted"""
+
+    def __init__(self, functions: Optional[Dict[str, Callable[..., Any]]] = None):
+        self.functions = functions or FUNCTIONS
+        # ** uses the table's pow, or the bounded one for plain numbers
+        self._power = _power if self.functions["pow"] is pow else self.functions["pow"]
+        self.variables = set()
+        self.cost = 0
+        self.heavy = 0  # Powers left unfolded because their exponent is large or unknown
+
+    def compile(self, node: ast.AST) -> Evaluator:
+        evaluator, _ = self._node(node)
+        return evaluator
+
+    # Each method returns (evaluator, constant); constant is True when the
+    # subtree has no variables and no big powers, so its parent may fold it to a value
+
+    def _node(self, node: ast.AST):
+        self.cost += 1
+        if isinstance(node, ast.Constant):
+            value = node.value
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                raise UnsafeExpressionError(f"Unsupported literal {value!r}")
+            return (lambda bindings: value), True
+        if isinstance(node, ast.Name):
+            return self._name(node.id)
+        if isinstance(node, ast.BinOp):
+            return self._binary(node)
+        if isinstance(node, ast.UnaryOp) and type(node.op) in _UNARY_OPERATORS:
+            apply = _UNARY_OPERATORS[type(node.op)]
+            operand, constant = self._node(node.operand)
+            return self._fold(lambda bindings: apply(operand(bindings)), constant)
+        if isinstance(node, ast.Call):
+            return self._call(node)
+        raise UnsafeExpressionError(f"Unsupported syntax: {type(node).__name__}")
+
+    def _name(self, name: str):
+        _check_name(name)
+        if name in CONSTANTS:
+            value = CONSTANTS[name]
+            return (lambda bindings: value), True
+        if name in self.functions:
+            raise UnsafeExpressionError(f"'{name}' is a function and must be called")
+        self.variables.add(name)
+        return (lambda bindings: bindings[name]), False
+
+    def _binary(self, node: ast.BinOp):
+        if type(node.op) not in _BINARY_OPERATORS:
+            raise UnsafeExpressionError(f"Unsupported operator: {type(node.op).__name__}")
+        apply = _BINARY_OPERATORS[type(node.op)] or self._power
+        left, left_constant = self._node(node.left)
+        right, right_constant = self._node(node.right)
+        if isinstance(node.op, ast.Pow) and not self._cheap_exponent(right, right_constant):
+            # Never folded, nor anything containing it: a big power is only worked
+            # out when evaluated (possibly in a worker)
+            self.heavy += 1
+            return (lambda bindings: apply(left(bindings), right(bindings))), False
+        return self._fold(lambda bindings: apply(left(bindings), right(bindings)), left_constant and right_constant)
+
+    @staticmethod
+    def _cheap_exponent(exponent: Evaluator, constant: bool) -> bool:
+        if not constant:
+            return False
+        try:
+            value = exponent({})
+        except (ArithmeticError, ValueError, TypeError):
+            return True  # Fails the same way whenever it is evaluated
+        return abs(value) <= _CHEAP_EXPONENT
+
+    def _call(self, node: ast.Call):
+        if not isinstance(node.func, ast.Name) or node.keywords:
+            raise UnsafeExpressionError("Only whitelisted functions with positional arguments can be called")
+        name = node.func.id
+        _check_name(name)
+        if name not in self.functions:
+            raise UnsafeExpressionError(f"Unknown function '{name}'")
+        function = self.functions[name]
+        compiled = [self._node(arg) for arg in node.args]
+        arguments = [evaluator for evaluator, _ in compiled]
+        constant = all(is_constant for _, is_constant in compiled)
+        if name == "pow":
+            function = self._power
+            if len(compiled) != 2 or not self._cheap_exponent(*compiled[1]):
+                self.heavy += 1
+                return (lambda bindings: function(*[argument(bindings) for argument in arguments])), False
+        if len(arguments) == 1:
+            (argument,) = arguments
+            return self._fold(lambda bindings: function(argument(bindings)), constant)
+        return self._fold(lambda bindings: function(*[argument(bindings) for argument in arguments]), constant)
+
+    def _fold(self, evaluator: Evaluator, constant: bool):
+        """Precompute a constant subtree; errors such as 1/0 are left to evaluation"""
+        if not constant:
+            return evaluator, False
+        try:
+            value = evaluator({})
+        except (ArithmeticError, ValueError, TypeError):
+            return evaluator, True
+        return (lambda bindings: value), True
+
+def _check_name(name: str) -> None:
+    if name.startswith("_"):
+        raise UnsafeExpressionError(f"Name '{name}' is not allowed")
+
+def _power(base: Number, exponent: Number) -> Number:
+    # Exact integer powers grow without bound (9**9**9); refuse the huge ones
+    if isinstance(base, int) and isinstance(exponent, int) and exponent > 0 and abs(base) > 1:
+        if (abs(base).bit_length() - 1) * exponent > _MAX_POWER_BITS:
+            raise ValueError("Result is too large")
+    return operator.pow(base, exponent)
+
+# Global engine instance
+_expression_engine = None
+
+def get_expression_engine() -> ExpressionEngine:
+    """Get or create the shared expression engine"""
+    global _expression_engine
+    if _expression_engine is None:
+        _expression_engine = ExpressionEngine(settings.calculator_cache_size)
+    return _expression_engine
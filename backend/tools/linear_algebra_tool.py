@@ -0,0 +1,576 @@
+import asyncio
+import math
+import re
+from decimal import Decimal
+from fractions import Fraction
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+import numpy as np
+from .base_tool import BaseTool, ToolResult
+from .equation_solver_tool import format_fraction, solve as solve_equations
+
+# Entries are exact: ints, or Fractions where they need them. A matrix is a
+# list of rows; a vector (as in NumPy) is a flat list
+Rational = Union[int, Fraction]
+Matrix = List[List[Rational]]
+Vector = List[Rational]
+Operand = Union[Matrix, Vector]
+
+_ENTRY = re.compile(r"[-+]?(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][-+]?\d+)?(?:/\d+)?")
+_ROW = re.compile(r"\[([^\[\]]*)\]")
+_ROW_SEPARATORS = re.compile(r"^[\s,;]*$")
+
+_MAX_SIZE = 200          # Rows or columns accepted
+_EXACT_MAX_SIZE = 10     # Larger matrices are computed in floating point by NumPy
+_INLINE_MAX_SIZE = 12    # Larger computations run in a thread, off the event loop
+_MAX_DENOMINATOR = 1000  # Largest denominator tried for an exact eigenvalue
+_SINGULAR_CONDITION = 1e13
+
+_EXACT = "Gauss-Jordan elimination in rational arithmetic"
+_LAPACK = "LU factorisation (NumPy/LAPACK)"
+
+class LinearAlgebraError(ValueError):
+    """A matrix that cannot be parsed, or an operation its shape or value does not allow"""
+
+class LinearAlgebraTool(BaseTool):
+   #Matrix and vector tool
+
+    def __init__(self):
+        super().__init__(
+            name="linear_algebra",
+            description="Computes determinants, inverses, ranks, eigenvalues and eigenvectors, products and (least-squares) solutions of matrix equations, exactly for small matrices"
+        )
+
+    async def execute(self, operation: str, *operands: Union[str, Sequence]) -> ToolResult:
+        """
+        Apply a linear algebra operation to matrices and vectors
+
+        Args:
+            operation: "determinant", "inverse", "rank", "eigen", "product"
+                       (two or more operands), "cross" or "solve" (matrix, then
+                       right-hand side vector)
+            *operands: Matrices or vectors written inline ("[[1, 2], [3, 4]]",
+                       "[1 2; 3 4]", "[5, 6]") or as nested lists of numbers
+
+        Returns:
+            ToolResult whose result is the dict described by that function
+        """
+        if operation not in _OPERATIONS:
+            return ToolResult(success=False, result=None, error_message=f"Unknown linear algebra operation '{operation}'")
+        function, arity = _OPERATIONS[operation]
+        try:
+            if len(operands) < arity[0] or (arity[1] is not None and len(operands) > arity[1]):
+                raise LinearAlgebraError(f"{operation} takes {_arity_text(arity)}, not {len(operands)}")
+            parsed = [parse_matrix(operand) for operand in operands]
+            if max(max(_shape(operand)) for operand in parsed) <= _INLINE_MAX_SIZE:
+                # Small matrices take microseconds; a thread would cost more than the work
+                result = function(*parsed)
+            else:
+                result = await asyncio.to_thread(function, *parsed)
+            return ToolResult(
+                success=True,
+                result=result,
+                metadata={"operation": operation, "method": result["method"], "exact": result["exact"] is not None}
+            )
+        except LinearAlgebraError as e:
+            return ToolResult(success=False, result=None, error_message=str(e))
+        except Exception as e:
+            return ToolResult(success=False, result=None, error_message=f"Linear algebra error: {str(e)}")
+
+def parse_matrix(operand: Union[str, Sequence]) -> Operand:
+    """
+    Parse a matrix or vector into exact entries
+
+    "[[1, 2], [3, 4]]", "[1 2; 3 4]" and "{{1, 2}, {3, 4}}" are 2×2 matrices,
+    "[1, 2, 3]" is a vector and "[1; 2; 3]" a column (3×1 matrix). Entries
+    are integers, decimals or fractions ("1/2"); decimals are taken as
+    written, so 0.1 is exactly 1/10. Nested lists of numbers are accepted too.
+
+    Raises:
+        LinearAlgebraError: Anything else, ragged rows or an empty or oversized matrix
+    """
+    if isinstance(operand, str):
+        rows, is_vector = _parse_text(operand)
+    elif len(operand) and all(isinstance(row, (list, tuple)) for row in operand):
+        rows, is_vector = [[_entry(value) for value in row] for row in operand], False
+    else:
+        rows, is_vector = [[_entry(value) for value in operand]], True
+    if not rows or not rows[0]:
+        raise LinearAlgebraError("Empty matrix")
+    if any(len(row) != len(rows[0]) for row in rows):
+        raise LinearAlgebraError("Every row of a matrix must have the same number of entries")
+    if len(rows) > _MAX_SIZE or len(rows[0]) > _MAX_SIZE:
+        raise LinearAlgebraError(f"Matrices are limited to {_MAX_SIZE} rows and columns")
+    return rows[0] if is_vector else rows
+
+def _parse_text(text: str) -> Tuple[Matrix, bool]:
+    """Rows of entries, and whether the text is a flat vector"""
+    text = text.strip().replace("{", "[").replace("}", "]").replace("−", "-")
+    if not (text.startswith("[") and text.endswith("]")):
+        raise LinearAlgebraError(f"'{text}' is not a matrix or vector in brackets")
+    inner = text[1:-1]
+    if "[" in inner or "]" in inner:
+        # Nested rows: [[1, 2], [3, 4]]
+        rows = _ROW.findall(inner)
+        if not rows or not _ROW_SEPARATORS.match(_ROW.sub("", inner)):
+            raise LinearAlgebraError(f"Cannot read the rows of '{text}'")
+        return [_parse_row(row, text) for row in rows], False
+    # Flat: [1, 2, 3] is a vector, [1 2; 3 4] and [1; 2; 3] are matrices
+    rows = inner.split(";")
+    return [_parse_row(row, text) for row in rows], len(rows) == 1
+
+def _parse_row(row: str, text: str) -> Vector:
+    row = re.sub(r"\s*/\s*", "/", row.strip())
+    entries = row.split(",") if "," in row else row.split()
+    values = []
+    for entry in entries:
+        entry = entry.strip()
+        if not _ENTRY.fullmatch(entry):
+            raise LinearAlgebraError(f"'{entry}' in '{text}' is not a number")
+        values.append(_entry(entry))
+    return values
+
+def _entry(value: Any) -> Rational:
+    if isinstance(value, bool):
+        raise LinearAlgebraError(f"{value!r} is not a number")
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    if isinstance(value, Fraction):
+        return value
+    if isinstance(value, (float, np.floating)):
+        if not math.isfinite(value):
+            raise LinearAlgebraError("Matrix entries must be finite")
+        return Fraction(repr(float(value)))  # The decimal as written, not its binary approximation
+    if isinstance(value, str):
+        try:
+            return int(value)
+        except ValueError:
+            pass
+        try:
+            return Fraction(value.strip())
+        except (ValueError, ZeroDivisionError):
+            pass
+    raise LinearAlgebraError(f"{value!r} is not a number")
+
+def determinant(matrix: Operand) -> Dict[str, Any]:
+    """
+    Determinant of a square matrix
+
+    Returns:
+        "operation", "operands" (as exact text), "value", "exact" (text, or
+        None when computed in floating point) and "method"
+    """
+    rows = _square(matrix, "A determinant")
+    if _is_exact(matrix):
+        value = _echelon(rows)[2]
+        return _result("determinant", [matrix], _json(value), format_fraction(value), _EXACT)
+    value = float(np.linalg.det(_array(rows)))
+    return _result("determinant", [matrix], value, None, _LAPACK)
+
+def inverse(matrix: Operand) -> Dict[str, Any]:
+    """
+    Inverse of a square matrix
+
+    Returns:
+        As determinant, with the inverse as rows in "value" and "exact", and
+        its "determinant"
+    """
+    rows = _square(matrix, "An inverse")
+    n = len(rows)
+    if _is_exact(matrix):
+        identity = [[int(i == j) for j in range(n)] for i in range(n)]
+        # Eliminating [A | I] leaves [I | A⁻¹]; a column of A without a pivot makes det 0
+        reduced, _, det = _eliminate([row + unit for row, unit in zip(rows, identity)])
+        if det == 0:
+            raise LinearAlgebraError("The matrix is singular (determinant 0), so it has no inverse")
+        result = [row[n:] for row in reduced]
+        return _result("inverse", [matrix], _json(result), _text(result), _EXACT, determinant=_json(det))
+    a = _array(rows)
+    if np.linalg.cond(a) > _SINGULAR_CONDITION:
+        raise LinearAlgebraError("The matrix is singular (or nearly so), so it has no inverse")
+    return _result("inverse", [matrix], np.linalg.inv(a).tolist(), None, _LAPACK,
+                   determinant=float(np.linalg.det(a)))
+
+def rank(matrix: Operand) -> Dict[str, Any]:
+    """Rank of a matrix (a vector has rank 1 unless it is zero); returns as determinant"""
+    rows = _rows(matrix)
+    if _is_exact(matrix):
+        value = len(_echelon(rows)[1])
+        return _result("rank", [matrix], value, str(value), _EXACT)
+    value = int(np.linalg.matrix_rank(_array(rows)))
+    return _result("rank", [matrix], value, None, "singular value decomposition (NumPy/LAPACK)")
+
+def eigen(matrix: Operand) -> Dict[str, Any]:
+    """
+    Eigenvalues and eigenvectors of a square matrix
+
+    2×2 matrices are solved exactly from the characteristic polynomial, surds
+    and complex roots included. Larger ones are diagonalised by LAPACK, and
+    each rational eigenvalue it finds is confirmed exactly (det(A − λI) = 0),
+    with exact eigenvectors spanning its null space.
+
+    Returns:
+        As determinant, with the eigenvalues (largest real part first; complex
+        ones as text such as "1 + 2i") in "value" and "exact", and "eigenpairs":
+        for each distinct eigenvalue its "value", "exact", algebraic
+        "multiplicity" and "vectors" (a basis of the eigenspace, exact text
+        where the eigenvalue is exact)
+    """
+    rows = _square(matrix, "Eigenvalues")
+    a = _array(rows)
+    symmetric = bool(np.array_equal(a, a.T))
+    if symmetric:
+        values, vectors = np.linalg.eigh(a)
+    else:
+        values, vectors = np.linalg.eig(a)
+    numeric = [(complex(value), vectors[:, i]) for i, value in enumerate(values)]
+
+    pairs = []
+    if _is_exact(matrix) and len(rows) == 2:
+        method = "the roots of the characteristic polynomial λ² − tr(A)λ + det(A)"
+        for text, value, multiplicity in _quadratic_eigenvalues(rows):
+            pairs.append(_eigenpair(rows, text, value, multiplicity, numeric))
+    elif _is_exact(matrix):
+        method = "the QR algorithm (NumPy/LAPACK), rational eigenvalues confirmed by det(A − λI) = 0"
+        for value, _ in numeric:
+            candidate = _rational_eigenvalue(rows, value)
+            if candidate is None:
+                pairs.append(_eigenpair(rows, None, value, 1, numeric))
+                continue
+            text = format_fraction(candidate)
+            repeated = next((pair for pair in pairs if pair["exact"] == text), None)
+            if repeated:
+                repeated["multiplicity"] += 1
+            else:
+                pairs.append(_eigenpair(rows, text, candidate, 1, numeric))
+    else:
+        method = "the QR algorithm (NumPy/LAPACK)"
+        for value, vector in numeric:
+            pairs.append({"value": _json(value), "exact": None, "multiplicity": 1, "vectors": [_json(vector.tolist())]})
+
+    pairs.sort(key=lambda pair: _sort_key(pair["value"]), reverse=True)
+    eigenvalues = [pair["value"] for pair in pairs for _ in range(pair["multiplicity"])]
+    exact = None
+    if all(pair["exact"] is not None for pair in pairs):
+        exact = [pair["exact"] for pair in pairs for _ in range(pair["multiplicity"])]
+    return _result("eigen", [matrix], eigenvalues, exact, method, eigenpairs=pairs, symmetric=symmetric)
+
+def product(*operands: Operand) -> Dict[str, Any]:
+    """
+    Product of matrices and vectors, left to right, with NumPy's rules for
+    vectors: vector · vector is the dot product, matrix · vector a vector
+
+    Returns:
+        As determinant, with the product (number, vector or rows) in "value" and "exact"
+    """
+    if all(_is_exact(operand) for operand in operands):
+        result = operands[0]
+        for operand in operands[1:]:
+            result = _multiply(result, operand)
+        return _result("product", list(operands), _json(result), _text(result), "rational arithmetic")
+    result = _array(operands[0])
+    for operand in operands[1:]:
+        _multiply_shape(result.shape, np.shape(_array(operand)))
+        result = result @ _array(operand)
+    value = result.tolist() if isinstance(result, np.ndarray) else float(result)
+    return _result("product", list(operands), value, None, "matrix multiplication (NumPy)")
+
+def cross(u: Operand, v: Operand) -> Dict[str, Any]:
+    """Cross product of two 3-vectors (columns and rows accepted); returns as determinant"""
+    a, b = (_vector(operand, "The cross product") for operand in (u, v))
+    if len(a) != 3 or len(b) != 3:
+        raise LinearAlgebraError("The cross product is defined for vectors with 3 components")
+    result = [a[1] * b[2] - a[2] * b[1], a[2] * b[0] - a[0] * b[2], a[0] * b[1] - a[1] * b[0]]
+    return _result("cross", [u, v], _json(result), _text(result), "rational arithmetic")
+
+def solve(matrix: Operand, rhs: Operand) -> Dict[str, Any]:
+    """
+    Solve A x = b, in the least-squares sense when there is no exact solution
+
+    Returns:
+        As determinant, with x in "value" and "exact", and "status" ("solved",
+        "least_squares" when no x satisfies every equation, or "underdetermined"
+        when many do and the one of least norm is given), "rank" and
+        "residual" (|A x − b|)
+    """
+    rows = _rows(matrix)
+    b = _vector(rhs, "The right-hand side")
+    m, n = len(rows), len(rows[0])
+    if len(b) != m:
+        raise LinearAlgebraError(f"The right-hand side has {len(b)} entries but the matrix has {m} rows")
+
+    if _is_exact(matrix) and _is_exact(rhs):
+        reduced, pivots, _ = _eliminate([row + [value] for row, value in zip(rows, b)])
+        if n not in pivots:
+            status, method = "solved", _EXACT
+        else:
+            # No exact solution: the normal equations AᵀA x = Aᵀb always have one
+            transposed = [list(column) for column in zip(*rows)]
+            normal = [[_dot(r, s) for s in transposed] for r in transposed]
+            reduced, pivots, _ = _eliminate([row + [_dot(r, b)] for row, r in zip(normal, transposed)])
+            status, method = "least_squares", "the normal equations AᵀA x = Aᵀb in rational arithmetic"
+        x = _minimum_norm(reduced, pivots, n)
+        if len(pivots) < n:
+            status = "underdetermined" if status == "solved" else status
+            method += ", least-norm solution"
+        # rank(AᵀA) = rank(A), so the pivots count the rank either way
+        residual = math.sqrt(sum((_dot(row, x) - value) ** 2 for row, value in zip(rows, b)))
+        return _result("solve", [matrix, rhs], _json(x), _text(x), method,
+                       status=status, rank=len(pivots), residual=residual)
+
+    a, target = _array(rows), _array(b)
+    if m == n and np.linalg.cond(a) <= _SINGULAR_CONDITION:
+        x = np.linalg.solve(a, target)
+        return _result("solve", [matrix, rhs], x.tolist(), None, _LAPACK, status="solved", rank=n,
+                       residual=float(np.linalg.norm(a @ x - target)))
+    x, _, matrix_rank, _ = np.linalg.lstsq(a, target, rcond=None)
+    residual = float(np.linalg.norm(a @ x - target))
+    status = "underdetermined" if residual <= 1e-9 * max(1.0, float(np.linalg.norm(target))) else "least_squares"
+    return _result("solve", [matrix, rhs], x.tolist(), None, "least squares by singular value decomposition (NumPy/LAPACK)",
+                   status=status, rank=int(matrix_rank), residual=residual)
+
+# Operation -> (function, (fewest, most) operands)
+_OPERATIONS: Dict[str, Tuple[Callable[..., Dict[str, Any]], Tuple[int, Optional[int]]]] = {
+    "determinant": (determinant, (1, 1)),
+    "inverse": (inverse, (1, 1)),
+    "rank": (rank, (1, 1)),
+    "eigen": (eigen, (1, 1)),
+    "product": (product, (2, None)),
+    "cross": (cross, (2, 2)),
+    "solve": (solve, (2, 2)),
+}
+
+def _arity_text(arity: Tuple[int, Optional[int]]) -> str:
+    fewest, most = arity
+    if most is None:
+        return f"at least {fewest} operands"
+    return f"{fewest} operand{'s' if fewest > 1 else ''}"
+
+def _result(operation: str, operands: List[Operand], value: Any, exact: Any, method: str, **extra) -> Dict[str, Any]:
+    return {"operation": operation, "operands": [_text(operand, decimals=True) for operand in operands],
+            "value": value, "exact": exact, "method": method, **extra}
+
+# Exact arithmetic
+
+def _echelon(rows: Matrix) -> Tuple[List[List[int]], List[int], Rational]:
+    """
+    Fraction-free Gauss-Jordan elimination (Bareiss): rows are scaled to
+    integers and every division is exact, so the work is all in integers
+    no larger than the matrix's minors
+
+    Returns:
+        The eliminated integer rows (pivot row r, divided by its entry in
+        pivot column r, is row r of the reduced row echelon form), the pivot
+        columns and the determinant of the leading square block (of a square
+        matrix, its determinant)
+    """
+    scales = [math.lcm(*(value.denominator for value in row)) for row in rows]
+    matrix = [[value.numerator * (scale // value.denominator) for value in row] for row, scale in zip(rows, scales)]
+    previous, sign = 1, 1
+    pivots = []
+    for col in range(len(matrix[0])):
+        r = len(pivots)
+        if r == len(matrix):
+            break
+        pivot = next((i for i in range(r, len(matrix)) if matrix[i][col]), None)
+        if pivot is None:
+            continue
+        if pivot != r:
+            matrix[r], matrix[pivot] = matrix[pivot], matrix[r]
+            sign = -sign
+        pivot_row, value = matrix[r], matrix[r][col]
+        for i, row in enumerate(matrix):
+            if i != r:
+                factor = row[col]
+                matrix[i] = [(value * x - factor * y) // previous for x, y in zip(row, pivot_row)]
+        previous = value
+        pivots.append(col)
+
+    determinant: Rational = 0
+    if pivots == list(range(len(matrix))):
+        determinant = Fraction(sign * previous, math.prod(scales))
+        determinant = determinant.numerator if determinant.denominator == 1 else determinant
+    return matrix, pivots, determinant
+
+def _eliminate(rows: Matrix) -> Tuple[Matrix, List[int], Rational]:
+    """Reduced row echelon form, its pivot columns and the determinant of the leading square block"""
+    matrix, pivots, determinant = _echelon(rows)
+    reduced = [[_ratio(x, row[col]) for x in row] for row, col in zip(matrix, pivots)]
+    reduced += [[0] * len(matrix[0]) for _ in range(len(matrix) - len(pivots))]
+    return reduced, pivots, determinant
+
+def _minimum_norm(reduced: Matrix, pivots: List[int], n: int) -> Vector:
+    """
+    The least-norm solution of a consistent system, from the reduced rows of
+    [A | b]: with R x = c its independent rows, x = Rᵀ (R Rᵀ)⁻¹ c, which is
+    the only solution when there are no free variables
+    """
+    rank = len(pivots)
+    x: Vector = [0] * n
+    if rank == n or rank == 0:
+        for row, col in zip(reduced, pivots):
+            x[col] = row[n]
+        return x
+    independent = [row[:n] for row in reduced[:rank]]
+    gram = [[_dot(r, s) for s in independent] for r in independent]
+    weights, _, _ = _eliminate([row + [row_target[n]] for row, row_target in zip(gram, reduced)])
+    return [sum((row[rank] * r[j] for row, r in zip(weights, independent)), 0) for j in range(n)]
+
+def _ratio(numerator: int, denominator: int) -> Rational:
+    if numerator % denominator == 0:
+        return numerator // denominator
+    return Fraction(numerator, denominator)
+
+def _dot(left: Vector, right: Vector) -> Rational:
+    return sum((p * q for p, q in zip(left, right)), 0)
+
+def _null_space(rows: Matrix) -> List[Vector]:
+    """Basis of the null space, each vector scaled to coprime integers"""
+    reduced, pivots, _ = _eliminate(rows)
+    basis = []
+    for free in (col for col in range(len(rows[0])) if col not in pivots):
+        vector: Vector = [0] * len(rows[0])
+        vector[free] = 1
+        for row, col in zip(reduced, pivots):
+            vector[col] = -row[free]
+        basis.append(_primitive(vector))
+    return basis
+
+def _primitive(vector: Vector) -> Vector:
+    """Scale to coprime integers with the first non-zero entry positive"""
+    scale = math.lcm(*(value.denominator for value in vector))
+    integers = [int(value * scale) for value in vector]
+    divisor = math.gcd(*integers) or 1
+    if next(value for value in integers if value) < 0:
+        divisor = -divisor
+    return [value // divisor for value in integers]
+
+def _multiply(left: Operand, right: Operand) -> Union[Rational, Operand]:
+    _multiply_shape(_shape(left, flat=True), _shape(right, flat=True))
+    left_vector, right_vector = _is_vector(left), _is_vector(right)
+    if left_vector and right_vector:
+        return _dot(left, right)
+    if right_vector:
+        return [_dot(row, right) for row in left]
+    columns = list(zip(*right))
+    if left_vector:
+        return [_dot(left, column) for column in columns]
+    return [[_dot(row, column) for column in columns] for row in left]
+
+def _multiply_shape(left: Tuple[int, ...], right: Tuple[int, ...]) -> None:
+    if not left or not right:
+        raise LinearAlgebraError("A dot product gives a number, which cannot be multiplied further as a matrix")
+    if left[-1] != right[0]:
+        raise LinearAlgebraError(f"Cannot multiply a {_shape_text(left)} by a {_shape_text(right)}: "
+                                 f"{left[-1]} columns against {right[0]} rows")
+
+def _rational_eigenvalue(rows: Matrix, value: complex) -> Optional[Fraction]:
+    """The rational number near a computed eigenvalue, if it is exactly one"""
+    if abs(value.imag) > 1e-9 * max(1.0, abs(value)):
+        return None
+    candidate = Fraction(value.real).limit_denominator(_MAX_DENOMINATOR)
+    if abs(float(candidate) - value.real) > 1e-6 * max(1.0, abs(value.real)):
+        return None
+    shifted = [[entry - candidate * (i == j) for j, entry in enumerate(row)] for i, row in enumerate(rows)]
+    return candidate if _echelon(shifted)[2] == 0 else None
+
+def _quadratic_eigenvalues(rows: Matrix) -> List[Tuple[str, Union[Fraction, complex, float], int]]:
+    """Exact text, value and multiplicity of each root of a 2×2 matrix's characteristic polynomial"""
+    (a, b), (c, d) = rows
+    polynomial = {(("λ", 2),): Fraction(1), (("λ", 1),): -(a + d), (): a * d - b * c}
+    solution = solve_equations([polynomial], ["λ² − tr(A)λ + det(A) = 0"])
+    if solution["status"] == "no_real_solution":
+        half_trace = float(a + d) / 2
+        spread = math.sqrt(-float((a - d) ** 2 + 4 * b * c)) / 2
+        return [(root["λ"], complex(half_trace, sign * spread), 1)
+                for root, sign in zip(solution["complex_roots"], (1, -1))]
+    multiplicity = 2 if len(solution["solutions"]) == 1 else 1  # A double root is listed once
+    roots = []
+    for exact, approximate in zip(solution["solutions"], solution["approximate"]):
+        text = exact["λ"]
+        try:
+            roots.append((text, Fraction(text), multiplicity))
+        except ValueError:
+            roots.append((text, approximate["λ"], multiplicity))  # A surd such as "2 + √3"
+    return roots
+
+def _eigenpair(rows: Matrix, text: Optional[str], value: Union[Fraction, complex, float], multiplicity: int,
+               numeric: List[Tuple[complex, np.ndarray]]) -> Dict[str, Any]:
+    if isinstance(value, Fraction):
+        shifted = [[entry - value * (i == j) for j, entry in enumerate(row)] for i, row in enumerate(rows)]
+        vectors = [_text(vector) for vector in _null_space(shifted)]
+        return {"value": _json(value), "exact": text, "multiplicity": multiplicity, "vectors": vectors}
+    # Irrational or complex: the eigenvector LAPACK found for the nearest eigenvalue
+    _, vector = min(numeric, key=lambda pair: abs(pair[0] - complex(value)))
+    return {"value": _json(complex(value)), "exact": text, "multiplicity": multiplicity, "vectors": [_json(vector.tolist())]}
+
+def _sort_key(value: Any) -> Tuple[float, float]:
+    if isinstance(value, str):
+        number = complex(value.replace("i", "j").replace(" ", "").replace("−", "-"))
+        return number.real, number.imag
+    return float(value), 0.0
+
+# Shapes and conversions
+
+def _is_vector(operand: Any) -> bool:
+    return not isinstance(operand[0], list)
+
+def _shape(operand: Any, flat: bool = False) -> Tuple[int, ...]:
+    if not isinstance(operand, list):
+        return ()  # A dot product
+    if _is_vector(operand):
+        return (len(operand),) if flat else (1, len(operand))
+    return len(operand), len(operand[0])
+
+def _shape_text(shape: Tuple[int, ...]) -> str:
+    return f"vector of length {shape[0]}" if len(shape) == 1 else f"{shape[0]}×{shape[1]} matrix"
+
+def _rows(operand: Operand) -> Matrix:
+    return [operand] if _is_vector(operand) else operand
+
+def _square(operand: Operand, what: str) -> Matrix:
+    rows = _rows(operand)
+    if len(rows) != len(rows[0]):
+        raise LinearAlgebraError(f"{what} needs a square matrix, not a {_shape_text(_shape(operand, flat=True))}")
+    return rows
+
+def _vector(operand: Operand, what: str) -> Vector:
+    """A vector, or a matrix with one row or one column read as one"""
+    if _is_vector(operand):
+        return operand
+    if len(operand[0]) == 1:
+        return [row[0] for row in operand]
+    if len(operand) == 1:
+        return operand[0]
+    raise LinearAlgebraError(f"{what} must be a vector, not a {_shape_text(_shape(operand))}")
+
+def _is_exact(operand: Operand) -> bool:
+    return max(_shape(operand)) <= _EXACT_MAX_SIZE
+
+def _array(operand: Any) -> np.ndarray:
+    return np.array(operand, dtype=float)
+
+def _json(value: Any) -> Any:
+    """Exact and NumPy values as plain numbers (complex ones as text), recursively"""
+    if isinstance(value, (list, tuple)):
+        return [_json(item) for item in value]
+    if isinstance(value, (int, Fraction)):
+        return value.numerator if value.denominator == 1 else float(value)
+    if isinstance(value, (complex, np.complexfloating)):
+        if abs(value.imag) <= 1e-12 * max(1.0, abs(value)):
+            return float(value.real)
+        real, imag = float(value.real), float(value.imag)
+        return f"{real:.12g} {'−' if imag < 0 else '+'} {abs(imag):.12g}i"
+    return float(value)
+
+def _text(value: Any, decimals: bool = False) -> Any:
+    """
+    Exact values as text ("3/4"), recursively; with decimals, tenths,
+    hundredths etc. and long terminating decimals are written as decimals
+    ("0.1", "0.131006"), as they were most likely entered
+    """
+    if isinstance(value, (list, tuple)):
+        return [_text(item, decimals) for item in value]
+    if decimals and value.denominator > 1 and 10 ** 20 % value.denominator == 0 and (
+            value.denominator > _MAX_DENOMINATOR or str(value.denominator).rstrip("0") == "1"):
+        return format(Decimal(value.numerator) / Decimal(value.denominator), "f")
+    return format_fraction(value)
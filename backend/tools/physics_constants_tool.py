@@ -1,5 +1,14 @@
-from typing import Dict, List, Optional
+from functools import cached_property
+from typing import Any, Dict, List
 from .base_tool import BaseTool, ToolResult
+from .physics_data import get_physics_data
+from utils.search_index import SearchIndex
+
+# Weight of a query word found in each field: names and symbols say most about an entry
+_CONSTANT_FIELDS = {"symbol": 4.0, "description": 2.0, "unit": 0.5}
+_FORMULA_FIELDS = {"name": 3.0, "description": 2.0, "formula": 0.5, "variables": 0.5}
+_SYMBOL_BOOST = 1.5  # Constants with their own symbol are the common ones; rank them above obscure namesakes
+_SEARCH_LIMIT = 20
 
 class PhysicsConstantsTool(BaseTool):
     """Tool for looking up physics constants and formulas"""
@@ -10,82 +19,33 @@ class PhysicsConstantsTool(BaseTool):
             description="Provides access to fundamental physics constants, common formulas, and unit conversions"
         )
         
-        # Fundamental physics constants
-        self.constants = {
-            # Fundamental constants
-            "c": {"value": 299792458, "unit": "m/s", "description": "Speed of light in vacuum"},
-            "h": {"value": 6.62607015e-34, "unit": "J⋅s", "description": "Planck constant"},
-            "hbar": {"value": 1.054571817e-34, "unit": "J⋅s", "description": "Reduced Planck constant"},
-            "e": {"value": 1.602176634e-19, "unit": "C", "description": "Elementary charge"},
-            "me": {"value": 9.1093837015e-31, "unit": "kg", "description": "Electron mass"},
-            "mp": {"value": 1.67262192369e-27, "unit": "kg", "description": "Proton mass"},
-            "mn": {"value": 1.67492749804e-27, "unit": "kg", "description": "Neutron mass"},
-            "u": {"value": 1.66053906660e-27, "unit": "kg", "description": "Atomic mass unit"},
-            
-            # Universal constants
-            "G": {"value": 6.67430e-11, "unit": "m³/kg⋅s²", "description": "Gravitational constant"},
-            "k": {"value": 1.380649e-23, "unit": "J/K", "description": "Boltzmann constant"},
-            "NA": {"value": 6.02214076e23, "unit": "1/mol", "description": "Avogadro constant"},
-            "R": {"value": 8.314462618, "unit": "J/mol⋅K", "description": "Gas constant"},
-            
-            # Electromagnetic constants
-            "eps0": {"value": 8.8541878128e-12, "unit": "F/m", "description": "Vacuum permittivity"},
-            "mu0": {"value": 1.25663706212e-6, "unit": "H/m", "description": "Vacuum permeability"},
-            "ke": {"value": 8.9875517923e9, "unit": "N⋅m²/C²", "description": "Coulomb constant"},
-            
-            # Other important constants
-            "g": {"value": 9.80665, "unit": "m/s²", "description": "Standard gravity"},
-            "atm": {"value": 101325, "unit": "Pa", "description": "Standard atmosphere"},
-            "sigma": {"value": 5.670374419e-8, "unit": "W/m²⋅K⁴", "description": "Stefan-Boltzmann constant"},
-            
-            # Mathematical constants used in physics
-            "pi": {"value": 3.141592653589793, "unit": "dimensionless", "description": "Pi"},
-            "euler": {"value": 2.718281828459045, "unit": "dimensionless", "description": "Euler's number"}
-        }
-        
-        # Common physics formulas
-        self.formulas = {
-            "kinetic_energy": {
-                "formula": "KE = (1/2) * m * v²",
-                "variables": {"m": "mass (kg)", "v": "velocity (m/s)"},
-                "description": "Kinetic energy of an object"
-            },
-            "potential_energy": {
-                "formula": "PE = m * g * h",
-                "variables": {"m": "mass (kg)", "g": "gravity (m/s²)", "h": "height (m)"},
-                "description": "Gravitational potential energy"
-            },
-            "force": {
-                "formula": "F = m * a",
-                "variables": {"m": "mass (kg)", "a": "acceleration (m/s²)"},
-                "description": "Newton's second law"
-            },
-            "gravitational_force": {
-                "formula": "F = G * m1 * m2 / r²",
-                "variables": {"G": "gravitational constant", "m1": "mass 1 (kg)", "m2": "mass 2 (kg)", "r": "distance (m)"},
-                "description": "Newton's law of universal gravitation"
-            },
-            "coulomb_law": {
-                "formula": "F = k * q1 * q2 / r²",
-                "variables": {"k": "Coulomb constant", "q1": "charge 1 (C)", "q2": "charge 2 (C)", "r": "distance (m)"},
-                "description": "Coulomb's law for electrostatic force"
-            },
-            "ohms_law": {
-                "formula": "V = I * R",
-                "variables": {"V": "voltage (V)", "I": "current (A)", "R": "resistance (Ω)"},
-                "description": "Ohm's law"
-            },
-            "wave_equation": {
-                "formula": "v = f * λ",
-                "variables": {"v": "wave speed (m/s)", "f": "frequency (Hz)", "λ": "wavelength (m)"},
-                "description": "Wave equation"
-            },
-            "ideal_gas": {
-                "formula": "PV = nRT",
-                "variables": {"P": "pressure (Pa)", "V": "volume (m³)", "n": "moles", "R": "gas constant", "T": "temperature (K)"},
-                "description": "Ideal gas law"
-            }
-        }
+        # CODATA constants and the formula library, memory-mapped and decoded on first use
+        data = get_physics_data()
+        self.constants = data.tables["constants"]
+        self.formulas = data.tables["formulas"]
+    
+    @cached_property
+    def _constant_index(self) -> SearchIndex:
+        """Constants indexed for search, built on the first search rather than at startup"""
+        # Constants without a symbol are keyed by their name, which should not count twice
+        symbols = {symbol for symbol, data in self.constants.items() if symbol.lower() != data["description"].lower()}
+        return SearchIndex(
+            {symbol: {"symbol": symbol if symbol in symbols else "", "description": data["description"],
+                      "unit": data["unit"]}
+             for symbol, data in self.constants.items()},
+            _CONSTANT_FIELDS,
+            boosts=dict.fromkeys(symbols, _SYMBOL_BOOST)
+        )
+    
+    @cached_property
+    def _formula_index(self) -> SearchIndex:
+        """Formulas indexed for search, built on the first search rather than at startup"""
+        return SearchIndex(
+            {name: {"name": name, "description": data["description"], "formula": data["formula"],
+                    "variables": " ".join(f"{var} {meaning}" for var, meaning in data["variables"].items())}
+             for name, data in self.formulas.items()},
+            _FORMULA_FIELDS
+        )
     
     async def execute(self, query: str, query_type: str = "constant") -> ToolResult:
         """
@@ -93,25 +53,33 @@ class PhysicsConstantsTool(BaseTool):
         
         Args:
             query: Name/symbol of constant or formula to look up
-            query_type: "constant", "formula", or "search"
+            query_type: "constant", "formula", "search" or "autocomplete"
             
         Returns:
             ToolResult with the requested information
         """
         try:
-            query = query.lower().strip()
+            query = query.strip()
             
             if query_type == "constant":
                 return await self._lookup_constant(query)
-            elif query_type == "formula":
+            
+            query = query.lower()
+            if query_type == "formula":
                 return await self._lookup_formula(query)
             elif query_type == "search":
                 return await self._search_all(query)
+            elif query_type == "autocomplete":
+                return ToolResult(
+                    success=True,
+                    result=self.autocomplete(query),
+                    metadata={"type": "autocomplete", "query": query}
+                )
             else:
                 return ToolResult(
                     success=False,
                     result=None,
-                    error_message=f"Invalid query type: {query_type}. Use 'constant', 'formula', or 'search'"
+                    error_message=f"Invalid query type: {query_type}. Use 'constant', 'formula', 'search' or 'autocomplete'"
                 )
                 
         except Exception as e:
@@ -122,77 +90,50 @@ class PhysicsConstantsTool(BaseTool):
             )
     
     async def _lookup_constant(self, symbol: str) -> ToolResult:
-        """Look up a specific physics constant"""
+        """Look up a specific physics constant (exact symbol first, so "G" and "g" stay distinct)"""
+        if symbol not in self.constants:
+            symbol = self.constants.find(symbol, ignore_case=True) or symbol
         if symbol in self.constants:
-            constant = self.constants[symbol]
             return ToolResult(
                 success=True,
-                result={
-                    "symbol": symbol,
-                    "value": constant["value"],
-                    "unit": constant["unit"],
-                    "description": constant["description"]
-                },
+                result=self._constant_entry(symbol),
                 metadata={"type": "constant"}
             )
         else:
-            # Try to find similar constants
-            suggestions = [k for k in self.constants.keys() if symbol in k or k in symbol]
             return ToolResult(
                 success=False,
                 result=None,
                 error_message=f"Constant '{symbol}' not found",
-                metadata={"suggestions": suggestions[:5]}
+                metadata={"suggestions": self._constant_index.suggest(symbol)}
             )
     
     async def _lookup_formula(self, name: str) -> ToolResult:
         """Look up a physics formula"""
         if name in self.formulas:
-            formula_data = self.formulas[name]
             return ToolResult(
                 success=True,
-                result=formula_data,
+                result=dict(self.formulas[name]),
                 metadata={"type": "formula"}
             )
         else:
-            # Try to find similar formulas
-            suggestions = [k for k in self.formulas.keys() if name in k or k in name]
             return ToolResult(
                 success=False,
                 result=None,
                 error_message=f"Formula '{name}' not found",
-                metadata={"suggestions": suggestions[:5]}
+                metadata={"suggestions": self._formula_index.suggest(name)}
             )
     
-    async def _search_all(self, query: str) -> ToolResult:
-        """Search through both constants and formulas"""
+    async def _search_all(self, query: str, limit: int = _SEARCH_LIMIT) -> ToolResult:
+        """Ranked search through both constants and formulas (tolerating typos and partial words)"""
+        constants = self._constant_index.search(query, limit)
+        formulas = self._formula_index.search(query, limit)
+        # Entries matching fewer of the query's words than the best ones only share filler ("of")
+        best = max((hit.matched for hit in constants + formulas), default=0)
         results = {
-            "constants": [],
-            "formulas": []
+            "constants": [self._constant_entry(hit.key) for hit in constants if hit.matched == best],
+            "formulas": [self._formula_entry(hit.key) for hit in formulas if hit.matched == best]
         }
         
-        # Search constants
-        for symbol, data in self.constants.items():
-            if (query in symbol.lower() or 
-                query in data["description"].lower() or
-                query in data["unit"].lower()):
-                results["constants"].append({
-                    "symbol": symbol,
-                    "value": data["value"],
-                    "unit": data["unit"],
-                    "description": data["description"]
-                })
-        
-        # Search formulas
-        for name, data in self.formulas.items():
-            if (query in name.lower() or 
-                query in data["description"].lower() or
-                query in data["formula"].lower()):
-                results["formulas"].append({
-                    "name": name,
-                    **data
-                })
-        
         total_results = len(results["constants"]) + len(results["formulas"])
         
         if total_results > 0:
@@ -218,4 +159,42 @@ class PhysicsConstantsTool(BaseTool):
     
     def list_all_formulas(self) -> List[str]:
         """Get list of all available formulas"""
-        return list(self.formulas.keys()) 
\ No newline at end of file
+        return list(self.formulas.keys())
+    
+    def autocomplete(self, prefix: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        Constants and formulas completing a partly typed name, best first
+        
+        Args:
+            prefix: Text typed so far ("planck c", "kinet")
+            limit: Most suggestions to return
+            
+        Returns:
+            Entries with their kind ("constant" or "formula") and key
+        """
+        hits = [("constant", hit) for hit in self._constant_index.complete(prefix, limit)]
+        hits += [("formula", hit) for hit in self._formula_index.complete(prefix, limit)]
+        hits.sort(key=lambda pair: (-pair[1].matched, -pair[1].score))
+        return [
+            {"kind": kind, "key": hit.key, **(self._constant_entry(hit.key) if kind == "constant"
+                                              else self._formula_entry(hit.key))}
+            for kind, hit in hits[:limit]
+        ]
+    
+    def _constant_entry(self, symbol: str) -> Dict[str, Any]:
+        data = self.constants[symbol]
+        return {"symbol": symbol, "value": data["value"], "unit": data["unit"], "description": data["description"],
+                "uncertainty": data["uncertainty"]}
+    
+    def _formula_entry(self, name: str) -> Dict[str, Any]:
+        return {"name": name, **self.formulas[name]}
+
+# Global constants tool instance (its indexes are built once and shared)
+_physics_constants_tool = None
+
+def get_physics_constants_tool() -> PhysicsConstantsTool:
+    """Get or create the shared physics constants tool"""
+    global _physics_constants_tool
+    if _physics_constants_tool is None:
+        _physics_constants_tool = PhysicsConstantsTool()
+    return _physics_constants_tool
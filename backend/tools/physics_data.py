@@ -0,0 +1,220 @@
+"""
+Compiled physics constants and formulas (CODATA 2022 plus the formula library).
+
+Built from tools/data/codata_2022.txt and tools/data/physics_library.json by
+``python -m tools.build_physics_data`` into a single binary file of columns:
+a JSON header, string ids and float64 values per table, sorted key orders for
+binary search, and one UTF-8 string heap. The file is memory-mapped read-only,
+so every worker shares the same page-cache pages, and an entry is decoded only
+when it is first looked up; opening it costs the same however large it grows.
+"""
+import bisect
+import json
+import logging
+import mmap
+import os
+from collections.abc import Mapping
+from typing import Any, Dict, Iterator, List, Optional
+import numpy as np
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+PHYSICS_DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+PHYSICS_DATA_PATH = os.path.join(PHYSICS_DATA_DIR, "physics_data.bin")
+
+_MAGIC = b"PHYSDAT1"
+_ALIGN = 8
+
+class PhysicsTable(Mapping):
+    """
+    Read-only mapping of key -> entry over one table of a compiled physics
+    data file.
+
+    Iterates in the order the entries were compiled. Lookups binary-search
+    the sorted key order, decoding only the keys they compare, and build the
+    entry dict once, on first access.
+    """
+
+    def __init__(self, data: "PhysicsData", name: str, spec: Dict[str, Any]):
+        self._data = data
+        self._size = spec["rows"]
+        self._strings = {field: data.array(f"{name}.{field}") for field in spec["strings"]}
+        self._numbers = {field: data.array(f"{name}.{field}") for field in spec["numbers"]}
+        self._json = set(spec.get("json", ()))
+        self._keys = self._strings.pop("key")
+        self._by_key = data.array(f"{name}.by_key")
+        self._by_folded = data.array(f"{name}.by_folded")
+        self._entries: Dict[int, Dict[str, Any]] = {}
+        self._rows: Dict[str, int] = {}  # Keys found so far (at most one per entry)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __iter__(self) -> Iterator[str]:
+        return (self._key(row) for row in range(self._size))
+
+    def __contains__(self, key: object) -> bool:
+        return self._row(key) is not None
+
+    def __getitem__(self, key: str) -> Dict[str, Any]:
+        row = self._row(key)
+        if row is None:
+            raise KeyError(key)
+        entry = self._entries.get(row)
+        if entry is None:
+            entry = self._entries[row] = self._decode(row)
+        return entry
+
+    def find(self, key: str, ignore_case: bool = False) -> Optional[str]:
+        """
+        The stored key matching a key, or None
+
+        Args:
+            key: Key to look for
+            ignore_case: Match regardless of case; the first compiled of
+                         several matches wins ("G" before "g")
+        """
+        if not ignore_case:
+            return key if key in self else None
+        row = self._find(key.lower(), self._by_folded, str.lower)
+        return None if row is None else self._key(row)
+
+    def _row(self, key: object) -> Optional[int]:
+        if not isinstance(key, str):
+            return None
+        row = self._rows.get(key)
+        if row is None:
+            row = self._find(key, self._by_key, str)
+            if row is not None:
+                self._rows[key] = row
+        return row
+
+    def _find(self, key: str, order: np.ndarray, fold) -> Optional[int]:
+        position = bisect.bisect_left(order, key, key=lambda row: fold(self._key(row)))
+        if position < self._size and fold(self._key(order[position])) == key:
+            return int(order[position])
+        return None
+
+    def _key(self, row: int) -> str:
+        return self._data.string(self._keys[row])
+
+    def _decode(self, row: int) -> Dict[str, Any]:
+        entry: Dict[str, Any] = {}
+        for field, ids in self._strings.items():
+            text = self._data.string(ids[row])
+            entry[field] = json.loads(text) if field in self._json else text
+        for field, values in self._numbers.items():
+            entry[field] = float(values[row])
+        return entry
+
+class PhysicsData:
+    """A memory-mapped compiled physics data file and its tables"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as file:
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[:len(_MAGIC)] != _MAGIC:
+            raise ValueError(f"{path} is not a compiled physics data file")
+        header_size = int.from_bytes(self._map[len(_MAGIC):len(_MAGIC) + 4], "little")
+        start = len(_MAGIC) + 4
+        self.header = json.loads(self._map[start:start + header_size].decode("utf-8"))
+        self._arrays: Dict[str, np.ndarray] = {}
+        self._heap = self.array("strings")
+        self._offsets = self.array("string_offsets")
+        self.source = self.header.get("source", "")
+        self.tables = {name: PhysicsTable(self, name, spec) for name, spec in self.header["tables"].items()}
+
+    def array(self, name: str) -> np.ndarray:
+        """A zero-copy, read-only view of one column of the file"""
+        array = self._arrays.get(name)
+        if array is None:
+            offset, dtype, count = self.header["arrays"][name]
+            array = self._arrays[name] = np.frombuffer(self._map, dtype=dtype, count=count, offset=offset)
+        return array
+
+    def string(self, string_id: int) -> str:
+        start, end = self._offsets[string_id], self._offsets[string_id + 1]
+        return self._heap[start:end].tobytes().decode("utf-8")
+
+def write_physics_data(path: str, tables: Dict[str, Dict[str, Any]], source: str = "") -> int:
+    """
+    Compile tables of entries into a physics data file
+
+    Args:
+        path: Output file; written beside it and renamed into place, so workers
+              that have the old file mapped keep reading it unchanged
+        tables: Table name -> {"entries": key -> entry (in order), "strings":
+                string fields, "numbers": float fields, "json": fields stored as JSON}
+        source: Description of where the data comes from
+
+    Returns:
+        Size of the file in bytes
+    """
+    strings: Dict[str, int] = {}
+    arrays: Dict[str, np.ndarray] = {}
+
+    def intern(text: str) -> int:
+        return strings.setdefault(text, len(strings))
+
+    header_tables = {}
+    for name, table in tables.items():
+        entries = table["entries"]
+        keys = list(entries)
+        json_fields = set(table.get("json", ()))
+        arrays[f"{name}.key"] = np.array([intern(key) for key in keys], dtype="<u4")
+        for field in table["strings"]:
+            values = [entries[key][field] for key in keys]
+            if field in json_fields:
+                values = [json.dumps(value, ensure_ascii=False) for value in values]
+            arrays[f"{name}.{field}"] = np.array([intern(value) for value in values], dtype="<u4")
+        for field in table["numbers"]:
+            arrays[f"{name}.{field}"] = np.array([entries[key][field] for key in keys], dtype="<f8")
+        rows = range(len(keys))
+        arrays[f"{name}.by_key"] = np.array(sorted(rows, key=lambda row: keys[row]), dtype="<u4")
+        arrays[f"{name}.by_folded"] = np.array(sorted(rows, key=lambda row: (keys[row].lower(), row)), dtype="<u4")
+        header_tables[name] = {
+            "rows": len(keys),
+            "strings": ["key", *table["strings"]],
+            "numbers": list(table["numbers"]),
+            "json": sorted(json_fields)
+        }
+
+    encoded = [text.encode("utf-8") for text in strings]
+    arrays["string_offsets"] = np.cumsum([0] + [len(text) for text in encoded], dtype="<u8")
+    arrays["strings"] = np.frombuffer(b"".join(encoded), dtype="u1")
+
+    # Offsets depend on the header's own length, so lay the arrays out after a fixed-width placeholder
+    layout: Dict[str, List[Any]] = {name: [0, array.dtype.str, len(array)] for name, array in arrays.items()}
+    header = {"source": source, "tables": header_tables, "arrays": layout}
+    reserve = len(json.dumps(header).encode("utf-8")) + 24 * len(arrays)
+    offset = _aligned(len(_MAGIC) + 4 + reserve)
+    for name, array in arrays.items():
+        layout[name][0] = offset
+        offset = _aligned(offset + array.nbytes)
+    header_bytes = json.dumps(header).encode("utf-8").ljust(reserve)
+
+    partial = f"{path}.tmp"
+    with open(partial, "wb") as file:
+        file.write(_MAGIC + len(header_bytes).to_bytes(4, "little") + header_bytes)
+        for name, array in arrays.items():
+            file.write(b"\0" * (layout[name][0] - file.tell()))
+            file.write(array.tobytes())
+        size = file.tell()
+    os.replace(partial, path)
+    return size
+
+def _aligned(offset: int) -> int:
+    return -(-offset // _ALIGN) * _ALIGN
+
+# Global physics data instance
+_physics_data = None
+
+def get_physics_data() -> PhysicsData:
+    """Get or open the shared compiled physics data"""
+    global _physics_data
+    if _physics_data is None:
+        _physics_data = PhysicsData(settings.physics_data_path or PHYSICS_DATA_PATH)
+        logger.info(f"Physics data: {_physics_data.source} from {_physics_data.path}")
+    return _physics_data
@@ -0,0 +1,418 @@
+import asyncio
+import re
+from functools import lru_cache, reduce
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import numpy as np
+from config import settings
+from .base_tool import BaseTool, ToolResult
+from .expression_engine import CompiledExpression, UnsafeExpressionError, compile_expression, _power
+
+def _log(x, base=None):
+    return np.log(x) if base is None else np.log(x) / np.log(base)
+
+def _array_power(base, exponent):
+    if np.isscalar(base) and np.isscalar(exponent):
+        return _power(base, exponent)  # Constants keep Python semantics (2^-1 = 0.5)
+    if np.isscalar(exponent) and float(exponent).is_integer() and 2 < abs(exponent) <= _MAX_SQUARING_EXPONENT:
+        # NumPy only special-cases squares; x^3 is far faster as multiplications
+        result = _power_by_squaring(_inexact(base), int(abs(exponent)))
+        return 1.0 / result if exponent < 0 else result
+    return np.power(_inexact(base) if np.isscalar(exponent) else base, exponent)
+
+def _inexact(values) -> np.ndarray:
+    """Floats, keeping complex values (the calculus tool's complex step) complex"""
+    return np.asarray(values, dtype=np.result_type(values, np.float64))
+
+def _power_by_squaring(base: np.ndarray, exponent: int) -> np.ndarray:
+    result = None
+    while exponent:
+        if exponent & 1:
+            result = base if result is None else result * base
+        exponent >>= 1
+        if exponent:
+            base = base * base
+    return result
+
+# Array versions of the calculator functions, applied to every point at once
+ARRAY_FUNCTIONS: Dict[str, Callable[..., Any]] = {
+    "abs": np.abs,
+    "round": np.round,
+    "pow": _array_power,
+    "max": lambda *args: reduce(np.maximum, args),
+    "min": lambda *args: reduce(np.minimum, args),
+    "sin": np.sin,
+    "cos": np.cos,
+    "tan": np.tan,
+    "sqrt": np.sqrt,
+    "exp": np.exp,  # Not a calculator function, but common in graphs
+    "log": _log,
+    "log10": np.log10,
+    "ceil": np.ceil,
+    "floor": np.floor,
+}
+
+_TOKEN = re.compile(r"\s*(?:((?:\d+(?:\.\d+)?|\.\d+)(?:[eE][+-]?\d+)?)|([A-Za-z_][A-Za-z0-9_]*)|(\*\*|[-+*/^(),²³×÷−·]))")
+_SUPERSCRIPTS = {"²": "**2", "³": "**3"}
+_SYMBOLS = {"^": "**", "×": "*", "÷": "/", "−": "-", "·": "*"}
+_ALIASES = {"ln": "log"}
+_FUNCTION_PREFIX = re.compile(r"^\s*(?:[a-z]\s*\(\s*[a-z]\s*(?:,\s*[a-z]\s*)?\)|[a-z])\s*=(?!=)", re.IGNORECASE)
+
+_DEFAULT_RANGE = (-10.0, 10.0)
+_DEFAULT_POINTS_1D = 2001     # Points analysed for a curve
+_DEFAULT_SAMPLES_1D = 201     # Points returned for drawing it
+_DEFAULT_POINTS_2D = 201      # Per axis
+_DEFAULT_SAMPLES_2D = 41      # Per axis
+_MAX_SAMPLES = 2001           # Per axis
+_MAX_SAMPLES_2D = 201         # Per axis; the grid returned has this many squared
+_MAX_FEATURES = 20            # Roots or extrema listed
+_BISECTION_STEPS = 50
+_GOLDEN_SECTION_STEPS = 60
+_SIGNIFICANT_DIGITS = 6
+_MAX_SQUARING_EXPONENT = 64
+
+class PlotError(ValueError):
+    """A function that cannot be plotted as asked"""
+
+class PlotTool(BaseTool):
+   #Function tabulation / plot data tool
+
+    def __init__(self):
+        super().__init__(
+            name="plot",
+            description="Evaluates a function of one or two variables over a range or grid and finds its roots, extrema and intercepts"
+        )
+
+    async def execute(self, expression: str, x_range: Optional[Tuple[float, float]] = None,
+                      y_range: Optional[Tuple[float, float]] = None, points: Optional[int] = None,
+                      samples: Optional[int] = None, analyze: bool = True) -> ToolResult:
+        """
+        Tabulate a function for plotting
+
+        Args:
+            expression: Function such as "x^2 - 4", "y = 2sin(x)" or "x^2 + y^2"
+            x_range: (min, max) of the first variable
+            y_range: (min, max) of the second variable, for functions of two variables
+            points: Points evaluated per axis for the analysis
+            samples: Points returned per axis for drawing
+            analyze: Whether to find roots, extrema and intercepts
+
+        Returns:
+            ToolResult whose result holds the sample arrays and features (see tabulate)
+        """
+        try:
+            # Large grids take tens of milliseconds; keep them off the event loop
+            result = await asyncio.to_thread(tabulate, expression, x_range, y_range, points, samples, analyze)
+            return ToolResult(
+                success=True,
+                result=result,
+                metadata={"expression": result["expression"], "kind": result["kind"], "points": result["points"]}
+            )
+        except PlotError as e:
+            return ToolResult(success=False, result=None, error_message=str(e))
+        except Exception as e:
+            return ToolResult(success=False, result=None, error_message=f"Plot error: {str(e)}")
+
+def tabulate(expression: str, x_range: Optional[Tuple[float, float]] = None,
+             y_range: Optional[Tuple[float, float]] = None, points: Optional[int] = None,
+             samples: Optional[int] = None, analyze: bool = True) -> Dict[str, Any]:
+    """
+    Evaluate a function over a range (one variable) or a grid (two variables)
+
+    Returns:
+        "kind" ("1d" or "2d"), the normalized "expression", its "variables",
+        sample arrays "x" and "y" (1-D: values; 2-D: axes, with values in "z"
+        by row of y), the number of "points" analysed, and "features": roots,
+        minima, maxima, poles, y_intercept, min and max (1-D) or min and max (2-D).
+        Points where the function is undefined are None.
+    """
+    normalized = normalize_function(expression)
+    compiled = _compile_array(normalized)
+    variables = _order_variables(compiled.variables)
+    x_range = _check_range(x_range or _DEFAULT_RANGE, variables[0] if variables else "x")
+    if len(variables) == 2:
+        return _tabulate_2d(compiled, normalized, variables, x_range,
+                            _check_range(y_range or _DEFAULT_RANGE, variables[1]), points, samples, analyze)
+    return _tabulate_1d(compiled, normalized, variables[0] if variables else "x", x_range, points, samples, analyze)
+
+def normalize_function(expression: str) -> str:
+    """
+    Rewrite a function as written by a student in calculator syntax: "y =" or
+    "f(x) =" dropped, ^ and unicode operators replaced, ln -> log and implicit
+    multiplication made explicit ("2x(x - 1)" -> "2*x*(x-1)"); a function
+    written without brackets applies to the term after it ("sin x", "cos 2x")
+    """
+    text = _FUNCTION_PREFIX.sub("", expression, count=1).strip().rstrip(".")
+    if not text:
+        raise PlotError("No function given")
+    parts: List[str] = []
+    previous = None  # Kind of the previous token: "value", "function", "open" or "operator"
+    bare = None      # "number" or "name" while inside the brackets added for "sin x"
+    position = 0
+    while position < len(text):
+        match = _TOKEN.match(text, position)
+        if match is None or match.end() == position:
+            if text[position:].strip():
+                raise PlotError(f"Unexpected '{text[position:].strip()[0]}' in '{expression.strip()}'")
+            break
+        position = match.end()
+        number, name, symbol = match.groups()
+        if name:
+            name = _ALIASES.get(name.lower(), name)
+        if bare:
+            if bare == "number" and name and name not in ARRAY_FUNCTIONS:
+                parts.append(f"*{name})")  # cos 2x -> cos(2*x)
+                bare = None
+                continue
+            parts.append(")")
+            bare = None
+        if symbol in _SUPERSCRIPTS:
+            parts.append(_SUPERSCRIPTS[symbol])
+            previous = "value"
+            continue
+        if number or name:
+            kind = "function" if name in ARRAY_FUNCTIONS else "value"
+            if previous == "value":
+                parts.append("*")  # 2x, x y, (x+1)x
+            if previous == "function" and kind == "value":
+                parts.append("(")
+                bare = "number" if number else "name"
+            parts.append(number or name)
+            previous = kind
+            continue
+        if symbol == "(":
+            if previous == "value":
+                parts.append("*")  # 2(x + 1), x(x - 1)
+            previous = "open"
+        else:
+            previous = "value" if symbol == ")" else "operator"
+        parts.append(_SYMBOLS.get(symbol, symbol))
+    if bare:
+        parts.append(")")
+    return "".join(parts)
+
+def function_variables(expression: str) -> List[str]:
+    """Variables of a plottable function (x first), raising PlotError if it cannot be plotted"""
+    return _order_variables(_compile_array(normalize_function(expression)).variables)
+
+@lru_cache(maxsize=256)
+def _compile_array(expression: str) -> CompiledExpression:
+    try:
+        compiled = compile_expression(expression, ARRAY_FUNCTIONS)
+    except SyntaxError:
+        raise PlotError(f"'{expression}' is not a valid function")
+    except UnsafeExpressionError as e:
+        raise PlotError(str(e))
+    if len(compiled.variables) > 2:
+        raise PlotError(f"Functions of at most two variables can be plotted, got {', '.join(sorted(compiled.variables))}")
+    return compiled
+
+def _order_variables(variables) -> List[str]:
+    """x before y, otherwise alphabetical"""
+    return sorted(variables, key=lambda name: ({"x": 0, "y": 1}.get(name, 2), name))
+
+def _check_range(bounds: Tuple[float, float], variable: str) -> Tuple[float, float]:
+    low, high = float(bounds[0]), float(bounds[1])
+    if not (np.isfinite(low) and np.isfinite(high)) or low >= high:
+        raise PlotError(f"The range of {variable} must be two finite numbers, lowest first")
+    return low, high
+
+def _resolution(points: Optional[int], samples: Optional[int], default_points: int,
+                default_samples: int, axes: int) -> Tuple[int, int]:
+    points = default_points if points is None else int(points)
+    samples = default_samples if samples is None else int(samples)
+    if points < 2 or samples < 2:
+        raise PlotError("At least 2 points per axis are needed")
+    if points ** axes > settings.plot_max_points:
+        raise PlotError(f"At most {settings.plot_max_points} points can be evaluated")
+    return points, min(samples, points, _MAX_SAMPLES if axes == 1 else _MAX_SAMPLES_2D)
+
+def _evaluate(compiled: CompiledExpression, bindings: Dict[str, np.ndarray], shape: Tuple[int, ...]) -> np.ndarray:
+    """Function values: ±inf at poles hit exactly, NaN where undefined (logs of negatives)"""
+    with np.errstate(all="ignore"):
+        try:
+            values = compiled.evaluate_vectorized(bindings)
+            values = np.broadcast_to(np.asarray(values, dtype=np.float64), shape)
+        except (ValueError, TypeError, ArithmeticError) as e:
+            raise PlotError(f"Cannot evaluate '{compiled.source}': {e}")
+    return values
+
+def _tabulate_1d(compiled: CompiledExpression, expression: str, variable: str, x_range: Tuple[float, float],
+                 points: Optional[int], samples: Optional[int], analyze: bool) -> Dict[str, Any]:
+    points, samples = _resolution(points, samples, _DEFAULT_POINTS_1D, _DEFAULT_SAMPLES_1D, 1)
+
+    def f(x: np.ndarray) -> np.ndarray:
+        return _evaluate(compiled, {variable: x}, x.shape)
+
+    sample_x = np.linspace(*x_range, samples)
+    result = {
+        "kind": "1d",
+        "expression": expression,
+        "variables": [variable],
+        "x": _compact(sample_x),
+        "y": _compact(f(sample_x)),
+        "points": points,
+        "features": {},
+    }
+    if analyze:
+        x = np.linspace(*x_range, points)
+        result["features"] = _features_1d(f, x, f(x), x_range)
+    return result
+
+def _features_1d(f: Callable[[np.ndarray], np.ndarray], x: np.ndarray, y: np.ndarray,
+                 x_range: Tuple[float, float]) -> Dict[str, Any]:
+    finite = np.isfinite(y)
+    features: Dict[str, Any] = {"roots": [], "minima": [], "maxima": [], "poles": [],
+                                "y_intercept": None, "min": None, "max": None}
+    if not finite.any():
+        return features
+
+    roots, poles, jumps = _roots(f, x, y, finite)
+    minima, maxima, hidden_poles = _extrema(f, x, y, finite, jumps)
+    poles = np.sort(np.concatenate([x[np.isinf(y)], poles, hidden_poles]))
+    # Feature positions to the precision of the axis, values to that of the curve
+    width, height = x[-1] - x[0], np.max(np.abs(y[finite]))
+    features["roots"] = [_snap(root, width) for root in roots]
+    features["poles"] = [_snap(pole, width) for pole in poles[:_MAX_FEATURES]]
+    # An extremum is located only to about the square root of float precision
+    features["minima"] = [{"x": _snap(px, width, 7), "y": _snap(py, height)} for px, py in minima]
+    features["maxima"] = [{"x": _snap(px, width, 7), "y": _snap(py, height)} for px, py in maxima]
+    if x_range[0] <= 0 <= x_range[1]:
+        intercept = f(np.zeros(1))[0]
+        features["y_intercept"] = _snap(intercept, height) if np.isfinite(intercept) else None
+    # Overall extremes: the best sample, or a refined local extremum beating it
+    y = np.where(finite, y, np.nan)
+    lowest = np.vstack([[x[np.nanargmin(y)], np.nanmin(y)], minima])
+    highest = np.vstack([[x[np.nanargmax(y)], np.nanmax(y)], maxima])
+    for name, point in (("min", lowest[np.argmin(lowest[:, 1])]), ("max", highest[np.argmax(highest[:, 1])])):
+        features[name] = {"x": _snap(point[0], width, 7), "y": _snap(point[1], height)}
+    return features
+
+def _roots(f: Callable[[np.ndarray], np.ndarray], x: np.ndarray, y: np.ndarray,
+           finite: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Zeros of f: sample points where it is 0 (to float noise, like sin(2π)),
+    and sign changes refined by bisection (all at once). A sign change across
+    a pole (1/x at 0) does not home in on a zero; those are returned as poles,
+    with a mask of the sample intervals they fall in.
+    """
+    height = np.max(np.abs(y[finite]))
+    zero = finite & (np.abs(y) <= 1e-12 * height)
+    exact = x[zero]
+    sign = np.where(zero, 0.0, np.sign(y))
+    bracket = (sign[:-1] * sign[1:] < 0) & finite[:-1] & finite[1:]
+    low, high, f_low = x[:-1][bracket], x[1:][bracket], y[:-1][bracket]
+    for _ in range(_BISECTION_STEPS):
+        middle = (low + high) / 2
+        f_middle = f(middle)
+        same = np.sign(f_middle) == np.sign(f_low)
+        low = np.where(same, middle, low)
+        f_low = np.where(same, f_middle, f_low)
+        high = np.where(same, high, middle)
+    refined = (low + high) / 2
+    scale = max(height, 1.0)
+    converged = np.abs(f(refined)) <= 1e-6 * scale
+    jumps = np.zeros(len(x) - 1, dtype=bool)
+    jumps[np.nonzero(bracket)[0][~converged]] = True
+
+    roots = np.sort(np.concatenate([exact, refined[converged]]))
+    if len(roots) > 1:
+        roots = roots[np.concatenate(([True], np.diff(roots) > 1e-9 * (x[-1] - x[0])))]
+    return roots[:_MAX_FEATURES], refined[~converged][:_MAX_FEATURES], jumps
+
+def _extrema(f: Callable[[np.ndarray], np.ndarray], x: np.ndarray, y: np.ndarray, finite: np.ndarray,
+             jumps: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Interior local minima and maxima as (x, y) rows, refined with a parabola
+    through each sample and its neighbours, and the positions of apparent
+    extrema that are really poles between samples
+    """
+    before, here, after = y[:-2], y[1:-1], y[2:]
+    # Samples either side of a pole are not extrema, however they compare
+    usable = finite[:-2] & finite[1:-1] & finite[2:] & ~jumps[:-1] & ~jumps[1:]
+    is_max = usable & (here > before) & (here >= after)
+    is_min = usable & (here < before) & (here <= after)
+    step = x[1] - x[0]
+    found, poles = [], []
+    for mask in (is_min, is_max):
+        index = np.nonzero(mask)[0][:_MAX_FEATURES]
+        curvature = before[index] - 2 * here[index] + after[index]
+        with np.errstate(all="ignore"):
+            offset = np.where(curvature != 0, step * (before[index] - after[index]) / (2 * curvature), 0.0)
+        t = np.clip(offset / step, -1.0, 1.0)
+        vertex = x[1:-1][index] + t * step
+        value = f(vertex)
+        # Near a smooth extremum the parabola predicts the value at its vertex closely;
+        # beside a pole that is not sampled (1/x^2 between two samples) it is far off
+        predicted = here[index] + (after[index] - before[index]) / 2 * t + curvature / 2 * t * t
+        spread = np.abs(before[index] - here[index]) + np.abs(after[index] - here[index])
+        smooth = np.isfinite(value) & (np.abs(value - predicted) <= spread / 2)
+        poles.append(vertex[~smooth])
+        sign = 1.0 if mask is is_min else -1.0
+        center = x[1:-1][index][smooth]
+        best = _golden_section(lambda points: sign * f(points), center - step, center + step)
+        found.append(np.column_stack([best, f(best)]))
+    return found[0], found[1], np.concatenate(poles)
+
+def _golden_section(f: Callable[[np.ndarray], np.ndarray], low: np.ndarray, high: np.ndarray) -> np.ndarray:
+    """Minimise f within each [low, high] bracket, all brackets at once"""
+    ratio = (np.sqrt(5) - 1) / 2
+    inner_low, inner_high = high - ratio * (high - low), low + ratio * (high - low)
+    f_low, f_high = f(inner_low), f(inner_high)
+    for _ in range(_GOLDEN_SECTION_STEPS):
+        left = ~(f_low > f_high)  # The minimum is left of inner_high (NaN counts as higher)
+        low, high = np.where(left, low, inner_low), np.where(left, inner_high, high)
+        # One inner point carries over; only the other is evaluated
+        kept, f_kept = np.where(left, inner_low, inner_high), np.where(left, f_low, f_high)
+        new = np.where(left, high - ratio * (high - low), low + ratio * (high - low))
+        f_new = f(new)
+        inner_low, f_low = np.where(left, new, kept), np.where(left, f_new, f_kept)
+        inner_high, f_high = np.where(left, kept, new), np.where(left, f_kept, f_new)
+    return (low + high) / 2
+
+def _tabulate_2d(compiled: CompiledExpression, expression: str, variables: List[str],
+                 x_range: Tuple[float, float], y_range: Tuple[float, float],
+                 points: Optional[int], samples: Optional[int], analyze: bool) -> Dict[str, Any]:
+    points, samples = _resolution(points, samples, _DEFAULT_POINTS_2D, _DEFAULT_SAMPLES_2D, 2)
+    first, second = variables
+
+    def f(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        # Row vector against column vector: the grid is formed by broadcasting
+        return _evaluate(compiled, {first: x[np.newaxis, :], second: y[:, np.newaxis]}, (len(y), len(x)))
+
+    sample_x, sample_y = np.linspace(*x_range, samples), np.linspace(*y_range, samples)
+    result = {
+        "kind": "2d",
+        "expression": expression,
+        "variables": variables,
+        "x": _compact(sample_x),
+        "y": _compact(sample_y),
+        "z": _compact(f(sample_x, sample_y)),
+        "points": points * points,
+        "features": {},
+    }
+    if analyze:
+        x, y = np.linspace(*x_range, points), np.linspace(*y_range, points)
+        z = f(x, y)
+        features: Dict[str, Any] = {"min": None, "max": None}
+        if np.isfinite(z).any():
+            for name, index in (("min", np.nanargmin(z)), ("max", np.nanargmax(z))):
+                row, column = np.unravel_index(index, z.shape)
+                features[name] = {first: _round(x[column]), second: _round(y[row]), "z": _round(z[row, column])}
+        result["features"] = features
+    return result
+
+def _compact(values: np.ndarray) -> list:
+    """Values to JSON-ready lists, rounded to the precision a plot needs, with None for gaps"""
+    finite = np.isfinite(values)
+    if finite.any():
+        magnitude = np.max(np.abs(values[finite]))
+        decimals = _SIGNIFICANT_DIGITS - 1 - int(np.floor(np.log10(magnitude))) if magnitude > 0 else 0
+        values = np.round(values, max(decimals, 0))
+    return np.where(finite, values, None).tolist()
+
+def _round(value: float) -> float:
+    return float(f"{float(value):.10g}")
+
+def _snap(value: float, scale: float, digits: int = 10) -> float:
+    """Round to digits, treating values below that precision relative to scale (noise around 0) as 0"""
+    return 0.0 if abs(value) <= scale * 10.0 ** -digits else float(f"{float(value):.{digits}g}")
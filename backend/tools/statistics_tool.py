@@ -0,0 +1,364 @@
+import asyncio
+import math
+import threading
+import warnings
+from array import array
+from typing import Any, Callable, Dict, List, Optional, Sequence, Union
+import numpy as np
+from config import settings
+from .base_tool import BaseTool, ToolResult
+
+# A dataset as pasted text, a sequence of numbers, an array('d') or a NumPy array
+Data = Union[str, Sequence[float], array, np.ndarray]
+
+# Everything that may separate two values in pasted text, read as a space
+_SEPARATORS = str.maketrans({character: " " for character in ",;\t\r\n\f\v()[]{}"})
+_UNREAD_TEXT = "string or file could not be read to its end"  # NumPy's complaint at a value it cannot parse
+_UNREAD_TEXT_LOCK = threading.Lock()
+
+_CHUNK = 1 << 16                # Values folded into the running moments at a time
+_INLINE_MAX_SIZE = 100_000      # Larger datasets (in values, or characters of text) are summarised in a thread
+_MAX_BINS = 50
+_MAX_MODES = 5                  # More values tied for most frequent are reported as no mode
+_MAX_MODE_DISTINCT = 1000       # Data with more distinct values is taken as continuous, where a mode means little
+_QUARTILES = (25.0, 50.0, 75.0)
+
+_ONE_PASS = "one pass with Welford's updates, merged a chunk at a time"
+_QUANTILE_METHOD = "linear interpolation between closest ranks (as Excel's PERCENTILE.INC)"
+
+class StatisticsError(ValueError):
+    """A dataset that cannot be parsed, or that is too small for the statistic asked of it"""
+
+class StatisticsTool(BaseTool):
+   #Descriptive statistics tool
+
+    def __init__(self):
+        super().__init__(
+            name="statistics",
+            description="Summarises pasted datasets of up to millions of values: mean, median, mode, variance, quartiles and percentiles, histograms, and least-squares regression of paired data"
+        )
+
+    async def execute(self, operation: str, data: Data, y: Optional[Data] = None, **options) -> ToolResult:
+        """
+        Compute statistics of a dataset
+
+        Args:
+            operation: "describe" (optionally with percentiles=[90, ...]),
+                       "histogram" (optionally with bins=n) or "regression"
+                       (data are the x values, y the paired y values)
+            data: The values, as pasted text ("3, 5.5, -2 and 8", one per
+                  line, ...) or as numbers
+            y: For regression, the y value paired with each x value
+
+        Returns:
+            ToolResult whose result is the dict described by that function
+        """
+        if operation not in _OPERATIONS:
+            return ToolResult(success=False, result=None, error_message=f"Unknown statistics operation '{operation}'")
+        try:
+            if operation == "regression" and y is None:
+                raise StatisticsError("Regression needs a y value paired with each x value")
+            datasets = [data] if y is None else [data, y]
+            if max(len(dataset) for dataset in datasets) <= _INLINE_MAX_SIZE:
+                # Small datasets take microseconds; a thread would cost more than the work
+                result = _compute(operation, datasets, options)
+            else:
+                result = await asyncio.to_thread(_compute, operation, datasets, options)
+            return ToolResult(
+                success=True,
+                result=result,
+                metadata={"operation": operation, "count": result["count"]}
+            )
+        except StatisticsError as e:
+            return ToolResult(success=False, result=None, error_message=str(e))
+        except Exception as e:
+            return ToolResult(success=False, result=None, error_message=f"Statistics error: {str(e)}")
+
+class RunningStatistics:
+    """
+    Count, sum, mean, variance, minimum and maximum of a stream of values.
+
+    Values are folded in a chunk at a time: NumPy gives each chunk's mean and
+    sum of squared deviations, and these are merged into the running ones
+    with the pairwise form of Welford's update (Chan, Golub and LeVeque), so
+    the data is read once and the variance does not suffer the cancellation
+    of the sum-of-squares formula.
+
+    The moments are kept in units of a power of two within a factor of two of
+    the largest value seen (rescaling exactly when a larger value arrives), so
+    sums and squares of values near the float limit cannot overflow on the
+    way to a mean or variance that fits ("1e308 1e308" has mean 1e308).
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.scale = 1.0     # Power of two the moments below are in units of
+        self.scaled_total = 0.0
+        self.scaled_mean = 0.0
+        self.scaled_m2 = 0.0  # Sum of squared deviations from the mean
+        self.minimum = math.inf
+        self.maximum = -math.inf
+
+    def update(self, values: Data) -> "RunningStatistics":
+        """Fold in more values"""
+        values = np.asarray(values, dtype=float).ravel()
+        for start in range(0, values.size, _CHUNK):
+            chunk = values[start:start + _CHUNK]
+            minimum, maximum = float(chunk.min()), float(chunk.max())
+            self._rescale(max(abs(minimum), abs(maximum)))
+            chunk = chunk / self.scale
+            deviations = chunk - chunk.mean()
+            total = float(chunk.sum())
+            self._merge(chunk.size, total / chunk.size, float(deviations @ deviations))
+            self.scaled_total += total
+            self.minimum = min(self.minimum, minimum)
+            self.maximum = max(self.maximum, maximum)
+        return self
+
+    def merge(self, other: "RunningStatistics") -> "RunningStatistics":
+        """Fold in the statistics of another stream, e.g. one read by another worker"""
+        if other.count:
+            self._rescale(other.scale)
+            factor = other.scale / self.scale
+            self._merge(other.count, other.scaled_mean * factor, other.scaled_m2 * factor * factor)
+            self.scaled_total += other.scaled_total * factor
+            self.minimum = min(self.minimum, other.minimum)
+            self.maximum = max(self.maximum, other.maximum)
+        return self
+
+    def _rescale(self, magnitude: float) -> None:
+        """Switch to a larger unit if a magnitude is two or more of the current one"""
+        scale = math.ldexp(1.0, math.frexp(magnitude)[1] - 1)  # Largest power of two not above it (2**1023 for 1e308)
+        if scale <= self.scale:
+            return
+        factor = self.scale / scale
+        self.scaled_total *= factor
+        self.scaled_mean *= factor
+        self.scaled_m2 *= factor * factor
+        self.scale = scale
+
+    def _merge(self, count: int, mean: float, m2: float) -> None:
+        combined = self.count + count
+        delta = mean - self.scaled_mean
+        self.scaled_mean += delta * count / combined
+        self.scaled_m2 += m2 + delta * delta * self.count * count / combined
+        self.count = combined
+
+    @property
+    def total(self) -> float:
+        return self.scaled_total * self.scale
+
+    @property
+    def mean(self) -> float:
+        return self.scaled_mean * self.scale
+
+    @property
+    def variance(self) -> Optional[float]:
+        """Sample variance (dividing by n - 1)"""
+        return self.scaled_m2 / (self.count - 1) * self.scale * self.scale if self.count > 1 else None
+
+    @property
+    def population_variance(self) -> Optional[float]:
+        return self.scaled_m2 / self.count * self.scale * self.scale if self.count else None
+
+class RunningRegression:
+    """
+    Least-squares line through a stream of (x, y) pairs, with the means, sums
+    of squared deviations and co-moment merged a chunk at a time as in
+    RunningStatistics.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.mean_x = 0.0
+        self.mean_y = 0.0
+        self.m2_x = 0.0
+        self.m2_y = 0.0
+        self.comoment = 0.0  # Sum of (x - mean x)(y - mean y)
+
+    def update(self, x: Data, y: Data) -> "RunningRegression":
+        """Fold in more pairs"""
+        x = np.asarray(x, dtype=float).ravel()
+        y = np.asarray(y, dtype=float).ravel()
+        if x.size != y.size:
+            raise StatisticsError(f"There are {x.size} x values but {y.size} y values")
+        for start in range(0, x.size, _CHUNK):
+            chunk_x, chunk_y = x[start:start + _CHUNK], y[start:start + _CHUNK]
+            count = chunk_x.size
+            mean_x, mean_y = float(chunk_x.mean()), float(chunk_y.mean())
+            dx, dy = chunk_x - mean_x, chunk_y - mean_y
+            combined = self.count + count
+            delta_x, delta_y = mean_x - self.mean_x, mean_y - self.mean_y
+            weight = self.count * count / combined
+            self.m2_x += float(dx @ dx) + delta_x * delta_x * weight
+            self.m2_y += float(dy @ dy) + delta_y * delta_y * weight
+            self.comoment += float(dx @ dy) + delta_x * delta_y * weight
+            self.mean_x += delta_x * count / combined
+            self.mean_y += delta_y * count / combined
+            self.count = combined
+        return self
+
+    @property
+    def slope(self) -> float:
+        if not self.m2_x:
+            raise StatisticsError("Every x value is the same, so no line can be fitted")
+        return self.comoment / self.m2_x
+
+    @property
+    def intercept(self) -> float:
+        return self.mean_y - self.slope * self.mean_x
+
+    @property
+    def correlation(self) -> Optional[float]:
+        """Pearson's r, or None when every y value is the same"""
+        if not self.m2_x or not self.m2_y:
+            return None
+        return max(-1.0, min(1.0, self.comoment / math.sqrt(self.m2_x * self.m2_y)))
+
+def parse_dataset(data: Data) -> np.ndarray:
+    """
+    Read a dataset into a float64 array
+
+    Text is numbers separated by commas, semicolons, whitespace or "and"
+    ("3, 5.5, -2 and 8", one value per line, "[1 2 3]"), read in a single
+    pass by NumPy's C parser straight into the array, so a pasted list of a
+    million values never becomes a million Python floats. Sequences,
+    array('d') buffers and NumPy arrays of numbers are accepted too.
+
+    Raises:
+        StatisticsError: Anything else, or an empty, oversized or non-finite dataset
+    """
+    if isinstance(data, str):
+        text = data.replace("−", "-").replace("and", " ").translate(_SEPARATORS)
+        try:
+            # NumPy before 2.3 only warns at text it cannot read, returning the values before it.
+            # The filters are process-wide, so datasets read in other threads wait rather than restore them early
+            with _UNREAD_TEXT_LOCK, warnings.catch_warnings():
+                warnings.filterwarnings("error", _UNREAD_TEXT, DeprecationWarning, __name__)
+                values = np.fromstring(text, dtype=float, sep=" ")
+        except (ValueError, DeprecationWarning):
+            raise StatisticsError("The dataset must be numbers separated by commas, spaces or new lines")
+    else:
+        try:
+            values = np.asarray(data, dtype=float)
+        except (TypeError, ValueError):
+            raise StatisticsError("The dataset must be a list of numbers")
+        if values.ndim != 1:
+            raise StatisticsError("The dataset must be a flat list of numbers")
+    if not values.size:
+        raise StatisticsError("The dataset is empty")
+    if values.size > settings.statistics_max_values:
+        raise StatisticsError(f"Datasets are limited to {settings.statistics_max_values} values")
+    if not np.isfinite(values).all():
+        raise StatisticsError("Every value in the dataset must be a finite number")
+    return values
+
+def describe(values: np.ndarray, percentiles: Optional[Sequence[float]] = None) -> Dict[str, Any]:
+    """
+    Summary statistics: count, sum, mean, median, mode(s), sample and
+    population variance and standard deviation, extremes, quartiles and
+    any other percentiles asked for
+
+    The moments come from one pass over the data; the quartiles and
+    percentiles from one selection (not a full sort) over a copy of it.
+    """
+    percentiles = [float(p) for p in percentiles or []]
+    if any(not 0 <= p <= 100 for p in percentiles):
+        raise StatisticsError("Percentiles must be between 0 and 100")
+    running = RunningStatistics().update(values)
+    asked = list(_QUARTILES) + [p for p in percentiles if p not in _QUARTILES]
+    with np.errstate(over="ignore"):  # Out-of-range results are refused as a whole by _check_finite
+        quantiles = dict(zip(asked, (float(q) for q in np.percentile(values, asked))))
+    variance, population_variance = running.variance, running.population_variance
+    modes = _modes(values)
+    return {
+        "operation": "describe",
+        "count": running.count,
+        "sum": running.total,
+        "mean": running.mean,
+        "median": quantiles[50.0],
+        "modes": modes,
+        "variance": variance,
+        "standard_deviation": math.sqrt(variance) if variance is not None else None,
+        "population_variance": population_variance,
+        "population_standard_deviation": math.sqrt(population_variance),
+        "minimum": running.minimum,
+        "maximum": running.maximum,
+        "range": running.maximum - running.minimum,
+        "quartiles": [quantiles[p] for p in _QUARTILES],
+        "iqr": quantiles[75.0] - quantiles[25.0],
+        "percentiles": {_percentile_key(p): quantiles[p] for p in percentiles},
+        "method": _ONE_PASS,
+        "quantile_method": _QUANTILE_METHOD,
+    }
+
+def histogram(values: np.ndarray, bins: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Counts of the values in equal-width bins spanning them, by default as
+    many as Sturges' rule gives (1 + log2 n, at most _MAX_BINS)
+    """
+    method = "by Sturges' rule" if bins is None else "as asked"
+    if bins is None:
+        bins = min(_MAX_BINS, math.ceil(math.log2(values.size)) + 1)
+    if not 1 <= bins <= _MAX_BINS:
+        raise StatisticsError(f"A histogram has between 1 and {_MAX_BINS} bins")
+    running = RunningStatistics().update(values)
+    counts, edges = np.histogram(values, bins=int(bins))
+    return {
+        "operation": "histogram",
+        "count": running.count,
+        "mean": running.mean,
+        "standard_deviation": math.sqrt(running.variance) if running.variance is not None else None,
+        "bins": int(bins),
+        "edges": [float(edge) for edge in edges],
+        "counts": [int(count) for count in counts],
+        "method": method,
+    }
+
+def regression(x: np.ndarray, y: np.ndarray) -> Dict[str, Any]:
+    """Least-squares line y = slope·x + intercept, with Pearson's r"""
+    if x.size < 2:
+        raise StatisticsError("A line needs at least two points")
+    running = RunningRegression().update(x, y)
+    correlation = running.correlation
+    return {
+        "operation": "regression",
+        "count": running.count,
+        "slope": running.slope,
+        "intercept": running.intercept,
+        "r": correlation,
+        "r_squared": correlation * correlation if correlation is not None else None,
+        "mean_x": running.mean_x,
+        "mean_y": running.mean_y,
+        "method": _ONE_PASS,
+    }
+
+_OPERATIONS: Dict[str, Callable[..., Dict[str, Any]]] = {
+    "describe": describe,
+    "histogram": histogram,
+    "regression": regression,
+}
+
+def _compute(operation: str, datasets: List[Data], options: Dict[str, Any]) -> Dict[str, Any]:
+    result = _OPERATIONS[operation](*[parse_dataset(data) for data in datasets], **options)
+    _check_finite(result)
+    return result
+
+def _check_finite(result: Dict[str, Any]) -> None:
+    """Refuse a result with a statistic beyond the float range (the sum of "1e308 1e308"), which JSON cannot carry"""
+    for name, value in result.items():
+        values = value.values() if isinstance(value, dict) else value if isinstance(value, list) else [value]
+        if any(isinstance(item, float) and not math.isfinite(item) for item in values):
+            raise StatisticsError(f"The {name.replace('_', ' ')} of the dataset is too large to represent")
+
+def _modes(values: np.ndarray) -> List[float]:
+    """The most frequent values, or none if no value repeats, too many tie or the data is continuous"""
+    distinct, counts = np.unique(values, return_counts=True)
+    top = counts.max()
+    if top == 1 or distinct.size > _MAX_MODE_DISTINCT:
+        return []
+    modes = distinct[counts == top]
+    return [float(mode) for mode in modes] if modes.size <= _MAX_MODES else []
+
+def _percentile_key(percentile: float) -> str:
+    return str(int(percentile)) if percentile.is_integer() else str(percentile)
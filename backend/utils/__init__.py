@@ -1,8 +1,16 @@
 # Utility functions will be added in later phases 
 
 from .logger import setup_logging, get_logger
+from .metrics import LatencyTracker
+from .singleflight import SingleFlight
+from .keyword_scorer import KeywordScorer
+from .search_index import SearchIndex
 
 __all__ = [
     "setup_logging",
-    "get_logger"
-] 
\ No newline at end of file
+    "get_logger",
+    "LatencyTracker",
+    "SingleFlight",
+    "KeywordScorer",
+    "SearchIndex"
+] 
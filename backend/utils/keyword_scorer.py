@@ -0,0 +1,195 @@
+import json
+from collections import deque
+from typing import Any, Dict, List, Tuple
+
+# How a keyword must sit in the text to count
+MATCH_MODES = ("word", "stem", "substring", "operator")
+
+class KeywordScorer:
+    """
+    Scores text against weighted keyword lists for several domains in one pass.
+
+    All keywords are compiled into a single Aho-Corasick automaton, so scoring
+    walks the text once no matter how many keywords or domains there are.
+    Each keyword counts once per text, adding its weight to its domains.
+
+    Match modes:
+        word:      whole word only ("sin" does not match "using")
+        stem:      at the start of a word ("force" matches "forces", not "workforce")
+        substring: anywhere ("^", "=")
+        operator:  anywhere except between two letters ("2-3" and "x - y", not "well-known")
+    """
+
+    def __init__(self, keywords: Dict[str, Dict[str, Any]]):
+        """
+        Args:
+            keywords: Domain -> {keyword: weight} or {keyword: {"weight": w, "match": mode}};
+                      a bare weight uses "stem" matching
+        """
+        self.domains = list(keywords)
+        self.keywords: Dict[str, List[str]] = {domain: [] for domain in self.domains}
+
+        # Pattern id -> (keyword, match mode, [(domain, weight), ...])
+        self._patterns: List[Tuple[str, str, List[Tuple[str, float]]]] = []
+        pattern_ids: Dict[Tuple[str, str], int] = {}
+        for domain, entries in keywords.items():
+            for keyword, spec in entries.items():
+                weight, mode = _parse_spec(keyword, spec)
+                keyword = keyword.lower()
+                self.keywords[domain].append(keyword)
+                key = (keyword, mode)
+                if key not in pattern_ids:
+                    pattern_ids[key] = len(self._patterns)
+                    self._patterns.append((keyword, mode, []))
+                self._patterns[pattern_ids[key]][2].append((domain, weight))
+
+        self._build_automaton()
+
+    @classmethod
+    def from_file(cls, path: str) -> "KeywordScorer":
+        """Load domain keyword weights from a JSON file"""
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def _build_automaton(self) -> None:
+        # Trie of goto transitions; node 0 is the root
+        self._goto: List[Dict[str, int]] = [{}]
+        self._output: List[List[int]] = [[]]
+        for pattern_id, (keyword, _, _) in enumerate(self._patterns):
+            node = 0
+            for char in keyword:
+                next_node = self._goto[node].get(char)
+                if next_node is None:
+                    next_node = len(self._goto)
+                    self._goto[node][char] = next_node
+                    self._goto.append({})
+                    self._output.append([])
+                node = next_node
+            self._output[node].append(pattern_id)
+
+        # Failure links in breadth-first order; outputs inherit those of their failure node
+        fail = [0] * len(self._goto)
+        order = []
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            order.append(node)
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fallback = fail[node]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                fail[child] = target if target != child else 0
+                self._output[child] = self._output[child] + self._output[fail[child]]
+
+        # Fold the failure links into a full transition table so scanning
+        # takes exactly one dict lookup per character
+        self._delta: List[Dict[str, int]] = [dict(self._goto[0])] + [{} for _ in order]
+        for node in order:
+            self._delta[node] = {**self._delta[fail[node]], **self._goto[node]}
+
+    def find(self, text: str) -> List[int]:
+        """Ids of the patterns present in the text, each reported once"""
+        text = text.lower()
+        delta, output, patterns = self._delta, self._output, self._patterns
+        found: Dict[int, None] = {}
+        node = 0
+        for end, char in enumerate(text):
+            node = delta[node].get(char, 0)
+            if not output[node]:
+                continue
+            for pattern_id in output[node]:
+                if pattern_id in found:
+                    continue
+                keyword, mode, _ = patterns[pattern_id]
+                if _at_boundary(text, end + 1 - len(keyword), end + 1, mode):
+                    found[pattern_id] = None
+        return list(found)
+
+    def find_all(self, text: str) -> List[Tuple[int, int]]:
+        """
+        Every match in the text as (pattern id, end offset), repeats included
+
+        Lets many texts joined by non-word separators be scanned in one pass,
+        with the end offsets telling which text each match belongs to.
+        """
+        text = text.lower()
+        delta, output, patterns = self._delta, self._output, self._patterns
+        hits = []
+        node = 0
+        for end, char in enumerate(text):
+            node = delta[node].get(char, 0)
+            if not output[node]:
+                continue
+            for pattern_id in output[node]:
+                keyword, mode, _ = patterns[pattern_id]
+                if _at_boundary(text, end + 1 - len(keyword), end + 1, mode):
+                    hits.append((pattern_id, end + 1))
+        return hits
+
+    def pattern_weights(self) -> List[Dict[str, float]]:
+        """Domain weights for each pattern id, e.g. to build a keyword-to-domain matrix"""
+        weights = []
+        for _, _, targets in self._patterns:
+            by_domain: Dict[str, float] = {}
+            for domain, weight in targets:
+                by_domain[domain] = by_domain.get(domain, 0.0) + weight
+            weights.append(by_domain)
+        return weights
+
+    def score(self, text: str) -> Dict[str, float]:
+        """
+        Score text for every domain
+
+        Args:
+            text: Text to score
+
+        Returns:
+            Domain -> summed weight of the keywords found
+        """
+        scores = {domain: 0.0 for domain in self.domains}
+        for pattern_id in self.find(text):
+            for domain, weight in self._patterns[pattern_id][2]:
+                scores[domain] += weight
+        return scores
+
+    def matches(self, text: str) -> Dict[str, List[str]]:
+        """Keywords found in the text, per domain"""
+        return self.scan(text)[1]
+
+    def scan(self, text: str) -> Tuple[Dict[str, float], Dict[str, List[str]]]:
+        """Scores and keywords found per domain, from a single pass"""
+        scores = {domain: 0.0 for domain in self.domains}
+        found: Dict[str, List[str]] = {domain: [] for domain in self.domains}
+        for pattern_id in self.find(text):
+            keyword, _, targets = self._patterns[pattern_id]
+            for domain, weight in targets:
+                scores[domain] += weight
+                found[domain].append(keyword)
+        return scores, found
+
+def _parse_spec(keyword: str, spec: Any) -> Tuple[float, str]:
+    if isinstance(spec, dict):
+        weight, mode = float(spec.get("weight", 1.0)), spec.get("match", "stem")
+    else:
+        weight, mode = float(spec), "stem"
+    if mode not in MATCH_MODES:
+        raise ValueError(f"Unknown match mode '{mode}' for keyword '{keyword}'. Use one of {MATCH_MODES}")
+    return weight, mode
+
+def _at_boundary(text: str, start: int, end: int, mode: str) -> bool:
+    """Whether the match text[start:end] satisfies its match mode"""
+    if mode == "substring":
+        return True
+    before = text[start - 1] if start > 0 else " "
+    after = text[end] if end < len(text) else " "
+    if mode == "operator":
+        return not (before.isalpha() and after.isalpha())
+    # Only edges that are word characters need a word boundary
+    if _is_word_char(text[start]) and _is_word_char(before):
+        return False
+    return mode == "stem" or not (_is_word_char(text[end - 1]) and _is_word_char(after))
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum() or char == "_"
@@ -0,0 +1,53 @@
+import threading
+from collections import deque
+from typing import Dict, Any, Optional
+
+class LatencyTracker:
+    """Tracks count, mean, max and recent percentiles for a stream of durations (seconds)"""
+
+    def __init__(self, window: int = 512):
+        self._lock = threading.Lock()
+        self._recent = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds: float) -> None:
+        """Record a single observation"""
+        with self._lock:
+            self.count += 1
+            self.total += seconds
+            if seconds > self.max:
+                self.max = seconds
+            self._recent.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """
+        Percentile over the recent window
+
+        Args:
+            q: Percentile in the range 0-100
+
+        Returns:
+            Observed percentile in seconds, or None if nothing was recorded yet
+        """
+        with self._lock:
+            if not self._recent:
+                return None
+            ordered = sorted(self._recent)
+        index = min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Get a JSON-friendly summary in milliseconds"""
+        p50 = self.percentile(50)
+        p95 = self.percentile(95)
+        p99 = self.percentile(99)
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total / self.count * 1000, 2) if self.count else 0.0,
+            "max_ms": round(self.max * 1000, 2),
+            "p50_ms": round(p50 * 1000, 2) if p50 is not None else None,
+            "p95_ms": round(p95 * 1000, 2) if p95 is not None else None,
+            "p99_ms": round(p99 * 1000, 2) if p99 is not None else None,
+        }
@@ -0,0 +1,197 @@
+import bisect
+import math
+import re
+from collections import defaultdict
+from typing import Dict, Hashable, List, NamedTuple, Optional, Tuple
+
+_WORD = re.compile(r"[^\W_]+")  # Letters and digits of any script ("λ", "m³"); "_" and punctuation split words
+_NGRAM = 3
+_MAX_EXPANSIONS = 64            # Indexed words a query word may stand for (prefix or fuzzy matches)
+_PREFIX_QUALITY = 0.6           # A prefix match counts for this much of an exact one, rising with its length
+_FUZZY_QUALITY = 0.5            # A word one edit away counts for this much of an exact one (a quarter for two)
+_LENGTH_WEIGHT = 0.4            # How much longer documents are marked down ("Planck constant" over "molar Planck constant")
+
+class SearchHit(NamedTuple):
+    key: Hashable
+    score: float
+    matched: int  # Query words the document matched
+
+class SearchIndex:
+    """
+    Ranked search, prefix autocompletion and typo-tolerant suggestions over a
+    fixed set of documents.
+
+    Built once: an inverted index from each word to the documents it appears
+    in (with the weight of the best field it appears in), the vocabulary sorted
+    for prefix lookups by bisection, and an index from character trigrams to
+    the words containing them. Each query word is looked up exactly, as a
+    prefix, and by the trigrams it shares with indexed words (confirmed by edit
+    distance), so a query touches only the postings of its own words and their
+    near neighbours, never every document.
+    """
+
+    def __init__(self, documents: Dict[Hashable, Dict[str, str]], weights: Dict[str, float],
+                 boosts: Optional[Dict[Hashable, float]] = None):
+        """
+        Args:
+            documents: Document key -> field name -> text
+            weights: Field name -> weight of a word found in that field; fields
+                     not listed are not indexed
+            boosts: Document key -> factor on its scores, for documents that
+                    should rank above equally good matches (default 1)
+        """
+        postings: Dict[str, Dict[Hashable, float]] = defaultdict(dict)
+        lengths: Dict[Hashable, int] = {}
+        for key, fields in documents.items():
+            length = 0
+            for field, text in fields.items():
+                weight = weights.get(field)
+                if not weight or not text:
+                    continue
+                words = tokenize(text)
+                length += len(words)
+                for word in words:
+                    if postings[word].get(key, 0) < weight:
+                        postings[word][key] = weight
+            lengths[key] = length
+        self.size = len(documents)
+        # As in BM25, a match counts for less in a document with more words besides it
+        average_length = sum(lengths.values()) / max(1, self.size) or 1
+        boosts = boosts or {}
+        self._scales = {
+            key: boosts.get(key, 1.0) / (1 - _LENGTH_WEIGHT + _LENGTH_WEIGHT * length / average_length)
+            for key, length in lengths.items()
+        }
+        self._postings = dict(postings)
+        self._vocabulary = sorted(self._postings)
+        # Rare words say more about a document than ones most documents share
+        self._idf = {word: math.log(1 + self.size / len(keys)) for word, keys in self._postings.items()}
+        self._grams: Dict[str, List[str]] = defaultdict(list)
+        for word in self._vocabulary:
+            for gram in _ngrams(word):
+                self._grams[gram].append(word)
+
+    def search(self, text: str, limit: int = 10, fuzzy: bool = True) -> List[SearchHit]:
+        """
+        Documents matching the words of a text, best first: those matching more
+        of the words, then by the weight and rarity of the words matched
+
+        Each word may also match indexed words it begins ("elec" for
+        "electron") and, if fuzzy, words a typo or two away ("plank")
+        """
+        return self._rank(tokenize(text), limit, fuzzy, prefix_last_only=False)
+
+    def complete(self, text: str, limit: int = 10) -> List[SearchHit]:
+        """
+        Autocompletion: documents matching every finished word of a partly
+        typed text (allowing typos) and a word beginning with the last one
+        """
+        words = tokenize(text)
+        if not words:
+            return []
+        if text[-1:].isspace():
+            return self._rank(words, limit, fuzzy=True, prefix_last_only=False, require_all=True)
+        return self._rank(words, limit, fuzzy=True, prefix_last_only=True, require_all=True)
+
+    def suggest(self, text: str, limit: int = 5) -> List[Hashable]:
+        """Keys of the documents closest to a text that matched nothing, for "did you mean" """
+        return [hit.key for hit in self.search(text, limit, fuzzy=True)]
+
+    def _rank(self, words: List[str], limit: int, fuzzy: bool, prefix_last_only: bool,
+              require_all: bool = False) -> List[SearchHit]:
+        words = list(dict.fromkeys(words))
+        scores: Dict[Hashable, float] = defaultdict(float)
+        matched: Dict[Hashable, int] = defaultdict(int)
+        for position, word in enumerate(words):
+            if not prefix_last_only:
+                expansions = self._expand(word, prefix=len(word) > 1, fuzzy=fuzzy)
+            elif position < len(words) - 1:
+                expansions = self._expand(word, prefix=False, fuzzy=True)
+            else:
+                expansions = self._expand(word, prefix=True, fuzzy=False)
+            # A document counts each query word once, by its best match
+            best: Dict[Hashable, float] = {}
+            for indexed, quality in expansions.items():
+                idf = self._idf[indexed]
+                for key, weight in self._postings[indexed].items():
+                    score = quality * weight * idf
+                    if score > best.get(key, 0):
+                        best[key] = score
+            for key, score in best.items():
+                scores[key] += score
+                matched[key] += 1
+        needed = len(words) if require_all else 1
+        hits = [SearchHit(key, score * self._scales[key], matched[key])
+                for key, score in scores.items() if matched[key] >= needed]
+        hits.sort(key=lambda hit: (-hit.matched, -hit.score))
+        return hits[:limit]
+
+    def _expand(self, word: str, prefix: bool, fuzzy: bool) -> Dict[str, float]:
+        """Indexed words a query word may stand for, with how well each matches"""
+        expansions: Dict[str, float] = {}
+        if word in self._postings:
+            expansions[word] = 1.0
+        if prefix:
+            start = bisect.bisect_left(self._vocabulary, word)
+            for indexed in self._vocabulary[start:start + _MAX_EXPANSIONS]:
+                if not indexed.startswith(word):
+                    break
+                if indexed != word:
+                    expansions[indexed] = _PREFIX_QUALITY + (1 - _PREFIX_QUALITY) * len(word) / len(indexed)
+        if fuzzy and word not in self._postings:
+            for indexed, distance in self._near(word):
+                quality = _FUZZY_QUALITY / distance
+                if quality > expansions.get(indexed, 0):
+                    expansions[indexed] = quality
+        return expansions
+
+    def _near(self, word: str) -> List[Tuple[str, int]]:
+        """Indexed words within a word's typo allowance (one edit up to 5 letters, two beyond)"""
+        allowed = 0 if len(word) < 3 else 1 if len(word) <= 5 else 2
+        if not allowed:
+            return []
+        grams = _ngrams(word)
+        shared: Dict[str, int] = defaultdict(int)
+        for gram in grams:
+            for indexed in self._grams.get(gram, ()):
+                shared[indexed] += 1
+        # Each edit spoils at most _NGRAM of the word's trigrams (fewer than that shared cannot be close)
+        needed = max(1, len(grams) - _NGRAM * allowed)
+        candidates = sorted((indexed for indexed, count in shared.items()
+                             if count >= needed and abs(len(indexed) - len(word)) <= allowed),
+                            key=lambda indexed: -shared[indexed])
+        near = []
+        for indexed in candidates[:_MAX_EXPANSIONS * 4]:
+            distance = edit_distance(word, indexed, allowed)
+            if distance is not None:
+                near.append((indexed, distance))
+        return near[:_MAX_EXPANSIONS]
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased words of a text, split at spaces, punctuation and underscores"""
+    return _WORD.findall(text.lower())
+
+def edit_distance(a: str, b: str, limit: int) -> Optional[int]:
+    """
+    Edits (insertions, deletions, substitutions or swaps of neighbouring
+    letters) between two words, or None if more than limit
+    """
+    if abs(len(a) - len(b)) > limit:
+        return None
+    previous2: Optional[List[int]] = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if previous2 is not None and i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return None
+        previous2, previous = previous, current
+    return previous[-1] if previous[-1] <= limit else None
+
+def _ngrams(word: str) -> List[str]:
+    padded = f"^{word}$"
+    return [padded[i:i + _NGRAM] for i in range(len(padded) - _NGRAM + 1)]
@@ -0,0 +1,78 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+class _Flight:
+    """One in-flight call shared by every caller with the same key"""
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key into a single execution.
+
+    The first caller for a key starts the work as its own task; callers that
+    arrive while it is running await the same task instead of starting another.
+    A caller that is cancelled only stops waiting; the shared work is cancelled
+    only when every caller waiting on it has gone away.
+    """
+
+    def __init__(self):
+        self._flights: Dict[Hashable, _Flight] = {}
+
+        # Metrics
+        self.leaders = 0
+        self.followers = 0
+        self.cancelled_waiters = 0
+        self.abandoned = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run fn once for all concurrent callers with the same key
+
+        Args:
+            key: Identity of the call (e.g. a cache key)
+            fn: Zero-argument coroutine function doing the actual work
+
+        Returns:
+            The shared result (exceptions are shared too)
+        """
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight(asyncio.ensure_future(fn()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _: self._forget(key, flight))
+            self.leaders += 1
+        else:
+            self.followers += 1
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            if not flight.task.done():
+                # This caller went away; the work keeps running for the others
+                self.cancelled_waiters += 1
+                if flight.waiters == 1:
+                    flight.task.cancel()
+                    self.abandoned += 1
+            raise
+        finally:
+            flight.waiters -= 1
+
+    def _forget(self, key: Hashable, flight: _Flight) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get coalescing counters"""
+        total = self.leaders + self.followers
+        return {
+            "in_flight": len(self._flights),
+            "executions": self.leaders,
+            "coalesced": self.followers,
+            "dedup_ratio": round(self.followers / total, 4) if total else 0.0,
+            "cancelled_waiters": self.cancelled_waiters,
+            "abandoned": self.abandoned,
+        }